@@ -0,0 +1,218 @@
+"""
+PERFORMANCE OPTIMIZATION MODULE
+Adaptive endpointing for the Deepgram transcriber.
+
+A fixed TimeEndpointingConfig makes every bot response wait the full cutoff
+(1.5s) of silence, even after a clearly finished "Yes.". The adaptive endpointer
+picks the silence it waits for per turn:
+- short punctuated answers are committed as soon as Deepgram marks speech_final
+- other punctuated sentence ends wait a short cutoff
+- a caller spelling an email or reading out a number gets an extended cutoff
+- anything else waits for a cutoff learned from this caller's own mid-turn pauses
+
+Every committed turn logs its endpoint delay (silence waited before the
+transcript was released) so the gain over the fixed cutoff can be measured.
+"""
+
+import logging
+import math
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlencode
+
+from vocode.streaming.models.audio import AudioEncoding
+from vocode.streaming.models.transcriber import DeepgramTranscriberConfig, EndpointingConfig, TranscriberConfig
+from vocode.streaming.transcriber.deepgram_transcriber import (
+    PUNCTUATION_TERMINATORS,
+    DeepgramTranscriber,
+    DeepgramTranscriptionResult,
+    DeepgramUtteranceEnd,
+)
+from vocode.streaming.transcriber.default_factory import DefaultTranscriberFactory
+
+from media_codec import TRANSCRIBER_FRAME_MS, MediaFrameRingBuffer, mulaw_silence
+
+logger = logging.getLogger(__name__)
+
+# Words callers use while spelling addresses or reading out numbers
+_SPELLING_WORDS = {
+    "en": {"zero", "oh", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine",
+           "at", "dot", "dash", "hyphen", "underscore", "double", "triple"},
+    "fr": {"zéro", "un", "une", "deux", "trois", "quatre", "cinq", "six", "sept", "huit", "neuf",
+           "arobase", "point", "tiret", "double"},
+    "es": {"cero", "uno", "dos", "tres", "cuatro", "cinco", "seis", "siete", "ocho", "nueve",
+           "arroba", "punto", "guion", "doble"},
+}
+# Gaps shorter than this are ordinary word transitions, not pauses
+_MIN_PAUSE_SECONDS = 0.15
+_PAUSE_EWMA_WEIGHT = 0.2
+
+
+class AdaptiveEndpointingConfig(EndpointingConfig, type="endpointing_adaptive"):  # type: ignore
+    # Deepgram VAD silence behind speech_final; short answers commit on it
+    min_cutoff_seconds: float = 0.4
+    sentence_end_cutoff_seconds: float = 0.6
+    # Ceiling for ordinary pauses (the previous fixed cutoff)
+    time_cutoff_seconds: float = 1.5
+    spelling_cutoff_seconds: float = 2.5
+    short_utterance_words: int = 3
+    # Prior for the per-caller pause model; mean + 2 std + margin = 1.45s
+    initial_pause_mean_seconds: float = 0.6
+    initial_pause_std_seconds: float = 0.3
+    pause_margin_seconds: float = 0.25
+
+
+class EndpointingStats:
+    """Endpoint delays of recent turns, per endpoint source"""
+
+    def __init__(self, max_turns: int = 1000):
+        self._delays: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=max_turns))
+        self._saved: Deque[float] = deque(maxlen=max_turns)
+
+    def record(self, source: str, delay_seconds: float, fixed_cutoff_seconds: float):
+        self._delays[source].append(delay_seconds)
+        self._saved.append(fixed_cutoff_seconds - delay_seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        sources = {}
+        for source, delays in self._delays.items():
+            ordered = sorted(delays)
+            sources[source] = {
+                "turns": len(ordered),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1)
+            }
+        return {
+            "turns": len(self._saved),
+            "avg_saved_vs_fixed_ms": round(sum(self._saved) / len(self._saved) * 1000, 1) if self._saved else 0.0,
+            "sources": sources
+        }
+
+
+class AdaptiveDeepgramTranscriber(DeepgramTranscriber):
+    """
+    DeepgramTranscriber whose endpoint cutoff adapts to the turn and the caller.
+    Mu-law input is also coalesced into TRANSCRIBER_FRAME_MS frames before it is
+    queued for Deepgram (one websocket message per frame instead of per 20ms).
+    """
+
+    def __init__(self, transcriber_config: DeepgramTranscriberConfig):
+        super().__init__(transcriber_config)
+        endpointing_config = transcriber_config.endpointing_config
+        language = (transcriber_config.language or "en").split("-")[0].lower()
+        self._spelling_words = _SPELLING_WORDS.get(language, _SPELLING_WORDS["en"])
+        self._pause_mean = getattr(endpointing_config, "initial_pause_mean_seconds", 0.6)
+        self._pause_variance = getattr(endpointing_config, "initial_pause_std_seconds", 0.3) ** 2
+        self._last_word_end = None
+        self._input_frames: Optional[MediaFrameRingBuffer] = None
+        if transcriber_config.audio_encoding == AudioEncoding.MULAW and TRANSCRIBER_FRAME_MS > 0:
+            self._input_frames = MediaFrameRingBuffer(
+                transcriber_config.sampling_rate * TRANSCRIBER_FRAME_MS // 1000)
+
+    def create_silent_chunk(self, chunk_size, sample_width=2):
+        if self.transcriber_config.audio_encoding == AudioEncoding.MULAW:
+            return mulaw_silence(chunk_size)
+        return super().create_silent_chunk(chunk_size, sample_width)
+
+    def send_audio(self, chunk):
+        if self._input_frames is None:
+            return super().send_audio(chunk)
+        self._input_frames.write(mulaw_silence(len(chunk)) if self.is_muted else chunk)
+        for frame in self._input_frames.frames():
+            self.consume_nonblocking(frame)
+
+    def get_deepgram_url(self):
+        url = super().get_deepgram_url()
+        endpointing_config = self.transcriber_config.endpointing_config
+        if not isinstance(endpointing_config, AdaptiveEndpointingConfig):
+            return url
+        return f"{url}&" + urlencode({
+            "punctuate": "true",
+            "endpointing": int(endpointing_config.min_cutoff_seconds * 1000 / self._get_speed_coefficient())
+        })
+
+    def _observe_pauses(self, words: List[dict]):
+        """Feed the caller's mid-turn pauses into the running pause model"""
+        for word in words:
+            if self._last_word_end is not None:
+                pause = word["start"] - self._last_word_end
+                if _MIN_PAUSE_SECONDS <= pause <= self.transcriber_config.endpointing_config.spelling_cutoff_seconds:
+                    deviation = pause - self._pause_mean
+                    self._pause_mean += _PAUSE_EWMA_WEIGHT * deviation
+                    self._pause_variance = (1 - _PAUSE_EWMA_WEIGHT) * (
+                        self._pause_variance + _PAUSE_EWMA_WEIGHT * deviation * deviation)
+            self._last_word_end = word["end"]
+
+    def _is_spelling_token(self, word: str) -> bool:
+        token = word.strip(".,!?-").lower()
+        return ((len(token) == 1 and token.isalpha()) or "@" in token
+                or any(character.isdigit() for character in token) or token in self._spelling_words)
+
+    def _select_cutoff(self, current_buffer: str) -> Tuple[float, str]:
+        endpointing_config: AdaptiveEndpointingConfig = self.transcriber_config.endpointing_config
+        words = current_buffer.split()
+        recent = words[-3:]
+        # Deepgram punctuates spelled letters ("J. O. H. N."), so check spelling first
+        if (recent and self._is_spelling_token(recent[-1])
+                and sum(self._is_spelling_token(word) for word in recent) >= 2):
+            return endpointing_config.spelling_cutoff_seconds, "spelling"
+        if words and words[-1][-1] in PUNCTUATION_TERMINATORS:
+            if len(words) <= endpointing_config.short_utterance_words:
+                return endpointing_config.min_cutoff_seconds, "short_answer"
+            return endpointing_config.sentence_end_cutoff_seconds, "sentence_end"
+        learned = (self._pause_mean + 2 * math.sqrt(self._pause_variance)
+                   + endpointing_config.pause_margin_seconds)
+        return (min(max(learned, endpointing_config.sentence_end_cutoff_seconds),
+                    endpointing_config.time_cutoff_seconds), "caller_pauses")
+
+    def _compute_is_endpoint_and_log_params(
+        self,
+        current_buffer: str,
+        deepgram_response: Union[DeepgramUtteranceEnd, DeepgramTranscriptionResult],
+        time_silent: float,
+    ) -> Tuple[bool, dict]:
+        endpointing_config = self.transcriber_config.endpointing_config
+        if not isinstance(endpointing_config, AdaptiveEndpointingConfig):
+            return super()._compute_is_endpoint_and_log_params(current_buffer, deepgram_response,
+                                                               time_silent)
+        log_params = {"endpointing_type": endpointing_config.type}
+        if not isinstance(deepgram_response, DeepgramTranscriptionResult):
+            return False, log_params
+        if deepgram_response.is_final and deepgram_response.top_choice.words:
+            self._observe_pauses(deepgram_response.top_choice.words)
+
+        cutoff, source = self._select_cutoff(current_buffer)
+        cutoff /= self._get_speed_coefficient()
+        if deepgram_response.top_choice.transcript:
+            # Deepgram already heard min_cutoff of silence after a short, finished answer
+            is_endpoint = (source == "short_answer" and deepgram_response.is_final
+                           and deepgram_response.speech_final)
+            delay = cutoff
+        else:
+            is_endpoint = self._satisfies_time_cutoff(seconds=cutoff,
+                                                      deepgram_response=deepgram_response,
+                                                      current_buffer=current_buffer,
+                                                      time_silent=time_silent)
+            delay = time_silent + deepgram_response.duration
+        if is_endpoint:
+            log_params["source"] = source
+            self._last_word_end = None
+            endpointing_stats.record(source, delay, endpointing_config.time_cutoff_seconds)
+            logger.info(
+                f"⏱️ Endpoint after {delay * 1000:.0f}ms of silence ({source}, cutoff {cutoff * 1000:.0f}ms, {len(current_buffer.split())} words)"
+            )
+        return is_endpoint, log_params
+
+
+class AdaptiveTranscriberFactory(DefaultTranscriberFactory):
+    """vocode's transcriber factory, with adaptive endpointing and framed input for Deepgram"""
+
+    def create_transcriber(self, transcriber_config: TranscriberConfig):
+        # Other endpointing configs keep vocode's endpointing inside the subclass
+        if isinstance(transcriber_config, DeepgramTranscriberConfig):
+            return AdaptiveDeepgramTranscriber(transcriber_config)
+        return super().create_transcriber(transcriber_config)
+
+
+# Global instance
+endpointing_stats = EndpointingStats()
@@ -0,0 +1,168 @@
+"""
+Admission Control
+
+Tracks the conversations this process is serving and samples event-loop lag and
+the event-loop thread's CPU, so new outbound calls are refused (HTTP 429 + Retry-After) before the
+event loop is saturated with media streams. /health and /ready report the
+remaining headroom so the load balancer can route by load.
+"""
+
+import os
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CapacityExceeded(Exception):
+    """Raised when a new call would exceed this process's capacity"""
+
+    # Lets retry logic treat it like an HTTP 429
+    status = 429
+
+    def __init__(self, reason: str, retry_after_seconds: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after_seconds = retry_after_seconds
+
+
+@dataclass
+class ActiveCall:
+    """A conversation currently served by this process"""
+    conversation_id: str
+    to_phone: Optional[str] = None
+    provider: str = "twilio"
+    started_at: float = field(default_factory=time.monotonic)
+
+
+class AdmissionController:
+    """Live registry of active calls plus load sampling for admission decisions"""
+
+    def __init__(self,
+                 max_concurrent_calls: Optional[int] = None,
+                 max_loop_lag_ms: Optional[float] = None,
+                 max_cpu_percent: Optional[float] = None,
+                 retry_after_seconds: Optional[int] = None,
+                 sample_interval_seconds: float = 0.5,
+                 stale_call_seconds: float = 2 * 3600):
+        self.max_concurrent_calls = max_concurrent_calls or int(
+            os.environ.get("MAX_CONCURRENT_CALLS", "50"))
+        self.max_loop_lag_ms = max_loop_lag_ms or float(
+            os.environ.get("MAX_EVENT_LOOP_LAG_MS", "200"))
+        # CPU of the event-loop thread, where 100 means the loop has no idle time left.
+        # Thread-pool work (uploads, transcoding, embeddings) runs on other threads
+        # and doesn't count
+        self.max_cpu_percent = max_cpu_percent or float(
+            os.environ.get("MAX_CPU_PERCENT", "90"))
+        self.retry_after_seconds = retry_after_seconds or int(
+            os.environ.get("ADMISSION_RETRY_AFTER_SECONDS", "5"))
+        self.sample_interval_seconds = sample_interval_seconds
+        self.stale_call_seconds = stale_call_seconds
+
+        self.active_calls: Dict[str, ActiveCall] = {}
+        # Admitted calls still being dialed (not yet registered)
+        self.pending_admissions = 0
+        self.loop_lag_ms = 0.0
+        self.cpu_percent = 0.0
+        self._sampler_task: Optional[asyncio.Task] = None
+
+        self.stats = {"admitted": 0, "rejected": 0}
+
+    def start(self):
+        """Start sampling event-loop lag and the loop thread's CPU"""
+        if self._sampler_task is None or self._sampler_task.done():
+            self._sampler_task = asyncio.create_task(self._sample_loop())
+
+    async def _sample_loop(self):
+        last_wall = time.monotonic()
+        # Sampled on the loop thread, so thread_time() is the loop's own CPU
+        last_cpu = time.thread_time()
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.sample_interval_seconds)
+            now = time.monotonic()
+
+            # Oversleep beyond the requested interval is time the loop was busy
+            lag_ms = max(0.0, now - started - self.sample_interval_seconds) * 1000
+            self.loop_lag_ms = 0.7 * self.loop_lag_ms + 0.3 * lag_ms
+
+            cpu = time.thread_time()
+            self.cpu_percent = (cpu - last_cpu) / max(now - last_wall, 1e-6) * 100
+            last_wall, last_cpu = now, cpu
+
+            self._expire_stale_calls(now)
+
+    def _expire_stale_calls(self, now: float):
+        for conversation_id, call in list(self.active_calls.items()):
+            if now - call.started_at > self.stale_call_seconds:
+                logger.warning(
+                    f"⚠️ No end reported for call {conversation_id} - dropping it from the active registry"
+                )
+                del self.active_calls[conversation_id]
+
+    def _rejection_reason(self) -> Optional[str]:
+        in_use = len(self.active_calls) + self.pending_admissions
+        if in_use >= self.max_concurrent_calls:
+            return f"At capacity: {in_use}/{self.max_concurrent_calls} concurrent calls"
+        if self.loop_lag_ms > self.max_loop_lag_ms:
+            return f"Event loop lag {self.loop_lag_ms:.0f}ms exceeds {self.max_loop_lag_ms:.0f}ms"
+        if self.cpu_percent > self.max_cpu_percent:
+            return f"Event loop CPU {self.cpu_percent:.0f}% exceeds {self.max_cpu_percent:.0f}%"
+        return None
+
+    def has_capacity(self) -> bool:
+        return self._rejection_reason() is None
+
+    def admit(self):
+        """Reserve capacity for a new call or raise CapacityExceeded"""
+        reason = self._rejection_reason()
+        if reason:
+            self.stats["rejected"] += 1
+            logger.warning(f"🚦 Refusing new call - {reason}")
+            raise CapacityExceeded(reason, self.retry_after_seconds)
+        self.pending_admissions += 1
+        self.stats["admitted"] += 1
+
+    def release_admission(self):
+        """Give back a reservation once the call is registered or failed to start"""
+        self.pending_admissions = max(0, self.pending_admissions - 1)
+
+    def register_call(self, conversation_id: str, **info: Any):
+        self.active_calls[conversation_id] = ActiveCall(
+            conversation_id=conversation_id, **info)
+
+    def call_ended(self, conversation_id: str):
+        self.active_calls.pop(conversation_id, None)
+
+    def get_capacity(self) -> Dict[str, Any]:
+        """Current load and remaining headroom"""
+        in_use = len(self.active_calls) + self.pending_admissions
+        return {
+            "accepting_calls": self.has_capacity(),
+            "active_calls": len(self.active_calls),
+            "pending_calls": self.pending_admissions,
+            "max_concurrent_calls": self.max_concurrent_calls,
+            "headroom_calls": max(0, self.max_concurrent_calls - in_use),
+            "event_loop_lag_ms": round(self.loop_lag_ms, 1),
+            "max_event_loop_lag_ms": self.max_loop_lag_ms,
+            "cpu_percent": round(self.cpu_percent, 1),
+            "max_cpu_percent": self.max_cpu_percent,
+            **self.stats
+        }
+
+    async def stop(self):
+        """Cancel the sampler task"""
+        if self._sampler_task and not self._sampler_task.done():
+            self._sampler_task.cancel()
+            try:
+                await self._sampler_task
+            except asyncio.CancelledError:
+                pass
+        self._sampler_task = None
+
+
+# Global instance
+admission_controller = AdmissionController()
@@ -0,0 +1,145 @@
+"""
+Campaign Templates
+
+A campaign template holds the agent, synthesizer, transcriber and telephony configs
+of an outbound campaign, validated and compiled once. Per-call requests then only
+carry contact fields (phone, name, previous summary, tags) and each call gets a
+deep copy of the compiled agent config.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Templates are never evicted - registering beyond this is refused
+MAX_CAMPAIGN_TEMPLATES = int(os.environ.get("MAX_CAMPAIGN_TEMPLATES", "1000"))
+# Key for template ids; set it to get the same id for a payload on every process
+CAMPAIGN_TEMPLATE_ID_KEY = os.environ.get("CAMPAIGN_TEMPLATE_ID_KEY")
+
+# Contact-specific values substituted into a compiled prompt at dial time
+PROMPT_CONTACT_FIELDS = ("customer_first_name", "previous_call_context",
+                         "current_date", "current_time")
+
+_PLACEHOLDER_MARK = "\x00"
+
+
+def prompt_placeholder(name: str) -> str:
+    """Marker used in place of a contact field while compiling a prompt"""
+    return f"{_PLACEHOLDER_MARK}{name}{_PLACEHOLDER_MARK}"
+
+
+class PromptTemplate:
+    """A prompt pre-rendered once, with contact fields left as placeholders"""
+
+    def __init__(self, text: str):
+        # Even indexes are literal text, odd indexes are contact field names
+        self._parts = text.split(_PLACEHOLDER_MARK)
+
+    def render(self, values: Dict[str, Any]) -> str:
+        """Fill in the contact fields (rendered like f-string values)"""
+        parts = list(self._parts)
+        for i in range(1, len(parts), 2):
+            parts[i] = str(values.get(parts[i]))
+        return "".join(parts)
+
+
+@dataclass
+class CompiledCallConfig:
+    """Contact-independent configuration for an outbound call"""
+    provider: str
+    primary_language: str
+    prompt_template: PromptTemplate
+    initial_message_template: Optional[str]
+    # Shared across calls - deep copy before personalizing
+    agent_config: Any
+    synth_config: Any
+    transcriber_config: Any
+    twilio_config: Optional[Any]
+    twilio_account_sid: Optional[str]
+    twilio_auth_token: Optional[str]
+    tts_provider: str
+    tts_model: Optional[str]
+    optimized_tts_model: Optional[str]
+    agent_model_name: str
+    voicemail_enabled: bool
+    voicemail_message: str
+    recording_enabled: bool
+    on_no_human_answer: str
+    transfer_enabled: bool
+    transfer_number: Optional[str]
+    transfer_message: str
+    from_phone: Optional[str] = None
+    base_url: Optional[str] = None
+    user_tags: List[str] = field(default_factory=list)
+    system_tags: List[str] = field(default_factory=list)
+    # Payload fields used for credential health checks at dial time
+    credential_payload: Dict[str, Any] = field(default_factory=dict)
+
+
+class CampaignTemplateStore:
+    """
+    Compiled campaign templates, kept until deleted. Templates live in their own
+    store rather than the LRU config cache so a busy cache can't evict a template
+    a campaign is still dialing from.
+    """
+
+    def __init__(self, max_templates: int = MAX_CAMPAIGN_TEMPLATES,
+                 id_key: Optional[str] = CAMPAIGN_TEMPLATE_ID_KEY):
+        self.max_templates = max_templates
+        # Payloads carry API keys, so ids are keyed hashes rather than plain digests
+        self._id_key = id_key.encode() if id_key else os.urandom(32)
+        self._templates: Dict[str, CompiledCallConfig] = {}
+        # Cluster mode: version of the shared template each local copy was compiled from
+        self._versions: Dict[str, str] = {}
+        self.stats = {"hits": 0, "misses": 0, "registered": 0, "deleted": 0, "rejected": 0}
+
+    def template_id_for(self, payload: Dict[str, Any]) -> str:
+        """Template id for a campaign payload (the same payload gets the same id)"""
+        payload_str = json.dumps(payload, sort_keys=True, default=str)
+        return hmac.new(self._id_key, payload_str.encode(), hashlib.sha256).hexdigest()[:32]
+
+    def register(self, template_id: str, compiled: CompiledCallConfig,
+                 version: Optional[str] = None):
+        if template_id not in self._templates and len(self._templates) >= self.max_templates:
+            self.stats["rejected"] += 1
+            raise ValueError(f"Campaign template limit ({self.max_templates}) reached - "
+                             f"delete unused templates first")
+        self._templates[template_id] = compiled
+        if version:
+            self._versions[template_id] = version
+        self.stats["registered"] += 1
+        logger.info(f"📋 Registered campaign template {template_id}")
+
+    def get(self, template_id: str) -> Optional[CompiledCallConfig]:
+        compiled = self._templates.get(template_id)
+        self.stats["hits" if compiled is not None else "misses"] += 1
+        return compiled
+
+    def version_of(self, template_id: str) -> Optional[str]:
+        return self._versions.get(template_id)
+
+    def delete(self, template_id: str) -> bool:
+        self._versions.pop(template_id, None)
+        if self._templates.pop(template_id, None) is None:
+            return False
+        self.stats["deleted"] += 1
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups * 100, 2) if lookups else 0.0,
+            "templates": len(self._templates),
+            "max_templates": self.max_templates
+        }
+
+
+# Global instance
+campaign_templates = CampaignTemplateStore()
@@ -0,0 +1,149 @@
+"""
+PERFORMANCE OPTIMIZATION MODULE
+Incrementally maintained OpenAI chat messages for the RAG agent.
+
+vocode's format_openai_chat_messages_from_transcript rebuilds (and re-tokenizes)
+the whole message list from the transcript every turn, which makes per-call work
+O(n^2) in the number of turns. IncrementalChatMessages converts each transcript
+event log once, keeps per-message token counts, and only re-derives the tail of
+the transcript that vocode can still change (the bot turn being spoken or cut
+off, plus anything after it).
+"""
+
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from vocode.streaming.agent.openai_utils import (
+    get_openai_chat_messages_from_transcript,
+    merge_event_logs,
+    vector_db_result_to_openai_chat_message,
+)
+from vocode.streaming.agent.token_utils import (
+    get_chat_gpt_max_tokens,
+    get_tokenizer_info,
+    num_tokens_from_functions,
+    tokens_from_dict,
+)
+from vocode.streaming.models.agent import LLM_AGENT_DEFAULT_MAX_TOKENS
+from vocode.streaming.models.events import Sender
+from vocode.streaming.models.transcript import Message, Transcript
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=16)
+def _cached_tokenizer_info(model_name: str):
+    """tiktoken encoder lookup, once per model"""
+    return get_tokenizer_info(model_name)
+
+
+def _is_bot_message(event_log) -> bool:
+    return isinstance(event_log, Message) and event_log.sender == Sender.BOT
+
+
+class IncrementalChatMessages:
+    """Chat messages for one conversation, appended to as the transcript grows"""
+
+    def __init__(self, model_name: str, functions: Optional[List[Dict]] = None):
+        self.model_name = model_name
+        self._tokenizer_info = _cached_tokenizer_info(model_name)
+        self._context_limit = get_chat_gpt_max_tokens(
+            model_name) - LLM_AGENT_DEFAULT_MAX_TOKENS - 50
+        self._functions_tokens = num_tokens_from_functions(functions=functions,
+                                                           model=model_name)
+
+        # Messages from event logs vocode no longer mutates, with token counts
+        self._frozen: List[Dict[str, Any]] = []
+        self._frozen_tokens: List[int] = []
+        self._frozen_token_total = 0
+        self._frozen_log_count = 0
+        # Oldest frozen messages dropped to fit the context window
+        self._first_kept = 0
+
+        self._preamble: Optional[str] = None
+        self._preamble_message: Dict[str, Any] = {}
+        self._preamble_tokens = 0
+
+    def count_tokens(self, message: Dict[str, Any]) -> int:
+        info = self._tokenizer_info
+        return info.tokens_per_message + tokens_from_dict(
+            encoding=info.encoding, d=message, tokens_per_name=info.tokens_per_name)
+
+    @staticmethod
+    def _convert(event_logs: List) -> List[Dict[str, Any]]:
+        """vocode's own conversion, without the system message"""
+        return get_openai_chat_messages_from_transcript(
+            merged_event_logs=merge_event_logs(event_logs=event_logs),
+            prompt_preamble="")[1:]
+
+    @staticmethod
+    def _mutable_tail_start(event_logs: List) -> int:
+        """
+        Index where the last run of bot messages starts.
+
+        Only the latest bot message is ever edited (text grows while it is spoken,
+        is_final flips, cut-off truncates it), and consecutive bot messages are merged
+        into one chat message - so everything before that run is final.
+        """
+        index = len(event_logs) - 1
+        while index >= 0 and not _is_bot_message(event_logs[index]):
+            index -= 1
+        if index < 0:
+            return 0
+        while index > 0 and _is_bot_message(event_logs[index - 1]):
+            index -= 1
+        return index
+
+    def _freeze_up_to(self, event_logs: List, tail_start: int):
+        if tail_start <= self._frozen_log_count:
+            return
+        for message in self._convert(event_logs[self._frozen_log_count:tail_start]):
+            tokens = self.count_tokens(message)
+            self._frozen.append(message)
+            self._frozen_tokens.append(tokens)
+            self._frozen_token_total += tokens
+        self._frozen_log_count = tail_start
+
+    def build(self,
+              transcript: Transcript,
+              prompt_preamble: str,
+              rag_context: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Chat messages for the next completion: system prompt, conversation history
+        trimmed to the context window, and the RAG context (if any) inserted right
+        before the latest message.
+        """
+        if prompt_preamble != self._preamble:
+            self._preamble = prompt_preamble
+            self._preamble_message = {"role": "system", "content": prompt_preamble}
+            self._preamble_tokens = self.count_tokens(self._preamble_message)
+
+        event_logs = transcript.event_logs
+        tail_start = self._mutable_tail_start(event_logs)
+        self._freeze_up_to(event_logs, tail_start)
+        tail = self._convert(event_logs[self._frozen_log_count:])
+
+        rag_message = (vector_db_result_to_openai_chat_message(rag_context)
+                       if rag_context is not None else None)
+        context_size = (self._preamble_tokens + self._functions_tokens + 3 +
+                        sum(self.count_tokens(message) for message in tail) +
+                        (self.count_tokens(rag_message) if rag_message else 0) +
+                        self._frozen_token_total)
+
+        # Drop the oldest history first, like vocode does
+        dropped_before = self._first_kept
+        while context_size > self._context_limit and self._first_kept < len(self._frozen):
+            context_size -= self._frozen_tokens[self._first_kept]
+            self._frozen_token_total -= self._frozen_tokens[self._first_kept]
+            self._first_kept += 1
+        if self._first_kept > dropped_before:
+            logger.info(
+                f"✂️ Dropped {self._first_kept - dropped_before} oldest messages to fit the context window")
+        if context_size > self._context_limit:
+            logger.error(f"❌ Prompt is too long to fit in context window, num tokens {context_size}")
+
+        messages = [self._preamble_message, *self._frozen[self._first_kept:], *tail]
+        if rag_message is not None:
+            messages.insert(-1, rag_message)
+        return messages
@@ -0,0 +1,69 @@
+"""
+Chat Message Construction Benchmark
+
+Compares per-turn prompt construction for a long call: vocode's
+format_openai_chat_messages_from_transcript (rebuilds and re-tokenizes the whole
+transcript each turn) against IncrementalChatMessages. Both must produce the same
+messages; the incremental builder's per-turn time should stay flat.
+
+Usage: python chat_messages_benchmark.py --turns 100
+"""
+
+import argparse
+import time
+from typing import List
+
+from vocode.streaming.agent.openai_utils import format_openai_chat_messages_from_transcript
+from vocode.streaming.models.transcript import Transcript
+
+from chat_messages import IncrementalChatMessages
+
+PREAMBLE = "You are a helpful sales agent. Answer only from the knowledge base. " * 20
+BOT_TURN = "Our plans start at 20 dollars per user per month and include unlimited calling in the USA and Canada."
+HUMAN_TURN = "Okay, and what happens if I need to add more users later on in the year?"
+
+
+def _time_us(fn, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    transcript = Transcript()
+    incremental = IncrementalChatMessages(args.model)
+    rebuild_us: List[float] = []
+    incremental_us: List[float] = []
+
+    for turn in range(args.turns):
+        transcript.add_bot_message(BOT_TURN, conversation_id="benchmark", is_final=True)
+        transcript.add_human_message(HUMAN_TURN, conversation_id="benchmark")
+
+        rebuilt = format_openai_chat_messages_from_transcript(
+            transcript, args.model, None, PREAMBLE)
+        assert incremental.build(transcript, PREAMBLE) == rebuilt, f"Mismatch at turn {turn + 1}"
+
+        rebuild_us.append(
+            _time_us(
+                lambda: format_openai_chat_messages_from_transcript(
+                    transcript, args.model, None, PREAMBLE), args.repeats))
+        incremental_us.append(
+            _time_us(lambda: incremental.build(transcript, PREAMBLE), args.repeats))
+
+    print(f"{'turn':>6} {'rebuild (us)':>14} {'incremental (us)':>18}")
+    for turn in sorted({1, 10, 25, 50, 75, args.turns}):
+        if turn <= args.turns:
+            print(f"{turn:>6} {rebuild_us[turn - 1]:>14.0f} {incremental_us[turn - 1]:>18.0f}")
+    print(f"✅ {args.turns} turns: rebuild total {sum(rebuild_us) / 1000:.1f}ms, "
+          f"incremental total {sum(incremental_us) / 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
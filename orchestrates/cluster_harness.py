@@ -0,0 +1,191 @@
+"""
+Local Cluster Harness
+
+Starts several orchestrates nodes on one machine against a shared Redis and shows
+that per-call state and post-call work are shared across them:
+
+1. writes a synthetic call's state as if node 0 had dialed it, and checks that
+   every node reads it back through its /cluster/calls endpoint
+2. queues post-call jobs for other synthetic calls and reports which node ran
+   each of them (a finished job deletes its call's state)
+3. reads an outbound batch's progress, and deletes a campaign template, through
+   nodes other than the one that created them
+
+Usage: python cluster_harness.py --nodes 3 --jobs 6
+Requires a reachable Redis (REDIS_URL, default redis://localhost:6379/0 here).
+"""
+
+import os
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Any, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The nodes only use Redis when REDIS_URL is set
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+
+
+def _get_json(url: str) -> Dict[str, Any]:
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def start_nodes(count: int, base_port: int) -> List[subprocess.Popen]:
+    nodes = []
+    for index in range(count):
+        port = base_port + index
+        env = {
+            **os.environ,
+            "CLUSTER_MODE": "true",
+            "NODE_ID": f"node-{index}",
+            "NODE_BASE_URL": f"localhost:{port}",
+            "PORT": str(port),
+            "POST_CALL_WORKERS": "2"
+        }
+        nodes.append(
+            subprocess.Popen([sys.executable, "main.py"], cwd=HERE, env=env))
+    return nodes
+
+
+def wait_until_healthy(ports: List[int], timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    for port in ports:
+        while True:
+            try:
+                status = _get_json(f"http://localhost:{port}/cluster/status")
+                if status.get("cluster_mode"):
+                    break
+            except Exception:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Node on port {port} did not become healthy")
+            time.sleep(0.5)
+
+
+async def seed_calls(conversation_ids: List[str]):
+    """Write synthetic call state as if node 0 had dialed the calls"""
+    from cluster_state import ClusterCallState
+    from memory_config import REDIS_URL
+
+    store = ClusterCallState(REDIS_URL, node_id="harness")
+    for conversation_id in conversation_ids:
+        await store.save(conversation_id,
+                         call_data={
+                             "from_phone": "+15550000000",
+                             "to_phone": "+15550000001",
+                             "call_start_time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                             "twilio_account_sid": None,
+                             "twilio_auth_token": None
+                         },
+                         call_tags={"user_tags": [], "system_tags": []},
+                         dial_node="node-0")
+    await store.stop()
+
+
+async def queue_post_call_jobs(conversation_ids: List[str]):
+    """Queue post-call jobs for seeded calls (each job deletes its call's state)"""
+    from cluster_state import ClusterCallState
+    from memory_config import REDIS_URL
+
+    store = ClusterCallState(REDIS_URL, node_id="harness")
+    for conversation_id in conversation_ids:
+        await store.enqueue_post_call({
+            "conversation_id": conversation_id,
+            "full_transcript": "BOT: Hello?\nHUMAN: Hi, not interested.",
+            "voicemail_detected": False,
+            "usage_state": None,
+            "enqueued_by": "harness"
+        })
+    await store.stop()
+
+
+async def seed_template_and_batch(suffix: str) -> Dict[str, str]:
+    """Write a campaign template and a batch's progress as if node 0 had created them"""
+    from cluster_state import ClusterCallState
+    from memory_config import REDIS_URL
+
+    store = ClusterCallState(REDIS_URL, node_id="harness")
+    template_id = f"harness-template-{suffix}"
+    batch_id = f"harness-batch-{suffix}"
+    await store.save_template(template_id, {"provider": "twilio"}, version="harness")
+    await store.save_batch(batch_id,
+                           batch={"batch_id": batch_id,
+                                  "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                                  "node_id": "node-0"},
+                           **{f"job:{i}": {"to_phone": f"+1555000010{i}", "status": status}
+                              for i, status in enumerate(["ended", "in_progress", "queued"])})
+    await store.stop()
+    return {"template_id": template_id, "batch_id": batch_id}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=6)
+    parser.add_argument("--base-port", type=int, default=3101)
+    args = parser.parse_args()
+
+    ports = [args.base_port + i for i in range(args.nodes)]
+    nodes = start_nodes(args.nodes, args.base_port)
+    try:
+        wait_until_healthy(ports)
+        print(f"✅ {args.nodes} nodes up on ports {ports}")
+
+        # Every node sees the state written on behalf of node 0. This call is never
+        # queued for post-call work, so nothing deletes its state mid-check
+        run_id = int(time.time())
+        shared_id = f"harness-{run_id}-shared"
+        asyncio.run(seed_calls([shared_id]))
+        for port in ports:
+            state = _get_json(f"http://localhost:{port}/cluster/calls/{shared_id}")
+            if not state["state"]:
+                raise RuntimeError(f"{state['node_id']} sees no state for {shared_id}")
+            print(f"🔎 {state['node_id']} sees {shared_id}: {sorted(state['state'])}")
+
+        conversation_ids = [f"harness-{run_id}-{i}" for i in range(args.jobs)]
+        asyncio.run(seed_calls(conversation_ids))
+        asyncio.run(queue_post_call_jobs(conversation_ids))
+
+        # Post-call jobs are spread across the nodes
+        deadline = time.monotonic() + 120
+        while True:
+            statuses = [
+                _get_json(f"http://localhost:{port}/cluster/status")
+                for port in ports
+            ]
+            done = sum(s["jobs_processed"] + s["jobs_failed"] for s in statuses)
+            if done >= args.jobs or time.monotonic() > deadline:
+                break
+            time.sleep(1.0)
+
+        for status in statuses:
+            print(
+                f"📊 {status['node_id']}: processed={status['jobs_processed']} failed={status['jobs_failed']}"
+            )
+        print(f"{'✅' if done >= args.jobs else '❌'} {done}/{args.jobs} post-call jobs finished")
+
+        # Batches and templates created on node 0 are visible from every node
+        seeded = asyncio.run(seed_template_and_batch(str(int(time.time()))))
+        for port in ports:
+            batch = _get_json(f"http://localhost:{port}/outbound_batches/{seeded['batch_id']}")
+            print(f"🔎 port {port} sees batch {seeded['batch_id']}: {batch['counts']}")
+        request = urllib.request.Request(
+            f"http://localhost:{ports[-1]}/campaign_templates/{seeded['template_id']}",
+            method="DELETE")
+        with urllib.request.urlopen(request, timeout=5) as response:
+            print(f"✅ port {ports[-1]} deleted template {seeded['template_id']} "
+                  f"(HTTP {response.status})")
+    finally:
+        for node in nodes:
+            node.terminate()
+        for node in nodes:
+            node.wait(timeout=15)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+"""
+Cluster Call State
+
+Shared per-call state for running several orchestrates processes (gunicorn workers
+or nodes) behind one load balancer. In cluster mode:
+
+- per-call state (call data, tags, Call SID, voicemail/transfer configs, usage
+  tracking) is written through to Redis, and loaded by whichever process serves
+  the conversation's media stream
+- post-call enrichment is queued in Redis and run by any node
+- call-ended notifications are broadcast so every process frees its slots
+- campaign templates and outbound batch progress are kept in Redis, so a template
+  registered or a batch queued on one process is visible from every other
+
+Cluster mode is enabled with CLUSTER_MODE=true and requires Redis (REDIS_URL).
+"""
+
+import os
+import asyncio
+import json
+import logging
+import socket
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from memory_config import REDIS_URL, redis_available
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_CLIENT_AVAILABLE = True
+except ImportError:
+    REDIS_CLIENT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CLUSTER_MODE = os.environ.get("CLUSTER_MODE", "false").lower() == "true"
+NODE_ID = os.environ.get("NODE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+# Host this process is directly reachable at - Twilio media streams and status
+# callbacks for calls it dials are pinned here (sticky routing)
+NODE_BASE_URL = os.environ.get("NODE_BASE_URL")
+
+
+class ClusterCallState:
+    """Redis-backed call state, post-call job queue and call-ended broadcast"""
+
+    KEY_PREFIX = "orchestrates"
+
+    def __init__(self,
+                 redis_url: str,
+                 node_id: str,
+                 node_base_url: Optional[str] = None,
+                 call_ttl_seconds: float = 6 * 3600,
+                 post_call_workers: Optional[int] = None,
+                 heartbeat_seconds: float = 10.0):
+        self.node_id = node_id
+        self.node_base_url = node_base_url
+        self.call_ttl_seconds = int(call_ttl_seconds)
+        self.post_call_workers = post_call_workers or int(
+            os.environ.get("POST_CALL_WORKERS", "4"))
+        self.heartbeat_seconds = heartbeat_seconds
+
+        # Pooled connections - nothing connects until the first command
+        self._redis = aioredis.from_url(redis_url, max_connections=32)
+        self._pending_writes: Set[asyncio.Task] = set()
+        # batch_id -> its latest progress write (each write waits for the previous)
+        self._batch_writes: Dict[str, asyncio.Task] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.active_jobs = 0
+
+        self.stats = {
+            "state_writes": 0,
+            "state_loads": 0,
+            "jobs_enqueued": 0,
+            "jobs_processed": 0,
+            "jobs_failed": 0,
+            "call_ended_broadcasts": 0
+        }
+
+    @property
+    def _jobs_key(self) -> str:
+        return f"{self.KEY_PREFIX}:post_call_jobs"
+
+    @property
+    def _processing_key(self) -> str:
+        return self._processing_key_for(self.node_id)
+
+    def _processing_key_for(self, node_id: str) -> str:
+        return f"{self.KEY_PREFIX}:post_call_jobs:processing:{node_id}"
+
+    @property
+    def _processing_nodes_key(self) -> str:
+        # Every node that has had a processing list, so live nodes can find the
+        # lists of crashed ones (NODE_ID defaults to hostname-pid and changes on restart)
+        return f"{self.KEY_PREFIX}:post_call_jobs:processing_nodes"
+
+    @property
+    def _call_ended_channel(self) -> str:
+        return f"{self.KEY_PREFIX}:call_ended"
+
+    @property
+    def _nodes_key(self) -> str:
+        return f"{self.KEY_PREFIX}:nodes"
+
+    def _call_key(self, conversation_id: str) -> str:
+        return f"{self.KEY_PREFIX}:call:{conversation_id}"
+
+    def _template_key(self, template_id: str) -> str:
+        return f"{self.KEY_PREFIX}:campaign_template:{template_id}"
+
+    def _batch_key(self, batch_id: str) -> str:
+        return f"{self.KEY_PREFIX}:outbound_batch:{batch_id}"
+
+    async def _write_hash(self, key: str, fields: Dict[str, Any]):
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key,
+                      mapping={
+                          name: json.dumps(value)
+                          for name, value in fields.items()
+                      })
+            pipe.expire(key, self.call_ttl_seconds)
+            await pipe.execute()
+        self.stats["state_writes"] += 1
+
+    async def _read_hash(self, key: str) -> Dict[str, Any]:
+        raw = await self._redis.hgetall(key)
+        self.stats["state_loads"] += 1
+        return {
+            name.decode() if isinstance(name, bytes) else name: json.loads(value)
+            for name, value in raw.items()
+        }
+
+    def _write_hash_later(self, key: str, fields: Dict[str, Any], description: str):
+        task = asyncio.create_task(self._write_hash_logged(key, fields, description))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+
+    async def _write_hash_logged(self, key: str, fields: Dict[str, Any], description: str):
+        try:
+            await self._write_hash(key, fields)
+        except Exception as e:
+            logger.error(f"❌ Failed to replicate {description}: {e}")
+
+    # Per-call state
+
+    async def save(self, conversation_id: str, **fields: Any):
+        """Write call state fields and refresh the call's TTL"""
+        await self._write_hash(self._call_key(conversation_id), fields)
+
+    def save_later(self, conversation_id: str, **fields: Any):
+        """Write-through from synchronous code; flush() waits for pending writes"""
+        self._write_hash_later(self._call_key(conversation_id), fields,
+                               f"call state {list(fields)} for {conversation_id}")
+
+    async def flush(self):
+        """Wait for this process's pending state writes"""
+        if self._pending_writes:
+            await asyncio.gather(*list(self._pending_writes),
+                                 return_exceptions=True)
+
+    async def load(self, conversation_id: str) -> Dict[str, Any]:
+        """All shared state for a call (empty if unknown or expired)"""
+        await self.flush()
+        return await self._read_hash(self._call_key(conversation_id))
+
+    async def delete(self, conversation_id: str):
+        await self.flush()
+        await self._redis.delete(self._call_key(conversation_id))
+
+    # Campaign templates
+
+    async def save_template(self, template_id: str, payload: Dict[str, Any], version: str):
+        """Store a template's registration payload (no TTL) under a new version"""
+        await self._redis.hset(self._template_key(template_id),
+                               mapping={
+                                   "version": version,
+                                   "payload": json.dumps(payload)
+                               })
+
+    async def get_template_version(self, template_id: str) -> Optional[str]:
+        """Current version of a template (None once deleted anywhere)"""
+        version = await self._redis.hget(self._template_key(template_id), "version")
+        return version.decode() if isinstance(version, bytes) else version
+
+    async def load_template(self, template_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(version, payload) of a template registered on any process"""
+        version, payload = await self._redis.hmget(self._template_key(template_id),
+                                                   "version", "payload")
+        if version is None or payload is None:
+            return None
+        self.stats["state_loads"] += 1
+        return version.decode() if isinstance(version, bytes) else version, json.loads(payload)
+
+    async def delete_template(self, template_id: str) -> bool:
+        return bool(await self._redis.delete(self._template_key(template_id)))
+
+    # Outbound batch progress
+
+    async def save_batch(self, batch_id: str, **fields: Any):
+        """Write batch progress fields and refresh the batch's TTL"""
+        await self._write_hash(self._batch_key(batch_id), fields)
+
+    def save_batch_later(self, batch_id: str, **fields: Any):
+        """Write-through of batch progress from synchronous code, in call order"""
+        task = asyncio.create_task(
+            self._save_batch_after(self._batch_writes.get(batch_id), batch_id, fields))
+        self._batch_writes[batch_id] = task
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+        task.add_done_callback(lambda done: self._batch_writes.pop(batch_id, None)
+                               if self._batch_writes.get(batch_id) is done else None)
+
+    async def _save_batch_after(self, previous: Optional[asyncio.Task], batch_id: str,
+                                fields: Dict[str, Any]):
+        # Writes go out on pooled connections, so a later status could land first
+        if previous:
+            await asyncio.gather(previous, return_exceptions=True)
+        await self._write_hash_logged(self._batch_key(batch_id), fields,
+                                      f"progress of outbound batch {batch_id}")
+
+    async def load_batch(self, batch_id: str) -> Dict[str, Any]:
+        """Batch progress written by whichever process dials it (empty if unknown)"""
+        await self.flush()
+        return await self._read_hash(self._batch_key(batch_id))
+
+    # Post-call job queue
+
+    async def enqueue_post_call(self, job: Dict[str, Any]):
+        """Queue post-call enrichment for any node to run"""
+        await self.flush()
+        await self._redis.lpush(self._jobs_key, json.dumps(job))
+        self.stats["jobs_enqueued"] += 1
+        logger.info(
+            f"📤 Queued post-call work for {job.get('conversation_id')} on the cluster"
+        )
+
+    async def _post_call_worker(
+            self, handler: Callable[[Dict[str, Any]], Awaitable[Any]]):
+        while True:
+            try:
+                # The processing list keeps the job if this process dies mid-run
+                raw = await self._redis.blmove(self._jobs_key,
+                                               self._processing_key,
+                                               timeout=5,
+                                               src="RIGHT",
+                                               dest="LEFT")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Post-call queue read failed: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if raw is None:
+                continue
+
+            self.active_jobs += 1
+            finished = False
+            try:
+                job = json.loads(raw)
+                await handler(job)
+                self.stats["jobs_processed"] += 1
+                finished = True
+            except Exception as e:
+                self.stats["jobs_failed"] += 1
+                finished = True
+                logger.error(f"❌ Post-call job failed: {e}")
+            finally:
+                self.active_jobs -= 1
+                # A job cancelled by shutdown stays in the processing list and is requeued
+                if finished:
+                    await self._redis.lrem(self._processing_key, 1, raw)
+
+    async def _requeue_processing_list(self, node_id: str) -> int:
+        """Move a node's unfinished jobs back to the shared queue"""
+        requeued = 0
+        while await self._redis.lmove(self._processing_key_for(node_id),
+                                      self._jobs_key,
+                                      src="RIGHT",
+                                      dest="RIGHT"):
+            requeued += 1
+        return requeued
+
+    async def _requeue_unfinished_jobs(self):
+        """Return jobs a previous run of this node left in its processing list"""
+        requeued = await self._requeue_processing_list(self.node_id)
+        if requeued:
+            logger.warning(f"♻️ Requeued {requeued} unfinished post-call jobs")
+
+    async def _reclaim_dead_nodes(self):
+        """Requeue jobs stranded in the processing lists of nodes that stopped heartbeating"""
+        alive = await self.get_nodes()
+        for node_id in await self._redis.smembers(self._processing_nodes_key):
+            node_id = node_id.decode() if isinstance(node_id, bytes) else node_id
+            if node_id == self.node_id or node_id in alive:
+                continue
+            # LMOVE is atomic, so nodes reclaiming the same list can't duplicate a job
+            requeued = await self._requeue_processing_list(node_id)
+            await self._redis.srem(self._processing_nodes_key, node_id)
+            await self._redis.hdel(self._nodes_key, node_id)
+            if requeued:
+                logger.warning(
+                    f"♻️ Requeued {requeued} post-call jobs left by stopped node {node_id}")
+
+    # Call-ended broadcast
+
+    def publish_call_ended(self, conversation_id: str):
+        """Tell the other processes a call ended"""
+        task = asyncio.create_task(
+            self._redis.publish(
+                self._call_ended_channel,
+                json.dumps({
+                    "conversation_id": conversation_id,
+                    "node_id": self.node_id
+                })))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+        self.stats["call_ended_broadcasts"] += 1
+
+    async def _call_ended_listener(self, handler: Callable[[str], None]):
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(self._call_ended_channel)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = json.loads(message["data"])
+                    if data.get("node_id") != self.node_id:
+                        handler(data["conversation_id"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Call-ended subscription failed, resubscribing: {e}")
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
+
+    # Node membership
+
+    async def _send_heartbeat(self):
+        await self._redis.hset(
+            self._nodes_key, self.node_id,
+            json.dumps({
+                "base_url": self.node_base_url,
+                "last_seen": time.time(),
+                "active_post_call_jobs": self.active_jobs
+            }))
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                await self._send_heartbeat()
+                await self._reclaim_dead_nodes()
+            except Exception as e:
+                logger.error(f"❌ Cluster heartbeat failed: {e}")
+
+    async def get_nodes(self) -> Dict[str, Any]:
+        """Nodes that sent a heartbeat recently"""
+        cutoff = time.time() - 3 * self.heartbeat_seconds
+        nodes = {}
+        for node_id, value in (await self._redis.hgetall(self._nodes_key)).items():
+            info = json.loads(value)
+            if info.get("last_seen", 0) >= cutoff:
+                nodes[node_id.decode() if isinstance(node_id, bytes) else node_id] = info
+        return nodes
+
+    async def get_status(self) -> Dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "node_base_url": self.node_base_url,
+            "queued_post_call_jobs": await self._redis.llen(self._jobs_key),
+            "active_post_call_jobs": self.active_jobs,
+            "nodes": await self.get_nodes(),
+            **self.stats
+        }
+
+    async def start(self, post_call_handler: Callable[[Dict[str, Any]],
+                                                      Awaitable[Any]],
+                    call_ended_handler: Callable[[str], None]):
+        """Start the post-call workers, call-ended subscription and heartbeat"""
+        # Announce this node before it takes jobs, so no live node reclaims them
+        await self._send_heartbeat()
+        await self._redis.sadd(self._processing_nodes_key, self.node_id)
+        await self._requeue_unfinished_jobs()
+        await self._reclaim_dead_nodes()
+        self._tasks = [
+            asyncio.create_task(self._post_call_worker(post_call_handler))
+            for _ in range(self.post_call_workers)
+        ]
+        self._tasks.append(
+            asyncio.create_task(self._call_ended_listener(call_ended_handler)))
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        logger.info(
+            f"🌐 Cluster mode: node {self.node_id} running {self.post_call_workers} post-call workers"
+        )
+
+    async def stop(self):
+        """Stop background tasks, flush pending writes and close the pool"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.flush()
+        try:
+            # Jobs interrupted by the shutdown go back to the queue for the other nodes
+            await self._requeue_unfinished_jobs()
+            await self._redis.srem(self._processing_nodes_key, self.node_id)
+            await self._redis.hdel(self._nodes_key, self.node_id)
+        except Exception:
+            pass
+        await self._redis.aclose()
+
+
+def _create_cluster_state() -> Optional[ClusterCallState]:
+    if not CLUSTER_MODE:
+        return None
+    if not (REDIS_CLIENT_AVAILABLE and redis_available):
+        logger.error(
+            "❌ CLUSTER_MODE=true but Redis is not reachable - running as a single node")
+        return None
+    return ClusterCallState(REDIS_URL, NODE_ID, NODE_BASE_URL)
+
+
+# Global instance (None when running as a single node)
+cluster_state = _create_cluster_state()
@@ -0,0 +1,325 @@
+"""
+Content-Addressed Redis Config Manager
+
+Vocode stores every outbound call's full config (agent, synthesizer, transcriber,
+telephony) in the config manager until the media stream connects. Most of it is
+identical across a campaign, including the multi-kilobyte prompt preamble.
+
+This manager stores large sub-configs once by content hash, splits long strings
+(the prompt) into content-defined chunks so personalized sentences don't defeat
+deduplication, compresses everything, pipelines reads and writes over a pooled
+async Redis connection, and ties TTLs to the call lifecycle:
+
+- saved (call dialing): CONFIG_PENDING_TTL_SECONDS
+- fetched (media stream connected): CONFIG_ACTIVE_TTL_SECONDS
+- shared blobs: BLOB_TTL_SECONDS, refreshed by every call that references them
+  (and stored again if Redis lost them)
+"""
+
+import os
+import hashlib
+import json
+import logging
+import re
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+from vocode.streaming.models.telephony import BaseCallConfig
+from vocode.streaming.telephony.config_manager.base_config_manager import BaseConfigManager
+from vocode.streaming.telephony.config_manager.in_memory_config_manager import InMemoryConfigManager
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_CLIENT_AVAILABLE = True
+except ImportError:
+    REDIS_CLIENT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Sub-configs at least this large (serialized) are stored once by content hash
+BLOB_MIN_BYTES = 512
+# Strings at least this long are split into content-defined chunks
+LARGE_TEXT_CHARS = 1024
+CHUNK_MIN_CHARS = 256
+CHUNK_MAX_CHARS = 4096
+
+# Zero-width split after sentence/line ends keeps "".join(parts) == text
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?\n])")
+
+_BLOB_MARKER = "$blob"
+_CHUNKS_MARKER = "$chunks"
+
+
+def chunk_text(text: str) -> List[str]:
+    """
+    Split text into chunks whose boundaries depend only on nearby content.
+
+    A chunk closes after a sentence whose hash selects it as a boundary, so editing
+    one sentence (e.g. the customer name) only changes the chunk containing it.
+    """
+    chunks = []
+    current = []
+    current_length = 0
+    for sentence in _SENTENCE_BOUNDARY.split(text):
+        if not sentence:
+            continue
+        current.append(sentence)
+        current_length += len(sentence)
+        is_boundary = zlib.crc32(sentence.encode()) % 4 == 0
+        if (current_length >= CHUNK_MIN_CHARS
+                and is_boundary) or current_length >= CHUNK_MAX_CHARS:
+            chunks.append("".join(current))
+            current, current_length = [], 0
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+class ContentAddressedConfigManager(BaseConfigManager):
+    """Deduplicated, compressed, TTL'd call configs in Redis"""
+
+    KEY_PREFIX = "call_config"
+
+    def __init__(self,
+                 redis_url: str,
+                 pending_ttl_seconds: Optional[int] = None,
+                 active_ttl_seconds: Optional[int] = None,
+                 blob_ttl_seconds: Optional[int] = None,
+                 blob_cache_size: int = 512):
+        self.pending_ttl_seconds = pending_ttl_seconds or int(
+            os.environ.get("CONFIG_PENDING_TTL_SECONDS", "900"))
+        self.active_ttl_seconds = active_ttl_seconds or int(
+            os.environ.get("CONFIG_ACTIVE_TTL_SECONDS", "7200"))
+        self.blob_ttl_seconds = blob_ttl_seconds or int(
+            os.environ.get("BLOB_TTL_SECONDS", str(24 * 3600)))
+
+        # Pooled connections - nothing connects until the first command
+        self.redis = aioredis.from_url(redis_url, max_connections=32)
+        # Blobs are immutable, so a local LRU never goes stale
+        self._blob_cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._blob_cache_size = blob_cache_size
+        # Used only while Redis is unreachable
+        self._fallback = InMemoryConfigManager()
+        self._zstd_compressor = zstandard.ZstdCompressor(
+            level=3) if ZSTD_AVAILABLE else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor(
+        ) if ZSTD_AVAILABLE else None
+
+        self.stats = {
+            "saves": 0,
+            "gets": 0,
+            "config_bytes_written": 0,
+            "blob_bytes_written": 0,
+            "blob_bytes_deduplicated": 0,
+            "blob_cache_hits": 0,
+            "blob_fetches": 0,
+            "blobs_restored": 0,
+            "fallback_saves": 0,
+            "failed_gets": 0
+        }
+
+    def _config_key(self, conversation_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{conversation_id}"
+
+    def _blob_key(self, digest: str) -> str:
+        return f"{self.KEY_PREFIX}:blob:{digest}"
+
+    def _compress(self, data: bytes) -> bytes:
+        if self._zstd_compressor:
+            return b"Z" + self._zstd_compressor.compress(data)
+        return b"z" + zlib.compress(data, 6)
+
+    def _decompress(self, data: bytes) -> bytes:
+        if data[:1] == b"Z":
+            return self._zstd_decompressor.decompress(data[1:])
+        return zlib.decompress(data[1:])
+
+    def _cache_blob(self, digest: str, payload: bytes):
+        self._blob_cache[digest] = payload
+        self._blob_cache.move_to_end(digest)
+        while len(self._blob_cache) > self._blob_cache_size:
+            self._blob_cache.popitem(last=False)
+
+    # Encoding
+
+    def _put_blob(self, payload: bytes, blobs: Dict[str, bytes]) -> str:
+        digest = hashlib.sha256(payload).hexdigest()[:32]
+        blobs[digest] = payload
+        return digest
+
+    def _encode(self, value: Any, blobs: Dict[str, bytes], root: bool = False) -> Any:
+        """Replace large strings and sub-configs with content-hash references"""
+        if isinstance(value, str):
+            if len(value) < LARGE_TEXT_CHARS:
+                return value
+            return {
+                _CHUNKS_MARKER: [
+                    self._put_blob(chunk.encode(), blobs)
+                    for chunk in chunk_text(value)
+                ]
+            }
+        if isinstance(value, dict):
+            encoded = {key: self._encode(item, blobs) for key, item in value.items()}
+        elif isinstance(value, list):
+            encoded = [self._encode(item, blobs) for item in value]
+        else:
+            return value
+
+        if root:
+            return encoded
+        serialized = json.dumps(encoded, sort_keys=True,
+                                separators=(",", ":")).encode()
+        if len(serialized) < BLOB_MIN_BYTES:
+            return encoded
+        return {_BLOB_MARKER: self._put_blob(serialized, blobs)}
+
+    def _references(self, value: Any, sub_configs: Set[str], chunks: Set[str]):
+        """Collect blob digests referenced by an encoded document, by blob kind"""
+        if isinstance(value, dict):
+            if _BLOB_MARKER in value:
+                sub_configs.add(value[_BLOB_MARKER])
+            elif _CHUNKS_MARKER in value:
+                chunks.update(value[_CHUNKS_MARKER])
+            else:
+                for item in value.values():
+                    self._references(item, sub_configs, chunks)
+        elif isinstance(value, list):
+            for item in value:
+                self._references(item, sub_configs, chunks)
+
+    def _decode(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            if _BLOB_MARKER in value:
+                return self._decode(
+                    json.loads(self._blob_cache[value[_BLOB_MARKER]]))
+            if _CHUNKS_MARKER in value:
+                return "".join(self._blob_cache[digest].decode()
+                               for digest in value[_CHUNKS_MARKER])
+            return {key: self._decode(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._decode(item) for item in value]
+        return value
+
+    async def _load_blobs(self, document: Any):
+        """Fetch every referenced blob missing from the local cache (one MGET per nesting level)"""
+        sub_configs: Set[str] = set()
+        chunks: Set[str] = set()
+        self._references(document, sub_configs, chunks)
+        while sub_configs or chunks:
+            pending = sub_configs | chunks
+            missing = [digest for digest in pending if digest not in self._blob_cache]
+            self.stats["blob_cache_hits"] += len(pending) - len(missing)
+            if missing:
+                values = await self.redis.mget(
+                    [self._blob_key(digest) for digest in missing])
+                self.stats["blob_fetches"] += len(missing)
+                for digest, raw in zip(missing, values):
+                    if raw is None:
+                        raise KeyError(f"Config blob {digest} expired")
+                    self._cache_blob(digest, self._decompress(raw))
+            # Only sub-config blobs are JSON and can reference further blobs -
+            # prompt chunks are plain text, even when they start with "{" or "["
+            next_sub_configs: Set[str] = set()
+            next_chunks: Set[str] = set()
+            for digest in sub_configs:
+                self._references(json.loads(self._blob_cache[digest]),
+                                 next_sub_configs, next_chunks)
+            sub_configs, chunks = next_sub_configs, next_chunks
+
+    # BaseConfigManager
+
+    async def save_config(self, conversation_id: str, config: BaseCallConfig):
+        blobs: Dict[str, bytes] = {}
+        document = self._encode(json.loads(config.json()), blobs, root=True)
+        config_payload = self._compress(
+            json.dumps(document, separators=(",", ":")).encode())
+
+        # Blobs this process already stored or read - only their lifetime is extended
+        refreshed = [digest for digest in blobs if digest in self._blob_cache]
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for digest in refreshed:
+                    pipe.expire(self._blob_key(digest), self.blob_ttl_seconds)
+                    self.stats["blob_bytes_deduplicated"] += len(blobs[digest])
+                for digest, payload in blobs.items():
+                    if digest in self._blob_cache:
+                        continue
+                    key = self._blob_key(digest)
+                    pipe.set(key, self._compress(payload),
+                             ex=self.blob_ttl_seconds, nx=True)
+                    pipe.expire(key, self.blob_ttl_seconds)
+                    self.stats["blob_bytes_written"] += len(payload)
+                pipe.set(self._config_key(conversation_id),
+                         config_payload,
+                         ex=self.pending_ttl_seconds)
+                results = await pipe.execute()
+
+            # EXPIRE returns 0 when Redis no longer has the blob (evicted, flushed
+            # or failed over) - store it again so the config doesn't point at nothing
+            lost = [digest for digest, extended in zip(refreshed, results) if not extended]
+            if lost:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for digest in lost:
+                        pipe.set(self._blob_key(digest), self._compress(blobs[digest]),
+                                 ex=self.blob_ttl_seconds)
+                        self.stats["blob_bytes_deduplicated"] -= len(blobs[digest])
+                        self.stats["blob_bytes_written"] += len(blobs[digest])
+                    await pipe.execute()
+                self.stats["blobs_restored"] += len(lost)
+                logger.warning(f"⚠️ Re-stored {len(lost)} config blobs missing from Redis")
+        except Exception as e:
+            logger.error(
+                f"❌ Redis unavailable saving config for {conversation_id}, keeping it in memory: {e}"
+            )
+            self.stats["fallback_saves"] += 1
+            await self._fallback.save_config(conversation_id, config)
+            return
+
+        for digest, payload in blobs.items():
+            self._cache_blob(digest, payload)
+        self.stats["saves"] += 1
+        self.stats["config_bytes_written"] += len(config_payload)
+
+    async def get_config(self, conversation_id) -> Optional[BaseCallConfig]:
+        config = await self._fallback.get_config(conversation_id)
+        if config is not None:
+            return config
+
+        key = self._config_key(conversation_id)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                # The media stream connected - keep the config for the call's lifetime
+                pipe.expire(key, self.active_ttl_seconds)
+                raw, _ = await pipe.execute()
+            if raw is None:
+                return None
+
+            document = json.loads(self._decompress(raw))
+            await self._load_blobs(document)
+        except Exception as e:
+            # vocode answers a missing config with "No active phone call" instead of
+            # failing the media stream with an unhandled error
+            logger.error(f"❌ Could not load config for {conversation_id}: {e!r}")
+            self.stats["failed_gets"] += 1
+            return None
+        self.stats["gets"] += 1
+        return BaseCallConfig.parse_obj(self._decode(document))
+
+    async def delete_config(self, conversation_id):
+        await self._fallback.delete_config(conversation_id)
+        await self.redis.delete(self._config_key(conversation_id))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "cached_blobs": len(self._blob_cache)}
+
+    async def close(self):
+        """Close the connection pool"""
+        await self.redis.aclose()
@@ -0,0 +1,213 @@
+"""
+Twilio Cost Reconciler
+
+Twilio usually hasn't finalized a call's ``price`` right after hangup, so the
+post-call pipeline reports a locally estimated cost. This module keeps those calls
+pending and periodically pages through each account's Calls list once to fill in
+the final prices, emitting a COST_RECONCILED webhook with the difference.
+"""
+
+import os
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from twilio_cost_fetcher import twilio_client_registry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingCostReconciliation:
+    """A call whose reported Twilio cost is still an estimate"""
+    conversation_id: str
+    call_sid: str
+    account_sid: str
+    estimated_cost_usd: float
+    registered_at: float = field(default_factory=time.monotonic)
+    ended_at: datetime = field(default_factory=datetime.utcnow)
+    # Listings this call was missing from or still unpriced in
+    passes: int = 0
+
+
+class TwilioCostReconciler:
+    """Periodically replaces estimated Twilio call costs with final prices"""
+
+    def __init__(self,
+                 send_webhook: Callable[[Dict[str, Any]], Awaitable[Any]],
+                 interval_seconds: Optional[float] = None,
+                 max_age_seconds: float = 6 * 3600,
+                 max_passes: Optional[int] = None,
+                 page_size: int = 200):
+        self.send_webhook = send_webhook
+        self.interval_seconds = interval_seconds or float(
+            os.environ.get("TWILIO_COST_RECONCILE_INTERVAL_SECONDS", "180"))
+        self.max_age_seconds = max_age_seconds
+        # A call that never gets a price would otherwise pin the listing window
+        self.max_passes = max_passes or int(
+            os.environ.get("TWILIO_COST_RECONCILE_MAX_PASSES", "10"))
+        self.page_size = page_size
+
+        # account_sid -> {call_sid: pending entry}
+        self._pending: Dict[str, Dict[str, PendingCostReconciliation]] = {}
+        self._auth_tokens: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "registered": 0,
+            "reconciled": 0,
+            "expired": 0,
+            "abandoned": 0,
+            "api_requests": 0,
+            "failed_passes": 0,
+            "total_delta_usd": 0.0
+        }
+
+    def register(self, conversation_id: str, call_sid: str, account_sid: str,
+                 auth_token: str, estimated_cost_data: Optional[Dict[str, Any]]):
+        """Queue a call for reconciliation and make sure the job is running"""
+        if not (call_sid and account_sid and auth_token):
+            return
+
+        estimated_cost_usd = (estimated_cost_data or {}).get("cost_usd", 0.0)
+        self._auth_tokens[account_sid] = auth_token
+        self._pending.setdefault(account_sid, {})[call_sid] = PendingCostReconciliation(
+            conversation_id=conversation_id,
+            call_sid=call_sid,
+            account_sid=account_sid,
+            estimated_cost_usd=estimated_cost_usd)
+        self.stats["registered"] += 1
+
+        logger.info(
+            f"🧾 Queued call {call_sid} for cost reconciliation (estimate ${estimated_cost_usd:.6f})"
+        )
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    @property
+    def pending_count(self) -> int:
+        return sum(len(calls) for calls in self._pending.values())
+
+    async def _run(self):
+        """Reconcile every interval until nothing is pending"""
+        while self.pending_count:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.reconcile_once()
+            except Exception as e:
+                logger.error(f"❌ Cost reconciliation pass failed: {e}")
+
+    async def reconcile_once(self):
+        """Run one reconciliation pass over all accounts with pending calls"""
+        account_sids = list(self._pending)
+        results = await asyncio.gather(*(self._reconcile_account(account_sid)
+                                         for account_sid in account_sids),
+                                       return_exceptions=True)
+        for account_sid, result in zip(account_sids, results):
+            if isinstance(result, Exception):
+                self.stats["failed_passes"] += 1
+                logger.error(
+                    f"❌ Cost reconciliation failed for {account_sid[:8]}...: {result!r}",
+                    exc_info=result)
+
+    async def _reconcile_account(self, account_sid: str):
+        pending = self._pending.get(account_sid)
+        if not pending:
+            self._pending.pop(account_sid, None)
+            return
+
+        self._expire_old_entries(account_sid, pending)
+        if not pending:
+            return
+
+        client = twilio_client_registry.get_client(
+            account_sid, self._auth_tokens.get(account_sid))
+        if client is None:
+            return
+
+        # One listing covers every call that ended since the oldest pending one
+        oldest_end = min(entry.ended_at for entry in pending.values())
+        params = {
+            "EndTime>": (oldest_end - timedelta(days=1)).strftime("%Y-%m-%d"),
+            "PageSize": self.page_size
+        }
+
+        reconciled = 0
+        async for calls in client.iter_calls(params):
+            self.stats["api_requests"] += 1
+            for call in calls:
+                entry = pending.get(call.get("sid"))
+                if entry is None or call.get("price") is None:
+                    continue
+                del pending[entry.call_sid]
+                reconciled += 1
+                await self._emit_reconciled(entry, client.parse_call_data(call))
+            if not pending:
+                break
+
+        self._abandon_unpriced_entries(pending)
+        if not pending:
+            self._pending.pop(account_sid, None)
+
+        logger.info(
+            f"🧾 Reconciled {reconciled} call costs for {account_sid[:8]}... ({len(pending)} still pending)"
+        )
+
+    def _expire_old_entries(self, account_sid: str,
+                            pending: Dict[str, PendingCostReconciliation]):
+        now = time.monotonic()
+        for call_sid, entry in list(pending.items()):
+            if now - entry.registered_at > self.max_age_seconds:
+                del pending[call_sid]
+                self.stats["expired"] += 1
+                logger.warning(
+                    f"⚠️ Gave up reconciling cost for call {call_sid} after {self.max_age_seconds / 3600:.0f}h - keeping estimate"
+                )
+
+    def _abandon_unpriced_entries(
+            self, pending: Dict[str, PendingCostReconciliation]):
+        for call_sid, entry in list(pending.items()):
+            entry.passes += 1
+            if entry.passes >= self.max_passes:
+                del pending[call_sid]
+                self.stats["abandoned"] += 1
+                logger.warning(
+                    f"⚠️ Gave up reconciling cost for call {call_sid} after {entry.passes} passes without a price - keeping estimate"
+                )
+
+    async def _emit_reconciled(self, entry: PendingCostReconciliation,
+                               cost_data: Dict[str, Any]):
+        final_cost_usd = cost_data.get("cost_usd", 0.0)
+        delta_usd = round(final_cost_usd - entry.estimated_cost_usd, 6)
+
+        self.stats["reconciled"] += 1
+        self.stats["total_delta_usd"] += delta_usd
+
+        logger.info(
+            f"✅ Final Twilio cost for {entry.call_sid}: ${final_cost_usd:.6f} (estimate ${entry.estimated_cost_usd:.6f}, delta ${delta_usd:+.6f})"
+        )
+
+        await self.send_webhook({
+            "type": "COST_RECONCILED",
+            "call_id": entry.conversation_id,
+            "call_sid": entry.call_sid,
+            "estimated_cost_usd": entry.estimated_cost_usd,
+            "final_cost_usd": final_cost_usd,
+            "delta_usd": delta_usd,
+            "twilio_call_cost_data": cost_data,
+            "timestamp": datetime.now().isoformat()
+        })
+
+    async def stop(self):
+        """Cancel the background job"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
@@ -0,0 +1,88 @@
+"""
+Twilio Cost Reconciliation Benchmark
+
+Runs the fake Twilio API in-process with a batch of finished calls, then
+compares the REST requests needed to price them one call at a time
+(fetch_call_cost) against one cost reconciler pass, and checks that every
+reconciled price matches the per-call one.
+
+Usage: python cost_reconciler_benchmark.py --calls 500
+"""
+
+import argparse
+import asyncio
+import os
+import random
+
+import uvicorn
+
+PORT = 8921
+# The fetcher reads its API host at import time
+os.environ.setdefault("TWILIO_API_HOST", f"http://127.0.0.1:{PORT}")
+
+from cost_reconciler import TwilioCostReconciler  # noqa: E402
+from fake_twilio_server import DEFAULT_ACCOUNT_SID, FakeTwilioAccount, create_app  # noqa: E402
+from twilio_cost_fetcher import twilio_client_registry  # noqa: E402
+
+AUTH_TOKEN = "fake-auth-token"
+
+
+async def run(args):
+    account = FakeTwilioAccount(rate_limit_rate=args.rate_limit_rate)
+    calls = [
+        account.add_call(duration_seconds=random.randint(10, 600),
+                         ended_seconds_ago=args.calls - index)
+        for index in range(args.calls)
+    ]
+    app = create_app({DEFAULT_ACCOUNT_SID: account})
+    server = uvicorn.Server(uvicorn.Config(app, port=PORT, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    client = twilio_client_registry.get_client(DEFAULT_ACCOUNT_SID, AUTH_TOKEN)
+    per_call = {}
+    for call in calls:
+        cost_data = await client.fetch_call_cost(call.sid, max_retries=1)
+        per_call[call.sid] = cost_data["cost_usd"]
+    per_call_requests = app.state.requests["call"]
+
+    webhooks = []
+
+    async def send_webhook(payload):
+        webhooks.append(payload)
+
+    reconciler = TwilioCostReconciler(send_webhook, interval_seconds=3600, page_size=args.page_size)
+    for call in calls:
+        reconciler.register(call.sid, call.sid, DEFAULT_ACCOUNT_SID, AUTH_TOKEN,
+                            {"cost_usd": 0.0})
+    await reconciler.reconcile_once()
+    await reconciler.stop()
+
+    assert len(webhooks) == len(calls), f"Reconciled {len(webhooks)}/{len(calls)} calls"
+    mismatched = [
+        payload["call_sid"] for payload in webhooks
+        if payload["final_cost_usd"] != per_call[payload["call_sid"]]
+    ]
+    assert not mismatched, f"Reconciled prices differ for {mismatched[:5]}"
+    print(f"{'per-call':>12}: {per_call_requests} requests for {len(calls)} calls")
+    print(f"{'reconciler':>12}: {reconciler.stats['api_requests']} requests for {len(calls)} calls "
+          f"({app.state.requests['rate_limited']} rate limited)")
+    print(f"✅ {len(webhooks)} COST_RECONCILED webhooks, prices match the per-call fetch")
+
+    await twilio_client_registry.close_all()
+    server.should_exit = True
+    await serving
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Credential Health Registry
+
+Keeps the validity and quota state of every credential set (tenant/campaign) seen by
+/start_outbound_call in memory. Known sets are answered synchronously from the registry
+while a background task re-validates them periodically, so call start latency stays
+flat even when a provider's account API is slow. Only unseen sets are validated inline.
+"""
+
+import os
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from credential_validator import CredentialValidator, REJECTION_KEYWORDS, validator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CredentialHealth:
+    """Last known health of one credential set"""
+    credentials: Dict[str, Any]
+    payload: Dict[str, Any]
+    all_valid: bool = False
+    results: Dict[str, str] = field(default_factory=dict)
+    elevenlabs_quota: Optional[Dict[str, int]] = None
+    checked_at: float = 0.0
+    last_used: float = field(default_factory=time.monotonic)
+
+    def quota_used_ratio(self) -> Optional[float]:
+        """Fraction of the ElevenLabs character quota already used"""
+        if not self.elevenlabs_quota:
+            return None
+        limit = self.elevenlabs_quota.get("character_limit") or 0
+        if limit <= 0:
+            return None
+        return self.elevenlabs_quota.get("character_count", 0) / limit
+
+
+class CredentialHealthRegistry:
+    """In-memory registry of credential sets refreshed in the background"""
+
+    def __init__(self,
+                 credential_validator: CredentialValidator,
+                 refresh_interval_seconds: Optional[float] = None,
+                 idle_ttl_seconds: float = 3600.0,
+                 quota_refuse_ratio: Optional[float] = None):
+        self.validator = credential_validator
+        self.refresh_interval_seconds = refresh_interval_seconds or float(
+            os.environ.get("CREDENTIAL_REFRESH_INTERVAL_SECONDS", "120"))
+        self.idle_ttl_seconds = idle_ttl_seconds
+        # Refuse calls once this fraction of the TTS character quota is used
+        self.quota_refuse_ratio = quota_refuse_ratio or float(
+            os.environ.get("TTS_QUOTA_REFUSE_RATIO", "0.98"))
+
+        self._salt = os.urandom(16)
+        self._entries: Dict[str, CredentialHealth] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.stats = {"registry_hits": 0, "inline_validations": 0,
+                      "background_refreshes": 0, "quota_refusals": 0}
+
+    def _set_key(self, credentials: Dict[str, Any]) -> str:
+        """Salted hash identifying a credential set"""
+        digest = hashlib.sha256(self._salt)
+        for name in sorted(credentials):
+            digest.update(f"\x00{name}={credentials[name] or ''}".encode())
+        return digest.hexdigest()
+
+    async def check(self,
+                    data: Dict[str, Any]) -> Tuple[bool, Dict[str, str]]:
+        """
+        Return (all_valid, validation_results) for an outbound call payload.
+
+        Known credential sets are answered from memory without any network request.
+        """
+        credentials = self.validator.extract_credentials(data)
+        key = self._set_key(credentials)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            entry = CredentialHealth(credentials=credentials,
+                                     payload=self.validation_payload(data))
+            self.stats["inline_validations"] += 1
+            logger.info("🔐 Unseen credential set - validating inline")
+            await self._refresh(entry)
+            # Transient provider errors are not remembered so the next call retries
+            if entry.all_valid or self._is_rejected(entry.results):
+                self._entries[key] = entry
+                self._ensure_refresh_task()
+        else:
+            self.stats["registry_hits"] += 1
+
+        entry.last_used = time.monotonic()
+
+        if not entry.all_valid:
+            return False, dict(entry.results)
+
+        quota_message = self._quota_refusal(entry)
+        if quota_message:
+            self.stats["quota_refusals"] += 1
+            results = dict(entry.results)
+            results["elevenlabs"] = quota_message
+            return False, results
+
+        return True, dict(entry.results)
+
+    def validation_payload(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep only the payload fields the validator reads"""
+        return {
+            key: data[key]
+            for key in ("provider", "twilio_account_sid", "twilio_auth_token",
+                        "tts_provider", "elevenlabs_api_key",
+                        "deepgram_api_key", "openai_api_key", "tts", "stt",
+                        "model") if key in data
+        }
+
+    def _is_rejected(self, results: Dict[str, str]) -> bool:
+        """True when a provider definitively rejected (or lacks) a credential"""
+        return any(
+            any(keyword in message.lower()
+                for keyword in REJECTION_KEYWORDS + ("missing",))
+            for message in results.values())
+
+    def _quota_refusal(self, entry: CredentialHealth) -> Optional[str]:
+        used_ratio = entry.quota_used_ratio()
+        if used_ratio is None or used_ratio < self.quota_refuse_ratio:
+            return None
+        quota = entry.elevenlabs_quota
+        return (
+            f"ElevenLabs character quota exhausted: {quota['character_count']}/"
+            f"{quota['character_limit']} used ({used_ratio:.1%})")
+
+    async def _refresh(self, entry: CredentialHealth, use_cache: bool = True):
+        """Re-validate a credential set and update its health"""
+        all_valid, results = await self.validator.validate_all_credentials(
+            entry.payload, use_cache=use_cache)
+
+        if all_valid or self._is_rejected(results) or not entry.checked_at:
+            entry.all_valid = all_valid
+            entry.results = results
+        else:
+            # Transient provider errors keep the last known state
+            logger.warning(
+                f"⚠️ Credential refresh hit transient errors, keeping previous state: {results}"
+            )
+
+        elevenlabs_api_key = entry.credentials.get("elevenlabs_api_key")
+        if elevenlabs_api_key and entry.credentials.get("tts_provider") in (
+                "eleven_labs", "elevenlabs"):
+            entry.elevenlabs_quota = self.validator.get_elevenlabs_quota(
+                elevenlabs_api_key) or entry.elevenlabs_quota
+        entry.checked_at = time.monotonic()
+
+    def _ensure_refresh_task(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        """Periodically re-validate every recently used credential set"""
+        while self._entries:
+            await asyncio.sleep(self.refresh_interval_seconds)
+
+            now = time.monotonic()
+            for key, entry in list(self._entries.items()):
+                if now - entry.last_used > self.idle_ttl_seconds:
+                    del self._entries[key]
+
+            entries = list(self._entries.values())
+            # Bypass the validator cache so validity and quotas are live
+            await asyncio.gather(*(self._refresh(entry, use_cache=False)
+                                   for entry in entries),
+                                 return_exceptions=True)
+            self.stats["background_refreshes"] += len(entries)
+            logger.info(
+                f"🔐 Refreshed health of {len(entries)} credential sets")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Registry statistics for health reporting"""
+        return {**self.stats, "known_credential_sets": len(self._entries)}
+
+    async def stop(self):
+        """Cancel the background refresh task"""
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+        self._refresh_task = None
+
+
+# Global instance
+credential_health_registry = CredentialHealthRegistry(validator)
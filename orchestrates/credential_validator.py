@@ -1,43 +1,165 @@
 import httpx
 import logging
 import asyncio
-from typing import Dict, Any, Tuple, Optional
+import hashlib
+import os
+import time
+from typing import Dict, Any, Tuple, Optional, Callable, Awaitable
 import json
 import base64
 
 logger = logging.getLogger(__name__)
 
+try:
+    import h2  # noqa: F401 - enables HTTP/2 support in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Messages that mean the provider definitively rejected the credential
+REJECTION_KEYWORDS = ("invalid", "expired", "forbidden", "unauthorized")
+
+
 class CredentialValidator:
     """Validates API credentials by making actual API requests"""
     
-    def __init__(self):
+    def __init__(self,
+                 positive_ttl_seconds: float = 600.0,
+                 negative_ttl_seconds: float = 30.0,
+                 max_cache_entries: int = 1000):
         self.timeout = 10.0  # 10 second timeout for validation requests
+
+        # PERFORMANCE OPTIMIZATION: Validation results are cached per credential.
+        # Keys are salted hashes so raw secrets never sit in the cache.
+        self.positive_ttl_seconds = positive_ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_cache_entries = max_cache_entries
+        self._cache_salt = os.urandom(16)
+        self._cache: Dict[str, Tuple[float, bool, str]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self.cache_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+        # Latest ElevenLabs quota per credential cache key
+        self.elevenlabs_quotas: Dict[str, Dict[str, int]] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared pooled HTTP client for all provider validations"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_keepalive_connections=20,
+                                    max_connections=50))
+        return self._client
+
+    def _cache_key(self, service: str, *credentials: str) -> str:
+        """Salted hash of a credential, used as the cache key"""
+        digest = hashlib.sha256(self._cache_salt)
+        for credential in credentials:
+            digest.update(b"\x00" + credential.encode())
+        return f"{service}:{digest.hexdigest()}"
+
+    def _ttl_for(self, is_valid: bool, message: str) -> float:
+        """Positive TTL for valid keys, negative TTL for rejected keys, 0 for transient errors"""
+        if is_valid:
+            return self.positive_ttl_seconds
+        if any(keyword in message.lower() for keyword in REJECTION_KEYWORDS):
+            return self.negative_ttl_seconds
+        # Timeouts and provider errors are not cached so the next call retries
+        return 0.0
+
+    async def _cached_validation(
+            self,
+            cache_key: str,
+            validate: Callable[[], Awaitable[Tuple[bool, str]]],
+            use_cache: bool = True) -> Tuple[bool, str]:
+        """Return a cached result or run the validation once for all concurrent callers"""
+        cached = self._cache.get(cache_key) if use_cache else None
+        if cached and cached[0] > time.monotonic():
+            self.cache_stats["hits"] += 1
+            return cached[1], cached[2]
+
+        # Single-flight: concurrent validations of the same key share one request
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            self.cache_stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        self.cache_stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            result = await validate()
+            ttl = self._ttl_for(*result)
+            if ttl > 0:
+                self._store(cache_key, ttl, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(cache_key, None)
+
+    def _store(self, cache_key: str, ttl: float, result: Tuple[bool, str]):
+        if len(self._cache) >= self.max_cache_entries:
+            now = time.monotonic()
+            self._cache = {
+                key: entry
+                for key, entry in self._cache.items() if entry[0] > now
+            }
+            if len(self._cache) >= self.max_cache_entries:
+                # Drop the entry closest to expiry
+                self._cache.pop(min(self._cache, key=lambda k: self._cache[k][0]))
+        self._cache[cache_key] = (time.monotonic() + ttl, result[0], result[1])
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Validation cache statistics"""
+        lookups = sum(self.cache_stats.values())
+        return {
+            **self.cache_stats,
+            "cached_entries": len(self._cache),
+            "hit_rate": round((self.cache_stats["hits"] + self.cache_stats["coalesced"]) /
+                              lookups, 3) if lookups else 0.0
+        }
+
+    async def close(self):
+        """Close the pooled HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def validate_elevenlabs_credentials(self, api_key: str) -> Tuple[bool, str]:
         """Validate ElevenLabs API key by fetching user info"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                headers = {
-                    "Accept": "application/json",
-                    "xi-api-key": api_key
+            client = self._get_client()
+            headers = {
+                "Accept": "application/json",
+                "xi-api-key": api_key
+            }
+            
+            response = await client.get(
+                "https://api.elevenlabs.io/v1/user",
+                headers=headers
+            )
+            
+            if response.status_code == 200:
+                user_data = response.json()
+                char_count = user_data.get("subscription", {}).get("character_count", 0)
+                char_limit = user_data.get("subscription", {}).get("character_limit", 0)
+                self.elevenlabs_quotas[self._cache_key("elevenlabs", api_key)] = {
+                    "character_count": char_count,
+                    "character_limit": char_limit
                 }
+                logger.info(f"✅ ElevenLabs API valid - Characters: {char_count}/{char_limit}")
+                return True, "ElevenLabs API key is valid"
+            elif response.status_code == 401:
+                return False, "ElevenLabs API key is invalid or expired"
+            else:
+                return False, f"ElevenLabs API error: {response.status_code}"
                 
-                response = await client.get(
-                    "https://api.elevenlabs.io/v1/user",
-                    headers=headers
-                )
-                
-                if response.status_code == 200:
-                    user_data = response.json()
-                    char_count = user_data.get("subscription", {}).get("character_count", 0)
-                    char_limit = user_data.get("subscription", {}).get("character_limit", 0)
-                    logger.info(f"✅ ElevenLabs API valid - Characters: {char_count}/{char_limit}")
-                    return True, "ElevenLabs API key is valid"
-                elif response.status_code == 401:
-                    return False, "ElevenLabs API key is invalid or expired"
-                else:
-                    return False, f"ElevenLabs API error: {response.status_code}"
-                    
         except httpx.TimeoutException:
             return False, "ElevenLabs API request timed out"
         except Exception as e:
@@ -47,27 +169,27 @@ class CredentialValidator:
     async def validate_deepgram_credentials(self, api_key: str) -> Tuple[bool, str]:
         """Validate Deepgram API key by fetching projects"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                headers = {
-                    "Authorization": f"Token {api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                response = await client.get(
-                    "https://api.deepgram.com/v1/projects",
-                    headers=headers
-                )
+            client = self._get_client()
+            headers = {
+                "Authorization": f"Token {api_key}",
+                "Content-Type": "application/json"
+            }
+            
+            response = await client.get(
+                "https://api.deepgram.com/v1/projects",
+                headers=headers
+            )
+            
+            if response.status_code == 200:
+                projects = response.json()
+                project_count = len(projects.get("projects", []))
+                logger.info(f"✅ Deepgram API valid - Projects: {project_count}")
+                return True, "Deepgram API key is valid"
+            elif response.status_code == 401:
+                return False, "Deepgram API key is invalid or expired"
+            else:
+                return False, f"Deepgram API error: {response.status_code}"
                 
-                if response.status_code == 200:
-                    projects = response.json()
-                    project_count = len(projects.get("projects", []))
-                    logger.info(f"✅ Deepgram API valid - Projects: {project_count}")
-                    return True, "Deepgram API key is valid"
-                elif response.status_code == 401:
-                    return False, "Deepgram API key is invalid or expired"
-                else:
-                    return False, f"Deepgram API error: {response.status_code}"
-                    
         except httpx.TimeoutException:
             return False, "Deepgram API request timed out"
         except Exception as e:
@@ -77,34 +199,34 @@ class CredentialValidator:
     async def validate_twilio_credentials(self, account_sid: str, auth_token: str) -> Tuple[bool, str]:
         """Validate Twilio credentials by fetching account info"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                # Encode credentials for Basic Auth
-                credentials = f"{account_sid}:{auth_token}"
-                encoded_credentials = base64.b64encode(credentials.encode()).decode()
-                
-                headers = {
-                    "Authorization": f"Basic {encoded_credentials}",
-                    "Accept": "application/json"
-                }
-                
-                response = await client.get(
-                    f"https://api.twilio.com/2010-04-01/Accounts/{account_sid}.json",
-                    headers=headers
-                )
+            client = self._get_client()
+            # Encode credentials for Basic Auth
+            credentials = f"{account_sid}:{auth_token}"
+            encoded_credentials = base64.b64encode(credentials.encode()).decode()
+            
+            headers = {
+                "Authorization": f"Basic {encoded_credentials}",
+                "Accept": "application/json"
+            }
+            
+            response = await client.get(
+                f"https://api.twilio.com/2010-04-01/Accounts/{account_sid}.json",
+                headers=headers
+            )
+            
+            if response.status_code == 200:
+                account_data = response.json()
+                account_status = account_data.get("status", "unknown")
+                friendly_name = account_data.get("friendly_name", "N/A")
+                logger.info(f"✅ Twilio API valid - Account: {friendly_name} (Status: {account_status})")
+                return True, "Twilio credentials are valid"
+            elif response.status_code == 401:
+                return False, "Twilio credentials are invalid"
+            elif response.status_code == 403:
+                return False, "Twilio account access forbidden"
+            else:
+                return False, f"Twilio API error: {response.status_code}"
                 
-                if response.status_code == 200:
-                    account_data = response.json()
-                    account_status = account_data.get("status", "unknown")
-                    friendly_name = account_data.get("friendly_name", "N/A")
-                    logger.info(f"✅ Twilio API valid - Account: {friendly_name} (Status: {account_status})")
-                    return True, "Twilio credentials are valid"
-                elif response.status_code == 401:
-                    return False, "Twilio credentials are invalid"
-                elif response.status_code == 403:
-                    return False, "Twilio account access forbidden"
-                else:
-                    return False, f"Twilio API error: {response.status_code}"
-                    
         except httpx.TimeoutException:
             return False, "Twilio API request timed out"
         except Exception as e:
@@ -114,41 +236,39 @@ class CredentialValidator:
     async def validate_openai_credentials(self, api_key: str) -> Tuple[bool, str]:
         """Validate OpenAI API key by making a simple models request"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                headers = {
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                response = await client.get(
-                    "https://api.openai.com/v1/models",
-                    headers=headers
-                )
+            client = self._get_client()
+            headers = {
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json"
+            }
+            
+            response = await client.get(
+                "https://api.openai.com/v1/models",
+                headers=headers
+            )
+            
+            if response.status_code == 200:
+                models_data = response.json()
+                model_count = len(models_data.get("data", []))
+                logger.info(f"✅ OpenAI API valid - Models available: {model_count}")
+                return True, "OpenAI API key is valid"
+            elif response.status_code == 401:
+                return False, "OpenAI API key is invalid or expired"
+            else:
+                return False, f"OpenAI API error: {response.status_code}"
                 
-                if response.status_code == 200:
-                    models_data = response.json()
-                    model_count = len(models_data.get("data", []))
-                    logger.info(f"✅ OpenAI API valid - Models available: {model_count}")
-                    return True, "OpenAI API key is valid"
-                elif response.status_code == 401:
-                    return False, "OpenAI API key is invalid or expired"
-                else:
-                    return False, f"OpenAI API error: {response.status_code}"
-                    
         except httpx.TimeoutException:
             return False, "OpenAI API request timed out"
         except Exception as e:
             logger.error(f"OpenAI validation error: {e}")
             return False, f"OpenAI validation failed: {str(e)}"
     
-    async def validate_all_credentials(self, data: Dict[str, Any]) -> Tuple[bool, Dict[str, str]]:
-        """
-        Validate all API credentials based on the JSON payload
-        Returns: (all_valid, validation_results)
-        """
-        validation_results = {}
-        validation_tasks = []
-        
+    def get_elevenlabs_quota(self, api_key: str) -> Optional[Dict[str, int]]:
+        """Latest known ElevenLabs character usage for an API key"""
+        return self.elevenlabs_quotas.get(self._cache_key("elevenlabs", api_key))
+
+    def extract_credentials(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract the provider credentials from an outbound call payload"""
         # Extract provider information (default to twilio for backward compatibility)
         provider = data.get("provider", "twilio").lower()
         
@@ -165,7 +285,6 @@ class CredentialValidator:
         ).lower()
         
         # Get API keys from environment or payload (supporting both direct and nested configs)
-        import os
         elevenlabs_api_key = (
             data.get("elevenlabs_api_key") or 
             tts_config.get("api_key") or 
@@ -185,11 +304,41 @@ class CredentialValidator:
             model_config.get("api_key") or 
             os.getenv("OPENAI_API_KEY")
         )
+
+        return {
+            "provider": provider,
+            "twilio_account_sid": twilio_account_sid,
+            "twilio_auth_token": twilio_auth_token,
+            "tts_provider": tts_provider,
+            "elevenlabs_api_key": elevenlabs_api_key,
+            "deepgram_api_key": deepgram_api_key,
+            "openai_api_key": openai_api_key
+        }
+
+    async def validate_all_credentials(self,
+                                       data: Dict[str, Any],
+                                       use_cache: bool = True
+                                       ) -> Tuple[bool, Dict[str, str]]:
+        """
+        Validate all API credentials based on the JSON payload
+        Returns: (all_valid, validation_results)
+        """
+        validation_results = {}
+        validation_tasks = []
+
+        credentials = self.extract_credentials(data)
+        provider = credentials["provider"]
+        twilio_account_sid = credentials["twilio_account_sid"]
+        twilio_auth_token = credentials["twilio_auth_token"]
+        tts_provider = credentials["tts_provider"]
+        elevenlabs_api_key = credentials["elevenlabs_api_key"]
+        deepgram_api_key = credentials["deepgram_api_key"]
+        openai_api_key = credentials["openai_api_key"]
         
         # Validate Twilio credentials ONLY if provider is twilio
         if provider == "twilio":
             if twilio_account_sid and twilio_auth_token:
-                validation_tasks.append(self._validate_twilio_task(twilio_account_sid, twilio_auth_token))
+                validation_tasks.append(self._validate_twilio_task(twilio_account_sid, twilio_auth_token, use_cache))
             else:
                 validation_results["twilio"] = "Missing Twilio credentials (account_sid or auth_token)"
         else:
@@ -199,19 +348,19 @@ class CredentialValidator:
         
         # Validate TTS provider credentials
         if tts_provider in ["eleven_labs", "elevenlabs"] and elevenlabs_api_key:
-            validation_tasks.append(self._validate_elevenlabs_task(elevenlabs_api_key))
+            validation_tasks.append(self._validate_elevenlabs_task(elevenlabs_api_key, use_cache))
         elif tts_provider in ["eleven_labs", "elevenlabs"]:
             validation_results["elevenlabs"] = "Missing ElevenLabs API key"
         
         # Validate Deepgram (always required for STT)
         if deepgram_api_key:
-            validation_tasks.append(self._validate_deepgram_task(deepgram_api_key))
+            validation_tasks.append(self._validate_deepgram_task(deepgram_api_key, use_cache))
         else:
             validation_results["deepgram"] = "Missing Deepgram API key"
         
         # Validate OpenAI (always required for LLM)
         if openai_api_key:
-            validation_tasks.append(self._validate_openai_task(openai_api_key))
+            validation_tasks.append(self._validate_openai_task(openai_api_key, use_cache))
         else:
             validation_results["openai"] = "Missing OpenAI API key"
         
@@ -241,24 +390,36 @@ class CredentialValidator:
         
         return all_valid, validation_results
     
-    async def _validate_twilio_task(self, account_sid: str, auth_token: str):
+    async def _validate_twilio_task(self, account_sid: str, auth_token: str, use_cache: bool = True):
         """Wrapper task for Twilio validation"""
-        is_valid, message = await self.validate_twilio_credentials(account_sid, auth_token)
+        is_valid, message = await self._cached_validation(
+            self._cache_key("twilio", account_sid, auth_token),
+            lambda: self.validate_twilio_credentials(account_sid, auth_token),
+            use_cache)
         return "twilio", is_valid, message
     
-    async def _validate_elevenlabs_task(self, api_key: str):
+    async def _validate_elevenlabs_task(self, api_key: str, use_cache: bool = True):
         """Wrapper task for ElevenLabs validation"""
-        is_valid, message = await self.validate_elevenlabs_credentials(api_key)
+        is_valid, message = await self._cached_validation(
+            self._cache_key("elevenlabs", api_key),
+            lambda: self.validate_elevenlabs_credentials(api_key),
+            use_cache)
         return "elevenlabs", is_valid, message
     
-    async def _validate_deepgram_task(self, api_key: str):
+    async def _validate_deepgram_task(self, api_key: str, use_cache: bool = True):
         """Wrapper task for Deepgram validation"""
-        is_valid, message = await self.validate_deepgram_credentials(api_key)
+        is_valid, message = await self._cached_validation(
+            self._cache_key("deepgram", api_key),
+            lambda: self.validate_deepgram_credentials(api_key),
+            use_cache)
         return "deepgram", is_valid, message
     
-    async def _validate_openai_task(self, api_key: str):
+    async def _validate_openai_task(self, api_key: str, use_cache: bool = True):
         """Wrapper task for OpenAI validation"""
-        is_valid, message = await self.validate_openai_credentials(api_key)
+        is_valid, message = await self._cached_validation(
+            self._cache_key("openai", api_key),
+            lambda: self.validate_openai_credentials(api_key),
+            use_cache)
         return "openai", is_valid, message
 
 # Global validator instance
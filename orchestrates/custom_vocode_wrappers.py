@@ -3,7 +3,14 @@ Custom wrapper classes for Vocode package to implement RAG/Knowledge Base functi
 These wrappers extend the base vocode classes without modifying the package directly.
 """
 
-import uuid
+import os
+import asyncio
+import difflib
+import hashlib
+import json
+import re
+import time
+from functools import partial
 from typing import Iterable, List, Optional, Tuple, Any, AsyncGenerator, Dict, Union
 
 from langchain.docstore.document import Document
@@ -13,16 +20,12 @@ from openai import AsyncAzureOpenAI, AsyncOpenAI
 
 from vocode import getenv
 from vocode.streaming.models.vector_db import PineconeConfig
-from vocode.streaming.vector_db.base_vector_db import VectorDB
+from vocode.streaming.vector_db.base_vector_db import DEFAULT_OPENAI_EMBEDDING_MODEL, VectorDB
 from vocode.streaming.agent.chat_gpt_agent import ChatGPTAgent, ChatGPTAgentConfig
 from vocode.streaming.action.abstract_factory import AbstractActionFactory
 from vocode.streaming.action.default_factory import DefaultActionFactory
 from vocode.streaming.agent.base_agent import GeneratedResponse, StreamedResponse
-from vocode.streaming.agent.openai_utils import (
-    format_openai_chat_messages_from_transcript,
-    openai_get_tokens,
-    vector_db_result_to_openai_chat_message,
-)
+from vocode.streaming.agent.openai_utils import openai_get_tokens
 from vocode.streaming.agent.streaming_utils import collate_response_async, stream_response_async
 from vocode.streaming.models.message import BaseMessage, BotBackchannel, LLMToken
 from vocode.streaming.models.events import Sender
@@ -31,6 +34,86 @@ from vocode.utils.sentry_utils import CustomSentrySpans, sentry_create_span
 import sentry_sdk
 from vocode import sentry_span_tags
 
+from chat_messages import IncrementalChatMessages
+from llm_router import LLMEndpoint, llm_router
+from retrieval_cache import normalize_query, retrieval_cache
+from semantic_answer_cache import is_grounded, semantic_answer_cache
+from speech_normalizer import SpeechNormalizer, get_speech_normalizer, stream_normalized_async
+
+# PERFORMANCE OPTIMIZATION: One Pinecone client/index handle per (api key, index),
+# shared by every call instead of reconnecting per conversation
+_pinecone_indexes: Dict[Tuple[str, str], Any] = {}
+
+
+def _get_pinecone_index(api_key: str, index_name: str):
+    key = (api_key, index_name)
+    if key not in _pinecone_indexes:
+        _pinecone_indexes[key] = Pinecone(api_key=api_key).Index(index_name)
+        logger.info(f"✅ Pinecone index '{index_name}' connected successfully")
+    return _pinecone_indexes[key]
+
+
+# Knowledge-base ingestion batching
+EMBEDDING_BATCH_SIZE = int(os.environ.get("RAG_EMBEDDING_BATCH_SIZE", "256"))
+EMBEDDING_CONCURRENCY = int(os.environ.get("RAG_EMBEDDING_CONCURRENCY", "4"))
+# Pinecone caps upserts at 1000 vectors and 2MB per request
+UPSERT_MAX_VECTORS = 100
+UPSERT_MAX_BYTES = int(1.8 * 1024 * 1024)
+FETCH_BATCH_SIZE = 100
+
+
+def _estimated_vector_bytes(vector: Dict[str, Any]) -> int:
+    """Rough serialized size of one upsert entry (floats are ~20 chars in JSON)"""
+    return len(vector["id"]) + 20 * len(vector["values"]) + len(
+        json.dumps(vector["metadata"]))
+
+
+# Speculative retrieval on interim transcripts
+RAG_SPECULATIVE_PREFETCH = os.environ.get("RAG_SPECULATIVE_PREFETCH", "true").lower() == "true"
+# Minimum words in a stable interim before it is worth retrieving for
+PREFETCH_MIN_WORDS = int(os.environ.get("RAG_PREFETCH_MIN_WORDS", "3"))
+# How similar the final query must be to the prefetched one to reuse its result
+PREFETCH_MATCH_THRESHOLD = float(os.environ.get("RAG_PREFETCH_MATCH_THRESHOLD", "0.85"))
+
+
+def _install_interim_transcript_hook():
+    """
+    PERFORMANCE OPTIMIZATION: Let agents see interim transcripts.
+    Vocode only hands final (endpointed) transcripts to the agent; agents that define
+    on_interim_transcript(text) are now also told about interim ones.
+    """
+    from vocode.streaming.streaming_conversation import StreamingConversation
+
+    worker_class = StreamingConversation.TranscriptionsWorker
+    if getattr(worker_class, "_interim_hook_installed", False):
+        return
+    original_process = worker_class.process
+
+    async def process(self, transcription):
+        if (not transcription.is_final
+                and self.conversation.initial_message_tracker.is_set()):
+            handler = getattr(self.conversation.agent, "on_interim_transcript", None)
+            if handler is not None:
+                try:
+                    handler(transcription.message)
+                except Exception as e:
+                    logger.debug(f"Interim transcript handler failed: {e}")
+        await original_process(self, transcription)
+
+    worker_class.process = process
+    worker_class._interim_hook_installed = True
+
+
+_install_interim_transcript_hook()
+
+
+class SemanticCachePineconeConfig(PineconeConfig, type="vector_db_pinecone_semantic_cache"):  # type: ignore
+    """PineconeConfig for agents that opt in to the semantic answer cache"""
+    # Agents sharing a scope (same base prompt, language and model) share answers
+    semantic_cache_scope: str = ""
+    semantic_cache_threshold: float = 0.95
+    semantic_cache_ttl_seconds: float = 3600
+
 
 class CustomPineconeDB(VectorDB):
     """
@@ -47,14 +130,26 @@ class CustomPineconeDB(VectorDB):
         
         # Initialize modern Pinecone client
         try:
-            self.pc = Pinecone(api_key=self.pinecone_api_key)
-            self.index = self.pc.Index(self.index_name)
-            logger.info(f"✅ Pinecone index '{self.index_name}' connected successfully")
+            self.index = _get_pinecone_index(self.pinecone_api_key, self.index_name)
         except Exception as e:
             logger.error(f"❌ Failed to connect to Pinecone index '{self.index_name}': {e}")
             raise
         
         self._text_key = "text"
+        # Timings of the most recent similarity search (ms)
+        self.last_retrieval: Dict[str, Any] = {}
+        # Counts and throughput of the most recent add_texts
+        self.last_ingestion: Dict[str, Any] = {}
+
+    async def embed_query(self, query: str) -> List[float]:
+        """Embed a search query, reusing cached embeddings of the same query"""
+        cache_key = retrieval_cache.embedding_key(
+            self.engine or DEFAULT_OPENAI_EMBEDDING_MODEL, query)
+        embedding = retrieval_cache.embeddings.get(cache_key)
+        if embedding is None:
+            embedding = await self.create_openai_embedding(query)
+            retrieval_cache.embeddings.set(cache_key, embedding)
+        return embedding
 
     async def add_texts(
         self,
@@ -66,10 +161,15 @@ class CustomPineconeDB(VectorDB):
         """
         Run more texts through the embeddings and add to the vectorstore.
 
+        Texts are embedded in batches (several requests in flight), texts already
+        stored with the same content are skipped, and upserts are split to stay
+        under Pinecone's request limits.
+
         Args:
             texts: Iterable of strings to add to the vectorstore.
             metadatas: Optional list of metadatas associated with the texts.
-            ids: Optional list of ids to associate with the texts.
+            ids: Optional list of ids to associate with the texts. Defaults to
+                content hashes, so re-adding an unchanged document is a no-op.
             namespace: Optional pinecone namespace to add the texts to.
 
         Returns:
@@ -77,29 +177,116 @@ class CustomPineconeDB(VectorDB):
         """
         if namespace is None:
             namespace = ""
-        
-        # Embed and create the documents
-        vectors = []
-        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        started = time.perf_counter()
+        texts = list(texts)
+
+        # Content hashes identify unchanged chunks (and default to being the ids)
+        content_hashes = [hashlib.sha256(text.encode()).hexdigest() for text in texts]
+        ids = ids or [content_hash[:32] for content_hash in content_hashes]
+
+        pending: Dict[str, Dict[str, Any]] = {}
         for i, text in enumerate(texts):
-            embedding = await self.create_openai_embedding(text)
-            metadata = metadatas[i] if metadatas else {}
+            metadata = dict(metadatas[i]) if metadatas else {}
             metadata[self._text_key] = text
-            vectors.append({
-                "id": ids[i],
-                "values": embedding,
-                "metadata": metadata
-            })
-        
-        # Upsert to Pinecone using modern SDK
-        try:
-            self.index.upsert(vectors=vectors, namespace=namespace)
-            logger.info(f"✅ Upserted {len(vectors)} vectors to Pinecone")
-        except Exception as e:
-            logger.error(f"❌ Error upserting vectors: {e}")
+            metadata["content_hash"] = content_hashes[i]
+            pending[ids[i]] = {"id": ids[i], "text": text, "metadata": metadata}
+
+        unchanged = await self._unchanged_ids(pending, namespace)
+        to_ingest = [chunk for chunk_id, chunk in pending.items() if chunk_id not in unchanged]
+
+        # Many inputs per embedding request, a few requests in flight at once
+        semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+        batches = [
+            to_ingest[i:i + EMBEDDING_BATCH_SIZE]
+            for i in range(0, len(to_ingest), EMBEDDING_BATCH_SIZE)
+        ]
+        results = await asyncio.gather(
+            *(self._ingest_batch(batch, namespace, semaphore) for batch in batches))
+        upserted = sum(results)
+
+        if upserted:
+            retrieval_cache.invalidate_namespace(self.index_name, namespace)
+            semantic_answer_cache.invalidate(self.index_name, namespace)
+        elapsed = time.perf_counter() - started
+        self.last_ingestion = {
+            "chunks": len(texts),
+            "skipped_unchanged": len(unchanged),
+            "duplicates": len(texts) - len(pending),
+            "upserted": upserted,
+            "failed": len(to_ingest) - upserted,
+            "seconds": round(elapsed, 2),
+            "chunks_per_second": round(len(texts) / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        logger.info(
+            f"✅ Ingested {upserted}/{len(texts)} chunks into Pinecone ({len(unchanged)} unchanged) at {self.last_ingestion['chunks_per_second']} chunks/s"
+        )
         
         return ids
 
+    async def _unchanged_ids(self, pending: Dict[str, Dict[str, Any]],
+                             namespace: str) -> set:
+        """Ids already stored with the same content hash"""
+        unchanged = set()
+        chunk_ids = list(pending)
+        for i in range(0, len(chunk_ids), FETCH_BATCH_SIZE):
+            try:
+                existing = await retrieval_cache.run_blocking(
+                    self.index.fetch,
+                    ids=chunk_ids[i:i + FETCH_BATCH_SIZE],
+                    namespace=namespace)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not check existing vectors, re-embedding them: {e}")
+                continue
+            for chunk_id, vector in existing.vectors.items():
+                stored_hash = (vector.metadata or {}).get("content_hash")
+                if stored_hash == pending[chunk_id]["metadata"]["content_hash"]:
+                    unchanged.add(chunk_id)
+        return unchanged
+
+    async def _ingest_batch(self, batch: List[Dict[str, Any]], namespace: str,
+                            semaphore: asyncio.Semaphore) -> int:
+        """Embed one batch with a single request and upsert it; returns vectors upserted"""
+        async with semaphore:
+            try:
+                response = await self.openai_client.embeddings.create(
+                    input=[chunk["text"] for chunk in batch],
+                    model=self.engine or DEFAULT_OPENAI_EMBEDDING_MODEL)
+            except Exception as e:
+                logger.error(f"❌ Error embedding {len(batch)} chunks: {e}")
+                return 0
+            embeddings = sorted(response.data, key=lambda item: item.index)
+            vectors = [{
+                "id": chunk["id"],
+                "values": item.embedding,
+                "metadata": chunk["metadata"]
+            } for chunk, item in zip(batch, embeddings)]
+
+            upserted = 0
+            for upsert_batch in self._size_bounded_batches(vectors):
+                try:
+                    await retrieval_cache.run_blocking(self.index.upsert,
+                                                       vectors=upsert_batch,
+                                                       namespace=namespace)
+                    upserted += len(upsert_batch)
+                except Exception as e:
+                    logger.error(f"❌ Error upserting {len(upsert_batch)} vectors: {e}")
+            return upserted
+
+    @staticmethod
+    def _size_bounded_batches(vectors: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        batches, current, current_bytes = [], [], 0
+        for vector in vectors:
+            size = _estimated_vector_bytes(vector)
+            if current and (len(current) >= UPSERT_MAX_VECTORS
+                            or current_bytes + size > UPSERT_MAX_BYTES):
+                batches.append(current)
+                current, current_bytes = [], 0
+            current.append(vector)
+            current_bytes += size
+        if current:
+            batches.append(current)
+        return batches
+
     async def similarity_search_with_score(
         self,
         query: str,
@@ -119,13 +306,25 @@ class CustomPineconeDB(VectorDB):
         """
         if namespace is None:
             namespace = ""
-        
+
+        started = time.perf_counter()
+        result_key = retrieval_cache.result_key(self.index_name, namespace,
+                                                self.config.top_k, filter, query)
+        cached_docs = retrieval_cache.results.get(result_key)
+        if cached_docs is not None:
+            self._record_retrieval(started, cached=True)
+            logger.info(f"⚡ Pinecone search served from cache for query: '{query[:100]}'")
+            return cached_docs
+
         # Create embedding
-        query_embedding = await self.create_openai_embedding(query)
+        query_embedding = await self.embed_query(query)
+        embedded = time.perf_counter()
         
-        # Query Pinecone using modern SDK
+        # Query Pinecone using modern SDK - on the retrieval thread pool, since the
+        # client is synchronous and would otherwise stall every call's media
         try:
-            results = self.index.query(
+            results = await retrieval_cache.run_blocking(
+                self.index.query,
                 vector=query_embedding,
                 top_k=self.config.top_k,
                 namespace=namespace,
@@ -161,12 +360,25 @@ class CustomPineconeDB(VectorDB):
             if len(docs) == 0:
                 logger.warning(f"⚠️  No relevant documents found in Pinecone for query: '{query[:100]}'")
             
+            retrieval_cache.results.set(result_key, docs)
+            self._record_retrieval(started, embedded=embedded)
             return docs
             
         except Exception as e:
             logger.error(f"❌ Error searching Pinecone: {e}")
             return []
 
+    def _record_retrieval(self, started: float, embedded: Optional[float] = None,
+                          cached: bool = False):
+        finished = time.perf_counter()
+        self.last_retrieval = {
+            "total_ms": round((finished - started) * 1000, 1),
+            "embedding_ms": round((embedded - started) * 1000, 1) if embedded else 0.0,
+            "query_ms": round((finished - embedded) * 1000, 1) if embedded else 0.0,
+            "cached": cached
+        }
+        retrieval_cache.record_latency(self.last_retrieval["total_ms"])
+
 
 class CustomChatGPTAgentWithRAG(ChatGPTAgent):
     """
@@ -195,6 +407,20 @@ class CustomChatGPTAgentWithRAG(ChatGPTAgent):
             **kwargs,
         )
         
+        # Per-turn retrieval timings for this conversation
+        self.retrieval_timings: List[Dict[str, Any]] = []
+        # Speculative retrieval started from a stable interim transcript
+        self._last_interim: Optional[str] = None
+        self._prefetch_query: Optional[str] = None
+        self._prefetch_task: Optional[asyncio.Task] = None
+        self._prefetch_started: float = 0.0
+        self._prefetch_finished: Optional[float] = None
+        self.prefetch_stats = {"hits": 0, "misses": 0, "latency_saved_ms": 0.0}
+        self._chat_messages: Optional[IncrementalChatMessages] = None
+        # Set by subclasses that rewrite text for speech; streamed tokens are then
+        # normalized before vocode's splitter can break emails and prices apart
+        self.speech_normalizer: Optional[SpeechNormalizer] = None
+
         # Override vector DB creation to use custom PineconeDB
         if self.agent_config.vector_db_config:
             if isinstance(self.agent_config.vector_db_config, PineconeConfig):
@@ -207,6 +433,139 @@ class CustomChatGPTAgentWithRAG(ChatGPTAgent):
                     self.agent_config.vector_db_config
                 )
 
+    @staticmethod
+    def _queries_match(prefetched: str, final: str) -> bool:
+        return difflib.SequenceMatcher(
+            None, prefetched, final).ratio() >= PREFETCH_MATCH_THRESHOLD
+
+    def on_interim_transcript(self, text: str):
+        """
+        Start retrieval speculatively once an interim transcript is stable.
+
+        Deepgram repeats an interim once its words are finalized, so an interim equal
+        to the previous one is treated as stable. An in-flight prefetch is kept while
+        the caller's words still match it, and replaced once they diverge.
+        """
+        if not (RAG_SPECULATIVE_PREFETCH and self.agent_config.vector_db_config):
+            return
+        query = normalize_query(text)
+        is_stable = query == self._last_interim
+        self._last_interim = query
+        if not is_stable or len(query.split()) < PREFETCH_MIN_WORDS:
+            return
+        if self._prefetch_query is not None:
+            if self._queries_match(self._prefetch_query, query):
+                return
+            self._cancel_prefetch()
+
+        self._prefetch_query = query
+        self._prefetch_started = time.perf_counter()
+        self._prefetch_finished = None
+        self._prefetch_task = asyncio.create_task(
+            self.vector_db.similarity_search_with_score(text))
+        self._prefetch_task.add_done_callback(self._mark_prefetch_finished)
+        retrieval_cache.record_prefetch("started")
+
+    def _mark_prefetch_finished(self, task: asyncio.Task):
+        if task is self._prefetch_task:
+            self._prefetch_finished = time.perf_counter()
+
+    def _cancel_prefetch(self):
+        if self._prefetch_task is not None and not self._prefetch_task.done():
+            self._prefetch_task.cancel()
+            retrieval_cache.record_prefetch("cancelled")
+        self._prefetch_task = None
+        self._prefetch_query = None
+
+    async def _retrieve(self, query: str) -> List[Tuple[Document, float]]:
+        """Knowledge-base search for the final query, reusing a matching prefetch"""
+        prefetch_task, prefetch_query = self._prefetch_task, self._prefetch_query
+        self._prefetch_task, self._prefetch_query, self._last_interim = None, None, None
+
+        if prefetch_task is not None and self._queries_match(
+                prefetch_query, normalize_query(query)):
+            # Retrieval already done (or under way) before endpointing finished
+            now = time.perf_counter()
+            latency_saved_ms = ((self._prefetch_finished or now) -
+                                self._prefetch_started) * 1000
+            docs_with_scores = await prefetch_task
+            self.prefetch_stats["hits"] += 1
+            self.prefetch_stats["latency_saved_ms"] += latency_saved_ms
+            retrieval_cache.record_prefetch("hits", latency_saved_ms)
+            logger.info(
+                f"🔮 Speculative retrieval hit: saved {latency_saved_ms:.0f}ms")
+            return docs_with_scores
+
+        if prefetch_task is not None:
+            if not prefetch_task.done():
+                prefetch_task.cancel()
+            self.prefetch_stats["misses"] += 1
+            retrieval_cache.record_prefetch("misses")
+        return await self.vector_db.similarity_search_with_score(query)
+
+    def terminate(self):
+        self._cancel_prefetch()
+        return super().terminate()
+
+    def _build_chat_messages(self, rag_context: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        PERFORMANCE OPTIMIZATION: Chat messages maintained incrementally across turns
+        instead of rebuilding (and re-tokenizing) the whole transcript every turn.
+        """
+        if self._chat_messages is None:
+            self._chat_messages = IncrementalChatMessages(
+                self.agent_config.model_name,
+                self.functions if hasattr(self, 'functions') else None)
+        return self._chat_messages.build(self.transcript,
+                                         self.agent_config.prompt_preamble,
+                                         rag_context)
+
+    async def _create_openai_stream(self, chat_parameters: Dict[str, Any]) -> AsyncGenerator:
+        """
+        PERFORMANCE OPTIMIZATION: Stream through the latency-tiered LLM router, which
+        hedges a late first token to a secondary endpoint and fails over on errors.
+        Azure-configured agents and vocode's own llm_fallback keep vocode's path.
+        """
+        if (not llm_router.enabled or self._is_azure_model()
+                or self.agent_config.llm_fallback is not None):
+            return await super()._create_openai_stream(chat_parameters)
+        return await llm_router.create_stream(chat_parameters,
+                                              LLMEndpoint("openai", self.openai_client))
+
+    def _semantic_cache_scope(self) -> Optional[Tuple[str, str, str]]:
+        config = self.agent_config.vector_db_config
+        if not isinstance(config, SemanticCachePineconeConfig):
+            return None
+        return (config.index, "", config.semantic_cache_scope)
+
+    async def _cached_answer(self, query: str) -> Optional[str]:
+        """Answer from the semantic cache, if a near-identical question was answered"""
+        config = self.agent_config.vector_db_config
+        try:
+            embedding = await self.vector_db.embed_query(query)
+        except Exception as e:
+            logger.warning(f"⚠️ Semantic cache lookup skipped: {e}")
+            return None
+        entry = semantic_answer_cache.lookup(self._semantic_cache_scope(), embedding,
+                                             config.semantic_cache_threshold)
+        return entry.answer if entry else None
+
+    async def _store_answer(self, query: str, answer: str,
+                            docs_with_scores: List[Tuple[Document, float]]):
+        """Cache an answer if it only states facts from the retrieved documents"""
+        context = "\n".join(doc.page_content for doc, _ in docs_with_scores)
+        if not is_grounded(answer, context, query):
+            semantic_answer_cache.reject_ungrounded()
+            return
+        config = self.agent_config.vector_db_config
+        try:
+            embedding = await self.vector_db.embed_query(query)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not cache answer: {e}")
+            return
+        semantic_answer_cache.store(self._semantic_cache_scope(), query, embedding,
+                                    answer, config.semantic_cache_ttl_seconds)
+
     async def generate_response(
         self,
         human_input: str,
@@ -220,11 +579,33 @@ class CustomChatGPTAgentWithRAG(ChatGPTAgent):
         """
         assert self.transcript is not None
 
+        query = self.transcript.get_last_user_message()[1]
+        using_input_streaming_synthesizer = (
+            self.conversation_state_manager.using_input_streaming_synthesizer()
+        )
+        # PERFORMANCE OPTIMIZATION: Repeated knowledge-base questions are answered
+        # from the semantic cache - no retrieval, no LLM call
+        use_semantic_cache = (self._semantic_cache_scope() is not None
+                              and not using_input_streaming_synthesizer)
+        if use_semantic_cache:
+            cached_answer = await self._cached_answer(query)
+            if cached_answer:
+                self._cancel_prefetch()
+                self._last_interim = None
+                for sentence in re.split(r"(?<=[.!?])\s+", cached_answer):
+                    if sentence:
+                        yield GeneratedResponse(message=BaseMessage(text=sentence),
+                                                is_interruptible=True)
+                return
+
         chat_parameters = {}
+        docs_with_scores: List[Tuple[Document, float]] = []
         if self.agent_config.vector_db_config:
             try:
-                docs_with_scores = await self.vector_db.similarity_search_with_score(
-                    self.transcript.get_last_user_message()[1])
+                docs_with_scores = await self._retrieve(query)
+                retrieval = getattr(self.vector_db, "last_retrieval", None)
+                if retrieval:
+                    self.retrieval_timings.append(retrieval)
                 
                 docs_with_scores_str = "\n\n".join([
                     "Document: " + doc[0].metadata.get("source", "unknown") +
@@ -238,6 +619,10 @@ class CustomChatGPTAgentWithRAG(ChatGPTAgent):
                     f"📚 RAG Context Retrieved for Conversation ID: {conversation_id}"
                 )
                 logger.info(f"👤 User Transcription: {human_input}")
+                if retrieval:
+                    logger.info(
+                        f"⏱️ Retrieval: {retrieval['total_ms']}ms (embedding {retrieval['embedding_ms']}ms, query {retrieval['query_ms']}ms, cached={retrieval['cached']})"
+                    )
                 logger.info(
                     f"📄 Retrieved Knowledge (Context Chunks): \n{docs_with_scores_str}"
                 )
@@ -246,22 +631,14 @@ class CustomChatGPTAgentWithRAG(ChatGPTAgent):
                 vector_db_result = (
                     f"Found {len(docs_with_scores)} similar documents:\n{docs_with_scores_str}"
                 )
-                messages = format_openai_chat_messages_from_transcript(
-                    self.transcript,
-                    self.agent_config.model_name,
-                    self.functions if hasattr(self, 'functions') else None,
-                    self.agent_config.prompt_preamble,
-                )
-                messages.insert(
-                    -1,
-                    vector_db_result_to_openai_chat_message(vector_db_result))
-                chat_parameters = self.get_chat_parameters(messages)
+                chat_parameters = self.get_chat_parameters(
+                    self._build_chat_messages(vector_db_result))
             except Exception as e:
                 logger.error(f"Error while hitting vector db: {e}",
                              exc_info=True)
-                chat_parameters = self.get_chat_parameters()
+                chat_parameters = self.get_chat_parameters(self._build_chat_messages())
         else:
-            chat_parameters = self.get_chat_parameters()
+            chat_parameters = self.get_chat_parameters(self._build_chat_messages())
         chat_parameters["stream"] = True
 
         openai_chat_messages: List = chat_parameters.get("messages", [])
@@ -303,12 +680,16 @@ class CustomChatGPTAgentWithRAG(ChatGPTAgent):
 
         stream = await self._create_openai_stream(chat_parameters)
 
+        # Only plain, knowledge-base-backed answers are worth caching
+        answer_parts: Optional[List[str]] = (
+            [] if use_semantic_cache and docs_with_scores and backchannel is None else None)
+
         response_generator = collate_response_async
-        using_input_streaming_synthesizer = (
-            self.conversation_state_manager.using_input_streaming_synthesizer()
-        )
         if using_input_streaming_synthesizer:
             response_generator = stream_response_async
+            if self.speech_normalizer is not None:
+                response_generator = partial(stream_normalized_async,
+                                             normalizer=self.speech_normalizer)
         async for message in response_generator(
                 conversation_id=conversation_id,
                 gen=openai_get_tokens(stream, ),
@@ -323,16 +704,22 @@ class CustomChatGPTAgentWithRAG(ChatGPTAgent):
                              GeneratedResponse)
             MessageType = LLMToken if using_input_streaming_synthesizer else BaseMessage
             if isinstance(message, str):
+                if answer_parts is not None:
+                    answer_parts.append(message)
                 yield ResponseClass(
                     message=MessageType(text=message),
                     is_interruptible=True,
                 )
             else:
+                answer_parts = None
                 yield ResponseClass(
                     message=message,
                     is_interruptible=True,
                 )
 
+        if answer_parts:
+            await self._store_answer(query, " ".join(answer_parts), docs_with_scores)
+
 
 # Combined SSML + RAG Agent
 class CustomSSMLChatGPTAgentWithRAG(CustomChatGPTAgentWithRAG):
@@ -357,6 +744,7 @@ class CustomSSMLChatGPTAgentWithRAG(CustomChatGPTAgentWithRAG):
             **kwargs
         )
         self.language = language.lower()
+        self.speech_normalizer = get_speech_normalizer(self.language)
         logger.info(f"🎤📚 Custom SSML + RAG Agent initialized for language: {self.language} (SSML pronunciation + Knowledge Base)")
     
     def add_ssml_pronunciation(self, text: str) -> str:
@@ -364,138 +752,7 @@ class CustomSSMLChatGPTAgentWithRAG(CustomChatGPTAgentWithRAG):
         Convert text to SSML with proper pronunciation for special characters.
         Language-aware transformations for English, French, and Spanish.
         """
-        import re
-        
-        if not text:
-            return text
-        
-        # Remove asterisks completely (don't speak them)
-        text = text.replace("*", "")
-        
-        # Language-specific transformations
-        if self.language == "fr":
-            # French-specific transformations
-            # Convert prices - handle both comma and dot as decimal separator
-            text = re.sub(r'\b0[.,](\d{1,2})\s*(?:euros?|€)\b', 
-                          lambda m: f"{int(m.group(1))} centimes", text, flags=re.IGNORECASE)
-            text = re.sub(r'€\s*0[.,](\d{1,2})\b', 
-                          lambda m: f"{int(m.group(1))} centimes", text)
-            text = re.sub(r'\b0[.,](\d{1,2})\s*€', 
-                          lambda m: f"{int(m.group(1))} centimes", text)
-            
-            # Handle larger euro amounts
-            text = re.sub(r'\b(\d+)[.,](\d{2})\s*(?:euros?|€)\b',
-                          lambda m: f"{m.group(1)} euros {int(m.group(2))} centimes" if int(m.group(2)) > 0 else f"{m.group(1)} euros", text, flags=re.IGNORECASE)
-            text = re.sub(r'€\s*(\d+)[.,](\d{2})\b',
-                          lambda m: f"{m.group(1)} euros {int(m.group(2))} centimes" if int(m.group(2)) > 0 else f"{m.group(1)} euros", text)
-            text = re.sub(r'\b(\d+)\s*(?:euros?|€)\b',
-                          lambda m: f"{m.group(1)} euros", text, flags=re.IGNORECASE)
-            
-            # Handle dollars
-            text = re.sub(r'\b0[.,](\d{1,2})\s*(?:dollars?|\$)\b', 
-                          lambda m: f"{int(m.group(1))} cents", text, flags=re.IGNORECASE)
-            text = re.sub(r'\$\s*0[.,](\d{1,2})\b', 
-                          lambda m: f"{int(m.group(1))} cents", text)
-            text = re.sub(r'\b(\d+)[.,](\d{2})\s*(?:dollars?|\$)\b',
-                          lambda m: f"{m.group(1)} dollars {int(m.group(2))} cents" if int(m.group(2)) > 0 else f"{m.group(1)} dollars", text, flags=re.IGNORECASE)
-            text = re.sub(r'\$\s*(\d+)[.,](\d{2})\b',
-                          lambda m: f"{m.group(1)} dollars {int(m.group(2))} cents" if int(m.group(2)) > 0 else f"{m.group(1)} dollars", text)
-            
-            # Replace @ with "arobase" (French term)
-            text = text.replace("@", " arobase ")
-            
-            # Replace dots with "point"
-            def replace_dot_fr(match):
-                return f"{match.group(1)} point {match.group(2)}"
-            text = re.sub(r'([a-zA-Z0-9])[.,]([a-zA-Z0-9])', replace_dot_fr, text)
-            text = text.replace("...", " point point point ")
-            
-        elif self.language == "es":
-            # Spanish-specific transformations
-            # Convert prices - handle both comma and dot as decimal separator
-            text = re.sub(r'\b0[.,](\d{1,2})\s*(?:euros?|€)\b', 
-                          lambda m: f"{int(m.group(1))} céntimos", text, flags=re.IGNORECASE)
-            text = re.sub(r'€\s*0[.,](\d{1,2})\b', 
-                          lambda m: f"{int(m.group(1))} céntimos", text)
-            text = re.sub(r'\b0[.,](\d{1,2})\s*€', 
-                          lambda m: f"{int(m.group(1))} céntimos", text)
-            
-            # Handle larger euro amounts
-            text = re.sub(r'\b(\d+)[.,](\d{2})\s*(?:euros?|€)\b',
-                          lambda m: f"{m.group(1)} euros {int(m.group(2))} céntimos" if int(m.group(2)) > 0 else f"{m.group(1)} euros", text, flags=re.IGNORECASE)
-            text = re.sub(r'€\s*(\d+)[.,](\d{2})\b',
-                          lambda m: f"{m.group(1)} euros {int(m.group(2))} céntimos" if int(m.group(2)) > 0 else f"{m.group(1)} euros", text)
-            text = re.sub(r'\b(\d+)\s*(?:euros?|€)\b',
-                          lambda m: f"{m.group(1)} euros", text, flags=re.IGNORECASE)
-            
-            # Handle dollars
-            text = re.sub(r'\b0[.,](\d{1,2})\s*(?:dólares?|\$)\b', 
-                          lambda m: f"{int(m.group(1))} centavos", text, flags=re.IGNORECASE)
-            text = re.sub(r'\$\s*0[.,](\d{1,2})\b', 
-                          lambda m: f"{int(m.group(1))} centavos", text)
-            text = re.sub(r'\b(\d+)[.,](\d{2})\s*(?:dólares?|\$)\b',
-                          lambda m: f"{m.group(1)} dólares {int(m.group(2))} centavos" if int(m.group(2)) > 0 else f"{m.group(1)} dólares", text, flags=re.IGNORECASE)
-            text = re.sub(r'\$\s*(\d+)[.,](\d{2})\b',
-                          lambda m: f"{m.group(1)} dólares {int(m.group(2))} centavos" if int(m.group(2)) > 0 else f"{m.group(1)} dólares", text)
-            
-            # Replace @ with "arroba" (Spanish term)
-            text = text.replace("@", " arroba ")
-            
-            # Replace dots with "punto"
-            def replace_dot_es(match):
-                return f"{match.group(1)} punto {match.group(2)}"
-            text = re.sub(r'([a-zA-Z0-9])[.,]([a-zA-Z0-9])', replace_dot_es, text)
-            text = text.replace("...", " punto punto punto ")
-            
-        else:
-            # English (default)
-            # Handle amounts less than $1 (e.g., $0.33 → "33 cents")
-            text = re.sub(r'\b0\.(\d{1,2})\s*(?:dollars?)\b', 
-                          lambda m: f"{int(m.group(1))} cents", text, flags=re.IGNORECASE)
-            text = re.sub(r'\$\s*0\.(\d{1,2})\b', 
-                          lambda m: f"{int(m.group(1))} cents", text)
-            text = re.sub(r'\b0\.(\d{1,2})\s*\$', 
-                          lambda m: f"{int(m.group(1))} cents", text)
-            
-            # Handle amounts $1 and above with cents (e.g., $1.33 → "1 dollar and 33 cents")
-            def format_dollars_with_cents(match):
-                dollars = int(match.group(1))
-                cents = int(match.group(2))
-                
-                # Singular or plural for dollars
-                dollar_word = "dollar" if dollars == 1 else "dollars"
-                
-                # Only add cents if non-zero
-                if cents > 0:
-                    return f"{dollars} {dollar_word} and {cents} cents"
-                else:
-                    return f"{dollars} {dollar_word}"
-            
-            # Match patterns like $1.33, $10.50, 1.33 dollars, etc.
-            text = re.sub(r'\$\s*(\d+)\.(\d{2})\b', format_dollars_with_cents, text)
-            text = re.sub(r'\b(\d+)\.(\d{2})\s*(?:dollars?)\b', format_dollars_with_cents, text, flags=re.IGNORECASE)
-            text = re.sub(r'\b(\d+)\.(\d{2})\s*\$', format_dollars_with_cents, text)
-            
-            # Handle whole dollar amounts (e.g., $100 → "100 dollars")
-            text = re.sub(r'\$\s*(\d+)\b(?!\.)', 
-                          lambda m: f"{m.group(1)} {'dollar' if int(m.group(1)) == 1 else 'dollars'}", text)
-            text = re.sub(r'\b(\d+)\s*(?:dollars?)\b', 
-                          lambda m: f"{m.group(1)} {'dollar' if int(m.group(1)) == 1 else 'dollars'}", text, flags=re.IGNORECASE)
-            
-            # Replace @ with "at"
-            text = text.replace("@", " at ")
-            
-            # Replace dots in technical contexts (but not in prices - those are already handled above)
-            def replace_dot_in_technical_context(match):
-                return f"{match.group(1)} dot {match.group(2)}"
-            text = re.sub(r'([a-zA-Z0-9])\.([a-zA-Z0-9])', replace_dot_in_technical_context, text)
-            text = text.replace("...", " dot dot dot ")
-        
-        # Clean up spaces (common to all languages)
-        text = re.sub(r'\s+', ' ', text)
-        text = text.strip()
-        
-        return text
+        return self.speech_normalizer.normalize(text)
     
     async def generate_response(
         self,
@@ -514,8 +771,10 @@ class CustomSSMLChatGPTAgentWithRAG(CustomChatGPTAgentWithRAG):
             is_interrupt=is_interrupt,
             bot_was_in_medias_res=bot_was_in_medias_res,
         ):
-            # Add SSML processing to the response
-            if isinstance(response.message, BaseMessage):
+            # Add SSML processing to the response (streamed tokens were already
+            # normalized as a stream)
+            if (isinstance(response.message, BaseMessage)
+                    and not isinstance(response.message, LLMToken)):
                 original_text = response.message.text
                 processed_text = self.add_ssml_pronunciation(original_text)
                 
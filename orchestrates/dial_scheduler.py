@@ -0,0 +1,454 @@
+"""
+Outbound Dial Scheduler
+
+Paces bulk outbound calls instead of firing one HTTP request per contact. Each
+Twilio account gets a token bucket for its calls-per-second (CPS) limit plus a cap
+on concurrent calls, each from_phone gets its own concurrency cap, callbacks are
+dialed before fresh leads, and transient Twilio errors are retried with backoff.
+"""
+
+import os
+import asyncio
+import heapq
+import itertools
+import logging
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Lower values are dialed first
+CALLBACK_PRIORITY = 0
+FRESH_LEAD_PRIORITY = 1
+
+# HTTP statuses from Twilio that are worth retrying
+TRANSIENT_HTTP_STATUSES = (429, 500, 502, 503, 504)
+TRANSIENT_ERROR_MARKERS = ("too many requests", "timed out", "timeout",
+                           "temporarily unavailable", "connection reset",
+                           "service unavailable")
+# vocode raises RuntimeError(f"Failed to create call: {status} {reason}") with no .status
+CREATE_CALL_STATUS_PATTERN = re.compile(r"failed to create call:\s*(\d{3})\b",
+                                        re.IGNORECASE)
+
+# Twilio call statuses after which a dial slot can be released
+TERMINAL_CALL_STATUSES = ("completed", "busy", "no-answer", "failed",
+                          "canceled")
+
+# Job statuses after which a batch contact needs nothing more
+FINISHED_JOB_STATUSES = ("ended", "failed")
+
+
+def is_transient_dial_error(error: Exception) -> bool:
+    """True when a dial failure is likely to succeed on retry"""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status", None)
+    if status is None:
+        match = CREATE_CALL_STATUS_PATTERN.search(str(error))
+        status = int(match.group(1)) if match else None
+    if status in TRANSIENT_HTTP_STATUSES:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in TRANSIENT_ERROR_MARKERS)
+
+
+class TokenBucket:
+    """Calls-per-second limiter that reports how long to wait instead of blocking"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """Take a token; returns 0.0 on success or the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+@dataclass(order=True)
+class DialJob:
+    """One contact of a batch waiting to be dialed"""
+    priority: int
+    sequence: int
+    batch_id: str = field(compare=False)
+    account_key: str = field(compare=False)
+    from_phone: str = field(compare=False)
+    contact: Dict[str, Any] = field(compare=False)
+    compiled: Any = field(compare=False, repr=False)
+    # Position of the contact in its batch
+    index: int = field(default=0, compare=False)
+    status: str = field(default="queued", compare=False)
+    attempts: int = field(default=0, compare=False)
+    not_before: float = field(default=0.0, compare=False)
+    started_at: float = field(default=0.0, compare=False)
+    status_checked_at: float = field(default=0.0, compare=False)
+    conversation_id: Optional[str] = field(default=None, compare=False)
+    error: Optional[str] = field(default=None, compare=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "to_phone": self.contact.get("to_phone"),
+            "from_phone": self.from_phone,
+            "priority": self.priority,
+            "status": self.status,
+            "attempts": self.attempts,
+            "call_id": self.conversation_id,
+            "error": self.error
+        }
+
+
+@dataclass
+class DialBatch:
+    """A submitted list of contacts and the progress of their calls"""
+    batch_id: str
+    jobs: List[DialJob]
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    created_monotonic: float = field(default_factory=time.monotonic)
+
+    @property
+    def finished(self) -> bool:
+        return all(job.status in FINISHED_JOB_STATUSES for job in self.jobs)
+
+    def summary(self, include_calls: bool = True) -> Dict[str, Any]:
+        return _batch_summary(self.batch_id, self.created_at,
+                              [job.to_dict() for job in self.jobs], include_calls)
+
+    def to_state(self) -> Dict[str, Any]:
+        """Batch fields replicated to other processes (see summary_from_state)"""
+        return {
+            "batch": {"batch_id": self.batch_id, "created_at": self.created_at},
+            **{f"job:{job.index}": job.to_dict() for job in self.jobs}
+        }
+
+    @staticmethod
+    def summary_from_state(state: Dict[str, Any], include_calls: bool = True) -> Dict[str, Any]:
+        """Summary of a batch dialed by another process, from its replicated state"""
+        job_fields = sorted((name for name in state if name.startswith("job:")),
+                            key=lambda name: int(name[4:]))
+        return _batch_summary(state["batch"]["batch_id"], state["batch"]["created_at"],
+                              [state[name] for name in job_fields], include_calls)
+
+
+def _batch_summary(batch_id: str, created_at: str, calls: List[Dict[str, Any]],
+                   include_calls: bool) -> Dict[str, Any]:
+    counts: Dict[str, int] = {}
+    for call in calls:
+        counts[call["status"]] = counts.get(call["status"], 0) + 1
+    summary = {
+        "batch_id": batch_id,
+        "created_at": created_at,
+        "total": len(calls),
+        "finished": all(call["status"] in FINISHED_JOB_STATUSES for call in calls),
+        "counts": counts
+    }
+    if include_calls:
+        summary["calls"] = calls
+    return summary
+
+
+class DialScheduler:
+    """Asyncio scheduler that dials batch contacts within Twilio account limits"""
+
+    # Bound the per-pass scan past contacts whose from_phone is busy
+    MAX_SKIPPED_PER_PASS = 100
+
+    def __init__(self,
+                 launch: Callable[[Any, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 can_dial: Optional[Callable[[], bool]] = None,
+                 on_job_update: Optional[Callable[[DialJob], None]] = None,
+                 fetch_call_status: Optional[Callable[[str], Awaitable[Optional[str]]]] = None,
+                 calls_per_second: Optional[float] = None,
+                 max_concurrent_per_account: Optional[int] = None,
+                 max_concurrent_per_number: Optional[int] = None,
+                 max_retries: int = 3,
+                 retry_backoff_seconds: float = 2.0,
+                 slot_timeout_seconds: Optional[float] = None,
+                 slot_check_seconds: Optional[float] = None,
+                 batch_retention_seconds: float = 3600.0):
+        self.launch = launch
+        # Process-wide admission check (e.g. concurrent call capacity)
+        self.can_dial = can_dial
+        # Called whenever a job's status changes (e.g. to replicate batch progress)
+        self.on_job_update = on_job_update
+        # Looks up a call's Twilio status by conversation id (lost status callbacks)
+        self.fetch_call_status = fetch_call_status
+        self.calls_per_second = calls_per_second or float(
+            os.environ.get("TWILIO_ACCOUNT_CPS", "1"))
+        self.max_concurrent_per_account = max_concurrent_per_account or int(
+            os.environ.get("DIAL_MAX_CONCURRENT_PER_ACCOUNT", "20"))
+        self.max_concurrent_per_number = max_concurrent_per_number or int(
+            os.environ.get("DIAL_MAX_CONCURRENT_PER_NUMBER", "1"))
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        # Release slots of calls whose end was never reported
+        self.slot_timeout_seconds = slot_timeout_seconds or float(
+            os.environ.get("DIAL_SLOT_TIMEOUT_SECONDS", "3600"))
+        # How often to ask Twilio whether a call holding a slot has ended
+        self.slot_check_seconds = slot_check_seconds or float(
+            os.environ.get("DIAL_SLOT_CHECK_SECONDS", "60"))
+        self.batch_retention_seconds = batch_retention_seconds
+
+        # account_key -> heap of jobs ready to dial
+        self._queues: Dict[str, List[DialJob]] = {}
+        # (not_before, sequence, job) for jobs waiting out a retry backoff
+        self._delayed: List[Tuple[float, int, DialJob]] = []
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._account_slots: Dict[str, int] = {}
+        self._number_slots: Dict[str, int] = {}
+        # conversation_id -> job holding dial slots until the call ends
+        self._active: Dict[str, DialJob] = {}
+        self._dialing = 0
+        self._batches: Dict[str, DialBatch] = {}
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "submitted": 0,
+            "dialed": 0,
+            "retried": 0,
+            "failed": 0,
+            "slots_released_by_status_check": 0
+        }
+
+    def submit(self, compiled: Any, contacts: List[Dict[str, Any]]) -> DialBatch:
+        """Queue a batch of contacts that share one compiled call configuration"""
+        self._drop_old_batches()
+
+        batch_id = uuid.uuid4().hex
+        account_key = compiled.twilio_account_sid or compiled.provider
+        jobs = []
+        for index, contact in enumerate(contacts):
+            priority = contact.get(
+                "priority", CALLBACK_PRIORITY
+                if contact.get("is_callback") else FRESH_LEAD_PRIORITY)
+            job = DialJob(priority=int(priority),
+                          sequence=next(self._sequence),
+                          batch_id=batch_id,
+                          account_key=account_key,
+                          from_phone=contact.get("from_phone")
+                          or compiled.from_phone or "",
+                          contact=contact,
+                          compiled=compiled,
+                          index=index)
+            heapq.heappush(self._queues.setdefault(account_key, []), job)
+            jobs.append(job)
+
+        batch = DialBatch(batch_id=batch_id, jobs=jobs)
+        self._batches[batch_id] = batch
+        self.stats["submitted"] += len(jobs)
+        logger.info(
+            f"📦 Queued batch {batch_id} with {len(jobs)} contacts for account {account_key[:8]}..."
+        )
+
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return batch
+
+    def get_batch(self, batch_id: str) -> Optional[DialBatch]:
+        return self._batches.get(batch_id)
+
+    def call_ended(self, conversation_id: str):
+        """Release the dial slots held by a batch call once it has ended"""
+        job = self._active.pop(conversation_id, None)
+        if job is None:
+            return
+        job.status = "ended"
+        self._job_updated(job)
+        self._release(job)
+
+    def _job_updated(self, job: DialJob):
+        if self.on_job_update:
+            try:
+                self.on_job_update(job)
+            except Exception as e:
+                logger.error(f"❌ Dial job update listener failed: {e}")
+
+    def _has_capacity(self, job: DialJob) -> bool:
+        return (self._account_slots.get(job.account_key, 0) <
+                self.max_concurrent_per_account
+                and self._number_slots.get(job.from_phone, 0) <
+                self.max_concurrent_per_number)
+
+    def _reserve(self, job: DialJob):
+        self._account_slots[job.account_key] = self._account_slots.get(
+            job.account_key, 0) + 1
+        self._number_slots[job.from_phone] = self._number_slots.get(
+            job.from_phone, 0) + 1
+
+    def _release(self, job: DialJob):
+        self._account_slots[job.account_key] -= 1
+        self._number_slots[job.from_phone] -= 1
+        self._wakeup.set()
+
+    def _pending_jobs(self) -> int:
+        return sum(len(queue) for queue in self._queues.values()) + len(
+            self._delayed)
+
+    async def _run(self):
+        """Dispatch loop - runs while any job is queued, dialing or holding a slot"""
+        while self._pending_jobs() or self._dialing or self._active:
+            self._wakeup.clear()
+            wait_seconds = self._dispatch()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(),
+                                       timeout=wait_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self) -> float:
+        """Start every job allowed right now; returns how long to sleep at most"""
+        now = time.monotonic()
+        wait_seconds = 1.0
+        self._expire_stale_slots(now)
+
+        # Move retries whose backoff has elapsed back into their account queue
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, job = heapq.heappop(self._delayed)
+            heapq.heappush(self._queues.setdefault(job.account_key, []), job)
+        if self._delayed:
+            wait_seconds = min(wait_seconds, self._delayed[0][0] - now)
+
+        if self.can_dial and not self.can_dial():
+            return wait_seconds
+
+        for account_key, queue in list(self._queues.items()):
+            skipped = []
+            while queue and self._account_slots.get(
+                    account_key, 0) < self.max_concurrent_per_account:
+                job = heapq.heappop(queue)
+                if not self._has_capacity(job):
+                    # This from_phone is busy - try the next contact
+                    skipped.append(job)
+                    if len(skipped) >= self.MAX_SKIPPED_PER_PASS:
+                        break
+                    continue
+                bucket = self._buckets.setdefault(
+                    account_key, TokenBucket(self.calls_per_second))
+                delay = bucket.try_acquire()
+                if delay > 0:
+                    skipped.append(job)
+                    wait_seconds = min(wait_seconds, delay)
+                    break
+                self._reserve(job)
+                self._dialing += 1
+                asyncio.create_task(self._dial(job))
+            for job in skipped:
+                heapq.heappush(queue, job)
+            if not queue:
+                del self._queues[account_key]
+
+        return max(wait_seconds, 0.01)
+
+    async def _dial(self, job: DialJob):
+        job.status = "dialing"
+        job.attempts += 1
+        self._job_updated(job)
+        try:
+            result = await self.launch(job.compiled, job.contact)
+            if result.get("status") != "success":
+                raise RuntimeError(result.get("message", "call was not initiated"))
+        except Exception as e:
+            self._release(job)
+            if job.attempts <= self.max_retries and is_transient_dial_error(e):
+                job.status = "retry_scheduled"
+                job.error = str(e)
+                job.not_before = time.monotonic() + self.retry_backoff_seconds * (
+                    2**(job.attempts - 1))
+                heapq.heappush(self._delayed,
+                               (job.not_before, job.sequence, job))
+                self.stats["retried"] += 1
+                logger.warning(
+                    f"⚠️ Transient error dialing {job.contact.get('to_phone')} (attempt {job.attempts}), retrying: {e}"
+                )
+            else:
+                job.status = "failed"
+                job.error = str(e)
+                self.stats["failed"] += 1
+                logger.error(
+                    f"❌ Failed to dial {job.contact.get('to_phone')} after {job.attempts} attempts: {e}"
+                )
+            self._job_updated(job)
+            return
+        finally:
+            self._dialing -= 1
+
+        job.conversation_id = result.get("call_id")
+        job.error = None
+        job.started_at = time.monotonic()
+        self.stats["dialed"] += 1
+        if job.compiled.provider == "twilio" and job.conversation_id:
+            # Hold the slots until Twilio or vocode reports the call ended
+            job.status = "in_progress"
+            self._active[job.conversation_id] = job
+        else:
+            # Non-Twilio providers dial elsewhere - nothing to wait for
+            job.status = "ended"
+            self._release(job)
+        self._job_updated(job)
+
+    def _expire_stale_slots(self, now: float):
+        for conversation_id, job in list(self._active.items()):
+            if now - job.started_at > self.slot_timeout_seconds:
+                logger.warning(
+                    f"⚠️ No end reported for batch call {conversation_id} - releasing its dial slot"
+                )
+                self.call_ended(conversation_id)
+            elif self.fetch_call_status and now - max(
+                    job.started_at,
+                    job.status_checked_at) > self.slot_check_seconds:
+                # A lost status callback would otherwise block the from_phone until the timeout
+                job.status_checked_at = now
+                asyncio.create_task(self._check_call_status(conversation_id))
+
+    async def _check_call_status(self, conversation_id: str):
+        try:
+            call_status = await self.fetch_call_status(conversation_id)
+        except Exception as e:
+            logger.warning(
+                f"⚠️ Could not check Twilio status of batch call {conversation_id}: {e}"
+            )
+            return
+        if call_status in TERMINAL_CALL_STATUSES and conversation_id in self._active:
+            logger.info(
+                f"📞 Batch call {conversation_id} is {call_status} on Twilio - releasing its dial slot"
+            )
+            self.stats["slots_released_by_status_check"] += 1
+            self.call_ended(conversation_id)
+
+    def _drop_old_batches(self):
+        now = time.monotonic()
+        for batch_id, batch in list(self._batches.items()):
+            if batch.finished and now - batch.created_monotonic > self.batch_retention_seconds:
+                del self._batches[batch_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats, "queued": self._pending_jobs(),
+            "dialing": self._dialing,
+            "active_calls": len(self._active),
+            "batches": len(self._batches)
+        }
+
+    async def stop(self):
+        """Cancel the dispatch loop"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
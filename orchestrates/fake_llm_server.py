@@ -0,0 +1,116 @@
+"""
+Fake Streaming LLM Server
+
+OpenAI-compatible chat completions server (plain and Azure deployment routes)
+that streams a canned reply with a configurable latency profile, for exercising
+the LLM router's hedging and failover without real endpoints.
+
+Usage: python fake_llm_server.py --port 8901 --ttft-ms 250 --slow-rate 0.1 --slow-ttft-ms 3000
+Point the router at it with LLM_SECONDARY_BASE_URL=http://127.0.0.1:8901/v1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_REPLY = "Our plans start at twenty dollars per user per month. Would you like me to send you the details?"
+
+
+@dataclass
+class LatencyProfile:
+    ttft_ms: float = 250.0
+    # Fraction of requests whose first token takes slow_ttft_ms instead
+    slow_rate: float = 0.0
+    slow_ttft_ms: float = 3000.0
+    token_ms: float = 20.0
+    error_rate: float = 0.0
+    reply: str = DEFAULT_REPLY
+
+
+def _chunk(model: str, delta: dict, finish_reason=None) -> str:
+    payload = {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "delta": delta,
+            "finish_reason": finish_reason
+        }]
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def create_app(profile: LatencyProfile) -> FastAPI:
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.cancelled = 0
+
+    async def completions(request: Request, model: str):
+        app.state.requests += 1
+        if random.random() < profile.error_rate:
+            return JSONResponse(status_code=503,
+                                content={"error": {"message": "fake overload", "type": "server_error"}})
+
+        async def stream():
+            yield _chunk(model, {"role": "assistant", "content": ""})
+            try:
+                slow = random.random() < profile.slow_rate
+                await asyncio.sleep((profile.slow_ttft_ms if slow else profile.ttft_ms) / 1000)
+                for index, word in enumerate(profile.reply.split(" ")):
+                    if index:
+                        await asyncio.sleep(profile.token_ms / 1000)
+                    yield _chunk(model, {"content": word if index == 0 else f" {word}"})
+            except asyncio.CancelledError:
+                app.state.cancelled += 1
+                raise
+            yield _chunk(model, {}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        return await completions(request, body.get("model", "fake"))
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def azure_chat_completions(deployment: str, request: Request):
+        return await completions(request, deployment)
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests, "cancelled": app.state.cancelled}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--ttft-ms", type=float, default=250.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ttft-ms", type=float, default=3000.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    profile = LatencyProfile(ttft_ms=args.ttft_ms,
+                             slow_rate=args.slow_rate,
+                             slow_ttft_ms=args.slow_ttft_ms,
+                             token_ms=args.token_ms,
+                             error_rate=args.error_rate)
+    uvicorn.run(create_app(profile), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Fake Object Store
+
+In-memory stand-in for the google-cloud-storage Bucket/Blob/BlobWriter calls the
+recording uploader makes (blob.open("wb") resumable writers, generate_signed_url),
+tracking resumable sessions so tests can check that failed uploads cancel theirs
+instead of leaking them.
+
+Usage: RecordingUploader(bucket=FakeBucket("recordings-test"))
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+from urllib.parse import quote
+
+# GCS accepts resumable chunks in multiples of 256 KiB (except the last one)
+RESUMABLE_CHUNK_MULTIPLE = 256 * 1024
+
+
+class FakeObjectStoreError(Exception):
+    pass
+
+
+class FakeBlobWriter:
+    """
+    Resumable upload; like GCS's BlobWriter the session starts with the first
+    write, and the object only appears once the writer is closed
+    """
+
+    def __init__(self, bucket: "FakeBucket", name: str, content_type: str, chunk_size: int):
+        if chunk_size % RESUMABLE_CHUNK_MULTIPLE:
+            raise FakeObjectStoreError(f"chunk_size {chunk_size} is not a multiple of 256 KiB")
+        self._bucket = bucket
+        self._name = name
+        self._content_type = content_type
+        self._buffer = bytearray()
+        self._started = False
+        self.closed = False
+
+    def write(self, data: bytes) -> int:
+        if self.closed:
+            raise FakeObjectStoreError("write to a closed upload session")
+        if not self._started:
+            self._started = True
+            self._bucket._start_session(self)
+        self._bucket._maybe_fail(len(self._buffer) + len(data))
+        self._buffer.extend(data)
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._bucket._finish_session(self, self._name, bytes(self._buffer), self._content_type)
+
+    def terminate(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._bucket._finish_session(self, None, None, None)
+
+
+class FakeBlob:
+    def __init__(self, bucket: "FakeBucket", name: str):
+        self.bucket = bucket
+        self.name = name
+
+    def open(self, mode: str = "rb", content_type: str = "application/octet-stream",
+             chunk_size: int = 40 * RESUMABLE_CHUNK_MULTIPLE) -> FakeBlobWriter:
+        if mode != "wb":
+            raise FakeObjectStoreError(f"Unsupported mode {mode!r}")
+        return FakeBlobWriter(self.bucket, self.name, content_type, chunk_size)
+
+    def download_as_bytes(self) -> bytes:
+        if self.name not in self.bucket.objects:
+            raise FakeObjectStoreError(f"No such object: {self.name}")
+        return self.bucket.objects[self.name]
+
+    @property
+    def content_type(self) -> Optional[str]:
+        return self.bucket.content_types.get(self.name)
+
+    def generate_signed_url(self, expiration: datetime, method: str = "GET") -> str:
+        return (f"https://storage.fake/{self.bucket.name}/{quote(self.name)}"
+                f"?X-Goog-Expires={int(expiration.timestamp())}&X-Goog-Method={method}")
+
+
+class FakeBucket:
+    """Objects and resumable sessions of one fake bucket (thread-safe, like the GCS client)"""
+
+    def __init__(self, name: str = "fake-bucket", fail_after_bytes: Optional[int] = None):
+        self.name = name
+        # Writes fail once a session has received this many bytes
+        self.fail_after_bytes = fail_after_bytes
+        self.objects: Dict[str, bytes] = {}
+        self.content_types: Dict[str, str] = {}
+        self.stats = {"opened": 0, "finalized": 0, "terminated": 0}
+        self._open_sessions = set()
+        self._lock = threading.Lock()
+
+    @property
+    def open_sessions(self) -> int:
+        return len(self._open_sessions)
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+    def _start_session(self, writer: FakeBlobWriter):
+        with self._lock:
+            self._open_sessions.add(writer)
+            self.stats["opened"] += 1
+
+    def _maybe_fail(self, session_bytes: int):
+        if self.fail_after_bytes is not None and session_bytes > self.fail_after_bytes:
+            raise FakeObjectStoreError("Injected upload failure")
+
+    def _finish_session(self, writer: FakeBlobWriter, name: Optional[str],
+                        data: Optional[bytes], content_type: Optional[str]):
+        with self._lock:
+            started = writer in self._open_sessions
+            self._open_sessions.discard(writer)
+            if name is None:
+                # Nothing written means no session was ever started
+                if started:
+                    self.stats["terminated"] += 1
+                return
+            self.objects[name] = data
+            self.content_types[name] = content_type
+            self.stats["finalized"] += 1
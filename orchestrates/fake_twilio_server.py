@@ -0,0 +1,221 @@
+"""
+Fake Twilio REST API
+
+Serves the Calls resources the cost fetcher and reconciler use (Calls list with
+EndTime> filter and paging, single Call, call Recordings and recording media)
+from an in-memory set of calls, with prices that only become final some time
+after each call ends, for exercising cost reconciliation and recording uploads
+without a real Twilio account.
+
+Usage: python fake_twilio_server.py --port 8921 --calls 500 --price-delay-seconds 30
+Point the fetcher at it with TWILIO_API_HOST=http://127.0.0.1:8921
+"""
+
+import argparse
+import io
+import math
+import random
+import time
+import uuid
+import wave
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+API_PREFIX = "/2010-04-01/Accounts"
+DEFAULT_ACCOUNT_SID = "AC" + "0" * 32
+# Twilio's US outbound rate, applied when a fake price becomes final
+RATE_PER_MINUTE = 0.014
+
+
+def telephony_wav(seconds: float, sample_rate: int = 8000) -> bytes:
+    """Mono PCM16 WAV of a tone with some noise, roughly as compressible as speech"""
+    frames = bytearray()
+    for index in range(int(seconds * sample_rate)):
+        sample = 6000 * math.sin(2 * math.pi * 220 * index / sample_rate) + random.gauss(0, 300)
+        frames += int(max(-32768, min(32767, sample))).to_bytes(2, "little", signed=True)
+    output = io.BytesIO()
+    with wave.open(output, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(frames))
+    return output.getvalue()
+
+
+@dataclass
+class FakeCall:
+    sid: str
+    duration_seconds: int
+    end_time: datetime
+    from_number: str = "+15550000001"
+    to_number: str = "+15550000002"
+    # Monotonic time after which Twilio reports the final price
+    priced_at: float = 0.0
+    # recording SID -> WAV bytes
+    recordings: Dict[str, bytes] = field(default_factory=dict)
+
+    def to_resource(self) -> Dict[str, Any]:
+        priced = time.monotonic() >= self.priced_at
+        minutes = -(-self.duration_seconds // 60)
+        return {
+            "sid": self.sid,
+            "status": "completed",
+            "direction": "outbound-api",
+            "from": self.from_number,
+            "to": self.to_number,
+            "duration": str(self.duration_seconds),
+            "end_time": self.end_time.strftime("%a, %d %b %Y %H:%M:%S +0000"),
+            "price": f"-{minutes * RATE_PER_MINUTE:.5f}" if priced else None,
+            "price_unit": "USD"
+        }
+
+
+@dataclass
+class FakeTwilioAccount:
+    # Newest first, like Twilio's Calls list
+    calls: List[FakeCall] = field(default_factory=list)
+    # Fraction of requests answered with HTTP 429
+    rate_limit_rate: float = 0.0
+
+    def add_call(self, duration_seconds: int, price_delay_seconds: float = 0.0,
+                 ended_seconds_ago: float = 0.0) -> FakeCall:
+        call = FakeCall(sid="CA" + uuid.uuid4().hex,
+                        duration_seconds=duration_seconds,
+                        end_time=datetime.utcnow() - timedelta(seconds=ended_seconds_ago),
+                        priced_at=time.monotonic() + price_delay_seconds)
+        self.calls.insert(0, call)
+        return call
+
+    def add_recording(self, call: FakeCall, seconds: float) -> str:
+        recording_sid = "RE" + uuid.uuid4().hex
+        call.recordings[recording_sid] = telephony_wav(seconds)
+        return recording_sid
+
+    def finalize_prices(self):
+        for call in self.calls:
+            call.priced_at = 0.0
+
+
+def create_app(accounts: Dict[str, FakeTwilioAccount]) -> FastAPI:
+    app = FastAPI()
+    app.state.requests = {"calls_list": 0, "call": 0, "recordings": 0, "recording_media": 0,
+                          "rate_limited": 0}
+
+    def rate_limited(account: FakeTwilioAccount) -> Optional[JSONResponse]:
+        if random.random() < account.rate_limit_rate:
+            app.state.requests["rate_limited"] += 1
+            return JSONResponse(status_code=429, headers={"Retry-After": "0.1"},
+                                content={"code": 20429, "message": "Too Many Requests"})
+        return None
+
+    def not_found() -> JSONResponse:
+        return JSONResponse(status_code=404, content={"code": 20404, "message": "Not Found"})
+
+    @app.get(API_PREFIX + "/{account_sid}/Calls.json")
+    async def calls_list(account_sid: str, request: Request):
+        account = accounts.get(account_sid)
+        if account is None:
+            return not_found()
+        limited = rate_limited(account)
+        if limited:
+            return limited
+        app.state.requests["calls_list"] += 1
+
+        calls = account.calls
+        end_after = request.query_params.get("EndTime>")
+        if end_after:
+            cutoff = datetime.strptime(end_after, "%Y-%m-%d")
+            calls = [call for call in calls if call.end_time >= cutoff]
+        page_size = min(int(request.query_params.get("PageSize", 50)), 1000)
+        page = int(request.query_params.get("Page", 0))
+        page_calls = calls[page * page_size:(page + 1) * page_size]
+
+        next_page_uri = None
+        if (page + 1) * page_size < len(calls):
+            query = f"PageSize={page_size}&Page={page + 1}"
+            if end_after:
+                query += f"&EndTime%3E={end_after}"
+            next_page_uri = f"{API_PREFIX}/{account_sid}/Calls.json?{query}"
+        return {
+            "calls": [call.to_resource() for call in page_calls],
+            "page": page,
+            "page_size": page_size,
+            "next_page_uri": next_page_uri
+        }
+
+    @app.get(API_PREFIX + "/{account_sid}/Calls/{call_sid}.json")
+    async def call(account_sid: str, call_sid: str):
+        account = accounts.get(account_sid)
+        if account is None:
+            return not_found()
+        limited = rate_limited(account)
+        if limited:
+            return limited
+        app.state.requests["call"] += 1
+        for fake_call in account.calls:
+            if fake_call.sid == call_sid:
+                return fake_call.to_resource()
+        return not_found()
+
+    @app.get(API_PREFIX + "/{account_sid}/Calls/{call_sid}/Recordings.json")
+    async def recordings(account_sid: str, call_sid: str):
+        account = accounts.get(account_sid)
+        if account is None:
+            return not_found()
+        app.state.requests["recordings"] += 1
+        for fake_call in account.calls:
+            if fake_call.sid == call_sid:
+                return {"recordings": [{
+                    "sid": recording_sid,
+                    "call_sid": call_sid,
+                    "duration": str(len(audio) // 16000),
+                    "channels": 1
+                } for recording_sid, audio in fake_call.recordings.items()]}
+        return {"recordings": []}
+
+    @app.get(API_PREFIX + "/{account_sid}/Recordings/{recording}")
+    async def recording_media(account_sid: str, recording: str):
+        account = accounts.get(account_sid)
+        if account is None:
+            return not_found()
+        recording_sid = recording.split(".")[0]
+        for fake_call in account.calls:
+            if recording_sid in fake_call.recordings:
+                app.state.requests["recording_media"] += 1
+                return Response(fake_call.recordings[recording_sid], media_type="audio/x-wav")
+        return not_found()
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.requests
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8921)
+    parser.add_argument("--account-sid", default=DEFAULT_ACCOUNT_SID)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--price-delay-seconds", type=float, default=30.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    account = FakeTwilioAccount(rate_limit_rate=args.rate_limit_rate)
+    for index in range(args.calls):
+        account.add_call(duration_seconds=random.randint(10, 600),
+                         price_delay_seconds=args.price_delay_seconds,
+                         ended_seconds_ago=args.calls - index)
+    print(f"Fake Twilio account {args.account_sid} with {args.calls} calls")
+    uvicorn.run(create_app({args.account_sid: account}), host=args.host, port=args.port,
+                log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
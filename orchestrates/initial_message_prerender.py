@@ -0,0 +1,232 @@
+"""
+PERFORMANCE OPTIMIZATION MODULE
+Pre-renders the initial message of outbound calls while the phone is ringing.
+
+vocode only synthesizes initial_message once the Twilio media stream connects,
+so the caller hears the TTS round trip as silence right after answering. The
+personalized initial message is synthesized as soon as the call is created and
+parked by conversation ID; the conversation's synthesizer plays the parked
+audio when it is asked for that message.
+
+Answer-to-first-audio latency (media stream start to the first audio chunk of
+the first message, including any initial_message_delay) is recorded for both
+pre-rendered and live-synthesized greetings.
+"""
+
+import os
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Deque, Dict, Optional
+
+from vocode import conversation_id as ctx_conversation_id
+from vocode.streaming.models.audio import AudioEncoding
+from vocode.streaming.models.message import BaseMessage, LLMToken, SilenceMessage
+from vocode.streaming.models.synthesizer import SynthesizerConfig
+from vocode.streaming.synthesizer.base_synthesizer import BaseSynthesizer, CachedAudio, SynthesisResult
+from vocode.streaming.synthesizer.default_factory import DefaultSynthesizerFactory
+from vocode.streaming.synthesizer.input_streaming_synthesizer import InputStreamingSynthesizer
+
+from tts_phrase_cache import PhraseCachingSynthesizerFactory, phrase_key, tts_phrase_cache
+
+logger = logging.getLogger(__name__)
+
+# One second of 8kHz mulaw per chunk; only used while collecting the audio
+PRERENDER_CHUNK_SIZE = 8000
+
+
+def _prerenderable(synthesizer: BaseSynthesizer) -> bool:
+    config = synthesizer.get_synthesizer_config()
+    return (not isinstance(synthesizer, InputStreamingSynthesizer)
+            and config.audio_encoding == AudioEncoding.MULAW
+            and not config.should_encode_as_wav)
+
+
+@dataclass
+class _ParkedMessage:
+    text: str
+    key: str
+    task: "asyncio.Task[Optional[bytes]]"
+    created_at: float
+
+
+class InitialMessagePrerenderer:
+    """Initial-message audio rendered during ringing, parked by conversation ID"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.enabled = os.environ.get("INITIAL_MESSAGE_PRERENDER_ENABLED",
+                                      "true").lower() == "true"
+        # Covers ringing (Timeout=20) plus slow media stream setup
+        self.ttl_seconds = ttl_seconds or float(
+            os.environ.get("INITIAL_MESSAGE_PRERENDER_TTL_SECONDS", "120"))
+        self._parked: Dict[str, _ParkedMessage] = {}
+        # Recent answer-to-first-audio latencies (ms) per path
+        self._first_audio_ms: Dict[str, Deque[float]] = {
+            "prerendered": deque(maxlen=500),
+            "synthesized": deque(maxlen=500)
+        }
+        self.stats = {
+            "started": 0,
+            "ready_at_answer": 0,
+            "awaited_at_answer": 0,
+            "played": 0,
+            "discarded": 0,
+            "failed": 0
+        }
+
+    def start(self, conversation_id: str, synthesizer_config: SynthesizerConfig,
+              text: Optional[str]):
+        """Begin synthesizing a call's initial message in the background"""
+        if not self.enabled or not text:
+            return
+        self._discard_expired()
+        task = asyncio.create_task(self._render(conversation_id, synthesizer_config, text))
+        self._parked[conversation_id] = _ParkedMessage(
+            text=text,
+            key=phrase_key(synthesizer_config, text),
+            task=task,
+            created_at=time.monotonic())
+        self.stats["started"] += 1
+
+    async def _render(self, conversation_id: str, synthesizer_config: SynthesizerConfig,
+                      text: str) -> Optional[bytes]:
+        started = time.monotonic()
+        synthesizer = DefaultSynthesizerFactory().create_synthesizer(synthesizer_config)
+        try:
+            if not _prerenderable(synthesizer):
+                return None
+            if tts_phrase_cache.enabled:
+                tts_phrase_cache.install(synthesizer, conversation_id)
+            result = await synthesizer.create_speech(BaseMessage(text=text),
+                                                     PRERENDER_CHUNK_SIZE,
+                                                     is_sole_text_chunk=True)
+            audio = b"".join([chunk_result.chunk async for chunk_result in result.chunk_generator])
+            logger.info(
+                f"🎙️ Pre-rendered initial message for {conversation_id} in {(time.monotonic() - started) * 1000:.0f}ms ({len(audio)} bytes)"
+            )
+            return audio
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.warning(f"⚠️ Initial message pre-render failed for {conversation_id}: {e}")
+            return None
+        finally:
+            await synthesizer.tear_down()
+
+    async def take(self, conversation_id: str, synthesizer_config: SynthesizerConfig,
+                   text: str) -> Optional[bytes]:
+        """Parked audio for this exact message and voice, waiting for it if still rendering"""
+        parked = self._parked.get(conversation_id)
+        if parked is None or parked.text != text:
+            return None
+        del self._parked[conversation_id]
+        if parked.key != phrase_key(synthesizer_config, text):
+            parked.task.cancel()
+            self.stats["discarded"] += 1
+            return None
+        # Even unfinished, the parked render is further along than a new request
+        self.stats["ready_at_answer" if parked.task.done() else "awaited_at_answer"] += 1
+        try:
+            audio = await parked.task
+        except asyncio.CancelledError:
+            return None
+        if audio:
+            self.stats["played"] += 1
+        return audio
+
+    def discard(self, conversation_id: str):
+        """Drop a call's parked audio (call ended or never answered)"""
+        parked = self._parked.pop(conversation_id, None)
+        if parked is not None:
+            parked.task.cancel()
+            self.stats["discarded"] += 1
+
+    # Registered as an EventsManager call-ended listener
+    call_ended = discard
+
+    def _discard_expired(self):
+        now = time.monotonic()
+        for conversation_id in [
+                conversation_id for conversation_id, parked in self._parked.items()
+                if now - parked.created_at > self.ttl_seconds
+        ]:
+            self.discard(conversation_id)
+
+    async def _timed_first_audio(self, chunk_generator: AsyncGenerator[SynthesisResult.ChunkResult, None],
+                                 stream_started: float, path: str, conversation_id: Optional[str]):
+        is_first_chunk = True
+        async for chunk_result in chunk_generator:
+            if is_first_chunk:
+                is_first_chunk = False
+                latency_ms = (time.monotonic() - stream_started) * 1000
+                self._first_audio_ms[path].append(latency_ms)
+                logger.info(
+                    f"⏱️ Answer-to-first-audio for {conversation_id}: {latency_ms:.0f}ms ({path})")
+            yield chunk_result
+
+    def install(self, synthesizer: BaseSynthesizer, conversation_id: Optional[str]) -> BaseSynthesizer:
+        """Serve a conversation's initial message from parked audio and time its first audio"""
+        if not _prerenderable(synthesizer):
+            return synthesizer
+        config = synthesizer.get_synthesizer_config()
+        create_speech = synthesizer.create_speech
+        # Conversations create their synthesizer when the media stream starts
+        stream_started = time.monotonic()
+        awaiting_first_audio = True
+
+        async def create_speech_with_prerendered_audio(message: BaseMessage,
+                                                       chunk_size: int,
+                                                       is_first_text_chunk: bool = False,
+                                                       is_sole_text_chunk: bool = False) -> SynthesisResult:
+            nonlocal awaiting_first_audio
+            if isinstance(message, SilenceMessage):
+                return await create_speech(message, chunk_size,
+                                           is_first_text_chunk=is_first_text_chunk,
+                                           is_sole_text_chunk=is_sole_text_chunk)
+            audio = None
+            if conversation_id and not isinstance(message, LLMToken):
+                audio = await self.take(conversation_id, config, message.text)
+            if audio:
+                result = CachedAudio(message, audio, config).create_synthesis_result(chunk_size)
+            else:
+                result = await create_speech(message, chunk_size,
+                                             is_first_text_chunk=is_first_text_chunk,
+                                             is_sole_text_chunk=is_sole_text_chunk)
+            if awaiting_first_audio:
+                awaiting_first_audio = False
+                result.chunk_generator = self._timed_first_audio(
+                    result.chunk_generator, stream_started,
+                    "prerendered" if audio else "synthesized", conversation_id)
+            return result
+
+        synthesizer.create_speech = create_speech_with_prerendered_audio
+        return synthesizer
+
+    def get_stats(self) -> Dict[str, Any]:
+        first_audio = {}
+        for path, latencies in self._first_audio_ms.items():
+            ordered = sorted(latencies)
+            first_audio[path] = {
+                "calls": len(ordered),
+                "p50_ms": round(ordered[len(ordered) // 2], 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1)
+            } if ordered else {"calls": 0}
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "parked": len(self._parked),
+            "answer_to_first_audio": first_audio
+        }
+
+
+class PrerenderingSynthesizerFactory(PhraseCachingSynthesizerFactory):
+    """Phrase-caching synthesizer factory that also plays pre-rendered initial messages"""
+
+    def create_synthesizer(self, synthesizer_config: SynthesizerConfig):
+        synthesizer = super().create_synthesizer(synthesizer_config)
+        return initial_message_prerenderer.install(synthesizer, ctx_conversation_id.value)
+
+
+# Global instance
+initial_message_prerenderer = InitialMessagePrerenderer()
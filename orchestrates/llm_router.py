@@ -0,0 +1,291 @@
+"""
+PERFORMANCE OPTIMIZATION MODULE
+Latency-tiered LLM routing with hedged requests.
+
+Every live call's agent streams from a single OpenAI endpoint, so a slow region
+stalls time-to-first-token (TTFT) for all of them. The router keeps a rolling
+TTFT window per (endpoint, model) and:
+- sends each request to the endpoint with the best recent median TTFT
+- starts a hedged duplicate on the next endpoint when the first token is later
+  than the leader's recent p95, keeps whichever streams first and cancels the other
+- fails over to the next endpoint on errors, and sidelines an endpoint for a
+  cooldown after repeated failures
+
+Secondaries come from the environment: Azure OpenAI (AZURE_OPENAI_ENDPOINT,
+AZURE_OPENAI_API_KEY, AZURE_OPENAI_DEPLOYMENT) and/or any OpenAI-compatible
+server (LLM_SECONDARY_BASE_URL, e.g. fake_llm_server.py in tests and benchmarks).
+"""
+
+import os
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, AsyncIterator, Deque, Dict, List, Optional, Tuple, Union
+
+from openai import AsyncAzureOpenAI, AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Samples needed before an endpoint's TTFT percentiles are trusted
+MIN_TTFT_SAMPLES = 5
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _is_first_token(chunk: Any) -> bool:
+    """True for the first chunk that carries output (OpenAI opens with a role-only delta)"""
+    if not chunk.choices:
+        return False
+    choice = chunk.choices[0]
+    delta = choice.delta
+    return bool(choice.finish_reason or (delta is not None and (
+        delta.content or delta.function_call or getattr(delta, "tool_calls", None))))
+
+
+@dataclass
+class LLMEndpoint:
+    name: str
+    client: Union[AsyncOpenAI, AsyncAzureOpenAI]
+    # Azure deployment serving the requested model (None: use the model name)
+    deployment: Optional[str] = None
+
+    def model_for(self, model: str) -> str:
+        return self.deployment or model
+
+
+@dataclass
+class _OpenedStream:
+    endpoint: LLMEndpoint
+    stream: Any
+    # One iterator for the whole stream, so the relay resumes after the first token
+    chunks: AsyncIterator[Any]
+    # Chunks read while waiting for the first token
+    buffered: List[Any]
+    ttft_ms: float
+
+
+def _configured_secondaries() -> List[LLMEndpoint]:
+    secondaries = []
+    azure_endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT")
+    azure_api_key = os.environ.get("AZURE_OPENAI_API_KEY")
+    if azure_endpoint and azure_api_key:
+        secondaries.append(
+            LLMEndpoint("azure",
+                        AsyncAzureOpenAI(azure_endpoint=azure_endpoint,
+                                         api_key=azure_api_key,
+                                         api_version=os.environ.get("AZURE_OPENAI_API_VERSION",
+                                                                    "2024-06-01"),
+                                         max_retries=0),
+                        deployment=os.environ.get("AZURE_OPENAI_DEPLOYMENT")))
+    secondary_base_url = os.environ.get("LLM_SECONDARY_BASE_URL")
+    if secondary_base_url:
+        secondaries.append(
+            LLMEndpoint("secondary",
+                        AsyncOpenAI(base_url=secondary_base_url,
+                                    api_key=os.environ.get("LLM_SECONDARY_API_KEY")
+                                    or os.environ.get("OPENAI_API_KEY") or "unused",
+                                    max_retries=0)))
+    return secondaries
+
+
+class LLMRouter:
+    """Routes chat completion streams to the fastest healthy endpoint, hedging late ones"""
+
+    def __init__(self, secondaries: Optional[List[LLMEndpoint]] = None):
+        self.enabled = os.environ.get("LLM_ROUTER_ENABLED", "true").lower() == "true"
+        self.hedge_enabled = os.environ.get("LLM_HEDGE_ENABLED", "true").lower() == "true"
+        # Hedge delay is the leader's recent p95 TTFT, clamped to this range
+        self.min_hedge_delay_ms = float(os.environ.get("LLM_HEDGE_MIN_DELAY_MS", "400"))
+        self.max_hedge_delay_ms = float(os.environ.get("LLM_HEDGE_MAX_DELAY_MS", "2000"))
+        # Used until the leader has MIN_TTFT_SAMPLES recent samples
+        self.default_hedge_delay_ms = float(os.environ.get("LLM_HEDGE_DELAY_MS", "1000"))
+        self.window_seconds = float(os.environ.get("LLM_TTFT_WINDOW_SECONDS", "300"))
+        self.failure_threshold = int(os.environ.get("LLM_ENDPOINT_FAILURE_THRESHOLD", "3"))
+        self.cooldown_seconds = float(os.environ.get("LLM_ENDPOINT_COOLDOWN_SECONDS", "30"))
+        self.secondaries = _configured_secondaries() if secondaries is None else secondaries
+
+        # (endpoint, model) -> (monotonic time, TTFT ms), oldest first
+        self._ttft: Dict[Tuple[str, str], Deque[Tuple[float, float]]] = defaultdict(
+            lambda: deque(maxlen=200))
+        self._consecutive_failures: Dict[str, int] = defaultdict(int)
+        self._sidelined_until: Dict[str, float] = {}
+        self.stats = {
+            "requests": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "failovers": 0,
+            "errors": 0
+        }
+
+    def _recent_ttft(self, endpoint_name: str, model: str) -> List[float]:
+        samples = self._ttft[(endpoint_name, model)]
+        oldest = time.monotonic() - self.window_seconds
+        while samples and samples[0][0] < oldest:
+            samples.popleft()
+        return sorted(ttft_ms for _, ttft_ms in samples)
+
+    def _record_ttft(self, endpoint_name: str, model: str, ttft_ms: float):
+        self._ttft[(endpoint_name, model)].append((time.monotonic(), ttft_ms))
+
+    def _rank(self, endpoints: List[LLMEndpoint], model: str) -> List[LLMEndpoint]:
+        """Healthy endpoints by recent median TTFT; unmeasured ones keep their configured order"""
+        now = time.monotonic()
+        healthy = [
+            endpoint for endpoint in endpoints
+            if self._sidelined_until.get(endpoint.name, 0.0) <= now
+        ]
+
+        def median_ttft(endpoint: LLMEndpoint) -> float:
+            recent = self._recent_ttft(endpoint.name, model)
+            return _percentile(recent, 0.5) if len(recent) >= MIN_TTFT_SAMPLES else float("inf")
+
+        # sorted() is stable, so ties (including "not measured") keep the configured order
+        return sorted(healthy or endpoints, key=median_ttft)
+
+    def _hedge_delay_seconds(self, endpoint: LLMEndpoint, model: str) -> float:
+        recent = self._recent_ttft(endpoint.name, model)
+        if len(recent) < MIN_TTFT_SAMPLES:
+            return self.default_hedge_delay_ms / 1000
+        return min(max(_percentile(recent, 0.95), self.min_hedge_delay_ms),
+                   self.max_hedge_delay_ms) / 1000
+
+    def _record_failure(self, endpoint: LLMEndpoint, error: BaseException):
+        self.stats["errors"] += 1
+        self._consecutive_failures[endpoint.name] += 1
+        logger.warning(f"⚠️ LLM endpoint '{endpoint.name}' failed: {error}")
+        if self._consecutive_failures[endpoint.name] >= self.failure_threshold:
+            self._sidelined_until[endpoint.name] = time.monotonic() + self.cooldown_seconds
+            self._consecutive_failures[endpoint.name] = 0
+            logger.warning(
+                f"🚧 LLM endpoint '{endpoint.name}' sidelined for {self.cooldown_seconds:.0f}s after {self.failure_threshold} failures"
+            )
+
+    @staticmethod
+    async def _open(endpoint: LLMEndpoint, chat_parameters: Dict[str, Any], model: str) -> _OpenedStream:
+        """Start a stream and read up to its first token"""
+        started = time.monotonic()
+        stream = await endpoint.client.chat.completions.create(
+            **{**chat_parameters, "model": endpoint.model_for(model)})
+        chunks = stream.__aiter__()
+        buffered = []
+        try:
+            while not buffered or not _is_first_token(buffered[-1]):
+                buffered.append(await chunks.__anext__())
+        except StopAsyncIteration:
+            pass
+        except BaseException:
+            # Includes cancellation of a hedge loser: release the HTTP connection
+            await stream.close()
+            raise
+        return _OpenedStream(endpoint, stream, chunks, buffered,
+                             (time.monotonic() - started) * 1000)
+
+    @staticmethod
+    async def _relay(opened: _OpenedStream) -> AsyncGenerator[Any, None]:
+        for chunk in opened.buffered:
+            yield chunk
+        async for chunk in opened.chunks:
+            yield chunk
+
+    async def create_stream(self, chat_parameters: Dict[str, Any],
+                            primary: LLMEndpoint) -> AsyncGenerator[Any, None]:
+        """Drop-in for chat.completions.create(stream=True) across primary and secondaries"""
+        model = chat_parameters["model"]
+        remaining = self._rank([primary, *self.secondaries], model)
+        leader = remaining[0]
+        self.stats["requests"] += 1
+        started = time.monotonic()
+        # task -> (endpoint, launch time)
+        pending: Dict["asyncio.Task[_OpenedStream]", Tuple[LLMEndpoint, float]] = {}
+        hedged = False
+        winner: Optional[_OpenedStream] = None
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            endpoint = remaining.pop(0)
+            task = asyncio.create_task(self._open(endpoint, chat_parameters, model))
+            pending[task] = (endpoint, time.monotonic())
+
+        launch()
+        try:
+            while pending and winner is None:
+                timeout = None
+                if self.hedge_enabled and remaining and not hedged:
+                    timeout = max(0.0, self._hedge_delay_seconds(leader, model)
+                                  - (time.monotonic() - started))
+                done, _ = await asyncio.wait(set(pending), timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    self.stats["hedged"] += 1
+                    logger.info(
+                        f"🔀 No first token from '{leader.name}' after {(time.monotonic() - started) * 1000:.0f}ms, hedging to '{remaining[0].name}'"
+                    )
+                    launch()
+                    continue
+                for task in done:
+                    endpoint, _ = pending.pop(task)
+                    try:
+                        opened = task.result()
+                    except Exception as e:
+                        last_error = e
+                        self._record_failure(endpoint, e)
+                        if remaining:
+                            self.stats["failovers"] += 1
+                            launch()
+                        continue
+                    self._consecutive_failures[endpoint.name] = 0
+                    self._record_ttft(endpoint.name, model, opened.ttft_ms)
+                    if winner is None:
+                        winner = opened
+                    else:
+                        await opened.stream.close()
+        finally:
+            now = time.monotonic()
+            for task, (endpoint, launched) in pending.items():
+                task.cancel()
+                # A cancelled loser's elapsed time is only a lower bound on its TTFT -
+                # record it as no faster than the winner so a lagging endpoint can't
+                # look quicker than the one that beat it
+                if winner is not None:
+                    self._record_ttft(endpoint.name, model,
+                                      max((now - launched) * 1000, winner.ttft_ms))
+
+        if winner is None:
+            raise last_error or RuntimeError("No LLM endpoint available")
+        if winner.endpoint is not leader:
+            if hedged:
+                self.stats["hedge_wins"] += 1
+            logger.info(
+                f"⚡ LLM stream served by '{winner.endpoint.name}' (TTFT {winner.ttft_ms:.0f}ms)")
+        return self._relay(winner)
+
+    def get_stats(self) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint_name, model in list(self._ttft):
+            recent = self._recent_ttft(endpoint_name, model)
+            if recent:
+                endpoints[f"{endpoint_name}/{model}"] = {
+                    "samples": len(recent),
+                    "p50_ttft_ms": round(_percentile(recent, 0.5), 1),
+                    "p95_ttft_ms": round(_percentile(recent, 0.95), 1)
+                }
+        now = time.monotonic()
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "hedge_enabled": self.hedge_enabled,
+            "secondaries": [endpoint.name for endpoint in self.secondaries],
+            "sidelined": [
+                name for name, until in self._sidelined_until.items() if until > now
+            ],
+            "endpoints": endpoints
+        }
+
+
+# Global instance
+llm_router = LLMRouter()
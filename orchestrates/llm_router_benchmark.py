@@ -0,0 +1,112 @@
+"""
+LLM Router Hedging Benchmark
+
+Runs two fake streaming LLM servers in-process - a primary with a slow tail and
+a steady secondary - and compares time-to-first-token for the primary alone
+against the router with hedging, then checks failover with an erroring primary.
+
+Usage: python llm_router_benchmark.py --requests 200
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+import uvicorn
+from openai import AsyncOpenAI
+
+from fake_llm_server import LatencyProfile, create_app
+from llm_router import LLMEndpoint, LLMRouter, _is_first_token
+
+PRIMARY_PORT = 8911
+SECONDARY_PORT = 8912
+CHAT_PARAMETERS = {
+    "model": "gpt-4o-mini",
+    "messages": [{"role": "user", "content": "How much does it cost?"}],
+    "stream": True
+}
+
+
+async def _serve(profile: LatencyProfile, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(create_app(profile), port=port, log_level="warning"))
+    asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server
+
+
+def _client(port: int) -> AsyncOpenAI:
+    return AsyncOpenAI(base_url=f"http://127.0.0.1:{port}/v1", api_key="unused", max_retries=0)
+
+
+async def _ttft_direct(client: AsyncOpenAI) -> float:
+    started = time.monotonic()
+    stream = await client.chat.completions.create(**CHAT_PARAMETERS)
+    ttft = None
+    async for chunk in stream:
+        if ttft is None and _is_first_token(chunk):
+            ttft = (time.monotonic() - started) * 1000
+    return ttft
+
+
+async def _ttft_routed(router: LLMRouter, primary: LLMEndpoint) -> float:
+    started = time.monotonic()
+    stream = await router.create_stream(CHAT_PARAMETERS, primary)
+    ttft = None
+    async for chunk in stream:
+        if ttft is None and _is_first_token(chunk):
+            ttft = (time.monotonic() - started) * 1000
+    return ttft
+
+
+def _summary(label: str, ttfts: List[float]):
+    ordered = sorted(ttfts)
+    percentile = lambda fraction: ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+    print(f"{label:>10} {percentile(0.5):>10.0f} {percentile(0.95):>10.0f} "
+          f"{percentile(0.99):>10.0f} {ordered[-1]:>10.0f}")
+
+
+async def run(args):
+    primary_profile = LatencyProfile(ttft_ms=args.primary_ttft_ms,
+                                     slow_rate=args.primary_slow_rate,
+                                     slow_ttft_ms=args.primary_slow_ttft_ms)
+    await _serve(primary_profile, PRIMARY_PORT)
+    await _serve(LatencyProfile(ttft_ms=args.secondary_ttft_ms), SECONDARY_PORT)
+
+    primary_client = _client(PRIMARY_PORT)
+    primary = LLMEndpoint("primary", primary_client)
+    router = LLMRouter(secondaries=[LLMEndpoint("secondary", _client(SECONDARY_PORT))])
+
+    direct = [await _ttft_direct(primary_client) for _ in range(args.requests)]
+    routed = [await _ttft_routed(router, primary) for _ in range(args.requests)]
+
+    print(f"{'path':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    _summary("primary", direct)
+    _summary("hedged", routed)
+    stats = router.get_stats()
+    print(f"hedged {stats['hedged']}/{stats['requests']} requests, "
+          f"{stats['hedge_wins']} won by the secondary")
+
+    # Failover: every primary request errors
+    primary_profile.error_rate = 1.0
+    failover_router = LLMRouter(secondaries=[LLMEndpoint("secondary", _client(SECONDARY_PORT))])
+    failover = [await _ttft_routed(failover_router, primary) for _ in range(20)]
+    stats = failover_router.get_stats()
+    assert all(ttft is not None for ttft in failover), "Failover lost a response"
+    print(f"✅ failover: 20/20 answered, {stats['failovers']} failovers, sidelined {stats['sidelined']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--primary-ttft-ms", type=float, default=250.0)
+    parser.add_argument("--primary-slow-rate", type=float, default=0.04)
+    parser.add_argument("--primary-slow-ttft-ms", type=float, default=3000.0)
+    parser.add_argument("--secondary-ttft-ms", type=float, default=350.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -24,13 +24,15 @@ from vocode.streaming.action.default_factory import DefaultActionFactory
 from vocode.streaming.agent.chat_gpt_agent import ChatGPTAgent
 from vocode.streaming.agent.abstract_factory import AbstractAgentFactory
 from ssml_agent_wrapper import SSMLChatGPTAgent
-from custom_vocode_wrappers import CustomSSMLChatGPTAgentWithRAG, CustomVectorDBFactory
+from custom_vocode_wrappers import CustomSSMLChatGPTAgentWithRAG, CustomVectorDBFactory, SemanticCachePineconeConfig
 
 from vocode.streaming.models.message import BaseMessage, SSMLMessage, SilenceMessage
 from vocode.streaming.agent.base_agent import RespondAgent
 from vocode.streaming.models.telephony import TwilioConfig
 from vocode.streaming.models.transcriber import DeepgramTranscriberConfig, TimeEndpointingConfig, PunctuationEndpointingConfig
 from vocode.streaming.telephony.conversation.outbound_call import OutboundCall
+from vocode.streaming.utils import create_conversation_id
+from twilio.request_validator import RequestValidator
 from vocode.streaming.telephony.server.base import TelephonyServer
 from vocode.streaming.models.synthesizer import ElevenLabsSynthesizerConfig, StreamElementsSynthesizerConfig, RimeSynthesizerConfig
 from memory_config import config_manager
@@ -42,7 +44,20 @@ from unified_cost_tracker import unified_cost_tracker as usage_tracker
 from vocode_usage_hook import vocode_usage_hook
 from error_handlers import JSONErrorHandlingMiddleware
 from credential_validator import validator
-from twilio_cost_fetcher import TwilioCostFetcher, twilio_cost_fetcher
+from credential_health import credential_health_registry
+from campaign_templates import CompiledCallConfig, PromptTemplate, campaign_templates, prompt_placeholder
+from dial_scheduler import DialBatch, DialScheduler, TERMINAL_CALL_STATUSES
+from admission_control import CapacityExceeded, admission_controller
+from cluster_state import NODE_BASE_URL, NODE_ID, cluster_state
+from config_cache import config_cache
+from retrieval_cache import retrieval_cache
+from semantic_answer_cache import semantic_answer_cache
+from tts_phrase_cache import tts_phrase_cache
+from initial_message_prerender import PrerenderingSynthesizerFactory, initial_message_prerenderer
+from adaptive_endpointing import AdaptiveEndpointingConfig, AdaptiveTranscriberFactory, endpointing_stats
+from llm_router import llm_router
+from media_codec import install_twilio_media_fast_path
+from twilio_cost_fetcher import twilio_client_registry
 from vocode.streaming.action.end_conversation import EndConversation
 from vocode.streaming.action.transfer_call import TwilioTransferCall
 from language_config_wrapper import LanguageConfig
@@ -56,8 +71,8 @@ from sentry_sdk import start_transaction, start_span
 from vocode import sentry_transaction
 
 import time
+import uuid
 
-twilio_cost_fetcher = TwilioCostFetcher()
 # Temporarily disabled Sentry SDK initialization to fix SpanRecorder compatibility issue
 if os.getenv("SENTRY_DSN"):
     try:
@@ -408,17 +423,25 @@ class CustomAgentFactory(AbstractAgentFactory):
             return default_factory.create_agent(agent_config)
 
 
-# Create custom agent factory and use default synthesizer factory
+# Create custom agent factory; synthesizers serve fixed phrases from the TTS phrase cache
+# and play initial messages pre-rendered while the phone was ringing
 custom_agent_factory = CustomAgentFactory()
 
-# TelephonyServer with proper EventsManager integration and default synthesizer factory
+# TelephonyServer with proper EventsManager integration
 telephony_server = TelephonyServer(base_url=BASE_URL,
                                    config_manager=CONFIG_MANAGER,
                                    events_manager=EVENTS_MANAGER,
-                                   agent_factory=custom_agent_factory)
+                                   agent_factory=custom_agent_factory,
+                                   transcriber_factory=AdaptiveTranscriberFactory(),
+                                   synthesizer_factory=PrerenderingSynthesizerFactory())
 app.include_router(telephony_server.get_router())
+install_twilio_media_fast_path()
 
-ACTIVE_CALLS = {}
+# Live registry of conversations served by this process (fed by admission control)
+ACTIVE_CALLS = admission_controller.active_calls
+EVENTS_MANAGER.add_call_ended_listener(admission_controller.call_ended)
+# Unanswered calls never consume their pre-rendered initial message
+EVENTS_MANAGER.add_call_ended_listener(initial_message_prerenderer.call_ended)
 
 
 async def start_dynamic_outbound_call(to_phone: str,
@@ -445,6 +468,11 @@ async def start_dynamic_outbound_call(to_phone: str,
 
         telephony_params["Timeout"] = str(20)
 
+        # Generate the conversation ID up front so Twilio's status callback can carry it
+        conversation_id = create_conversation_id()
+        telephony_params["StatusCallback"] = (
+            f"https://{base_url}/twilio/call_status/{conversation_id}")
+
         # Temporarily disabled Sentry spans
         with start_span(op="outbound.setup"):
             outbound_call = OutboundCall(base_url=base_url,
@@ -452,6 +480,7 @@ async def start_dynamic_outbound_call(to_phone: str,
                                          from_phone=from_phone,
                                          config_manager=CONFIG_MANAGER,
                                          agent_config=agent_config,
+                                         conversation_id=conversation_id,
                                          telephony_config=telephony_config,
                                          synthesizer_config=synthesizer_config,
                                          transcriber_config=transcriber_config,
@@ -462,6 +491,19 @@ async def start_dynamic_outbound_call(to_phone: str,
         call_id = outbound_call.conversation_id
         logger.info(f"Outbound call started with conversation ID: {call_id}")
 
+        # PERFORMANCE OPTIMIZATION: Synthesize the initial message while the phone rings
+        initial_message = agent_config.initial_message
+        initial_message_prerenderer.start(
+            call_id, synthesizer_config,
+            initial_message.text if initial_message else None)
+
+        # Record the Twilio Call SID returned when the call was created so
+        # post-call fetches use a direct lookup instead of searching by phone number
+        EVENTS_MANAGER.store_call_sid(call_id,
+                                      getattr(outbound_call, "telephony_id",
+                                              None),
+                                      source="dial")
+
         return call_id
 
 
@@ -474,11 +516,120 @@ async def health_check():
         content={
             "status": "healthy",
             "service": "orchestrates",
+            "capacity": admission_controller.get_capacity(),
+            "timestamp": datetime.now().isoformat()
+        }
+    )
+
+
+@app.get("/ready")
+@app.head("/ready")
+async def readiness_check():
+    """Readiness probe - 503 while the process has no headroom for new calls."""
+    capacity = admission_controller.get_capacity()
+    return JSONResponse(
+        status_code=200 if capacity["accepting_calls"] else 503,
+        content={
+            "status": "ready" if capacity["accepting_calls"] else "saturated",
+            "capacity": capacity,
             "timestamp": datetime.now().isoformat()
         }
     )
 
 
+@app.on_event("startup")
+async def start_admission_control():
+    """Start sampling event-loop lag and loop-thread CPU for admission decisions."""
+    admission_controller.start()
+    if cluster_state:
+        await cluster_state.start(
+            post_call_handler=EVENTS_MANAGER.run_post_call_job,
+            call_ended_handler=EVENTS_MANAGER.notify_call_ended_locally)
+
+
+@app.on_event("shutdown")
+async def close_twilio_clients():
+    """Close pooled Twilio REST sessions and validation clients on shutdown."""
+    await admission_controller.stop()
+    await dial_scheduler.stop()
+    if cluster_state:
+        await cluster_state.stop()
+    await twilio_client_registry.close_all()
+    await credential_health_registry.stop()
+    await validator.close()
+    retrieval_cache.shutdown()
+    if hasattr(CONFIG_MANAGER, "close"):
+        await CONFIG_MANAGER.close()
+
+
+@app.get("/cluster/status")
+async def cluster_status():
+    """This node's identity plus cluster membership and post-call queue depth."""
+    if not cluster_state:
+        return {"cluster_mode": False, "node_id": NODE_ID}
+    return {"cluster_mode": True, **await cluster_state.get_status()}
+
+
+@app.get("/cluster/calls/{conversation_id}")
+async def cluster_call_state(conversation_id: str):
+    """Shared state of a call as seen from this node (credentials redacted)."""
+    if not cluster_state:
+        return JSONResponse(status_code=404,
+                            content={
+                                "status": "error",
+                                "message": "Cluster mode is disabled"
+                            })
+    state = await cluster_state.load(conversation_id)
+    if "call_data" in state:
+        state["call_data"] = {
+            **state["call_data"], "twilio_auth_token": "***"
+        }
+    return {"node_id": NODE_ID, "conversation_id": conversation_id, "state": state}
+
+
+@app.post("/twilio/call_status/{conversation_id}")
+async def twilio_call_status(conversation_id: str, request: Request):
+    """Twilio status callback - records the Call SID for the conversation"""
+    form = await request.form()
+    call_sid = form.get("CallSid")
+    call_status = form.get("CallStatus")
+    logger.info(
+        f"📞 Twilio status callback for {conversation_id}: sid={call_sid}, status={call_status}"
+    )
+
+    # Only calls this process started (ignores late callbacks after cleanup)
+    call_data = EVENTS_MANAGER.call_phone_numbers.get(conversation_id)
+    if not call_data:
+        logger.warning(
+            f"⚠️ Ignoring status callback for unknown conversation {conversation_id}"
+        )
+        return JSONResponse(status_code=404,
+                            content={"error": "Unknown conversation"})
+
+    # Twilio signs the exact StatusCallback URL, which is always built with https
+    signature_validator = RequestValidator(
+        call_data.get("twilio_auth_token") or "")
+    callback_url = str(request.url.replace(scheme="https"))
+    if not signature_validator.validate(
+            callback_url, dict(form),
+            request.headers.get("X-Twilio-Signature", "")):
+        logger.warning(
+            f"🚫 Rejected status callback for {conversation_id}: invalid Twilio signature"
+        )
+        return JSONResponse(status_code=403,
+                            content={"error": "Invalid signature"})
+
+    EVENTS_MANAGER.store_call_sid(conversation_id,
+                                  call_sid,
+                                  source="status_callback")
+
+    # Calls that were never answered produce no vocode PHONE_CALL_ENDED event
+    if call_status in TERMINAL_CALL_STATUSES:
+        EVENTS_MANAGER.notify_call_ended(conversation_id)
+
+    return JSONResponse(status_code=200, content={"status": "success"})
+
+
 @app.get("/")
 async def root(request: Request):
     env_vars = {
@@ -503,544 +654,969 @@ async def root(request: Request):
     })
 
 
-@app.post("/start_outbound_call")
-async def api_start_outbound_call(request: Request):
-    try:
-        #data get
-        data = await request.json()
+# Previous-call context used in the agent prompt when there is no call history
+PREVIOUS_CALL_DEFAULTS = {
+    "es": "Primera llamada - sin historial previo",
+    "fr": "Premier appel - aucun historique précédent",
+    "en": "First call - no previous history"
+}
+
+# Initial message placeholders replaced with the customer's first name
+INITIAL_MESSAGE_PLACEHOLDERS = [
+    "{customer_name}",
+    "{Customer Name}",
+    "{CUSTOMER_NAME}",
+    "[customer_name]",
+    "[Customer Name]",
+    "[CUSTOMER_NAME]",
+    "{{customer_name}}",
+    "{{Customer Name}}",
+    "{{CUSTOMER_NAME}}",
+    "{customer name}",
+    "[customer name]",
+    "{{customer name}}",
+]
+
+
+def _previous_call_context(language: str, previous_call_history):
+    """Previous call summary, or the language's first-call note."""
+    if previous_call_history:
+        return previous_call_history
+    return PREVIOUS_CALL_DEFAULTS.get(language, PREVIOUS_CALL_DEFAULTS["en"])
+
+
+def _build_agent_prompt(language: str, customer_first_name,
+                        base_agent_prompt, previous_call_context,
+                        current_date, current_time):
+    """Build the language-specific agent prompt around the base prompt."""
+    if (language == "es"):
+        agent_prompt = f"""
+            Soy un agente. Sigue estas instrucciones cada vez que hables: - El nombre del cliente es: {customer_first_name} (Usa el primer nombre ocasionalmente durante la conversación, NO en cada oración). Sigue las instrucciones base del agente: {base_agent_prompt}. CONTEXTO DE LLAMADA ANTERIOR: {previous_call_context}. Siempre di algo como: “Sí, recuerdo nuestra última llamada. Usted preguntó sobre ~contexto~ y una reunión en ese día.” FECHA Y HORA ACTUAL: {current_date} a las {current_time}. Para los correos electrónicos, siempre pide que se deletreen letra por letra (por ejemplo: a-b-c arroba x-y-z punto com) y después de que el usuario lo diga, tú también confírmalo letra por letra. Usa “arroba” para '@' y “punto” para '.'. Si el usuario proporciona el correo completo; si solo da el nombre de usuario, infiere el dominio (por ejemplo: gmail.com, yahoo.com, hotmail.com). Si, por ejemplo, el nombre del usuario es Hardik Khandal y dice que su correo es harbikkhandl@gmail.com
+, confírmalo una vez, ya que puede que lo hayas escuchado mal, y es fácil adivinar que su correo es hardikkhandal@gmail.com
+. Los números deben decirse claramente y correctamente. Al programar una cita, DEBES confirmar TODOS estos elementos: DÍA DE LA SEMANA (por ejemplo, “miércoles”), FECHA COMPLETA (por ejemplo, “22 de octubre”), HORA EXACTA (por ejemplo, “1:30 PM”). Repite la cita completa: “Entonces confirmamos para el miércoles 22 de octubre a la 1:30 PM, ¿es correcto?”. No aceptes confirmaciones parciales. Debes escuchar un “sí” o una confirmación clara antes de guardar. Si falta algún elemento, pregunta específicamente: “¿Qué fecha de octubre prefiere para el miércoles?”. Habla los precios numéricamente, nunca con variables o marcadores de posición. Di siempre la moneda en palabras, nunca el símbolo: - Ejemplo: $100 → “100 dólares” - €50 → “50 euros” - Centavos: convierte 0.01 dólares → “1 centavo”. Usa los precios solo del conocimiento disponible. Si te preguntan por precios y no hay información específica, menciona el costo por minuto de las llamadas de Voxsun en EE. UU. y Canadá según la base de conocimiento. Para el mecanismo de respaldo, usa “Permítame verificar los detalles más recientes de precios para usted y le responderé en breve.” Si ocurre una interrupción, pide disculpas y completa tu mensaje anterior. Si el usuario guarda silencio por mucho tiempo, pregunta: “¿Sigue ahí?”. No intentes adivinar, inferir ni proporcionar información fuera de la base de conocimiento. Participa en una conversación inteligente, anticipa el contexto de intercambios anteriores. Usa el historial de llamadas previo para mantener una continuidad natural. Siempre intenta programar una reunión, una llamada de seguimiento o un correo de seguimiento. Mantén el discurso profesional, educado y preciso. Al finalizar la conversación, haz un cierre natural como “Gracias por su tiempo. ¡Que tenga un excelente día!”. Las direcciones de correo deben deletrearse letra por letra; se debe hacer una suposición inteligente si es necesario para el correo. Reconocimiento de correos electrónicos: Al dictar o confirmar direcciones de correo electrónico en español, sigue estas reglas mejoradas: El motor de reconocimiento de voz puede malinterpretar o reescribir direcciones cuando los usuarios las deletrean fonéticamente (por ejemplo, “a, r, r, o, b, a” para @). Para evitar esto, entrena y adapta el reconocimiento de voz para detectar patrones fonéticos específicos de correos electrónicos. Usa siempre el modo de confirmación letra por letra cuando escuches un correo. Ejemplo: “¿Dijo M-A-R-C arroba BoostMyDeal punto com?”. Usa la frase “arroba” para @ y “punto” para . Si el usuario solo proporciona el nombre de usuario, infiere un dominio común (por ejemplo: gmail.com, yahoo.com, hotmail.com). Después de que el usuario deletree el correo, confírmalo nuevamente letra por letra para evitar errores de transcripción. Asegúrate de que la sintaxis del correo sea válida (debe contener “arroba” y “punto”) antes de almacenarlo o usarlo.Después de que el usuario deletree el correo, confírmalo letra por letra para evitar errores de transcripción. Asegúrate de que la sintaxis del correo sea válida (debe contener “arroba” y “punto”) antes de guardarlo o usarlo. Ejemplo (en contexto español): “Por favor, deletree su correo letra por letra, por ejemplo: a-b-c arroba x-y-z punto com.” “Entonces, ¿confirmo que es a-b-c arroba x-y-z punto com?”.
 
-        logger.info("🔐 Validating API credentials...")
-        all_valid, validation_results = await validator.validate_all_credentials(
-            data)
-
-        if not all_valid:
-            logger.error("🚫 Credential validation failed:")
-            for service, message in validation_results.items():
-                if ("invalid" in message.lower()
-                        or "missing" in message.lower()
-                        or "error" in message.lower()
-                        or "failed" in message.lower()
-                        or "timeout" in message.lower()
-                        or "expired" in message.lower()):
-                    logger.error(f"   ❌ {service}: {message}")
-                else:
-                    logger.info(f"   ✅ {service}: {message}")
+            """
 
-            return {
-                "status": "error",
-                "message": "Invalid or missing credentials detected",
-                "validation_details": validation_results
-            }
+    elif (language == "fr"):
+        agent_prompt = f"""
+            Je suis un agent. Suivez ces instructions chaque fois que vous parlez : - Le prénom du client est : {customer_first_name} (Utilisez le prénom occasionnellement pendant la conversation, PAS dans chaque phrase). Suivez les instructions de base de l’agent : {base_agent_prompt}. CONTEXTE D’APPEL PRÉCÉDENT : {previous_call_context}. Dites toujours quelque chose comme : « Oui, je me souviens de notre dernier appel. Vous aviez demandé à propos de ~contexte~ et d’une réunion ce jour-là. » DATE ET HEURE ACTUELLES : {current_date} à {current_time}. Pour les courriels, demandez toujours à ce qu’ils soient épelés lettre par lettre (par exemple : a-b-c arobase x-y-z point com), et après que l’utilisateur l’a dit, confirmez-le vous aussi lettre par lettre. Utilisez « arobase » pour '@' et « point » pour '.'. Si l’utilisateur fournit l’adresse complète ; si seulement le nom d’utilisateur, déduisez le domaine (par exemple : gmail.com, yahoo.com, hotmail.com). Si, par exemple, le nom de l’utilisateur est Hardik Khandal et qu’il dit que son courriel est [harbikkhandl@gmail.com](mailto:harbikkhandl@gmail.com), confirmez-le une fois, car il se peut que vous ayez mal entendu, et il est facile de deviner que son courriel est [hardikkhandal@gmail.com](mailto:hardikkhandal@gmail.com). Les chiffres doivent être prononcés clairement et correctement. Lors de la planification d’un rendez-vous, vous DEVEZ confirmer TOUS ces éléments : JOUR DE LA SEMAINE (par exemple : « mercredi »), DATE COMPLÈTE (par exemple : « 22 octobre »), HEURE EXACTE (par exemple : « 13 h 30 »). Répétez le rendez-vous complet : « Nous confirmons donc pour le mercredi 22 octobre à 13 h 30, est-ce correct ? ». N’acceptez pas de confirmations partielles. Vous devez entendre un « oui » ou une confirmation claire avant d’enregistrer. S’il manque un élément, demandez précisément : « Quelle date d’octobre préférez-vous pour le mercredi ? ». Énoncez les prix numériquement, jamais avec des variables ou des espaces réservés. Dites toujours la devise en toutes lettres, jamais le symbole : - Exemple : $100 → « 100 dollars » - €50 → « 50 euros » - Centimes : convertissez 0,01 dollar → « 1 centime ». Utilisez uniquement les prix provenant de la base de connaissances. Si on vous demande les prix et qu’aucune information spécifique n’est donnée, mentionnez le tarif par minute des appels Voxsun aux États-Unis et au Canada selon la base de connaissances. Pour le mécanisme de secours, dites : « Permettez-moi de vérifier les derniers détails tarifaires pour vous et je vous recontacterai bientôt. » En cas d’interruption, excusez-vous et terminez votre message précédent. Si l’utilisateur reste silencieux trop longtemps, demandez : « Êtes-vous toujours là ? ». N’essayez pas de deviner, d’inférer ni de fournir des informations en dehors de la base de connaissances. Participez à une conversation intelligente, anticipez le contexte à partir des échanges précédents. Utilisez l’historique des appels précédents pour maintenir une continuité naturelle. Essayez toujours de planifier un rendez-vous, un appel de suivi ou un courriel de suivi. Gardez un ton professionnel, poli et précis. À la fin de la conversation, concluez naturellement avec : « Merci pour votre temps. Passez une excellente journée ! ». Les adresses e-mail doivent être épelées lettre par lettre ; une supposition intelligente peut être faite si nécessaire. Reconnaissance des courriels : Lors de la dictée ou de la confirmation d’adresses e-mail en français, suivez ces règles améliorées : Le moteur de reconnaissance vocale peut mal interpréter ou réécrire les adresses lorsque les utilisateurs les épellent phonétiquement (par exemple : « a, r, r, o, b, a » pour @). Pour éviter cela, entraînez et adaptez la reconnaissance vocale afin de détecter les schémas phonétiques spécifiques aux adresses e-mail. Utilisez toujours le mode de confirmation lettre par lettre lorsque vous entendez une adresse e-mail. Exemple : « Avez-vous dit M-A-R-C arobase BoostMyDeal point com ? ». Utilisez le mot « arobase » pour @ et « point » pour . Si l’utilisateur fournit uniquement le nom d’utilisateur, déduisez un domaine courant (par exemple : gmail.com, yahoo.com, hotmail.com). Après que l’utilisateur a épelé l’adresse, confirmez-la à nouveau lettre par lettre pour éviter toute erreur de transcription. Assurez-vous que la syntaxe de l’adresse est valide (elle doit contenir « arobase » et « point ») avant de l’enregistrer ou de l’utiliser. Exemple (en contexte français) : « Veuillez épeler votre adresse e-mail lettre par lettre, par exemple : a-b-c arobase x-y-z point com. » « Donc, je confirme que c’est a-b-c arobase x-y-z point com ? ».
 
-        logger.info("✅ All credentials validated successfully")
-        provider = data.get("provider", "twilio").lower()  # Get provider info
-        to_phone = data.get("to_phone")
-        from_phone = data.get("from_phone")
-        twilio_account_sid = data.get("twilio_account_sid")
-        twilio_auth_token = data.get("twilio_auth_token")
-
-        # Only configure Twilio cost fetcher if provider is twilio
-        if provider == "twilio" and twilio_account_sid and twilio_auth_token:
-            twilio_cost_fetcher.configure_credentials(twilio_account_sid,
-                                                      twilio_auth_token)
-        elif provider == "twilio":
-            logger.warning(f"⚠️ Provider is Twilio but missing credentials")
+            """
+
+    else:
+        agent_prompt = f"""
+            I am an agent . Follow these instructions every time you speak: - Customer's first name is: {customer_first_name} (Use the first name occasionally during conversation, NOT in every sentence) Follow the base agent prompt instructions: {base_agent_prompt} **PREVIOUS CALL CONTEXT:** {previous_call_context}. Always say like this Yes, I remember our last call. You asked about ~context~ and a meeting on this day.” **CURRENT DATE AND TIME:** {current_date} at {current_time}. For email always ask to Spell letter by letter (e.g., a-b-c at the rate x-y-z dot com) and after user speaks ypu too confirm letter by letter. Use "at the rate" for '@' and "dot" for '.'. If user provides full email; if only username, infer domain (e.g., gmail.com, yahoo.com, hotmail.com). If for example users name is hardik khandal and he told email id as harbikkhandl@gmail.com please confirm it once it might be you have heard it wrong it can be easily guess that his email is hardikkhandal@gmail.com Numbers should be spoken clearly and correctly. When scheduling an appointment, MUST confirm ALL these elements:DAY OF WEEK (e.g., "Wednesday")FULL DATE (e.g., "October 22nd") EXACT TIME (e.g., "1:30 PM") Repeat the complete appointment: "So we're confirmed for Wednesday, October 22nd at 1:30 PM, is that correct?" Do NOT accept partial confirmations. You must hear "yes" or clear confirmation before saving.If any element is missing, ask specifically: "Which date in October would you prefer for Wednesday?"Speak prices **numerically**, never in variables or placeholders.Always say the currency in words, never the symbol: - Example: $100 → "100 dollars" - €50 → "50 euros" - Cents: convert 0.01 dollars → "1 cent" - Use pricing only from the provided knowledge base. - If asked about pricing and nothin specific is given then tell the pricing of voxsun calling in USA and Canada per minute from knowledge base. For fallback mechanism use "Let me check the latest pricing details for you and will get back to you" INTERRUPTIONS: If the user interrupts or the call is momentarily cut off (e.g., due to an 'accidental mute' or technical delay), you must apologize immediately: "I apologize, it seems I accidentally muted myself for a moment." Then, quickly repeat the last point you made and wait for the user to resume.If the user is silent for a long time, ask: "Are you still there?" Do not attempt to guess, infer, or provide information outside the knowledge base. Engage in smart conversation, anticipate context from previous exchanges.Use previous call history for natural continuity. Always try to schedule a meeting or follow-up call or follow up mail.Keep speech professional, polite, and accurate."Email addresses should be spelled out letter by letter, smart guessing needs to be done for mail id Email Recognition When dictating or confirming email addresses in Spanish, follow these enhanced rules:The speech recognition engine may misinterpret or rewrite addresses when users spell them phonetically (e.g., “a, r, r, o, b, a” for @).DISQUALIFICATION RULE (Efficiency): If the caller clearly states they are NOT interested (e.g., "I'm not interested in a phone system"), if they admit to wasting time, or if their replies are nonsensical, say ONLY: "Thank you Have a Great day! GoodBye" - this will automatically end the call. DO NOT say anything else before or after this phrase. To prevent this, train and adapt speech recognition to detect email-specific phonetic spelling patterns.Always use letter-by-letter confirmation mode when hearing an email.Example:“Did you say M-A-R-C at the rate BoostMyDeal dot com?” Use the phrase “at the rate” for @ and “dot” for . If the user provides only the username, infer a common domain (e.g., gmail.com, yahoo.com, hotmail.com).After the user spells the email, confirm it back letter by letter to avoid transcription errors.Ensure the email syntax is valid (must contain “at the rate” and “dot”) before storing or using it. **HOW TO END CALLS NATURALLY:** When the conversation has truly reached a natural conclusion (appointment scheduled, user satisfied, all questions answered), end the call by saying exactly: "Thank you Have a Great day! GoodBye" - the call will automatically end after this phrase. ONLY use this goodbye phrase when the conversation is genuinely complete and user seems ready to end. DO NOT use it if the user is still engaged, asking questions, or waiting for information.
+            """
+    return agent_prompt
+
+
+def _personalize_initial_message(agent_initial_message, customer_first_name):
+    """Substitute the customer's first name into the initial message."""
+    # Support multiple placeholder formats: {customer_name}, [Customer Name], {{customer_name}}, etc.
+    if agent_initial_message and customer_first_name:
+        # Replace all variations with customer's FIRST NAME only
+        for placeholder in INITIAL_MESSAGE_PLACEHOLDERS:
+            if placeholder in agent_initial_message:
+                agent_initial_message = agent_initial_message.replace(
+                    placeholder, customer_first_name)
+                logger.info(
+                    f"✅ Replaced '{placeholder}' with first name '{customer_first_name}' in initial message"
+                )
+    return agent_initial_message
+
+
+def _credential_error_response(validation_results):
+    """Log failed credential checks and build the error response."""
+    logger.error("🚫 Credential validation failed:")
+    for service, message in validation_results.items():
+        if ("invalid" in message.lower() or "missing" in message.lower()
+                or "error" in message.lower() or "failed" in message.lower()
+                or "timeout" in message.lower()
+                or "expired" in message.lower()):
+            logger.error(f"   ❌ {service}: {message}")
         else:
-            logger.info(f"ℹ️ Provider is '{provider}', skipping Twilio cost fetcher configuration")
-        agent_initial_message_start = data.get("agent_initial_message")
-        base_agent_prompt = data.get("agent_prompt_preamble")
-        # rag_response = data.get("rag_response")
-        base_url = data.get("base_url")
-        user_speak_first = data.get("user_speak_first")
+            logger.info(f"   ✅ {service}: {message}")
+
+    return {
+        "status": "error",
+        "message": "Invalid or missing credentials detected",
+        "validation_details": validation_results
+    }
+
+
+def _capacity_exceeded_response(error: CapacityExceeded):
+    """429 telling the caller (or load balancer) when to retry."""
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(error.retry_after_seconds)},
+        content={
+            "status": "error",
+            "message": f"Server at capacity: {error.reason}",
+            "retry_after_seconds": error.retry_after_seconds
+        })
+
+
+async def _check_credentials(data):
+    """Check a payload's credentials; returns an error response or None."""
+    # Known credential sets are answered from the health registry; only
+    # unseen sets are validated inline against the provider APIs
+    logger.info("🔐 Validating API credentials...")
+    all_valid, validation_results = await credential_health_registry.check(
+        data)
+    cache_stats = validator.get_cache_stats()
+    logger.info(
+        f"🔐 Credential validation cache hit rate: {cache_stats['hit_rate']:.1%} ({cache_stats['cached_entries']} cached)"
+    )
 
-        customer_name = data.get("contact_name")
+    if not all_valid:
+        return _credential_error_response(validation_results)
 
-        # Extract first name only from full customer name
-        customer_first_name = customer_name.split(
-        )[0] if customer_name else None
+    logger.info("✅ All credentials validated successfully")
+    return None
 
-        primary_language = data.get("language", "en")
 
-        previous_call_history = data.get("previous_call_summary", None)
-        logger.info(f"Previous call history: {previous_call_history}")
-        current_time = data.get("current_time", None)
-        current_date = data.get("current_date", None)
+def _compile_call_config(data) -> CompiledCallConfig:
+    """
+    Build every contact-independent part of an outbound call once.
 
-        if (primary_language == "es"):
-            agent_prompt = f"""
-            Soy un agente. Sigue estas instrucciones cada vez que hables: - El nombre del cliente es: {customer_first_name} (Usa el primer nombre ocasionalmente durante la conversación, NO en cada oración). Sigue las instrucciones base del agente: {base_agent_prompt}. CONTEXTO DE LLAMADA ANTERIOR: {previous_call_history if previous_call_history else "Primera llamada - sin historial previo"}. Siempre di algo como: “Sí, recuerdo nuestra última llamada. Usted preguntó sobre ~contexto~ y una reunión en ese día.” FECHA Y HORA ACTUAL: {current_date} a las {current_time}. Para los correos electrónicos, siempre pide que se deletreen letra por letra (por ejemplo: a-b-c arroba x-y-z punto com) y después de que el usuario lo diga, tú también confírmalo letra por letra. Usa “arroba” para '@' y “punto” para '.'. Si el usuario proporciona el correo completo; si solo da el nombre de usuario, infiere el dominio (por ejemplo: gmail.com, yahoo.com, hotmail.com). Si, por ejemplo, el nombre del usuario es Hardik Khandal y dice que su correo es harbikkhandl@gmail.com
-, confírmalo una vez, ya que puede que lo hayas escuchado mal, y es fácil adivinar que su correo es hardikkhandal@gmail.com
-. Los números deben decirse claramente y correctamente. Al programar una cita, DEBES confirmar TODOS estos elementos: DÍA DE LA SEMANA (por ejemplo, “miércoles”), FECHA COMPLETA (por ejemplo, “22 de octubre”), HORA EXACTA (por ejemplo, “1:30 PM”). Repite la cita completa: “Entonces confirmamos para el miércoles 22 de octubre a la 1:30 PM, ¿es correcto?”. No aceptes confirmaciones parciales. Debes escuchar un “sí” o una confirmación clara antes de guardar. Si falta algún elemento, pregunta específicamente: “¿Qué fecha de octubre prefiere para el miércoles?”. Habla los precios numéricamente, nunca con variables o marcadores de posición. Di siempre la moneda en palabras, nunca el símbolo: - Ejemplo: $100 → “100 dólares” - €50 → “50 euros” - Centavos: convierte 0.01 dólares → “1 centavo”. Usa los precios solo del conocimiento disponible. Si te preguntan por precios y no hay información específica, menciona el costo por minuto de las llamadas de Voxsun en EE. UU. y Canadá según la base de conocimiento. Para el mecanismo de respaldo, usa “Permítame verificar los detalles más recientes de precios para usted y le responderé en breve.” Si ocurre una interrupción, pide disculpas y completa tu mensaje anterior. Si el usuario guarda silencio por mucho tiempo, pregunta: “¿Sigue ahí?”. No intentes adivinar, inferir ni proporcionar información fuera de la base de conocimiento. Participa en una conversación inteligente, anticipa el contexto de intercambios anteriores. Usa el historial de llamadas previo para mantener una continuidad natural. Siempre intenta programar una reunión, una llamada de seguimiento o un correo de seguimiento. Mantén el discurso profesional, educado y preciso. Al finalizar la conversación, haz un cierre natural como “Gracias por su tiempo. ¡Que tenga un excelente día!”. Las direcciones de correo deben deletrearse letra por letra; se debe hacer una suposición inteligente si es necesario para el correo. Reconocimiento de correos electrónicos: Al dictar o confirmar direcciones de correo electrónico en español, sigue estas reglas mejoradas: El motor de reconocimiento de voz puede malinterpretar o reescribir direcciones cuando los usuarios las deletrean fonéticamente (por ejemplo, “a, r, r, o, b, a” para @). Para evitar esto, entrena y adapta el reconocimiento de voz para detectar patrones fonéticos específicos de correos electrónicos. Usa siempre el modo de confirmación letra por letra cuando escuches un correo. Ejemplo: “¿Dijo M-A-R-C arroba BoostMyDeal punto com?”. Usa la frase “arroba” para @ y “punto” para . Si el usuario solo proporciona el nombre de usuario, infiere un dominio común (por ejemplo: gmail.com, yahoo.com, hotmail.com). Después de que el usuario deletree el correo, confírmalo nuevamente letra por letra para evitar errores de transcripción. Asegúrate de que la sintaxis del correo sea válida (debe contener “arroba” y “punto”) antes de almacenarlo o usarlo.Después de que el usuario deletree el correo, confírmalo letra por letra para evitar errores de transcripción. Asegúrate de que la sintaxis del correo sea válida (debe contener “arroba” y “punto”) antes de guardarlo o usarlo. Ejemplo (en contexto español): “Por favor, deletree su correo letra por letra, por ejemplo: a-b-c arroba x-y-z punto com.” “Entonces, ¿confirmo que es a-b-c arroba x-y-z punto com?”.
+    The agent prompt is rendered with contact fields left as placeholders, so
+    per-call work is limited to filling them in and cloning the agent config.
+    """
+    provider = data.get("provider", "twilio").lower()  # Get provider info
+    twilio_account_sid = data.get("twilio_account_sid")
+    twilio_auth_token = data.get("twilio_auth_token")
 
-            """
+    # Only register the account's pooled Twilio client if provider is twilio
+    if provider == "twilio" and twilio_account_sid and twilio_auth_token:
+        twilio_client_registry.get_client(twilio_account_sid,
+                                          twilio_auth_token)
+    elif provider == "twilio":
+        logger.warning(f"⚠️ Provider is Twilio but missing credentials")
+    else:
+        logger.info(f"ℹ️ Provider is '{provider}', skipping Twilio cost fetcher configuration")
+    agent_initial_message_start = data.get("agent_initial_message")
+    base_agent_prompt = data.get("agent_prompt_preamble")
+    # rag_response = data.get("rag_response")
+    user_speak_first = data.get("user_speak_first")
 
-        elif (primary_language == "fr"):
-            agent_prompt = f"""
-            Je suis un agent. Suivez ces instructions chaque fois que vous parlez : - Le prénom du client est : {customer_first_name} (Utilisez le prénom occasionnellement pendant la conversation, PAS dans chaque phrase). Suivez les instructions de base de l’agent : {base_agent_prompt}. CONTEXTE D’APPEL PRÉCÉDENT : {previous_call_history if previous_call_history else "Premier appel - aucun historique précédent"}. Dites toujours quelque chose comme : « Oui, je me souviens de notre dernier appel. Vous aviez demandé à propos de ~contexte~ et d’une réunion ce jour-là. » DATE ET HEURE ACTUELLES : {current_date} à {current_time}. Pour les courriels, demandez toujours à ce qu’ils soient épelés lettre par lettre (par exemple : a-b-c arobase x-y-z point com), et après que l’utilisateur l’a dit, confirmez-le vous aussi lettre par lettre. Utilisez « arobase » pour '@' et « point » pour '.'. Si l’utilisateur fournit l’adresse complète ; si seulement le nom d’utilisateur, déduisez le domaine (par exemple : gmail.com, yahoo.com, hotmail.com). Si, par exemple, le nom de l’utilisateur est Hardik Khandal et qu’il dit que son courriel est [harbikkhandl@gmail.com](mailto:harbikkhandl@gmail.com), confirmez-le une fois, car il se peut que vous ayez mal entendu, et il est facile de deviner que son courriel est [hardikkhandal@gmail.com](mailto:hardikkhandal@gmail.com). Les chiffres doivent être prononcés clairement et correctement. Lors de la planification d’un rendez-vous, vous DEVEZ confirmer TOUS ces éléments : JOUR DE LA SEMAINE (par exemple : « mercredi »), DATE COMPLÈTE (par exemple : « 22 octobre »), HEURE EXACTE (par exemple : « 13 h 30 »). Répétez le rendez-vous complet : « Nous confirmons donc pour le mercredi 22 octobre à 13 h 30, est-ce correct ? ». N’acceptez pas de confirmations partielles. Vous devez entendre un « oui » ou une confirmation claire avant d’enregistrer. S’il manque un élément, demandez précisément : « Quelle date d’octobre préférez-vous pour le mercredi ? ». Énoncez les prix numériquement, jamais avec des variables ou des espaces réservés. Dites toujours la devise en toutes lettres, jamais le symbole : - Exemple : $100 → « 100 dollars » - €50 → « 50 euros » - Centimes : convertissez 0,01 dollar → « 1 centime ». Utilisez uniquement les prix provenant de la base de connaissances. Si on vous demande les prix et qu’aucune information spécifique n’est donnée, mentionnez le tarif par minute des appels Voxsun aux États-Unis et au Canada selon la base de connaissances. Pour le mécanisme de secours, dites : « Permettez-moi de vérifier les derniers détails tarifaires pour vous et je vous recontacterai bientôt. » En cas d’interruption, excusez-vous et terminez votre message précédent. Si l’utilisateur reste silencieux trop longtemps, demandez : « Êtes-vous toujours là ? ». N’essayez pas de deviner, d’inférer ni de fournir des informations en dehors de la base de connaissances. Participez à une conversation intelligente, anticipez le contexte à partir des échanges précédents. Utilisez l’historique des appels précédents pour maintenir une continuité naturelle. Essayez toujours de planifier un rendez-vous, un appel de suivi ou un courriel de suivi. Gardez un ton professionnel, poli et précis. À la fin de la conversation, concluez naturellement avec : « Merci pour votre temps. Passez une excellente journée ! ». Les adresses e-mail doivent être épelées lettre par lettre ; une supposition intelligente peut être faite si nécessaire. Reconnaissance des courriels : Lors de la dictée ou de la confirmation d’adresses e-mail en français, suivez ces règles améliorées : Le moteur de reconnaissance vocale peut mal interpréter ou réécrire les adresses lorsque les utilisateurs les épellent phonétiquement (par exemple : « a, r, r, o, b, a » pour @). Pour éviter cela, entraînez et adaptez la reconnaissance vocale afin de détecter les schémas phonétiques spécifiques aux adresses e-mail. Utilisez toujours le mode de confirmation lettre par lettre lorsque vous entendez une adresse e-mail. Exemple : « Avez-vous dit M-A-R-C arobase BoostMyDeal point com ? ». Utilisez le mot « arobase » pour @ et « point » pour . Si l’utilisateur fournit uniquement le nom d’utilisateur, déduisez un domaine courant (par exemple : gmail.com, yahoo.com, hotmail.com). Après que l’utilisateur a épelé l’adresse, confirmez-la à nouveau lettre par lettre pour éviter toute erreur de transcription. Assurez-vous que la syntaxe de l’adresse est valide (elle doit contenir « arobase » et « point ») avant de l’enregistrer ou de l’utiliser. Exemple (en contexte français) : « Veuillez épeler votre adresse e-mail lettre par lettre, par exemple : a-b-c arobase x-y-z point com. » « Donc, je confirme que c’est a-b-c arobase x-y-z point com ? ».
+    primary_language = data.get("language", "en")
 
-            """
+    # Contact fields stay placeholders until the call is launched
+    agent_prompt = _build_agent_prompt(
+        primary_language, prompt_placeholder("customer_first_name"),
+        base_agent_prompt, prompt_placeholder("previous_call_context"),
+        prompt_placeholder("current_date"), prompt_placeholder("current_time"))
 
-        else:
-            agent_prompt = f"""
-            I am an agent . Follow these instructions every time you speak: - Customer's first name is: {customer_first_name} (Use the first name occasionally during conversation, NOT in every sentence) Follow the base agent prompt instructions: {base_agent_prompt} **PREVIOUS CALL CONTEXT:** {previous_call_history if previous_call_history else "First call - no previous history"}. Always say like this Yes, I remember our last call. You asked about ~context~ and a meeting on this day.” **CURRENT DATE AND TIME:** {current_date} at {current_time}. For email always ask to Spell letter by letter (e.g., a-b-c at the rate x-y-z dot com) and after user speaks ypu too confirm letter by letter. Use "at the rate" for '@' and "dot" for '.'. If user provides full email; if only username, infer domain (e.g., gmail.com, yahoo.com, hotmail.com). If for example users name is hardik khandal and he told email id as harbikkhandl@gmail.com please confirm it once it might be you have heard it wrong it can be easily guess that his email is hardikkhandal@gmail.com Numbers should be spoken clearly and correctly. When scheduling an appointment, MUST confirm ALL these elements:DAY OF WEEK (e.g., "Wednesday")FULL DATE (e.g., "October 22nd") EXACT TIME (e.g., "1:30 PM") Repeat the complete appointment: "So we're confirmed for Wednesday, October 22nd at 1:30 PM, is that correct?" Do NOT accept partial confirmations. You must hear "yes" or clear confirmation before saving.If any element is missing, ask specifically: "Which date in October would you prefer for Wednesday?"Speak prices **numerically**, never in variables or placeholders.Always say the currency in words, never the symbol: - Example: $100 → "100 dollars" - €50 → "50 euros" - Cents: convert 0.01 dollars → "1 cent" - Use pricing only from the provided knowledge base. - If asked about pricing and nothin specific is given then tell the pricing of voxsun calling in USA and Canada per minute from knowledge base. For fallback mechanism use "Let me check the latest pricing details for you and will get back to you" INTERRUPTIONS: If the user interrupts or the call is momentarily cut off (e.g., due to an 'accidental mute' or technical delay), you must apologize immediately: "I apologize, it seems I accidentally muted myself for a moment." Then, quickly repeat the last point you made and wait for the user to resume.If the user is silent for a long time, ask: "Are you still there?" Do not attempt to guess, infer, or provide information outside the knowledge base. Engage in smart conversation, anticipate context from previous exchanges.Use previous call history for natural continuity. Always try to schedule a meeting or follow-up call or follow up mail.Keep speech professional, polite, and accurate."Email addresses should be spelled out letter by letter, smart guessing needs to be done for mail id Email Recognition When dictating or confirming email addresses in Spanish, follow these enhanced rules:The speech recognition engine may misinterpret or rewrite addresses when users spell them phonetically (e.g., “a, r, r, o, b, a” for @).DISQUALIFICATION RULE (Efficiency): If the caller clearly states they are NOT interested (e.g., "I'm not interested in a phone system"), if they admit to wasting time, or if their replies are nonsensical, say ONLY: "Thank you Have a Great day! GoodBye" - this will automatically end the call. DO NOT say anything else before or after this phrase. To prevent this, train and adapt speech recognition to detect email-specific phonetic spelling patterns.Always use letter-by-letter confirmation mode when hearing an email.Example:“Did you say M-A-R-C at the rate BoostMyDeal dot com?” Use the phrase “at the rate” for @ and “dot” for . If the user provides only the username, infer a common domain (e.g., gmail.com, yahoo.com, hotmail.com).After the user spells the email, confirm it back letter by letter to avoid transcription errors.Ensure the email syntax is valid (must contain “at the rate” and “dot”) before storing or using it. **HOW TO END CALLS NATURALLY:** When the conversation has truly reached a natural conclusion (appointment scheduled, user satisfied, all questions answered), end the call by saying exactly: "Thank you Have a Great day! GoodBye" - the call will automatically end after this phrase. ONLY use this goodbye phrase when the conversation is genuinely complete and user seems ready to end. DO NOT use it if the user is still engaged, asking questions, or waiting for information.
-            """
+    # Extract additional agent parameters first
+    agent_temperature = data.get("temperature", 0.7)
 
-        # Variable substitution for initial message
-        # Support multiple placeholder formats: {customer_name}, [Customer Name], {{customer_name}}, etc.
-        agent_initial_message = agent_initial_message_start
-
-        if agent_initial_message and customer_first_name:
-            # Define all possible placeholder variations
-            placeholder_variations = [
-                "{customer_name}",
-                "{Customer Name}",
-                "{CUSTOMER_NAME}",
-                "[customer_name]",
-                "[Customer Name]",
-                "[CUSTOMER_NAME]",
-                "{{customer_name}}",
-                "{{Customer Name}}",
-                "{{CUSTOMER_NAME}}",
-                "{customer name}",
-                "[customer name]",
-                "{{customer name}}",
-            ]
-
-            # Replace all variations with customer's FIRST NAME only
-            for placeholder in placeholder_variations:
-                if placeholder in agent_initial_message:
-                    agent_initial_message = agent_initial_message.replace(
-                        placeholder, customer_first_name)
-                    logger.info(
-                        f"✅ Replaced '{placeholder}' with first name '{customer_first_name}' in initial message"
-                    )
-
-        # Extract additional agent parameters first
-        agent_temperature = data.get("temperature", 0.7)
-
-        agent_speed = data.get("agent_speed", 1.0)
-
-        tts_config = data.get("tts", {})
-        tts_provider = tts_config.get("provider_name", "stream_elements")
-        tts_api_key = tts_config.get("api_key")
-        tts_voice = tts_config.get("voice_id")
-        tts_model = tts_config.get("model_id")
-
-        # Handle Model configuration - direct configuration without environment variables
-        model_config = data.get("model", {})
-        # agent_model_name = model_config.get("gpt-4o-mini")
-
-        agent_model_name = "gpt-4o-mini"
-        openai_api_key = model_config.get("api_key")
-
-        # Use OpenAI key from JSON payload, fallback to environment if not provided
-        openai_key = openai_api_key or os.environ.get("OPENAI_API_KEY")
-
-        if openai_api_key:
-            logger.info("🔑 OpenAI API key configured directly from JSON")
-        elif openai_key:
-            logger.info("🔑 Using OpenAI API key from environment fallback")
-
-        logger.info(f"🤖 Model configuration: {agent_model_name}")
-
-        # Smart TTS model selection: Select fastest model based on language
-        optimized_tts_model = tts_model
-        if tts_provider == "eleven_labs" and not tts_model and primary_language:
-            # Language-specific model selection for optimal speed
-            lang = primary_language.lower()
-            if lang in ["en"]:
-                optimized_tts_model = "eleven_flash_v2"  # Fastest for English
+    agent_speed = data.get("agent_speed", 1.0)
 
-            else:
-                optimized_tts_model = "eleven_multilingual_v2"
-        elif tts_model:
-            logger.info(f"🎛️ Using TTS model from JSON payload: {tts_model}")
+    tts_config = data.get("tts", {})
+    tts_provider = tts_config.get("provider_name", "stream_elements")
+    tts_api_key = tts_config.get("api_key")
+    tts_voice = tts_config.get("voice_id")
+    tts_model = tts_config.get("model_id")
 
-        synth_config = _configure_tts_provider(tts_provider, tts_api_key or "",
-                                               tts_voice or "",
-                                               optimized_tts_model or "",
-                                               primary_language, agent_speed)
+    # Handle Model configuration - direct configuration without environment variables
+    model_config = data.get("model", {})
+    # agent_model_name = model_config.get("gpt-4o-mini")
 
-        stt_config = data.get("stt", {})
-        deepgram_api_key = stt_config.get("api_key")
+    agent_model_name = "gpt-4o-mini"
+    openai_api_key = model_config.get("api_key")
 
-        user_tags = data.get("user_tags", [])
-        system_tags = data.get("system_tags", [])
+    # Use OpenAI key from JSON payload, fallback to environment if not provided
+    openai_key = openai_api_key or os.environ.get("OPENAI_API_KEY")
 
-        # Use Deepgram key from JSON payload, fallback to environment if not provided
-        deepgram_key = deepgram_api_key or os.environ.get("DEEPGRAM_API_KEY")
+    if openai_api_key:
+        logger.info("🔑 OpenAI API key configured directly from JSON")
+    elif openai_key:
+        logger.info("🔑 Using OpenAI API key from environment fallback")
 
-        if deepgram_api_key:
-            logger.info("✅ Deepgram API key configured directly from JSON")
-        else:
-            logger.info("✅ Using Deepgram API key from environment fallback")
-
-        # Configure transcriber with language-specific endpoint detection
-        if primary_language == "en":
-            # English: Use time-based endpoint detection with longer pause tolerance
-            # Increased to 1.5s to prevent interrupting users mid-sentence
-            transcriber_config = DeepgramTranscriberConfig(
-                api_key=deepgram_key,
-                model="nova-2",
-                language=primary_language,
-                sampling_rate=8000,
-                audio_encoding=AudioEncoding.MULAW,
-                chunk_size=1024,
-                endpointing_config=TimeEndpointingConfig(
-                    time_cutoff_seconds=1.5))
-            logger.info(
-                "🎤 Transcriber: English with time-based endpoint detection (1.5s pause tolerance)"
-            )
-        else:
-            # Non-English (French, Spanish, etc.): Use time-based endpoint detection
-            # Increased to 1.5s to prevent interrupting users mid-sentence
-            transcriber_config = DeepgramTranscriberConfig(
-                api_key=deepgram_key,
-                model="nova-2",
-                language=primary_language,
-                sampling_rate=8000,
-                audio_encoding=AudioEncoding.MULAW,
-                chunk_size=1024,
-                endpointing_config=TimeEndpointingConfig(
-                    time_cutoff_seconds=1.5))
-            logger.info(
-                f"🎤 Transcriber: {primary_language} with time-based endpoint detection (1.5s pause tolerance)"
-            )
+    logger.info(f"🤖 Model configuration: {agent_model_name}")
+
+    # Smart TTS model selection: Select fastest model based on language
+    optimized_tts_model = tts_model
+    if tts_provider == "eleven_labs" and not tts_model and primary_language:
+        # Language-specific model selection for optimal speed
+        lang = primary_language.lower()
+        if lang in ["en"]:
+            optimized_tts_model = "eleven_flash_v2"  # Fastest for English
 
-        voicemail_raw = data.get("voicemail", False)
-
-        voicemail_message = data.get(
-            "voicemail_message",
-            "Hi please call us back at your earliest convenience.")
-
-        recording_raw = data.get("recording", True)
-        transfer_message = "I'll transfer you to a human agent right away. Please hold."
-        
-        # Handle provider-specific call initiation
-        if provider == "twilio":
-            # Create TwilioConfig only for Twilio calls
-            account_sid = twilio_account_sid
-            auth_token = twilio_auth_token
-
-            # Configure recording based on JSON payload
-            twilio_config = TwilioConfig(
-                account_sid=account_sid,
-                auth_token=auth_token,
-                record=recording_raw  # Use recording setting from JSON
-            )
-        else:
-            # For non-Twilio providers (e.g., voxsun), set twilio_config to None
-            logger.info(f"ℹ️ Provider is '{provider}', skipping TwilioConfig initialization")
-            twilio_config = None
-
-        # Determine behavior based on voicemail setting
-        if voicemail_raw and voicemail_message:
-            on_no_human_answer = "speak_message_and_hangup"
-            logger.info("📞 Voicemail enabled: Will speak message then hangup")
         else:
-            on_no_human_answer = "hangup_immediately"
-            logger.info(
-                "📞 Voicemail disabled: Will hangup immediately on voicemail detection"
-            )
+            optimized_tts_model = "eleven_multilingual_v2"
+    elif tts_model:
+        logger.info(f"🎛️ Using TTS model from JSON payload: {tts_model}")
 
-        # Extract transfer configuration
-
-        transfer_enabled = data.get("enable_call_transfer", False)
-        transfer_number = data.get("transfer_phone_number", None)
-
-        # Configure language-specific messages using LanguageConfig wrapper
-        lang_config = LanguageConfig.configure_for_language(primary_language)
-
-        enhanced_prompt = _build_enhanced_prompt(agent_prompt, voicemail_raw,
-                                                 voicemail_message or "",
-                                                 transfer_message or "",
-                                                 primary_language)
-
-        # PERFORMANCE OPTIMIZATION: Configure agent actions (simplified for stability)
-        agent_actions = []
-        if transfer_enabled:
-            if transfer_enabled and transfer_number:
-                # Create transfer action with the actual phone number
-                transfer_call_config = TransferCallVocodeActionConfig(
-                    phone_number=transfer_number)
-                agent_actions.append(transfer_call_config)
-
-        # Configure EndConversation action - triggers ONLY on specific goodbye phrase
-        # This allows agent to naturally end calls when conversation is complete
-        agent_actions.append(
-            EndConversationVocodeActionConfig(
-                action_trigger=PhraseBasedActionTrigger(
-                    type="action_trigger_phrase_based",
-                    config=PhraseBasedActionTriggerConfig(phrase_triggers=[
-                        PhraseTrigger(
-                            phrase="Thank you Have a Great day! GoodBye",
-                            conditions=["phrase_condition_type_contains"]),
-                    ]))))
-
-        if (user_speak_first):
-            agent_config_params = {
-                "initial_message":
-                BaseMessage(text=agent_initial_message),
-                "prompt_preamble":
-                enhanced_prompt,
-                "model_name":
-                agent_model_name,
-                "max_tokens":
-                130,
-                "temperature":
-                0.3,
-                # Use temperature from JSON payload
-                "actions":
-                agent_actions if agent_actions else None,
-                # Enable interruption handling for more natural conversation flow
-                "interrupt_sensitivity":
-                "high",  # Balanced interruption sensitivity
-                "allow_agent_to_be_cut_off":
-                True,
-                # "use_backchannels": True,
-                # "backchannel_probability": 0.7,
-                "allowed_idle_time_seconds":
-                15.0,
-                "num_check_human_present_times":
-                2,
-                "end_conversation_on_goodbye":
-                True,
-                "goodbye_phrases":
-                lang_config[
-                    "goodbye_phrases"],  # Language-specific goodbye detection
-                "send_filler_audio":
-                FillerAudioConfig(
-                    silence_threshold_seconds=
-                    0.1,  # Play filler after 0.5s of silence
-                    use_typing_noise=False  # Keyboard typing sounds disabled
-                ),
-                "initial_message_delay":
-                2.0,
-
-                # Check if user is still there
-            }
+    synth_config = _configure_tts_provider(tts_provider, tts_api_key or "",
+                                           tts_voice or "",
+                                           optimized_tts_model or "",
+                                           primary_language, agent_speed)
 
-        else:
-            agent_config_params = {
-                "initial_message":
-                BaseMessage(text=agent_initial_message),
-                "prompt_preamble":
-                enhanced_prompt,
-                "model_name":
-                agent_model_name,
-                "max_tokens":
-                130,
-                "temperature":
-                0.3,
-                "cut_off_response":
-                CutOffResponse(messages=[
-                    # If the agent says any of these EXACT phrases, Vocode will immediately trigger the EndConversation action.
-                    # This is a technical override that guarantees the hangup.
-                    BaseMessage(
-                        text="Thank you for your time, and have a great day!"),
-                    BaseMessage(text="I understand. Thank you for your time!"),
-                    BaseMessage(text="Thank you for your time!"),
-                    BaseMessage(text="Have a great day!")
-                ]),
-                # Use temperature from JSON payload
-                "actions":
-                agent_actions if agent_actions else None,
-                # Enable interruption handling for more natural conversation flow
-                "interrupt_sensitivity":
-                "high",  # Balanced interruption sensitivity
-                "allow_agent_to_be_cut_off":
-                True,
-                # "use_backchannels": True,
-                # "backchannel_probability": 0.7,
-                "allowed_idle_time_seconds":
-                15.0,
-                "num_check_human_present_times":
-                2,
-                "end_conversation_on_goodbye":
-                True,
-                "goodbye_phrases":
-                lang_config[
-                    "goodbye_phrases"],  # Language-specific goodbye detection
-
-                # With this:
-                "send_filler_audio":
-                FillerAudioConfig(
-                    silence_threshold_seconds=
-                    0.1,  # Play filler after 0.5s of silence
-                    use_typing_noise=False  # Keyboard typing sounds disabled
-                ),
-            }
+    stt_config = data.get("stt", {})
+    deepgram_api_key = stt_config.get("api_key")
 
-        # Add OpenAI API key directly to agent configuration if available
-        if openai_key:
-            agent_config_params["api_key"] = openai_key
-
-        # Only configure vector database if all required environment variables are set
-        pinecone_api_key = os.getenv("PINECONE_API_KEY")
-        pinecone_index = os.getenv("PINECONE_INDEX_NAME")
-        pinecone_env = os.getenv("PINECONE_ENVIRONMENT")
-
-        if pinecone_api_key and pinecone_index and pinecone_env:
-            agent_config_params["vector_db_config"] = PineconeConfig(
-                api_key=pinecone_api_key,
-                index=pinecone_index,
-                api_environment=pinecone_env,
-                top_k=3)
-            logger.info("=" * 60)
-            logger.info("📚 VECTOR DATABASE (RAG) ENABLED")
-            logger.info(f"  - Provider: Pinecone")
-            logger.info(f"  - Index: {pinecone_index}")
-            logger.info(f"  - Environment: {pinecone_env}")
-            logger.info(f"  - Top K Results: 3")
-            logger.info(f"  - Agent will ONLY answer from knowledge base")
-            logger.info("=" * 60)
-        else:
-            logger.info(
-                "📚 Vector database disabled - Pinecone environment variables not set"
-            )
-        # Set language in factory BEFORE creating agent for SSML processing
-        custom_agent_factory.set_language(primary_language)
-        logger.info(f"🌍 Language set for SSML processing: {primary_language}")
+    # Use Deepgram key from JSON payload, fallback to environment if not provided
+    deepgram_key = deepgram_api_key or os.environ.get("DEEPGRAM_API_KEY")
 
-        agent_config = ChatGPTAgentConfig(**agent_config_params)
+    if deepgram_api_key:
+        logger.info("✅ Deepgram API key configured directly from JSON")
+    else:
+        logger.info("✅ Using Deepgram API key from environment fallback")
+
+    # PERFORMANCE OPTIMIZATION: Adaptive endpointing commits finished answers early and
+    # waits longer while the caller spells or reads out numbers (per-language word lists);
+    # ADAPTIVE_ENDPOINTING_ENABLED=false restores the fixed 1.5s pause tolerance
+    if os.environ.get("ADAPTIVE_ENDPOINTING_ENABLED", "true").lower() == "true":
+        endpointing_config = AdaptiveEndpointingConfig(time_cutoff_seconds=1.5)
+        endpointing_description = "adaptive endpoint detection (0.4s-2.5s)"
+    else:
+        endpointing_config = TimeEndpointingConfig(time_cutoff_seconds=1.5)
+        endpointing_description = "time-based endpoint detection (1.5s pause tolerance)"
+    transcriber_config = DeepgramTranscriberConfig(
+        api_key=deepgram_key,
+        model="nova-2",
+        language=primary_language,
+        sampling_rate=8000,
+        audio_encoding=AudioEncoding.MULAW,
+        chunk_size=1024,
+        endpointing_config=endpointing_config)
+    logger.info(f"🎤 Transcriber: {primary_language} with {endpointing_description}")
+
+    voicemail_raw = data.get("voicemail", False)
+
+    voicemail_message = data.get(
+        "voicemail_message",
+        "Hi please call us back at your earliest convenience.")
+
+    recording_raw = data.get("recording", True)
+    transfer_message = "I'll transfer you to a human agent right away. Please hold."
+
+    # Handle provider-specific call initiation
+    if provider == "twilio":
+        # Create TwilioConfig only for Twilio calls
+        account_sid = twilio_account_sid
+        auth_token = twilio_auth_token
+
+        # Configure recording based on JSON payload
+        twilio_config = TwilioConfig(
+            account_sid=account_sid,
+            auth_token=auth_token,
+            record=recording_raw  # Use recording setting from JSON
+        )
+    else:
+        # For non-Twilio providers (e.g., voxsun), set twilio_config to None
+        logger.info(f"ℹ️ Provider is '{provider}', skipping TwilioConfig initialization")
+        twilio_config = None
+
+    # Determine behavior based on voicemail setting
+    if voicemail_raw and voicemail_message:
+        on_no_human_answer = "speak_message_and_hangup"
+        logger.info("📞 Voicemail enabled: Will speak message then hangup")
+    else:
+        on_no_human_answer = "hangup_immediately"
+        logger.info(
+            "📞 Voicemail disabled: Will hangup immediately on voicemail detection"
+        )
 
-        # Use provided base_url or fallback to current BASE_URL with default
-        effective_base_url = base_url or BASE_URL or "localhost:3000"
+    # Extract transfer configuration
+
+    transfer_enabled = data.get("enable_call_transfer", False)
+    transfer_number = data.get("transfer_phone_number", None)
+
+    # Configure language-specific messages using LanguageConfig wrapper
+    lang_config = LanguageConfig.configure_for_language(primary_language)
+
+    enhanced_prompt = _build_enhanced_prompt(agent_prompt, voicemail_raw,
+                                             voicemail_message or "",
+                                             transfer_message or "",
+                                             primary_language)
+
+    # PERFORMANCE OPTIMIZATION: Configure agent actions (simplified for stability)
+    agent_actions = []
+    if transfer_enabled:
+        if transfer_enabled and transfer_number:
+            # Create transfer action with the actual phone number
+            transfer_call_config = TransferCallVocodeActionConfig(
+                phone_number=transfer_number)
+            agent_actions.append(transfer_call_config)
+
+    # Configure EndConversation action - triggers ONLY on specific goodbye phrase
+    # This allows agent to naturally end calls when conversation is complete
+    agent_actions.append(
+        EndConversationVocodeActionConfig(
+            action_trigger=PhraseBasedActionTrigger(
+                type="action_trigger_phrase_based",
+                config=PhraseBasedActionTriggerConfig(phrase_triggers=[
+                    PhraseTrigger(
+                        phrase="Thank you Have a Great day! GoodBye",
+                        conditions=["phrase_condition_type_contains"]),
+                ]))))
+
+    if (user_speak_first):
+        agent_config_params = {
+            "initial_message":
+            BaseMessage(text=agent_initial_message_start),
+            "prompt_preamble":
+            enhanced_prompt,
+            "model_name":
+            agent_model_name,
+            "max_tokens":
+            130,
+            "temperature":
+            0.3,
+            # Use temperature from JSON payload
+            "actions":
+            agent_actions if agent_actions else None,
+            # Enable interruption handling for more natural conversation flow
+            "interrupt_sensitivity":
+            "high",  # Balanced interruption sensitivity
+            "allow_agent_to_be_cut_off":
+            True,
+            # "use_backchannels": True,
+            # "backchannel_probability": 0.7,
+            "allowed_idle_time_seconds":
+            15.0,
+            "num_check_human_present_times":
+            2,
+            "end_conversation_on_goodbye":
+            True,
+            "goodbye_phrases":
+            lang_config[
+                "goodbye_phrases"],  # Language-specific goodbye detection
+            "send_filler_audio":
+            FillerAudioConfig(
+                silence_threshold_seconds=
+                0.1,  # Play filler after 0.5s of silence
+                use_typing_noise=False  # Keyboard typing sounds disabled
+            ),
+            "initial_message_delay":
+            2.0,
+
+            # Check if user is still there
+        }
 
-        # Provider-specific call initiation
-        if provider == "twilio":
+    else:
+        agent_config_params = {
+            "initial_message":
+            BaseMessage(text=agent_initial_message_start),
+            "prompt_preamble":
+            enhanced_prompt,
+            "model_name":
+            agent_model_name,
+            "max_tokens":
+            130,
+            "temperature":
+            0.3,
+            "cut_off_response":
+            CutOffResponse(messages=[
+                # If the agent says any of these EXACT phrases, Vocode will immediately trigger the EndConversation action.
+                # This is a technical override that guarantees the hangup.
+                BaseMessage(
+                    text="Thank you for your time, and have a great day!"),
+                BaseMessage(text="I understand. Thank you for your time!"),
+                BaseMessage(text="Thank you for your time!"),
+                BaseMessage(text="Have a great day!")
+            ]),
+            # Use temperature from JSON payload
+            "actions":
+            agent_actions if agent_actions else None,
+            # Enable interruption handling for more natural conversation flow
+            "interrupt_sensitivity":
+            "high",  # Balanced interruption sensitivity
+            "allow_agent_to_be_cut_off":
+            True,
+            # "use_backchannels": True,
+            # "backchannel_probability": 0.7,
+            "allowed_idle_time_seconds":
+            15.0,
+            "num_check_human_present_times":
+            2,
+            "end_conversation_on_goodbye":
+            True,
+            "goodbye_phrases":
+            lang_config[
+                "goodbye_phrases"],  # Language-specific goodbye detection
+
+            # With this:
+            "send_filler_audio":
+            FillerAudioConfig(
+                silence_threshold_seconds=
+                0.1,  # Play filler after 0.5s of silence
+                use_typing_noise=False  # Keyboard typing sounds disabled
+            ),
+        }
+
+    # Add OpenAI API key directly to agent configuration if available
+    if openai_key:
+        agent_config_params["api_key"] = openai_key
+
+    # Only configure vector database if all required environment variables are set
+    pinecone_api_key = os.getenv("PINECONE_API_KEY")
+    pinecone_index = os.getenv("PINECONE_INDEX_NAME")
+    pinecone_env = os.getenv("PINECONE_ENVIRONMENT")
+
+    if pinecone_api_key and pinecone_index and pinecone_env:
+        pinecone_params = {
+            "api_key": pinecone_api_key,
+            "index": pinecone_index,
+            "api_environment": pinecone_env,
+            "top_k": 3
+        }
+        if data.get("semantic_answer_cache"):
+            # Agents with the same base prompt, language and model share cached answers
+            semantic_cache_scope = config_cache.get_agent_config_hash({
+                "agent_prompt_preamble": base_agent_prompt,
+                "language": primary_language,
+                "model": agent_model_name
+            })
+            agent_config_params["vector_db_config"] = SemanticCachePineconeConfig(
+                **pinecone_params,
+                semantic_cache_scope=semantic_cache_scope,
+                semantic_cache_threshold=float(data.get("semantic_cache_threshold", 0.95)),
+                semantic_cache_ttl_seconds=float(data.get("semantic_cache_ttl_seconds", 3600)))
+            logger.info("💡 Semantic answer cache enabled for this agent")
+        else:
+            agent_config_params["vector_db_config"] = PineconeConfig(**pinecone_params)
+        logger.info("=" * 60)
+        logger.info("📚 VECTOR DATABASE (RAG) ENABLED")
+        logger.info(f"  - Provider: Pinecone")
+        logger.info(f"  - Index: {pinecone_index}")
+        logger.info(f"  - Environment: {pinecone_env}")
+        logger.info(f"  - Top K Results: 3")
+        logger.info(f"  - Agent will ONLY answer from knowledge base")
+        logger.info("=" * 60)
+    else:
+        logger.info(
+            "📚 Vector database disabled - Pinecone environment variables not set"
+        )
+
+    agent_config = ChatGPTAgentConfig(**agent_config_params)
+
+    # PERFORMANCE OPTIMIZATION: Lines every call of this campaign speaks verbatim are
+    # synthesized once per voice and replayed from the TTS phrase cache
+    cut_off_response = agent_config_params.get("cut_off_response")
+    cut_off_messages = cut_off_response.messages if cut_off_response else []
+    tts_phrase_cache.register_phrases([
+        agent_initial_message_start,
+        voicemail_message if voicemail_raw else None,
+        transfer_message if transfer_enabled else None,
+        "Thank you Have a Great day! GoodBye",
+        lang_config["goodbye_message"],
+        *lang_config["idle_messages"],
+        *(message.text for message in cut_off_messages),
+    ])
+
+    return CompiledCallConfig(
+        provider=provider,
+        primary_language=primary_language,
+        prompt_template=PromptTemplate(enhanced_prompt),
+        initial_message_template=agent_initial_message_start,
+        agent_config=agent_config,
+        synth_config=synth_config,
+        transcriber_config=transcriber_config,
+        twilio_config=twilio_config,
+        twilio_account_sid=twilio_account_sid,
+        twilio_auth_token=twilio_auth_token,
+        tts_provider=tts_provider,
+        tts_model=tts_model,
+        optimized_tts_model=optimized_tts_model,
+        agent_model_name=agent_model_name,
+        voicemail_enabled=voicemail_raw,
+        voicemail_message=voicemail_message,
+        recording_enabled=recording_raw,
+        on_no_human_answer=on_no_human_answer,
+        transfer_enabled=transfer_enabled,
+        transfer_number=transfer_number,
+        transfer_message=transfer_message,
+        from_phone=data.get("from_phone"),
+        base_url=data.get("base_url"),
+        user_tags=data.get("user_tags", []),
+        system_tags=data.get("system_tags", []),
+        credential_payload=credential_health_registry.validation_payload(data))
+
+
+async def _launch_outbound_call(compiled: CompiledCallConfig, contact):
+    """Dial one contact using a compiled call configuration."""
+    provider = compiled.provider
+    primary_language = compiled.primary_language
+    to_phone = contact.get("to_phone")
+    from_phone = contact.get("from_phone") or compiled.from_phone
+    twilio_account_sid = compiled.twilio_account_sid
+    twilio_auth_token = compiled.twilio_auth_token
+
+    customer_name = contact.get("contact_name")
+
+    # Extract first name only from full customer name
+    customer_first_name = customer_name.split(
+    )[0] if customer_name else None
+
+    previous_call_history = contact.get("previous_call_summary", None)
+    logger.info(f"Previous call history: {previous_call_history}")
+
+    agent_prompt = compiled.prompt_template.render({
+        "customer_first_name": customer_first_name,
+        "previous_call_context": _previous_call_context(
+            primary_language, previous_call_history),
+        "current_date": contact.get("current_date", None),
+        "current_time": contact.get("current_time", None)
+    })
+    agent_initial_message = _personalize_initial_message(
+        compiled.initial_message_template, customer_first_name)
+    # Contacts sharing a first name share the rendered greeting
+    tts_phrase_cache.register_phrases([agent_initial_message])
+
+    # Deep clone: the compiled config (and its nested configs) is shared by every
+    # call of a template
+    agent_config = compiled.agent_config.copy(update={
+        "prompt_preamble": agent_prompt,
+        "initial_message": BaseMessage(text=agent_initial_message)
+    }, deep=True)
+
+    user_tags = contact.get("user_tags", compiled.user_tags)
+    system_tags = contact.get("system_tags", compiled.system_tags)
+
+    # Set language in factory BEFORE creating agent for SSML processing
+    custom_agent_factory.set_language(primary_language)
+    logger.info(f"🌍 Language set for SSML processing: {primary_language}")
+
+    # Use provided base_url or fallback to current BASE_URL with default
+    effective_base_url = compiled.base_url or BASE_URL or "localhost:3000"
+    if cluster_state and NODE_BASE_URL:
+        # Sticky routing: Twilio opens the media stream on the node that dialed
+        effective_base_url = NODE_BASE_URL
+
+    # Provider-specific call initiation
+    if provider == "twilio":
+        # Reserve capacity first - raises CapacityExceeded when saturated
+        admission_controller.admit()
+        try:
             # Start Twilio outbound call
             conversation_id = await start_dynamic_outbound_call(
                 to_phone=to_phone,
                 from_phone=from_phone,
                 base_url=effective_base_url,
-                telephony_config=twilio_config,
+                telephony_config=compiled.twilio_config,
                 agent_config=agent_config,
-                synthesizer_config=synth_config,
-                transcriber_config=transcriber_config,
-                on_no_human_answer=on_no_human_answer,
-                recording_enabled=recording_raw)
+                synthesizer_config=compiled.synth_config,
+                transcriber_config=compiled.transcriber_config,
+                on_no_human_answer=compiled.on_no_human_answer,
+                recording_enabled=compiled.recording_enabled)
+        finally:
+            admission_controller.release_admission()
+        admission_controller.register_call(conversation_id,
+                                           to_phone=to_phone,
+                                           provider=provider)
 
-            logger.info(
-                f"Outbound call started with conversation ID: {conversation_id}")
-        else:
-            # For Voxsun and other non-Twilio providers, generate conversation_id locally
-            # The actual call initiation happens in the dashboard's OutboundWorker via LiveKit SIP
-            import uuid
-            conversation_id = f"voxsun-{to_phone}-{uuid.uuid4().hex[:8]}"
-            logger.info(
-                f"ℹ️ Provider is '{provider}', call initiated via {provider.upper()} SIP (not Twilio)")
-            logger.info(
-                f"Generated conversation ID for {provider}: {conversation_id}")
+        logger.info(
+            f"Outbound call started with conversation ID: {conversation_id}")
+    else:
+        # For Voxsun and other non-Twilio providers, generate conversation_id locally
+        # The actual call initiation happens in the dashboard's OutboundWorker via LiveKit SIP
+        import uuid
+        conversation_id = f"voxsun-{to_phone}-{uuid.uuid4().hex[:8]}"
+        logger.info(
+            f"ℹ️ Provider is '{provider}', call initiated via {provider.upper()} SIP (not Twilio)")
+        logger.info(
+            f"Generated conversation ID for {provider}: {conversation_id}")
 
-        # Store phone numbers and Twilio credentials in webhook system for Call SID lookup
-        try:
+    # Store phone numbers and Twilio credentials in webhook system for Call SID lookup
+    try:
+        logger.info(
+            f"🔍 Attempting to store call data for conversation {conversation_id}"
+        )
+        logger.info(
+            f"📋 EVENTS_MANAGER available: {EVENTS_MANAGER is not None}")
+        logger.info(
+            f"📋 Has call_phone_numbers: {hasattr(EVENTS_MANAGER, 'call_phone_numbers')}"
+        )
+        logger.info(f"📋 to_phone value: {to_phone}")
+
+        if hasattr(EVENTS_MANAGER, 'call_phone_numbers') and to_phone:
+            call_start_time = datetime.now().isoformat()
+            call_data = {
+                "from_phone": from_phone or "",
+                "to_phone": to_phone,
+                "call_start_time": call_start_time,
+                "twilio_account_sid": twilio_account_sid,
+                "twilio_auth_token": twilio_auth_token
+            }
+            EVENTS_MANAGER.store_call_data(conversation_id, call_data)
             logger.info(
-                f"🔍 Attempting to store call data for conversation {conversation_id}"
+                f"✅ Successfully stored call data for conversation {conversation_id}: from={from_phone} to={to_phone}"
             )
             logger.info(
-                f"📋 EVENTS_MANAGER available: {EVENTS_MANAGER is not None}")
+                f"🔑 Stored Twilio credentials for call: SID={twilio_account_sid[:8] if twilio_account_sid else 'None'}..."
+            )
             logger.info(
-                f"📋 Has call_phone_numbers: {hasattr(EVENTS_MANAGER, 'call_phone_numbers')}"
+                f"🗂️ Total stored call data entries: {len(EVENTS_MANAGER.call_phone_numbers)}"
             )
-            logger.info(f"📋 to_phone value: {to_phone}")
-
-            if hasattr(EVENTS_MANAGER, 'call_phone_numbers') and to_phone:
-                call_start_time = datetime.now().isoformat()
-                call_data = {
-                    "from_phone": from_phone or "",
-                    "to_phone": to_phone,
-                    "call_start_time": call_start_time,
-                    "twilio_account_sid": twilio_account_sid,
-                    "twilio_auth_token": twilio_auth_token
-                }
-                EVENTS_MANAGER.call_phone_numbers[conversation_id] = call_data
-                logger.info(
-                    f"✅ Successfully stored call data for conversation {conversation_id}: from={from_phone} to={to_phone}"
-                )
-                logger.info(
-                    f"🔑 Stored Twilio credentials for call: SID={twilio_account_sid[:8] if twilio_account_sid else 'None'}..."
-                )
+
+            # Verify storage worked
+            verification = EVENTS_MANAGER.call_phone_numbers.get(
+                conversation_id)
+            if verification:
                 logger.info(
-                    f"🗂️ Total stored call data entries: {len(EVENTS_MANAGER.call_phone_numbers)}"
+                    f"✅ Storage verification successful for {conversation_id}"
                 )
-
-                # Verify storage worked
-                verification = EVENTS_MANAGER.call_phone_numbers.get(
-                    conversation_id)
-                if verification:
-                    logger.info(
-                        f"✅ Storage verification successful for {conversation_id}"
-                    )
-                else:
-                    logger.error(
-                        f"❌ Storage verification failed for {conversation_id}")
             else:
                 logger.error(
-                    f"❌ Cannot store call data - EVENTS_MANAGER has call_phone_numbers: {hasattr(EVENTS_MANAGER, 'call_phone_numbers')}, to_phone: {to_phone}"
-                )
-        except Exception as e:
+                    f"❌ Storage verification failed for {conversation_id}")
+        else:
             logger.error(
-                f"❌ Exception storing call data for {conversation_id}: {e}")
-            import traceback
-            logger.error(f"❌ Traceback: {traceback.format_exc()}")
-
-        cost_calculator.start_call_tracking(conversation_id,
-                                            transcription_provider="deepgram",
-                                            synthesis_provider=tts_provider,
-                                            llm_provider="openai")
-
-        # Initialize detailed usage tracking
-        transcription_model = "nova-2"
-        synthesis_model = tts_model
-        llm_model = agent_model_name
-
-        usage_tracker.start_call_tracking(
-            conversation_id,
-            transcription_provider="deepgram",
-            transcription_model=transcription_model,
-            synthesis_provider=tts_provider,
-            synthesis_model=optimized_tts_model or synthesis_model,
-            llm_provider="openai",
-            llm_model=llm_model)
-
-        # Register conversation mapping for real-time usage tracking
-        vocode_usage_hook.register_call(conversation_id, conversation_id)
-
-        logger.info(f"📊 Usage tracking initialized for call {conversation_id}")
-
-        # Store tags in EventsManager for later use during transcript evaluation
-        if user_tags or system_tags:
-            EVENTS_MANAGER.store_call_tags(conversation_id, user_tags,
-                                           system_tags)
-
-        # Store complete voicemail configuration in EventsManager
-        EVENTS_MANAGER.store_voicemail_config(conversation_id, voicemail_raw,
-                                              voicemail_message, recording_raw)
-
-        # Store transfer configuration in EventsManager
-        if transfer_enabled:
-            EVENTS_MANAGER.store_transfer_config(conversation_id,
-                                                 transfer_enabled,
-                                                 transfer_number,
-                                                 transfer_message)
+                f"❌ Cannot store call data - EVENTS_MANAGER has call_phone_numbers: {hasattr(EVENTS_MANAGER, 'call_phone_numbers')}, to_phone: {to_phone}"
+            )
+    except Exception as e:
+        logger.error(
+            f"❌ Exception storing call data for {conversation_id}: {e}")
+        import traceback
+        logger.error(f"❌ Traceback: {traceback.format_exc()}")
+
+    cost_calculator.start_call_tracking(conversation_id,
+                                        transcription_provider="deepgram",
+                                        synthesis_provider=compiled.tts_provider,
+                                        llm_provider="openai")
+
+    # Initialize detailed usage tracking
+    transcription_model = "nova-2"
+    synthesis_model = compiled.tts_model
+    llm_model = compiled.agent_model_name
+
+    usage_tracker.start_call_tracking(
+        conversation_id,
+        transcription_provider="deepgram",
+        transcription_model=transcription_model,
+        synthesis_provider=compiled.tts_provider,
+        synthesis_model=compiled.optimized_tts_model or synthesis_model,
+        llm_provider="openai",
+        llm_model=llm_model)
+    # Lets another cluster node track usage if the media stream lands there
+    EVENTS_MANAGER.replicate_call_state(
+        conversation_id,
+        dial_node=NODE_ID,
+        usage_tracking={
+            "transcription_provider": "deepgram",
+            "transcription_model": transcription_model,
+            "synthesis_provider": compiled.tts_provider,
+            "synthesis_model": compiled.optimized_tts_model or synthesis_model,
+            "llm_provider": "openai",
+            "llm_model": llm_model
+        })
+
+    # Register conversation mapping for real-time usage tracking
+    vocode_usage_hook.register_call(conversation_id, conversation_id)
+
+    logger.info(f"📊 Usage tracking initialized for call {conversation_id}")
+
+    # Store tags in EventsManager for later use during transcript evaluation
+    if user_tags or system_tags:
+        EVENTS_MANAGER.store_call_tags(conversation_id, user_tags,
+                                       system_tags)
+
+    # Store complete voicemail configuration in EventsManager
+    EVENTS_MANAGER.store_voicemail_config(conversation_id,
+                                          compiled.voicemail_enabled,
+                                          compiled.voicemail_message,
+                                          compiled.recording_enabled)
+
+    # Store transfer configuration in EventsManager
+    if compiled.transfer_enabled:
+        EVENTS_MANAGER.store_transfer_config(conversation_id,
+                                             compiled.transfer_enabled,
+                                             compiled.transfer_number,
+                                             compiled.transfer_message)
+
+    return {
+        "status": "success",
+        "message": "Outbound call initiated",
+        "call_id": conversation_id,
+        "to_phone": to_phone,
+        "from_phone": from_phone
+    }
+
+
+def _replicate_dial_job(job):
+    """Cluster mode: publish job progress so any node can answer batch status"""
+    cluster_state.save_batch_later(job.batch_id, **{f"job:{job.index}": job.to_dict()})
+
+
+async def _fetch_dial_call_status(conversation_id: str) -> Optional[str]:
+    """Twilio status of a batch call, for slots whose status callback never came"""
+    call_sid = EVENTS_MANAGER.call_sids.get(conversation_id)
+    client = twilio_client_registry.get_client_for_call(
+        EVENTS_MANAGER.call_phone_numbers.get(conversation_id))
+    if not call_sid or not client:
+        return None
+    return await client.fetch_call_status(call_sid)
+
+
+# PERFORMANCE OPTIMIZATION: Batch calls are paced per Twilio account (CPS token
+# bucket, concurrency caps per account and from_phone) instead of dialed at once
+dial_scheduler = DialScheduler(launch=_launch_outbound_call,
+                               can_dial=admission_controller.has_capacity,
+                               on_job_update=_replicate_dial_job if cluster_state else None,
+                               fetch_call_status=_fetch_dial_call_status)
+EVENTS_MANAGER.add_call_ended_listener(dial_scheduler.call_ended)
+
+
+async def _get_campaign_template(template_id: str) -> Optional[CompiledCallConfig]:
+    """
+    Compiled template for an id. In cluster mode Redis holds every template's
+    payload and version, and this process compiles its own copy on first use or
+    when the template was re-registered or deleted elsewhere.
+    """
+    compiled = campaign_templates.get(template_id)
+    if not cluster_state:
+        return compiled
+    version = await cluster_state.get_template_version(template_id)
+    if version is None:
+        if compiled is not None:
+            campaign_templates.delete(template_id)
+        return None
+    if compiled is not None and campaign_templates.version_of(template_id) == version:
+        return compiled
+    stored = await cluster_state.load_template(template_id)
+    if stored is None:
+        return None
+    version, payload = stored
+    compiled = _compile_call_config(payload)
+    campaign_templates.register(template_id, compiled, version=version)
+    return compiled
+
+
+@app.post("/start_outbound_call")
+async def api_start_outbound_call(request: Request):
+    try:
+        #data get
+        data = await request.json()
+
+        credential_error = await _check_credentials(data)
+        if credential_error:
+            return credential_error
+
+        compiled = _compile_call_config(data)
+        return await _launch_outbound_call(compiled, data)
+
+    except CapacityExceeded as e:
+        return _capacity_exceeded_response(e)
+    except Exception as e:
+        logger.error(f"Error in /start_outbound_call: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"Failed to initiate call: {str(e)}"
+        }
+
+
+@app.post("/campaign_templates")
+async def api_register_campaign_template(request: Request):
+    """Validate and precompile a campaign's agent and provider configuration."""
+    try:
+        data = await request.json()
+
+        credential_error = await _check_credentials(data)
+        if credential_error:
+            return credential_error
+
+        template_id = data.get("template_id") or campaign_templates.template_id_for(data)
+        version = uuid.uuid4().hex
+        campaign_templates.register(template_id, _compile_call_config(data), version=version)
+        if cluster_state:
+            # Shared through Redis so every node can dial from the template
+            await cluster_state.save_template(template_id, data, version)
 
         return {
             "status": "success",
-            "message": "Outbound call initiated",
-            "call_id": conversation_id,
-            "to_phone": to_phone,
-            "from_phone": from_phone
+            "message": "Campaign template registered",
+            "template_id": template_id
         }
 
     except Exception as e:
-        logger.error(f"Error in /start_outbound_call: {str(e)}")
+        logger.error(f"Error in /campaign_templates: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"Failed to register campaign template: {str(e)}"
+        }
+
+
+@app.post("/campaign_templates/{template_id}/start_call")
+async def api_start_template_call(template_id: str, request: Request):
+    """Start an outbound call from a template with only the contact fields."""
+    try:
+        contact = await request.json()
+
+        compiled = await _get_campaign_template(template_id)
+        if compiled is None:
+            return JSONResponse(
+                status_code=404,
+                content={
+                    "status": "error",
+                    "message": f"Campaign template {template_id} not found - register it again"
+                })
+
+        # Answered from the credential health registry without network requests
+        credential_error = await _check_credentials(compiled.credential_payload)
+        if credential_error:
+            return credential_error
+
+        return await _launch_outbound_call(compiled, contact)
+
+    except CapacityExceeded as e:
+        return _capacity_exceeded_response(e)
+    except Exception as e:
+        logger.error(f"Error in /campaign_templates/{template_id}/start_call: {str(e)}")
         return {
             "status": "error",
             "message": f"Failed to initiate call: {str(e)}"
         }
 
 
+@app.delete("/campaign_templates/{template_id}")
+async def api_delete_campaign_template(template_id: str):
+    """Drop a compiled campaign template."""
+    deleted = campaign_templates.delete(template_id)
+    if cluster_state:
+        deleted = await cluster_state.delete_template(template_id) or deleted
+    if not deleted:
+        return JSONResponse(status_code=404,
+                            content={
+                                "status": "error",
+                                "message": f"Campaign template {template_id} not found"
+                            })
+    return {"status": "success", "template_id": template_id}
+
+
+@app.get("/campaign_templates/stats")
+async def api_campaign_template_stats():
+    """Template store statistics (templates, hits, misses, hit rate)."""
+    return campaign_templates.get_stats()
+
+
+@app.get("/rag/stats")
+async def api_rag_stats():
+    """Knowledge-base retrieval cache hit rates and per-turn retrieval latency."""
+    return {
+        **retrieval_cache.get_stats(),
+        "semantic_answers": semantic_answer_cache.get_stats()
+    }
+
+
+@app.get("/llm/router/stats")
+async def api_llm_router_stats():
+    """Rolling time-to-first-token per LLM endpoint/model, hedges and failovers."""
+    return llm_router.get_stats()
+
+
+@app.get("/tts/phrase_cache/stats")
+async def api_tts_phrase_cache_stats():
+    """TTS phrase cache contents, hit rate and synthesis characters saved."""
+    return {
+        **tts_phrase_cache.get_stats(),
+        "cost": cost_calculator.get_synthesis_cache_stats()
+    }
+
+
+@app.get("/tts/initial_message/stats")
+async def api_initial_message_stats():
+    """Initial message pre-render outcomes and answer-to-first-audio latency."""
+    return initial_message_prerenderer.get_stats()
+
+
+@app.get("/transcriber/endpointing/stats")
+async def api_endpointing_stats():
+    """Per-turn endpoint delays by endpoint source, and time saved against the fixed cutoff."""
+    return endpointing_stats.get_stats()
+
+
+@app.delete("/rag/semantic_cache")
+async def api_clear_semantic_cache(index: Optional[str] = None,
+                                   namespace: Optional[str] = None):
+    """Drop cached answers after the knowledge base changed outside this process."""
+    if index:
+        dropped = semantic_answer_cache.invalidate(index, namespace)
+        retrieval_cache.invalidate_namespace(index, namespace)
+    else:
+        dropped = semantic_answer_cache.get_stats()["entries"]
+        semantic_answer_cache.clear()
+    return {"status": "success", "dropped_answers": dropped}
+
+
+@app.post("/start_outbound_calls_batch")
+async def api_start_outbound_calls_batch(request: Request):
+    """Queue contacts sharing one campaign configuration for paced dialing."""
+    try:
+        data = await request.json()
+        contacts = data.get("contacts") or []
+        if not contacts:
+            return {"status": "error", "message": "No contacts provided"}
+
+        # Either a registered campaign template or a full campaign payload
+        template_id = data.get("template_id")
+        if template_id:
+            compiled = await _get_campaign_template(template_id)
+            if compiled is None:
+                return JSONResponse(
+                    status_code=404,
+                    content={
+                        "status": "error",
+                        "message": f"Campaign template {template_id} not found - register it again"
+                    })
+            credential_error = await _check_credentials(
+                compiled.credential_payload)
+        else:
+            compiled = None
+            credential_error = await _check_credentials(data)
+        if credential_error:
+            return credential_error
+
+        # Validated and compiled once for the whole batch
+        compiled = compiled or _compile_call_config(data)
+        batch = dial_scheduler.submit(compiled, contacts)
+        if cluster_state:
+            # Any node can answer the status URL; this node dials the batch. Queued
+            # before any job update, which are written after it in order
+            state = batch.to_state()
+            state["batch"]["node_id"] = NODE_ID
+            cluster_state.save_batch_later(batch.batch_id, **state)
+
+        return {
+            "status": "success",
+            "message": "Outbound batch queued",
+            "batch_id": batch.batch_id,
+            "queued": len(batch.jobs),
+            "status_url": f"/outbound_batches/{batch.batch_id}"
+        }
+
+    except Exception as e:
+        logger.error(f"Error in /start_outbound_calls_batch: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"Failed to queue outbound batch: {str(e)}"
+        }
+
+
+@app.get("/outbound_batches/{batch_id}")
+async def api_outbound_batch_status(batch_id: str, include_calls: bool = True):
+    """Progress of a queued outbound batch."""
+    batch = dial_scheduler.get_batch(batch_id)
+    if batch is None and cluster_state:
+        state = await cluster_state.load_batch(batch_id)
+        if "batch" in state:
+            return {
+                **DialBatch.summary_from_state(state, include_calls=include_calls),
+                "node_id": state["batch"].get("node_id")
+            }
+    if batch is None:
+        return JSONResponse(status_code=404,
+                            content={
+                                "status": "error",
+                                "message": f"Outbound batch {batch_id} not found"
+                            })
+    return {
+        **batch.summary(include_calls=include_calls),
+        "scheduler": dial_scheduler.get_stats()
+    }
+
+
 def initialize_configuration():
     """Initialize server configuration - simplified to use JSON payload -> Environment fallback only."""
     logger.info("🔧 Initializing server configuration...")
@@ -1061,4 +1637,4 @@ if __name__ == "__main__":
     logger.info(
         "⚡ EventsManager integration enabled for automatic webhook forwarding")
 
-    uvicorn.run(app, host="0.0.0.0", port=3000)
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", "3000")))
@@ -0,0 +1,194 @@
+"""
+PERFORMANCE OPTIMIZATION MODULE
+Mu-law codec and Twilio media framing for the telephony audio path.
+
+Twilio streams 8kHz mu-law in 20ms (160 byte) frames, each base64-encoded inside
+its own JSON message, 50 times a second per call. vocode parses every one with
+json.loads, sends each frame to Deepgram as a separate websocket message and
+builds outbound media/mark messages with json.dumps. This module provides:
+- mu-law <-> PCM16 conversion through NumPy lookup tables (bit-exact with
+  audioop, which is deprecated and removed in Python 3.13)
+- extraction of inbound media payloads without building the JSON message
+- a preallocated ring buffer that reassembles frames into larger transcriber
+  frames through memoryviews
+- preallocated silence frames and templated outbound Twilio messages
+"""
+
+import os
+import binascii
+import json
+import re
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Union
+
+import numpy as np
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+MULAW_SILENCE_BYTE = 0xFF
+# Audio per transcriber websocket message; Twilio's 20ms frames are coalesced up
+# to this (each extra 20ms adds at most 20ms of transcription latency)
+TRANSCRIBER_FRAME_MS = int(os.environ.get("TRANSCRIBER_FRAME_MS", "40"))
+# Segment end points of the G.711 mu-law encoder (14-bit magnitudes)
+_ULAW_SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+_ULAW_BIAS = 0x84
+_ULAW_CLIP = 8159
+
+
+def _build_ulaw_to_pcm16() -> np.ndarray:
+    inverted = ~np.arange(256, dtype=np.int32) & 0xFF
+    magnitude = (((inverted & 0x0F) << 3) + _ULAW_BIAS) << ((inverted & 0x70) >> 4)
+    return np.where(inverted & 0x80, _ULAW_BIAS - magnitude, magnitude - _ULAW_BIAS).astype(np.int16)
+
+
+def _build_pcm16_to_ulaw() -> np.ndarray:
+    """Indexed by the sample's raw 16 bits, so int16 audio is looked up as uint16"""
+    samples = np.arange(65536, dtype=np.uint32).astype(np.uint16).view(np.int16).astype(np.int32) >> 2
+    mask = np.where(samples < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(samples), _ULAW_CLIP) + (_ULAW_BIAS >> 2)
+    segment = np.searchsorted(_ULAW_SEGMENT_ENDS, magnitude)
+    encoded = (segment << 4) | ((magnitude >> (segment + 1)) & 0x0F)
+    return np.where(segment >= 8, 0x7F ^ mask, encoded ^ mask).astype(np.uint8)
+
+
+ULAW_TO_PCM16 = _build_ulaw_to_pcm16()
+PCM16_TO_ULAW = _build_pcm16_to_ulaw()
+
+
+def ulaw_to_pcm16(data: BytesLike) -> bytes:
+    """Decode mu-law bytes to little-endian PCM16 (audioop.ulaw2lin(data, 2))"""
+    return ULAW_TO_PCM16[np.frombuffer(data, dtype=np.uint8)].tobytes()
+
+
+def pcm16_to_ulaw(data: BytesLike) -> bytes:
+    """Encode little-endian PCM16 to mu-law (audioop.lin2ulaw(data, 2)); a trailing odd byte is ignored"""
+    view = memoryview(data).cast("B")
+    return PCM16_TO_ULAW[np.frombuffer(view[:len(view) - len(view) % 2], dtype=np.uint16)].tobytes()
+
+
+_silence_frames: Dict[int, bytes] = {}
+
+
+def mulaw_silence(size: int) -> bytes:
+    """Shared silent mu-law frame of the given size"""
+    frame = _silence_frames.get(size)
+    if frame is None:
+        frame = _silence_frames[size] = bytes([MULAW_SILENCE_BYTE]) * size
+    return frame
+
+
+class MediaFrameRingBuffer:
+    """Preallocated ring that reassembles arbitrarily sized audio into fixed-size frames"""
+
+    def __init__(self, frame_bytes: int, capacity_frames: int = 16):
+        self.frame_bytes = frame_bytes
+        self._capacity = frame_bytes * capacity_frames
+        self._view = memoryview(bytearray(self._capacity))
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, data: BytesLike):
+        data = memoryview(data).cast("B")
+        if len(data) > self._capacity:
+            data = data[-self._capacity:]
+        # A consumer that stopped draining loses the oldest audio, not the newest
+        overflow = self._size + len(data) - self._capacity
+        if overflow > 0:
+            self._start = (self._start + overflow) % self._capacity
+            self._size -= overflow
+        end = (self._start + self._size) % self._capacity
+        first = min(len(data), self._capacity - end)
+        self._view[end:end + first] = data[:first]
+        self._view[:len(data) - first] = data[first:]
+        self._size += len(data)
+
+    def _take(self, size: int) -> bytes:
+        end = self._start + size
+        if end <= self._capacity:
+            frame = self._view[self._start:end].tobytes()
+        else:
+            frame = self._view[self._start:].tobytes() + self._view[:end - self._capacity].tobytes()
+        self._start = end % self._capacity
+        self._size -= size
+        return frame
+
+    def frames(self) -> Iterator[bytes]:
+        """Complete frames buffered so far"""
+        while self._size >= self.frame_bytes:
+            yield self._take(self.frame_bytes)
+
+    def flush(self) -> bytes:
+        """Whatever is left, as a short final frame"""
+        return self._take(self._size)
+
+
+# Twilio sends media messages as compact JSON with "event" first; anything else
+# goes through the regular json.loads handler
+_TWILIO_MEDIA_EVENT = re.compile(r'\{\s*"event"\s*:\s*"media"')
+_TWILIO_MEDIA_PAYLOAD = re.compile(r'"payload"\s*:\s*"([A-Za-z0-9+/=]*)"')
+
+
+def twilio_media_payload(message: str) -> Optional[bytes]:
+    """Decoded audio of a Twilio media message, or None for any other message"""
+    if not _TWILIO_MEDIA_EVENT.match(message):
+        return None
+    payload = _TWILIO_MEDIA_PAYLOAD.search(message)
+    if payload is None:
+        return None
+    return binascii.a2b_base64(payload.group(1))
+
+
+@lru_cache(maxsize=4096)
+def _json_string(value: Optional[str]) -> str:
+    return json.dumps(value)
+
+
+def twilio_media_message(stream_sid: str, chunk: BytesLike) -> str:
+    payload = binascii.b2a_base64(chunk, newline=False).decode("ascii")
+    return f'{{"event":"media","streamSid":{_json_string(stream_sid)},"media":{{"payload":"{payload}"}}}}'
+
+
+def twilio_mark_message(stream_sid: str, name: str) -> str:
+    # Mark names are built from hex utterance IDs and chunk indexes
+    return f'{{"event":"mark","streamSid":{_json_string(stream_sid)},"mark":{{"name":"{name}"}}}}'
+
+
+def install_twilio_media_fast_path():
+    """
+    PERFORMANCE OPTIMIZATION: Handle Twilio media frames without per-frame JSON work.
+    Inbound media payloads skip json.loads; outbound media and mark messages are
+    formatted from templates instead of json.dumps. Other messages are unchanged.
+    """
+    if os.environ.get("TWILIO_MEDIA_FAST_PATH", "true").lower() != "true":
+        return
+    from vocode.streaming.output_device.twilio_output_device import TwilioOutputDevice
+    from vocode.streaming.telephony.conversation.twilio_phone_conversation import TwilioPhoneConversation
+
+    if getattr(TwilioOutputDevice, "_media_fast_path_installed", False):
+        return
+    original_handle_ws_message = TwilioPhoneConversation._handle_ws_message
+
+    async def _handle_ws_message(self, message):
+        chunk = twilio_media_payload(message) if message else None
+        if chunk is None:
+            return await original_handle_ws_message(self, message)
+        self.receive_audio(chunk)
+        return None
+
+    def consume_nonblocking(self, chunk: bytes):
+        self.queue.put_nowait(twilio_media_message(self.stream_sid, chunk))
+
+    def send_chunk_finished_mark(self, utterance_id, chunk_idx):
+        self.queue.put_nowait(twilio_mark_message(self.stream_sid, f"chunk-{utterance_id}-{chunk_idx}"))
+
+    def send_utterance_finished_mark(self, utterance_id):
+        self.queue.put_nowait(twilio_mark_message(self.stream_sid, f"utterance-{utterance_id}"))
+
+    TwilioPhoneConversation._handle_ws_message = _handle_ws_message
+    TwilioOutputDevice.consume_nonblocking = consume_nonblocking
+    TwilioOutputDevice.send_chunk_finished_mark = send_chunk_finished_mark
+    TwilioOutputDevice.send_utterance_finished_mark = send_utterance_finished_mark
+    TwilioOutputDevice._media_fast_path_installed = True
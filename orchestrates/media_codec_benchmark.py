@@ -0,0 +1,151 @@
+"""
+Twilio Media Path CPU Benchmark
+
+Replays simulated call audio through the per-frame work of the Twilio media
+path - vocode's (json.loads/json.dumps per message, one transcriber message per
+20ms frame, audioop silence while muted) against media_codec's (payload fast
+path, coalesced transcriber frames, templated outbound messages) - and reports
+CPU per concurrent call. Also checks the NumPy mu-law tables against audioop
+and compares their conversion throughput.
+
+Usage: python media_codec_benchmark.py --call-seconds 600
+"""
+
+import argparse
+import base64
+import json
+import os
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from media_codec import (
+    TRANSCRIBER_FRAME_MS,
+    MediaFrameRingBuffer,
+    mulaw_silence,
+    pcm16_to_ulaw,
+    twilio_mark_message,
+    twilio_media_message,
+    twilio_media_payload,
+    ulaw_to_pcm16,
+)
+
+try:
+    import audioop
+except ImportError:  # Python 3.13+
+    audioop = None
+
+STREAM_SID = "MZ" + "0123456789abcdef" * 2
+TWILIO_FRAME_BYTES = 160
+FRAMES_PER_SECOND = 50
+# vocode's Twilio synthesizer chunk (0.4s) and one mark per chunk
+OUTBOUND_CHUNK_BYTES = 3200
+# The transcriber is muted while the bot speaks about this share of the call
+MUTED_SHARE = 0.4
+
+
+def _inbound_messages(call_seconds: int) -> List[str]:
+    audio = os.urandom(TWILIO_FRAME_BYTES)
+    return [
+        json.dumps({
+            "event": "media",
+            "sequenceNumber": str(index + 2),
+            "media": {
+                "track": "inbound",
+                "chunk": str(index + 1),
+                "timestamp": str(index * 20),
+                "payload": base64.b64encode(audio).decode("utf-8")
+            },
+            "streamSid": STREAM_SID
+        }, separators=(",", ":")) for index in range(call_seconds * FRAMES_PER_SECOND)
+    ]
+
+
+def vocode_media_path(messages: List[str], outbound_chunks: int, sent: list):
+    muted_after = int(len(messages) * (1 - MUTED_SHARE))
+    for index, message in enumerate(messages):
+        data = json.loads(message)
+        if data["event"] == "media":
+            chunk = base64.b64decode(data["media"]["payload"])
+            if index >= muted_after:
+                chunk = audioop.lin2ulaw(b"\0" * len(chunk), 2)
+            sent.append(chunk)
+    audio = os.urandom(OUTBOUND_CHUNK_BYTES)
+    for index in range(outbound_chunks):
+        sent.append(json.dumps({
+            "event": "media",
+            "streamSid": STREAM_SID,
+            "media": {"payload": base64.b64encode(audio).decode("utf-8")}
+        }))
+        sent.append(json.dumps({
+            "event": "mark",
+            "streamSid": STREAM_SID,
+            "mark": {"name": f"chunk-0123456789abcdef-{index}"}
+        }))
+
+
+def codec_media_path(messages: List[str], outbound_chunks: int, sent: list):
+    frames = MediaFrameRingBuffer(8000 * TRANSCRIBER_FRAME_MS // 1000)
+    muted_after = int(len(messages) * (1 - MUTED_SHARE))
+    for index, message in enumerate(messages):
+        chunk = twilio_media_payload(message)
+        frames.write(mulaw_silence(len(chunk)) if index >= muted_after else chunk)
+        for frame in frames.frames():
+            sent.append(frame)
+    audio = os.urandom(OUTBOUND_CHUNK_BYTES)
+    for index in range(outbound_chunks):
+        sent.append(twilio_media_message(STREAM_SID, audio))
+        sent.append(twilio_mark_message(STREAM_SID, f"chunk-0123456789abcdef-{index}"))
+
+
+def _cpu_seconds(fn: Callable[[], None], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.process_time()
+        fn()
+        best = min(best, time.process_time() - started)
+    return best
+
+
+def check_codec():
+    ulaw = bytes(range(256))
+    pcm = np.arange(-32768, 32768, dtype=np.int16).tobytes()
+    assert ulaw_to_pcm16(ulaw) == audioop.ulaw2lin(ulaw, 2), "ulaw_to_pcm16 differs from audioop"
+    assert pcm16_to_ulaw(pcm) == audioop.lin2ulaw(pcm, 2), "pcm16_to_ulaw differs from audioop"
+    print("✅ NumPy mu-law tables match audioop for all 256 codes and 65536 samples")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--call-seconds", type=int, default=600)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    if audioop is None:
+        raise SystemExit("audioop is needed as the reference (Python 3.12 or older)")
+
+    check_codec()
+    messages = _inbound_messages(args.call_seconds)
+    outbound_chunks = int(args.call_seconds * (1 - MUTED_SHARE) * 8000 / OUTBOUND_CHUNK_BYTES)
+
+    for label, path in (("vocode", vocode_media_path), ("media_codec", codec_media_path)):
+        sent: list = []
+        path(messages, outbound_chunks, sent)
+        cpu = _cpu_seconds(lambda: path(messages, outbound_chunks, []), args.repeats)
+        per_call_ms = cpu / args.call_seconds * 1000
+        print(f"{label:>12}: {per_call_ms:.3f}ms CPU per call-second "
+              f"({per_call_ms / 10:.3f}% of a core per concurrent call, "
+              f"{len(sent)} transcriber/Twilio messages)")
+
+    pcm = os.urandom(OUTBOUND_CHUNK_BYTES * 2)
+    ulaw = os.urandom(OUTBOUND_CHUNK_BYTES)
+    repeats = 20000
+    for label, encode, decode in (("audioop", lambda: audioop.lin2ulaw(pcm, 2), lambda: audioop.ulaw2lin(ulaw, 2)),
+                                  ("numpy", lambda: pcm16_to_ulaw(pcm), lambda: ulaw_to_pcm16(ulaw))):
+        encode_us = _cpu_seconds(lambda: [encode() for _ in range(repeats)], 1) / repeats * 1e6
+        decode_us = _cpu_seconds(lambda: [decode() for _ in range(repeats)], 1) / repeats * 1e6
+        print(f"{label:>12}: lin2ulaw {encode_us:.2f}us, ulaw2lin {decode_us:.2f}us per 0.4s chunk")
+
+
+if __name__ == "__main__":
+    main()
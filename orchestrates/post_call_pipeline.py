@@ -0,0 +1,176 @@
+"""
+Post-Call Enrichment Pipeline
+
+Runs post-call enrichment work (Twilio Call SID lookup, recording fetch and upload,
+call cost, tag evaluation, usage metrics) as a small dependency graph of async stages.
+Independent branches run concurrently, every stage has its own timeout, and per-stage
+durations are recorded so they can be reported in the webhook payload.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PipelineStage:
+    """A single async stage in the post-call enrichment graph"""
+    name: str
+    # Receives the values of all completed stages, keyed by stage name
+    func: Callable[[Dict[str, Any]], Awaitable[Any]]
+    depends_on: List[str] = field(default_factory=list)
+    timeout: float = 30.0
+    # Value used when the stage fails, times out or is skipped
+    default: Any = None
+    # Skip the stage when a dependency produced None (e.g. no Call SID found)
+    skip_if_missing: bool = True
+    # Called with the stage value as soon as it is ready (used for partial webhooks)
+    on_complete: Optional[Callable[[Any], Awaitable[None]]] = None
+
+
+@dataclass
+class StageResult:
+    """Outcome and timing of a single pipeline stage"""
+    name: str
+    status: str = "pending"  # ok / timeout / error / skipped
+    started_at_ms: float = 0.0
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for webhook payload"""
+        return {
+            "status": self.status,
+            "started_at_ms": round(self.started_at_ms, 1),
+            "duration_ms": round(self.duration_ms, 1),
+            "error": self.error
+        }
+
+
+class PostCallPipeline:
+    """Executes a DAG of post-call stages, running independent branches concurrently"""
+
+    def __init__(self, call_id: str, stages: List[PipelineStage]):
+        self.call_id = call_id
+        self.stages: Dict[str, PipelineStage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate pipeline stage: {stage.name}")
+            self.stages[stage.name] = stage
+
+        for stage in stages:
+            for dependency in stage.depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(
+                        f"Stage '{stage.name}' depends on unknown stage '{dependency}'"
+                    )
+
+        self._order = self._topological_order()
+        self.values: Dict[str, Any] = {}
+        self.results: Dict[str, StageResult] = {
+            name: StageResult(name=name)
+            for name in self.stages
+        }
+        self._started_at = 0.0
+
+    def _topological_order(self) -> List[str]:
+        """Return stage names in dependency order, rejecting cycles"""
+        order: List[str] = []
+        state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+        def visit(name: str):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Cycle detected at pipeline stage '{name}'")
+            state[name] = 1
+            for dependency in self.stages[name].depends_on:
+                visit(dependency)
+            state[name] = 2
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    async def run(self) -> Dict[str, Any]:
+        """Run all stages and return their values keyed by stage name"""
+        self._started_at = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        # Tasks are created in dependency order so every stage can await its inputs
+        for name in self._order:
+            tasks[name] = asyncio.create_task(self._run_stage(
+                self.stages[name], tasks))
+
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        total_ms = (time.perf_counter() - self._started_at) * 1000
+        logger.info(
+            f"⚡ Post-call pipeline for {self.call_id} completed in {total_ms:.1f}ms: "
+            + ", ".join(f"{name}={result.status}/{result.duration_ms:.0f}ms"
+                        for name, result in self.results.items()))
+        return self.values
+
+    async def _run_stage(self, stage: PipelineStage,
+                         tasks: Dict[str, asyncio.Task]) -> None:
+        result = self.results[stage.name]
+
+        if stage.depends_on:
+            await asyncio.gather(*(tasks[d] for d in stage.depends_on),
+                                 return_exceptions=True)
+
+        result.started_at_ms = (time.perf_counter() - self._started_at) * 1000
+
+        missing = [
+            d for d in stage.depends_on if self.values.get(d) is None
+        ]
+        if missing and stage.skip_if_missing:
+            result.status = "skipped"
+            self.values[stage.name] = stage.default
+            logger.info(
+                f"⏭️ Skipping stage '{stage.name}' for {self.call_id} - missing inputs: {missing}"
+            )
+            return
+
+        start = time.perf_counter()
+        try:
+            value = await asyncio.wait_for(stage.func(self.values),
+                                           timeout=stage.timeout)
+            result.status = "ok"
+        except asyncio.TimeoutError:
+            value = stage.default
+            result.status = "timeout"
+            result.error = f"Timed out after {stage.timeout}s"
+            logger.warning(
+                f"⏰ Stage '{stage.name}' timed out after {stage.timeout}s for {self.call_id}"
+            )
+        except Exception as e:
+            value = stage.default
+            result.status = "error"
+            result.error = str(e)
+            logger.error(
+                f"❌ Stage '{stage.name}' failed for {self.call_id}: {e}")
+        finally:
+            result.duration_ms = (time.perf_counter() - start) * 1000
+
+        self.values[stage.name] = value
+
+        if result.status == "ok" and stage.on_complete:
+            try:
+                await stage.on_complete(value)
+            except Exception as e:
+                logger.error(
+                    f"❌ on_complete handler for stage '{stage.name}' failed: {e}"
+                )
+
+    def stage_timings(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage status and durations for the webhook payload"""
+        return {
+            name: result.to_dict()
+            for name, result in self.results.items()
+        }
@@ -1,39 +1,86 @@
 """
 Recording Uploader
 
-This module downloads Twilio recording files and uploads them to Google Cloud Storage,
-returning the public URL for use in webhooks and transcript completion.
+This module streams Twilio recording files into Google Cloud Storage resumable uploads
+(no temporary files), returning the signed URL for use in webhooks and transcript completion.
 """
 
 import os
 import asyncio
 import aiohttp
-import aiofiles
-import tempfile
+import functools
 import logging
-from typing import Optional, Dict, Any
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing, asynccontextmanager
+from typing import Optional, Dict, Any, AsyncIterator, TYPE_CHECKING
 from datetime import datetime, timedelta
 import json
 from google.cloud import storage
 from google.oauth2 import service_account
 from urllib.parse import urlparse
 
+if TYPE_CHECKING:
+    from twilio_cost_fetcher import TwilioCostFetcher
+
 logger = logging.getLogger(__name__)
 
+# GCS resumable upload chunks must be a multiple of 256 KiB
+UPLOAD_CHUNK_SIZE = 4 * 256 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+CONTENT_TYPES = {
+    '.wav': 'audio/wav',
+    '.mp3': 'audio/mpeg',
+    '.opus': 'audio/ogg',
+    '.flac': 'audio/flac'
+}
+
+# ffmpeg encoder arguments per storage format (telephony audio is 8 kHz speech)
+TRANSCODE_ARGS = {
+    'opus': ['-c:a', 'libopus', '-b:a', '24k', '-application', 'voip', '-f', 'ogg'],
+    'flac': ['-c:a', 'flac', '-compression_level', '8', '-f', 'flac']
+}
+
 
 class RecordingUploader:
-    """Downloads Twilio recordings and uploads them to GCP Storage"""
+    """Streams Twilio recordings into GCP Storage"""
 
     def __init__(self,
                  service_account_path: str = "boostmydeal-dc83797b0605.json",
-                 bucket_name: str = "boostmydeal-transcription"):
+                 bucket_name: str = "boostmydeal-transcription",
+                 max_concurrent_uploads: int = 4,
+                 upload_chunk_size: int = UPLOAD_CHUNK_SIZE,
+                 transcode_format: Optional[str] = None,
+                 bucket: Optional[Any] = None):
         self.service_account_path = service_account_path
         self.bucket_name = bucket_name
         self._storage_client = None
         self._bucket = None
-
-        # Initialize GCP client
-        self._initialize_gcp_client()
+        self.upload_chunk_size = upload_chunk_size
+
+        # PERFORMANCE OPTIMIZATION: Blocking GCS client calls run in a thread pool
+        # and concurrent recording transfers are bounded by a semaphore
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_uploads,
+                                            thread_name_prefix="gcs-upload")
+        self._semaphore = asyncio.Semaphore(max_concurrent_uploads)
+
+        # Optional compressed storage: "opus" or "flac" (RECORDING_TRANSCODE_FORMAT)
+        self.transcode_format = self._resolve_transcode_format(
+            transcode_format or os.environ.get("RECORDING_TRANSCODE_FORMAT", ""))
+        self.transcode_stats = {
+            "files": 0,
+            "failures": 0,
+            "input_bytes": 0,
+            "output_bytes": 0,
+            "transcode_ms": 0.0
+        }
+
+        # Initialize GCP client, unless given a bucket (e.g. fake_object_store.FakeBucket)
+        if bucket is not None:
+            self._bucket = bucket
+        else:
+            self._initialize_gcp_client()
 
     def _initialize_gcp_client(self):
         """Initialize Google Cloud Storage client with service account"""
@@ -56,146 +103,297 @@ class RecordingUploader:
             self._storage_client = None
             self._bucket = None
 
-    async def download_recording(
-            self,
-            recording_url: str,
-            temp_dir: str,
-            twilio_auth: Optional[aiohttp.BasicAuth] = None) -> Optional[str]:
+    def _resolve_transcode_format(self, transcode_format: str) -> Optional[str]:
+        """Validate the configured storage format, disabling transcoding if unusable"""
+        transcode_format = transcode_format.strip().lower()
+        if not transcode_format or transcode_format == "wav":
+            return None
+        if transcode_format not in TRANSCODE_ARGS:
+            logger.warning(
+                f"⚠️ Unsupported recording transcode format '{transcode_format}', storing WAV"
+            )
+            return None
+        if not shutil.which("ffmpeg"):
+            logger.warning(
+                "⚠️ ffmpeg not found - recording transcoding disabled, storing WAV")
+            return None
+        logger.info(f"🗜️ Recordings will be stored as {transcode_format}")
+        return transcode_format
+
+    @asynccontextmanager
+    async def _open_recording(self, recording_url: str,
+                              twilio_auth: Optional[aiohttp.BasicAuth],
+                              twilio_client: Optional["TwilioCostFetcher"]):
+        """Open the Twilio recording download and yield the streaming response"""
+        # PERFORMANCE OPTIMIZATION: Reuse the account's pooled keep-alive session
+        if twilio_client is not None:
+            async with twilio_client.stream(recording_url) as response:
+                yield response
+            return
+
+        # Get Twilio credentials from environment if not provided
+        if not twilio_auth:
+            account_sid = os.environ.get("TWILIO_ACCOUNT_SID")
+            auth_token = os.environ.get("TWILIO_AUTH_TOKEN")
+            if account_sid and auth_token:
+                twilio_auth = aiohttp.BasicAuth(account_sid, auth_token)
+
+        async with aiohttp.ClientSession() as session:
+            async with session.get(recording_url,
+                                   auth=twilio_auth) as response:
+                yield response
+
+    def _build_blob_name(self,
+                         recording_url: str,
+                         call_sid: str,
+                         extension: Optional[str] = None) -> str:
+        """Build a unique GCS object name for a recording"""
+        parsed_url = urlparse(recording_url)
+        recording_name = os.path.basename(parsed_url.path)
+        if not recording_name.endswith(('.wav', '.mp3')):
+            recording_name = f"{recording_name or 'recording'}.wav"
+        if extension:
+            recording_name = f"{os.path.splitext(recording_name)[0]}.{extension}"
+
+        date_prefix = datetime.now().strftime("%Y/%m/%d")
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"recordings/{date_prefix}/{call_sid}_recording_{timestamp}_{recording_name}"
+
+    def _run_blocking(self, func, *args, **kwargs) -> asyncio.Future:
+        """Schedule a blocking GCS client call on the upload thread pool"""
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._executor,
+                                    functools.partial(func, *args, **kwargs))
+
+    async def stream_to_gcp(self, chunks: AsyncIterator[bytes],
+                            blob_name: str) -> int:
         """
-        Download recording file from Twilio URL
+        Pipe a stream of audio bytes into a GCS resumable upload
         
         Args:
-            recording_url: Twilio recording URL
-            temp_dir: Temporary directory to save file
+            chunks: Async iterator over the recording bytes
+            blob_name: Destination object name
             
         Returns:
-            Local file path if successful, None otherwise
+            Number of bytes uploaded
         """
+        content_type = CONTENT_TYPES.get(os.path.splitext(blob_name)[1],
+                                         'audio/wav')
+        blob = self._bucket.blob(blob_name)
+        writer = await self._run_blocking(blob.open,
+                                          "wb",
+                                          content_type=content_type,
+                                          chunk_size=self.upload_chunk_size)
+
+        # At most one chunk is being uploaded while the next one is downloaded
+        buffer = bytearray()
+        pending_write = None
+        total_bytes = 0
         try:
-            # Extract filename from URL or generate one
-            parsed_url = urlparse(recording_url)
-            if parsed_url.path.endswith(('.wav', '.mp3')):
-                filename = f"recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}{parsed_url.path[-4:]}"
-            else:
-                filename = f"recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav"
-            local_file_path = os.path.join(temp_dir, filename)
-
-            logger.info(f"⬇️ Downloading recording from: {recording_url}")
-
-            # Get Twilio credentials from environment if not provided
-            if not twilio_auth:
-                account_sid = os.environ.get("TWILIO_ACCOUNT_SID")
-                auth_token = os.environ.get("TWILIO_AUTH_TOKEN")
-                if account_sid and auth_token:
-                    twilio_auth = aiohttp.BasicAuth(account_sid, auth_token)
-
-            async with aiohttp.ClientSession() as session:
-                async with session.get(recording_url,
-                                       auth=twilio_auth) as response:
-                    if response.status == 200:
-                        async with aiofiles.open(local_file_path,
-                                                 'wb') as file:
-                            async for chunk in response.content.iter_chunked(
-                                    8192):
-                                await file.write(chunk)
-
-                        logger.info(
-                            f"✅ Downloaded recording to: {local_file_path}")
-                        return local_file_path
-                    else:
-                        logger.error(
-                            f"❌ Failed to download recording: HTTP {response.status}"
-                        )
-                        return None
-
+            async for data in chunks:
+                buffer.extend(data)
+                if len(buffer) >= self.upload_chunk_size:
+                    if pending_write:
+                        await pending_write
+                    chunk = bytes(buffer)
+                    buffer.clear()
+                    total_bytes += len(chunk)
+                    pending_write = self._run_blocking(writer.write, chunk)
+
+            if pending_write:
+                await pending_write
+            if buffer:
+                total_bytes += len(buffer)
+                await self._run_blocking(writer.write, bytes(buffer))
+
+            # Closing the writer finalizes the resumable upload
+            await self._run_blocking(writer.close)
+        except BaseException:
+            # Cancel the resumable session so no partial object or open session is left
+            await asyncio.shield(self._abort_upload(writer, pending_write))
+            raise
+        return total_bytes
+
+    async def _abort_upload(self, writer, pending_write: Optional[asyncio.Future]):
+        """Cancel a resumable upload once no write is running on it"""
+        if pending_write is not None:
+            await asyncio.gather(pending_write, return_exceptions=True)
+        try:
+            await self._run_blocking(writer.terminate)
         except Exception as e:
-            logger.error(f"❌ Error downloading recording: {e}")
-            return None
+            logger.warning(f"⚠️ Could not cancel resumable upload session: {e}")
 
-    def upload_to_gcp(self, local_file_path: str,
-                      call_sid: str) -> Optional[str]:
+    async def _transcode_stream(self, response: aiohttp.ClientResponse,
+                                stats: Dict[str, Any]) -> AsyncIterator[bytes]:
         """
-        Upload recording file to Google Cloud Storage
-        
-        Args:
-            local_file_path: Local path to recording file
-            call_sid: Twilio Call SID for organizing files
-            
-        Returns:
-            Public GCP Storage URL if successful, None otherwise
+        Transcode a recording response body through an ffmpeg worker process
+
+        The WAV body is fed to ffmpeg's stdin while the encoded output is read
+        from stdout, so nothing is buffered beyond the pipe chunks.
         """
-        if not self._storage_client or not self._bucket:
-            logger.error("❌ GCP Storage client not initialized")
-            return None
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+            *TRANSCODE_ARGS[self.transcode_format], "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE)
+
+        async def feed_input():
+            try:
+                async for data in response.content.iter_chunked(
+                        DOWNLOAD_CHUNK_SIZE):
+                    stats["input_bytes"] += len(data)
+                    process.stdin.write(data)
+                    await process.stdin.drain()
+            finally:
+                process.stdin.close()
 
+        feeder = asyncio.create_task(feed_input())
         try:
-            # Generate GCP blob name with date and call SID
-            date_prefix = datetime.now().strftime("%Y/%m/%d")
-            filename = os.path.basename(local_file_path)
-            blob_name = f"recordings/{date_prefix}/{call_sid}_{filename}"
-
-            # Upload file
-            blob = self._bucket.blob(blob_name)
-
-            logger.info(f"⬆️ Uploading to GCP Storage: {blob_name}")
-
-            with open(local_file_path, 'rb') as file:
-                blob.upload_from_file(file, content_type='audio/wav')
-
-            # Generate a signed URL instead of making blob public (more secure)
-            # URL expires in 30 days
-            expiration = datetime.utcnow() + timedelta(days=30)
-            signed_url = blob.generate_signed_url(expiration=expiration,
-                                                  method='GET')
-
-            public_url = signed_url
-
-            logger.info(
-                f"✅ Successfully uploaded recording to GCP: {public_url}")
-            return public_url
-
-        except Exception as e:
-            logger.error(f"❌ Error uploading to GCP Storage: {e}")
-            return None
+            while True:
+                data = await process.stdout.read(DOWNLOAD_CHUNK_SIZE)
+                if not data:
+                    break
+                stats["output_bytes"] += len(data)
+                yield data
+
+            await feeder
+            stderr = await process.stderr.read()
+            if await process.wait() != 0:
+                raise RuntimeError(
+                    f"ffmpeg exited with {process.returncode}: {stderr.decode(errors='ignore')[:200]}"
+                )
+        finally:
+            feeder.cancel()
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+    async def _transcode_to_gcp(self, recording_url: str, call_sid: str,
+                                twilio_auth: Optional[aiohttp.BasicAuth],
+                                twilio_client: Optional["TwilioCostFetcher"]
+                                ) -> Optional[str]:
+        """Stream a recording through the transcoder into GCS, returning the blob name"""
+        blob_name = self._build_blob_name(recording_url, call_sid,
+                                          self.transcode_format)
+        stats = {"input_bytes": 0, "output_bytes": 0}
+
+        start_time = time.perf_counter()
+        async with self._open_recording(recording_url, twilio_auth,
+                                        twilio_client) as response:
+            if response.status != 200:
+                logger.error(
+                    f"❌ Failed to download recording: HTTP {response.status}")
+                return None
+            async with aclosing(self._transcode_stream(response,
+                                                       stats)) as chunks:
+                await self.stream_to_gcp(chunks, blob_name)
+        transcode_ms = (time.perf_counter() - start_time) * 1000
+
+        self.transcode_stats["files"] += 1
+        self.transcode_stats["input_bytes"] += stats["input_bytes"]
+        self.transcode_stats["output_bytes"] += stats["output_bytes"]
+        self.transcode_stats["transcode_ms"] += transcode_ms
+
+        compression_ratio = stats["input_bytes"] / max(stats["output_bytes"], 1)
+        logger.info(
+            f"🗜️ Transcoded {recording_url} to {self.transcode_format}: {stats['input_bytes'] / 1024:.0f} KB -> {stats['output_bytes'] / 1024:.0f} KB (ratio {compression_ratio:.1f}x) in {transcode_ms:.0f}ms"
+        )
+        return blob_name
+
+    async def _stream_raw_to_gcp(self, recording_url: str, call_sid: str,
+                                 twilio_auth: Optional[aiohttp.BasicAuth],
+                                 twilio_client: Optional["TwilioCostFetcher"]
+                                 ) -> Optional[str]:
+        """Stream a recording into GCS unchanged, returning the blob name"""
+        blob_name = self._build_blob_name(recording_url, call_sid)
+
+        start_time = time.perf_counter()
+        async with self._open_recording(recording_url, twilio_auth,
+                                        twilio_client) as response:
+            if response.status != 200:
+                logger.error(
+                    f"❌ Failed to download recording: HTTP {response.status}")
+                return None
+            uploaded_bytes = await self.stream_to_gcp(
+                response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE), blob_name)
+
+        logger.info(
+            f"📊 Streamed {uploaded_bytes / (1024*1024):.2f} MB in {(time.perf_counter() - start_time) * 1000:.0f}ms"
+        )
+        return blob_name
+
+    def get_transcode_stats(self) -> Dict[str, Any]:
+        """Aggregate transcoding statistics (compression ratio and average time)"""
+        files = self.transcode_stats["files"]
+        return {
+            **self.transcode_stats,
+            "format": self.transcode_format,
+            "compression_ratio": round(
+                self.transcode_stats["input_bytes"] /
+                max(self.transcode_stats["output_bytes"], 1), 2),
+            "avg_transcode_ms": round(
+                self.transcode_stats["transcode_ms"] / files, 1) if files else 0.0
+        }
 
     async def process_recording(
             self,
             recording_url: str,
             call_sid: str,
-            twilio_auth: Optional[aiohttp.BasicAuth] = None) -> Optional[str]:
+            twilio_auth: Optional[aiohttp.BasicAuth] = None,
+            twilio_client: Optional["TwilioCostFetcher"] = None
+    ) -> Optional[str]:
         """
-        Complete process: download from Twilio, upload to GCP, return public URL
+        Complete process: stream from Twilio into GCP, return signed URL
         
         Args:
             recording_url: Twilio recording URL
             call_sid: Twilio Call SID
             
         Returns:
-            Public GCP Storage URL if successful, None otherwise
+            Signed GCP Storage URL if successful, None otherwise
         """
         if not recording_url or not call_sid:
             logger.error("❌ Recording URL and Call SID are required")
             return None
 
-        # Create temporary directory
-        with tempfile.TemporaryDirectory() as temp_dir:
-            logger.info(f"📁 Created temporary directory for recording download")
-            try:
-                # Download recording from Twilio
-                local_file_path = await self.download_recording(
-                    recording_url, temp_dir, twilio_auth)
-                if not local_file_path:
-                    return None
+        if not self._bucket:
+            logger.error("❌ GCP Storage client not initialized")
+            return None
 
-                # Log file size before upload
-                file_size = os.path.getsize(local_file_path)
-                logger.info(f"📊 Downloaded file size: {file_size / (1024*1024):.2f} MB")
+        async with self._semaphore:
+            try:
+                logger.info(f"⬇️⬆️ Streaming recording {recording_url} to GCP")
+
+                blob_name = None
+                if self.transcode_format:
+                    try:
+                        blob_name = await self._transcode_to_gcp(
+                            recording_url, call_sid, twilio_auth,
+                            twilio_client)
+                        if blob_name is None:
+                            return None
+                    except Exception as e:
+                        # Fall back to storing the original WAV
+                        self.transcode_stats["failures"] += 1
+                        logger.warning(
+                            f"⚠️ Transcoding failed for {recording_url}, storing original: {e}"
+                        )
 
-                # Upload to GCP Storage
-                gcp_url = self.upload_to_gcp(local_file_path, call_sid)
-                if not gcp_url:
+                if blob_name is None:
+                    blob_name = await self._stream_raw_to_gcp(
+                        recording_url, call_sid, twilio_auth, twilio_client)
+                if blob_name is None:
                     return None
 
+                # Generate a signed URL instead of making blob public (more secure)
+                # URL expires in 30 days
+                expiration = datetime.utcnow() + timedelta(days=30)
+                gcp_url = await self._run_blocking(
+                    self._bucket.blob(blob_name).generate_signed_url,
+                    expiration=expiration,
+                    method='GET')
+
                 logger.info(
                     f"🎉 Recording processing complete: {recording_url} -> {gcp_url}"
                 )
@@ -204,18 +402,16 @@ class RecordingUploader:
             except Exception as e:
                 logger.error(f"❌ Error processing recording: {e}")
                 return None
-            finally:
-                # Log cleanup (happens automatically when context exits)
-                logger.info(f"🧹 Temporary files automatically cleaned up from local storage")
 
     async def process_multiple_recordings(
         self,
         recording_urls: list,
         call_sid: str,
-        twilio_auth: Optional[aiohttp.BasicAuth] = None
+        twilio_auth: Optional[aiohttp.BasicAuth] = None,
+        twilio_client: Optional["TwilioCostFetcher"] = None
     ) -> Dict[str, Optional[str]]:
         """
-        Process multiple recordings for a call
+        Process multiple recordings for a call concurrently
         
         Args:
             recording_urls: List of Twilio recording URLs
@@ -224,20 +420,27 @@ class RecordingUploader:
         Returns:
             Dictionary mapping original URLs to GCP URLs
         """
-        results = {}
-
-        for recording_url in recording_urls:
-            gcp_url = await self.process_recording(recording_url, call_sid,
-                                                   twilio_auth)
-            results[recording_url] = gcp_url
-
-        return results
+        gcp_urls = await asyncio.gather(*(self.process_recording(
+            recording_url, call_sid, twilio_auth, twilio_client)
+                                          for recording_url in recording_urls))
+        return dict(zip(recording_urls, gcp_urls))
 
 
 # Global instance
 recording_uploader = RecordingUploader()
 
 
+def stored_file_format(gcp_url: str) -> str:
+    """
+    File format a recording was stored in, from the object name in its signed URL
+
+    Transcoded recordings are stored as .opus/.flac, but a recording whose
+    transcoding failed is stored as the original WAV.
+    """
+    extension = os.path.splitext(urlparse(gcp_url).path)[1]
+    return extension.lstrip('.').lower() or 'wav'
+
+
 async def upload_recording_to_gcp(
         recording_url: str,
         call_sid: str,
@@ -259,7 +462,8 @@ async def upload_recording_to_gcp(
 async def upload_recordings_to_gcp(
     recording_urls: list,
     call_sid: str,
-    twilio_auth: Optional[aiohttp.BasicAuth] = None
+    twilio_auth: Optional[aiohttp.BasicAuth] = None,
+    twilio_client: Optional["TwilioCostFetcher"] = None
 ) -> Dict[str, Optional[str]]:
     """
     Convenience function to upload multiple recordings
@@ -272,4 +476,4 @@ async def upload_recordings_to_gcp(
         Dictionary mapping original URLs to GCP URLs
     """
     return await recording_uploader.process_multiple_recordings(
-        recording_urls, call_sid, twilio_auth)
+        recording_urls, call_sid, twilio_auth, twilio_client)
@@ -0,0 +1,111 @@
+"""
+Recording Upload Benchmark
+
+Runs the fake Twilio API in-process with recorded calls and streams the
+recordings through RecordingUploader into the fake object store. Reports
+throughput and checks that the stored objects match the Twilio media. Also
+checks that an upload failing mid-stream, or cancelled, cancels its resumable
+session instead of leaking it.
+
+Usage: python recording_uploader_benchmark.py --recordings 8 --seconds 60 --transcode opus
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import uvicorn
+
+PORT = 8922
+# The fetcher reads its API host at import time
+os.environ.setdefault("TWILIO_API_HOST", f"http://127.0.0.1:{PORT}")
+
+from fake_object_store import FakeBucket  # noqa: E402
+from fake_twilio_server import DEFAULT_ACCOUNT_SID, FakeTwilioAccount, create_app  # noqa: E402
+from recording_uploader import RecordingUploader  # noqa: E402
+from twilio_cost_fetcher import twilio_client_registry  # noqa: E402
+
+AUTH_TOKEN = "fake-auth-token"
+
+
+async def _upload_all(uploader: RecordingUploader, client, call_sids):
+    results = {}
+    for call_sid in call_sids:
+        recordings = await client.fetch_recording_urls(call_sid)
+        urls = [recording["recording_url"] for recording in recordings]
+        results.update(await uploader.process_multiple_recordings(urls, call_sid,
+                                                                  twilio_client=client))
+    return results
+
+
+async def run(args):
+    account = FakeTwilioAccount()
+    calls = [account.add_call(duration_seconds=int(args.seconds)) for _ in range(args.recordings)]
+    for call in calls:
+        account.add_recording(call, args.seconds)
+    media = {sid: audio for call in calls for sid, audio in call.recordings.items()}
+
+    server = uvicorn.Server(uvicorn.Config(create_app({DEFAULT_ACCOUNT_SID: account}), port=PORT,
+                                           log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    client = twilio_client_registry.get_client(DEFAULT_ACCOUNT_SID, AUTH_TOKEN)
+
+    bucket = FakeBucket("recordings-benchmark")
+    uploader = RecordingUploader(bucket=bucket, transcode_format=args.transcode)
+    started = time.perf_counter()
+    results = await _upload_all(uploader, client, [call.sid for call in calls])
+    elapsed = time.perf_counter() - started
+
+    assert all(results.values()), "Some recordings were not uploaded"
+    assert bucket.stats["finalized"] == len(media) and not bucket.open_sessions
+    if not uploader.transcode_format:
+        stored = {name.rsplit("_", 1)[-1].split(".")[0]: data for name, data in bucket.objects.items()}
+        assert stored == media, "Stored objects differ from the Twilio media"
+    input_mb = sum(len(audio) for audio in media.values()) / (1024 * 1024)
+    stored_mb = sum(len(data) for data in bucket.objects.values()) / (1024 * 1024)
+    print(f"✅ {len(media)} recordings, {input_mb:.1f} MB -> {stored_mb:.1f} MB stored "
+          f"({uploader.transcode_format or 'wav'}) in {elapsed * 1000:.0f}ms "
+          f"({input_mb / elapsed:.1f} MB/s)")
+
+    # An upload that fails mid-stream falls back (transcoding) or gives up, and
+    # every resumable session it opened is cancelled
+    failing_bucket = FakeBucket("recordings-failing",
+                                fail_after_bytes=min(len(audio) for audio in media.values()) // 4)
+    failing = RecordingUploader(bucket=failing_bucket, transcode_format=args.transcode)
+    results = await _upload_all(failing, client, [calls[0].sid])
+    assert not any(results.values()) and not failing_bucket.objects
+    assert failing_bucket.open_sessions == 0, f"{failing_bucket.open_sessions} sessions leaked"
+    print(f"✅ failed upload: {failing_bucket.stats['terminated']}/{failing_bucket.stats['opened']} "
+          f"sessions cancelled, none left open")
+
+    # Cancelling the caller mid-upload also cancels the session
+    cancelled_bucket = FakeBucket("recordings-cancelled")
+    cancelled = RecordingUploader(bucket=cancelled_bucket, upload_chunk_size=256 * 1024)
+    task = asyncio.create_task(_upload_all(cancelled, client, [calls[0].sid]))
+    while not cancelled_bucket.stats["opened"]:
+        await asyncio.sleep(0.001)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await asyncio.sleep(0.1)
+    assert cancelled_bucket.open_sessions == 0, f"{cancelled_bucket.open_sessions} sessions leaked"
+    print(f"✅ cancelled upload: {cancelled_bucket.stats['terminated']} session cancelled, none left open")
+
+    await twilio_client_registry.close_all()
+    server.should_exit = True
+    await serving
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--recordings", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--transcode", default="", help="opus, flac or empty for WAV")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
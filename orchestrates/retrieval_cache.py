@@ -0,0 +1,176 @@
+"""
+PERFORMANCE OPTIMIZATION MODULE
+Shared caches and a dedicated thread pool for knowledge-base retrieval.
+
+The Pinecone client is synchronous, so queries run on their own thread pool instead
+of blocking the event loop that pumps Twilio media for every other call. Query
+embeddings and search results are cached (LRU + TTL) across calls, since callers in
+a campaign ask the same questions.
+"""
+
+import os
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive form of a query used in cache keys"""
+    return re.sub(r"\s+", " ", text).strip().strip(".,!?¿¡").lower()
+
+
+class TTLCache:
+    """LRU cache whose entries also expire after a fixed time"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._cache: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._hit_count = 0
+        self._miss_count = 0
+        self._eviction_count = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._cache.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._cache.move_to_end(key)
+                self._hit_count += 1
+                return value
+            del self._cache[key]
+        self._miss_count += 1
+        return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._cache[key] = (time.monotonic() + self._ttl_seconds, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._max_size:
+            self._cache.popitem(last=False)
+            self._eviction_count += 1
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches; returns how many were dropped"""
+        stale = [key for key in self._cache if predicate(key)]
+        for key in stale:
+            del self._cache[key]
+        return len(stale)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total_requests = self._hit_count + self._miss_count
+        hit_rate = (self._hit_count / total_requests *
+                    100.0) if total_requests > 0 else 0.0
+        return {
+            'hits': self._hit_count,
+            'misses': self._miss_count,
+            'hit_rate': round(hit_rate, 2),
+            'evictions': self._eviction_count,
+            'cache_size': len(self._cache)
+        }
+
+
+class RetrievalCache:
+    """Query embeddings, search results per namespace, and per-turn retrieval latency"""
+
+    def __init__(self,
+                 embedding_cache_size: Optional[int] = None,
+                 embedding_ttl_seconds: Optional[float] = None,
+                 result_cache_size: Optional[int] = None,
+                 result_ttl_seconds: Optional[float] = None,
+                 query_threads: Optional[int] = None):
+        self.embeddings = TTLCache(
+            embedding_cache_size
+            or int(os.environ.get("RAG_EMBEDDING_CACHE_SIZE", "2048")),
+            embedding_ttl_seconds
+            or float(os.environ.get("RAG_EMBEDDING_CACHE_TTL_SECONDS", "3600")))
+        self.results = TTLCache(
+            result_cache_size
+            or int(os.environ.get("RAG_RESULT_CACHE_SIZE", "1024")),
+            result_ttl_seconds
+            or float(os.environ.get("RAG_RESULT_CACHE_TTL_SECONDS", "300")))
+        self._executor = ThreadPoolExecutor(
+            max_workers=query_threads
+            or int(os.environ.get("PINECONE_QUERY_THREADS", "8")),
+            thread_name_prefix="pinecone")
+        # Recent per-turn retrieval latencies (ms)
+        self._latencies_ms: Deque[float] = deque(maxlen=500)
+        # Speculative prefetch on interim transcripts
+        self.prefetch_stats = {
+            "started": 0,
+            "hits": 0,
+            "misses": 0,
+            "cancelled": 0,
+            "latency_saved_ms": 0.0
+        }
+
+    def embedding_key(self, model: str, query: str) -> Tuple:
+        return (model, normalize_query(query))
+
+    def result_key(self, index_name: str, namespace: str, top_k: int,
+                   filter: Optional[dict], query: str) -> Tuple:
+        return (index_name, namespace, top_k,
+                json.dumps(filter, sort_keys=True) if filter else None,
+                normalize_query(query))
+
+    def invalidate_namespace(self, index_name: str, namespace: Optional[str]) -> int:
+        """Forget cached results after the namespace's documents change (all namespaces if None)"""
+        dropped = self.results.invalidate(
+            lambda key: key[0] == index_name and namespace in (None, key[1]))
+        if dropped:
+            logger.info(
+                f"♻️ Dropped {dropped} cached retrieval results for {index_name}/{namespace if namespace is not None else '*'}"
+            )
+        return dropped
+
+    async def run_blocking(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run a synchronous Pinecone call on the retrieval thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor,
+                                          partial(fn, *args, **kwargs))
+
+    def record_latency(self, latency_ms: float):
+        self._latencies_ms.append(latency_ms)
+
+    def record_prefetch(self, outcome: str, latency_saved_ms: float = 0.0):
+        """Count a speculative prefetch outcome (started, hits, misses, cancelled)"""
+        self.prefetch_stats[outcome] += 1
+        self.prefetch_stats["latency_saved_ms"] += latency_saved_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies_ms)
+        latency_stats = {}
+        if latencies:
+            latency_stats = {
+                "turns": len(latencies),
+                "p50_ms": round(latencies[len(latencies) // 2], 1),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                "max_ms": round(latencies[-1], 1)
+            }
+        resolved = self.prefetch_stats["hits"] + self.prefetch_stats["misses"]
+        prefetch = {
+            **self.prefetch_stats,
+            "latency_saved_ms": round(self.prefetch_stats["latency_saved_ms"], 1),
+            "hit_rate": round(self.prefetch_stats["hits"] / resolved * 100.0, 2) if resolved else 0.0,
+            "avg_latency_saved_ms": round(self.prefetch_stats["latency_saved_ms"] / self.prefetch_stats["hits"], 1) if self.prefetch_stats["hits"] else 0.0
+        }
+        return {
+            "embeddings": self.embeddings.get_stats(),
+            "results": self.results.get_stats(),
+            "retrieval_latency": latency_stats,
+            "speculative_prefetch": prefetch
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global instance
+retrieval_cache = RetrievalCache()
@@ -0,0 +1,170 @@
+"""
+PERFORMANCE OPTIMIZATION MODULE
+Semantic answer cache for repeated knowledge-base questions.
+
+Across a campaign callers ask the same handful of questions ("what's the price",
+"who are you"). Agents that opt in store (query embedding -> answer) for turns
+answered purely from the knowledge base, and answer near-duplicate questions from
+the cache instead of doing retrieval plus a full LLM generation.
+
+Entries are scoped per knowledge base (index + namespace) and per agent (hash of
+the base prompt, language and model), expire after a TTL, and are dropped when
+the knowledge base changes.
+"""
+
+import os
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Numbers and capitalized words (names, products, places) in an answer
+_FACT_TOKEN = re.compile(r"\d+(?:[.,]\d+)*|\b[A-ZÀ-Ý][\w'-]*")
+_SENTENCE_START = re.compile(r"(?:^|[.!?¡¿]\s+)([A-ZÀ-Ý][\w'-]*)")
+# Capitalized only because they open a sentence
+_COMMON_OPENERS = {
+    "yes", "no", "sure", "of", "the", "our", "we", "it", "its", "that", "this",
+    "there", "great", "absolutely", "certainly", "thanks", "thank", "you", "i",
+    "a", "an", "for", "in", "and", "but", "so", "if", "please", "let", "well",
+    "sí", "si", "claro", "el", "la", "los", "las", "nuestro", "nuestra", "es",
+    "oui", "non", "bien", "le", "les", "nous", "notre", "c'est", "il", "elle"
+}
+
+
+def is_grounded(answer: str, context: str, query: str) -> bool:
+    """
+    True if every fact-like token of the answer (numbers, names) appears in the
+    retrieved context or the question - i.e. nothing came from the per-contact
+    prompt (customer name, previous call) or was made up.
+    """
+    source = f"{context}\n{query}".lower()
+    openers = {word.lower() for word in _SENTENCE_START.findall(answer)}
+    for token in _FACT_TOKEN.findall(answer):
+        lowered = token.lower()
+        if lowered in source:
+            continue
+        if lowered in openers and lowered in _COMMON_OPENERS:
+            continue
+        return False
+    return True
+
+
+@dataclass
+class CachedAnswer:
+    """An answer generated for a knowledge-base question"""
+    query: str
+    answer: str
+    expires_at: float
+    hits: int = 0
+
+
+@dataclass
+class _AnswerScope:
+    entries: List[CachedAnswer] = field(default_factory=list)
+    # One L2-normalized embedding per entry, same order
+    embeddings: Optional[np.ndarray] = None
+
+
+class SemanticAnswerCache:
+    """Per-scope (query embedding -> answer) store with similarity lookup"""
+
+    def __init__(self, max_entries_per_scope: Optional[int] = None):
+        self.max_entries_per_scope = max_entries_per_scope or int(
+            os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "256"))
+        self._scopes: Dict[Tuple[str, str, str], _AnswerScope] = {}
+        self.stats = {
+            "lookups": 0,
+            "hits": 0,
+            "stores": 0,
+            "rejected_ungrounded": 0,
+            "invalidations": 0
+        }
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _drop_expired(self, scope: _AnswerScope):
+        now = time.monotonic()
+        keep = [i for i, entry in enumerate(scope.entries) if entry.expires_at > now]
+        if len(keep) != len(scope.entries):
+            scope.entries = [scope.entries[i] for i in keep]
+            scope.embeddings = scope.embeddings[keep] if keep else None
+
+    def lookup(self, scope_key: Tuple[str, str, str], embedding: List[float],
+               threshold: float) -> Optional[CachedAnswer]:
+        """Best cached answer whose question is at least `threshold` cosine-similar"""
+        self.stats["lookups"] += 1
+        scope = self._scopes.get(scope_key)
+        if scope is None:
+            return None
+        self._drop_expired(scope)
+        if scope.embeddings is None:
+            return None
+
+        similarities = scope.embeddings @ self._normalize(embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] < threshold:
+            return None
+        entry = scope.entries[best]
+        entry.hits += 1
+        self.stats["hits"] += 1
+        logger.info(
+            f"💡 Semantic cache hit ({similarities[best]:.3f}) for '{entry.query[:60]}'")
+        return entry
+
+    def store(self, scope_key: Tuple[str, str, str], query: str,
+              embedding: List[float], answer: str, ttl_seconds: float):
+        scope = self._scopes.setdefault(scope_key, _AnswerScope())
+        self._drop_expired(scope)
+        row = self._normalize(embedding)[np.newaxis, :]
+        scope.entries.append(
+            CachedAnswer(query=query,
+                         answer=answer,
+                         expires_at=time.monotonic() + ttl_seconds))
+        scope.embeddings = row if scope.embeddings is None else np.vstack(
+            [scope.embeddings, row])
+        # Oldest entries go first once the scope is full
+        overflow = len(scope.entries) - self.max_entries_per_scope
+        if overflow > 0:
+            scope.entries = scope.entries[overflow:]
+            scope.embeddings = scope.embeddings[overflow:]
+        self.stats["stores"] += 1
+
+    def reject_ungrounded(self):
+        self.stats["rejected_ungrounded"] += 1
+
+    def invalidate(self, index_name: str, namespace: Optional[str] = None) -> int:
+        """Drop cached answers for a knowledge base (all namespaces if none given)"""
+        stale = [
+            key for key in self._scopes
+            if key[0] == index_name and (namespace is None or key[1] == namespace)
+        ]
+        dropped = sum(len(self._scopes.pop(key).entries) for key in stale)
+        if dropped:
+            self.stats["invalidations"] += 1
+            logger.info(f"♻️ Dropped {dropped} cached answers for knowledge base {index_name}")
+        return dropped
+
+    def clear(self):
+        self._scopes.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["lookups"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups * 100.0, 2) if lookups else 0.0,
+            "scopes": len(self._scopes),
+            "entries": sum(len(scope.entries) for scope in self._scopes.values())
+        }
+
+
+# Global instance
+semantic_answer_cache = SemanticAnswerCache()
@@ -2,16 +2,19 @@ import logging
 import httpx
 import asyncio
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Set
+from typing import Callable, Dict, Any, List, Optional, Set
 import json
 import os
 from vocode.streaming.models.events import Event, EventType, PhoneCallConnectedEvent, PhoneCallEndedEvent, RecordingEvent
 from vocode.streaming.models.transcript import TranscriptCompleteEvent
 from vocode.streaming.utils.events_manager import EventsManager
 from unified_cost_tracker import unified_cost_tracker as cost_calculator, unified_cost_tracker as usage_tracker, unified_cost_tracker as real_cost_calculator
-from twilio_cost_fetcher import twilio_cost_fetcher
-from recording_uploader import upload_recordings_to_gcp
-import aiohttp
+from twilio_cost_fetcher import TwilioCostFetcher, twilio_client_registry
+from cost_reconciler import TwilioCostReconciler
+from recording_uploader import stored_file_format, upload_recordings_to_gcp
+from post_call_pipeline import PostCallPipeline, PipelineStage
+from cluster_state import NODE_ID, cluster_state
+from vocode_usage_hook import vocode_usage_hook
 
 logger = logging.getLogger(__name__)
 
@@ -103,6 +106,14 @@ class CustomEventsManager(EventsManager):
         self.call_phone_numbers = {
         }  # Store from/to phone numbers for Call SID lookup
         self.base_url = os.getenv("BASE_URL")  # For recording URL construction
+        # PERFORMANCE OPTIMIZATION: Report an estimated Twilio cost right away and
+        # fill in final prices with one batched Calls listing per account
+        self.cost_reconciliation_enabled = os.getenv(
+            "TWILIO_COST_RECONCILIATION_ENABLED", "true").lower() == "true"
+        self.cost_reconciler = TwilioCostReconciler(
+            send_webhook=self._send_webhook)
+        # Notified with the conversation ID when a call ends (e.g. to free dial slots)
+        self.call_ended_listeners: List[Callable[[str], None]] = []
 
 
     async def handle_event(self, event: Event):
@@ -130,7 +141,13 @@ class CustomEventsManager(EventsManager):
                                            event: PhoneCallConnectedEvent):
         """Handle PHONE_CALL_CONNECTED event with phone number capture"""
         call_start_time = datetime.now().isoformat()
+        if cluster_state:
+            # The media stream may land on a different process than the one that dialed
+            await self.hydrate_call_state(event.conversation_id)
         self.call_start_times[event.conversation_id] = call_start_time
+        self.replicate_call_state(event.conversation_id,
+                                  call_start_time=call_start_time,
+                                  owner_node=NODE_ID)
 
         payload = {
             "type": "PHONE_CALL_CONNECTED",
@@ -263,6 +280,25 @@ class CustomEventsManager(EventsManager):
         }
 
         await self._send_webhook(payload)
+        self.notify_call_ended(event.conversation_id)
+
+    def add_call_ended_listener(self, listener: Callable[[str], None]):
+        """Register a callback invoked with the conversation ID of every ended call"""
+        self.call_ended_listeners.append(listener)
+
+    def notify_call_ended(self, conversation_id: str):
+        """Tell listeners in every process a call ended - listeners must tolerate repeats"""
+        self.notify_call_ended_locally(conversation_id)
+        if cluster_state:
+            cluster_state.publish_call_ended(conversation_id)
+
+    def notify_call_ended_locally(self, conversation_id: str):
+        """Tell this process's listeners a call ended"""
+        for listener in self.call_ended_listeners:
+            try:
+                listener(conversation_id)
+            except Exception as e:
+                logger.error(f"❌ Call ended listener failed for {conversation_id}: {e}")
 
     async def _handle_transcript_complete(self,
                                           event: TranscriptCompleteEvent):
@@ -278,10 +314,6 @@ class CustomEventsManager(EventsManager):
         logger.info(
             f"🗃️ Total stored transcripts: {len(self.call_transcripts)}")
 
-        # Add 5-second delay to allow tracking system to fully initialize
-        logger.info(f"⏰ Waiting 5 seconds for tracking system to initialize...")
-        await asyncio.sleep(5)
-
         # VOICEMAIL DETECTION: Analyze transcript for voicemail indicators
         is_voicemail_transcript = self._detect_voicemail_from_transcript(
             full_transcript)
@@ -405,18 +437,266 @@ class CustomEventsManager(EventsManager):
             logger.info(
                 f"✅ No call termination indicators found in transcript")
 
+        if cluster_state:
+            await self._enqueue_post_call(conversation_id, full_transcript,
+                                          is_voicemail_transcript)
+            return
+
+        await self._run_post_call_pipeline(conversation_id, full_transcript,
+                                           is_voicemail_transcript)
+
+    async def _run_post_call_pipeline(self,
+                                      conversation_id: str,
+                                      full_transcript: str,
+                                      is_voicemail_transcript: bool,
+                                      usage_settle_seconds: float = 5.0):
+        """Enrich a finished call (tags, usage, Twilio cost, recordings) and send TRANSCRIPT_COMPLETE"""
         # Get stored tags for this call
         call_tags = self.call_tags.get(conversation_id, {})
         user_tags = call_tags.get('user_tags', [])
         system_tags = call_tags.get('system_tags', [])
 
-        # Evaluate tags with LLM if we have any tags to check
-        detected_tags = set()
-        if user_tags or system_tags:
-            detected_tags = await self._evaluate_tags_with_llm(
-                full_transcript, user_tags, system_tags, conversation_id)
+        # Retrieve stored Twilio credentials for this call
+        logger.info(f"🔍 Looking up call data for conversation {conversation_id}")
+        logger.info(f"🗂️ Available call data keys: {list(self.call_phone_numbers.keys())}")
+        call_data = self.call_phone_numbers.get(conversation_id)
+        if call_data:
+            logger.info(f"✅ Found call data for {conversation_id}: from={call_data.get('from_phone')} to={call_data.get('to_phone')}")
+        else:
+            logger.warning(
+                f"⚠️ No call data found for conversation {conversation_id}, skipping Twilio fetch"
+            )
+
+        # PERFORMANCE OPTIMIZATION: Post-call enrichment runs as a dependency graph.
+        # Tag evaluation and usage metrics don't depend on Twilio, so they run
+        # concurrently with the Call SID -> recordings/cost branch.
+        async def evaluate_tags(values):
+            detected_tags = set()
+            if user_tags or system_tags:
+                detected_tags = await self._evaluate_tags_with_llm(
+                    full_transcript, user_tags, system_tags, conversation_id)
+            return self._split_detected_tags(detected_tags)
+
+        async def send_tags_ready(tags):
+            await self._send_webhook({
+                "type": "CALL_TAGS_READY",
+                "call_id": conversation_id,
+                "user_tags_found": tags["user_tags_found"],
+                "system_tags_found": tags["system_tags_found"],
+                "timestamp": datetime.now().isoformat()
+            })
+
+        async def collect_usage_metrics(values):
+            return await self._collect_usage_metrics(conversation_id,
+                                                     full_transcript,
+                                                     usage_settle_seconds)
+
+        # Pooled REST client for the Twilio account that placed this call
+        twilio_client = twilio_client_registry.get_client_for_call(call_data)
+
+        async def find_call_sid(values):
+            return await self._find_twilio_call_sid(conversation_id,
+                                                    call_data, twilio_client)
+
+        async def fetch_recordings(values):
+            return await twilio_client.fetch_recording_urls(
+                values["call_sid"])
+
+        async def fetch_call_cost(values):
+            if not self.cost_reconciliation_enabled:
+                return await twilio_client.fetch_call_cost(values["call_sid"])
+            return self._estimate_twilio_call_cost(conversation_id,
+                                                   values["call_sid"],
+                                                   call_data, twilio_client)
+
+        async def send_cost_ready(cost_data):
+            if cost_data:
+                await self._send_webhook({
+                    "type": "CALL_COST_READY",
+                    "call_id": conversation_id,
+                    "twilio_call_cost_data": cost_data,
+                    "timestamp": datetime.now().isoformat()
+                })
+
+        async def upload_recordings(values):
+            return await self._upload_call_recordings(values["recordings"],
+                                                      values["call_sid"],
+                                                      call_data)
+
+        async def send_recordings_ready(recording_urls):
+            if recording_urls:
+                await self._send_webhook({
+                    "type": "CALL_RECORDINGS_READY",
+                    "call_id": conversation_id,
+                    "recording_urls": recording_urls,
+                    "timestamp": datetime.now().isoformat()
+                })
+
+        pipeline = PostCallPipeline(conversation_id, [
+            PipelineStage(name="tags",
+                          func=evaluate_tags,
+                          timeout=30.0,
+                          default={
+                              "user_tags_found": [],
+                              "system_tags_found": []
+                          },
+                          on_complete=send_tags_ready),
+            # Depends on tags so the tag-evaluation LLM usage is included in the costs
+            PipelineStage(name="usage_metrics",
+                          func=collect_usage_metrics,
+                          depends_on=["tags"],
+                          skip_if_missing=False,
+                          timeout=15.0,
+                          default=(None, None)),
+            PipelineStage(name="call_sid", func=find_call_sid, timeout=10.0),
+            PipelineStage(name="recordings",
+                          func=fetch_recordings,
+                          depends_on=["call_sid"],
+                          timeout=10.0,
+                          default=[]),
+            PipelineStage(name="call_cost",
+                          func=fetch_call_cost,
+                          depends_on=["call_sid"],
+                          timeout=30.0,
+                          on_complete=send_cost_ready),
+            PipelineStage(name="recording_upload",
+                          func=upload_recordings,
+                          depends_on=["recordings", "call_sid"],
+                          timeout=120.0,
+                          default=[],
+                          on_complete=send_recordings_ready),
+        ])
+        results = await pipeline.run()
+
+        tags = results["tags"]
+        usage_metrics_data, ai_services_cost_breakdown = results[
+            "usage_metrics"]
+        twilio_call_cost_data = results["call_cost"]
+        webhook_recording_urls = results["recording_upload"]
 
-        # Separate user and system tags found
+        payload = {
+            "type":
+            "TRANSCRIPT_COMPLETE",
+            "call_id":
+            conversation_id,
+            "full_transcript":
+            full_transcript,
+            "user_tags_found":
+            tags["user_tags_found"],
+            "system_tags_found":
+            tags["system_tags_found"],
+            "voicemail_detected":
+            is_voicemail_transcript,
+            "usage_metrics_data":
+            usage_metrics_data.to_dict() if usage_metrics_data else None,
+            "ai_services_cost_breakdown":
+            ai_services_cost_breakdown,
+            "total_call_cost_breakdown":
+            _calculate_total_call_cost(ai_services_cost_breakdown,
+                                       twilio_call_cost_data),
+            "recording_urls":
+            webhook_recording_urls,
+            "twilio_call_cost_data":
+            twilio_call_cost_data,  # Will be populated if available
+            "enrichment_stage_timings":
+            pipeline.stage_timings()
+        }
+
+        await self._send_webhook(payload)
+
+        self._cleanup_call_state(conversation_id)
+
+    def _cleanup_call_state(self, conversation_id: str):
+        """Clean up stored data and usage tracking (final cleanup)"""
+        self.call_tags.pop(conversation_id, None)
+        self.call_transcripts.pop(conversation_id, None)
+        self.call_sids.pop(conversation_id,
+                           None)  # Clean up stored Call SID
+        self.call_phone_numbers.pop(conversation_id, None)
+        cost_calculator.cleanup_call(conversation_id)
+        usage_tracker.cleanup_call(conversation_id)
+
+        # Clean up Vocode usage hook mapping
+        vocode_usage_hook.cleanup_conversation(conversation_id)
+
+        logger.info(
+            f"🧹 Cleaned up data and usage metrics for call {conversation_id}"
+        )
+
+    async def _enqueue_post_call(self, conversation_id: str,
+                                 full_transcript: str,
+                                 is_voicemail_transcript: bool):
+        """Hand post-call enrichment to whichever cluster node picks it up"""
+        # Let the last real-time usage events land before exporting the tracker state
+        await asyncio.sleep(5)
+        await cluster_state.enqueue_post_call({
+            "conversation_id": conversation_id,
+            "full_transcript": full_transcript,
+            "voicemail_detected": is_voicemail_transcript,
+            "usage_state": usage_tracker.export_call_state(conversation_id),
+            "enqueued_by": NODE_ID
+        })
+        self._cleanup_call_state(conversation_id)
+
+    async def run_post_call_job(self, job: Dict[str, Any]):
+        """Run a queued post-call job on this node (cluster mode)"""
+        conversation_id = job["conversation_id"]
+        logger.info(
+            f"📥 Running post-call work for {conversation_id} (queued by {job.get('enqueued_by')})"
+        )
+        await self.hydrate_call_state(conversation_id)
+        if job.get("usage_state"):
+            usage_tracker.import_call_state(conversation_id, job["usage_state"])
+
+        await self._run_post_call_pipeline(conversation_id,
+                                           job["full_transcript"],
+                                           job.get("voicemail_detected", False),
+                                           usage_settle_seconds=0)
+        await cluster_state.delete(conversation_id)
+
+    def replicate_call_state(self, conversation_id: str, **fields: Any):
+        """Write per-call state through to the cluster store (no-op on a single node)"""
+        if cluster_state:
+            cluster_state.save_later(conversation_id, **fields)
+
+    async def hydrate_call_state(self, conversation_id: str):
+        """Load per-call state written by other processes into the local maps"""
+        state = await cluster_state.load(conversation_id)
+        if not state:
+            return
+
+        if "call_data" in state:
+            self.call_phone_numbers.setdefault(conversation_id,
+                                               state["call_data"])
+        if state.get("call_sid"):
+            self.call_sids.setdefault(conversation_id, state["call_sid"])
+        if "call_tags" in state:
+            self.call_tags.setdefault(conversation_id, state["call_tags"])
+        if "call_start_time" in state:
+            self.call_start_times.setdefault(conversation_id,
+                                             state["call_start_time"])
+        if "transfer_config" in state:
+            self.transfer_configs.setdefault(conversation_id,
+                                             state["transfer_config"])
+        if "voicemail_config" in state:
+            if not hasattr(self, 'voicemail_configs'):
+                self.voicemail_configs = {}
+            self.voicemail_configs.setdefault(conversation_id,
+                                              state["voicemail_config"])
+
+        # Real-time usage is tracked by the process serving the conversation
+        if "usage_tracking" in state and not usage_tracker.get_call_metrics(
+                conversation_id, None):
+            usage_tracker.start_call_tracking(conversation_id,
+                                              **state["usage_tracking"])
+        if conversation_id not in vocode_usage_hook.conversation_to_call_id:
+            vocode_usage_hook.register_call(conversation_id, conversation_id)
+
+        logger.info(
+            f"📥 Loaded shared call state for {conversation_id}: {sorted(state)}")
+
+    def _split_detected_tags(self, detected_tags: Set[str]) -> Dict[str, List[str]]:
+        """Separate LLM-detected tags into user and system tags"""
         user_tags_found = []
         system_tags_found = []
 
@@ -429,6 +709,23 @@ class CustomEventsManager(EventsManager):
                 # Handle simple tags (backward compatibility)
                 user_tags_found.append(tag)
 
+        return {
+            "user_tags_found": user_tags_found,
+            "system_tags_found": system_tags_found
+        }
+
+    async def _collect_usage_metrics(self,
+                                     conversation_id: str,
+                                     full_transcript: str,
+                                     settle_seconds: float = 5.0):
+        """Update usage tracking with final call data and return (metrics, AI cost breakdown)"""
+        # Give the tracking system time to receive the last real-time usage events
+        if settle_seconds:
+            logger.info(
+                f"⏰ Waiting {settle_seconds:.0f} seconds for tracking system to initialize..."
+            )
+            await asyncio.sleep(settle_seconds)
+
         # Update call duration and transcript data before getting usage metrics
         if conversation_id in self.call_start_times:
             call_start_time_str = self.call_start_times[conversation_id]
@@ -457,6 +754,8 @@ class CustomEventsManager(EventsManager):
         # Get comprehensive cost breakdown for all AI services
         ai_services_cost_breakdown = usage_tracker.get_comprehensive_cost_breakdown(
             conversation_id)
+        # Evicted after a grace period even if the webhook never completes
+        usage_tracker.finalize_call_metrics(conversation_id)
         if ai_services_cost_breakdown:
             logger.info(
                 f"💰 AI Services cost breakdown: ${ai_services_cost_breakdown['cost_breakdown']['total_ai_services_cost_usd']:.6f}"
@@ -466,192 +765,141 @@ class CustomEventsManager(EventsManager):
                 f"⚠️ Could not calculate AI services cost for call {conversation_id}"
             )
 
-        webhook_recording_urls = []
-        twilio_call_cost_data = None
+        return usage_metrics_data, ai_services_cost_breakdown
 
-        # Retrieve stored Twilio credentials for this call
-        logger.info(f"🔍 Looking up call data for conversation {conversation_id}")
-        logger.info(f"🗂️ Available call data keys: {list(self.call_phone_numbers.keys())}")
-        call_data = self.call_phone_numbers.get(conversation_id)
-        if call_data:
-            logger.info(f"✅ Found call data for {conversation_id}: from={call_data.get('from_phone')} to={call_data.get('to_phone')}")
-            twilio_account_sid = call_data.get("twilio_account_sid")
-            twilio_auth_token = call_data.get("twilio_auth_token")
+    async def _find_twilio_call_sid(
+            self, conversation_id: str, call_data: Optional[Dict[str, Any]],
+            twilio_client: Optional[TwilioCostFetcher]) -> Optional[str]:
+        """Resolve the Twilio Call SID for a conversation"""
+        if not call_data:
+            return None
+
+        if twilio_client is None:
+            logger.warning(
+                f"⚠️ Twilio credentials not found for conversation {conversation_id}"
+            )
+            return None
 
-            # Configure twilio_cost_fetcher with the stored credentials
-            if twilio_account_sid and twilio_auth_token:
-                twilio_cost_fetcher.configure_credentials(
-                    twilio_account_sid, twilio_auth_token)
+        # Direct lookup: SID captured at dial time or from a Twilio status callback
+        captured_call_sid = self.call_sids.get(conversation_id)
+        if captured_call_sid:
+            logger.info(
+                f"✅ Using captured Twilio Call SID: {captured_call_sid} for conversation {conversation_id}"
+            )
+            return captured_call_sid
 
-                logger.info(
-                    f"🔑 Configured Twilio credentials for call {conversation_id}"
-                )
+        # Fallback: search the Calls list using phone numbers and call start time
+        from_phone = call_data.get("from_phone")
+        to_phone = call_data.get("to_phone")
+        call_start_time = call_data.get("call_start_time")
 
-                # Get actual Twilio Call SID using phone numbers and call start time
-                from_phone = call_data.get("from_phone")
-                to_phone = call_data.get("to_phone")
-                call_start_time = call_data.get("call_start_time")
-
-                if from_phone and to_phone:
-                    actual_call_sid = await twilio_cost_fetcher.find_call_sid_by_phone_numbers(
-                        from_phone, to_phone, call_start_time)
-
-                    if actual_call_sid:
-                        logger.info(
-                            f"✅ Found actual Twilio Call SID: {actual_call_sid} for conversation {conversation_id}"
-                        )
-
-                        # Fetch recordings and cost with the actual Twilio Call SID
-                        twilio_recording_urls = await twilio_cost_fetcher.fetch_recording_urls(
-                            actual_call_sid)
-                        twilio_call_cost_data = await twilio_cost_fetcher.fetch_call_cost(
-                            actual_call_sid)
-
-                        # Process recordings through GCP uploader
-                        webhook_recording_urls = []
-                        if twilio_recording_urls:
-                            logger.info(
-                                f"🎙️ Processing {len(twilio_recording_urls)} recordings for GCP upload"
-                            )
-
-                            # Extract media URLs from recording objects for upload
-                            media_urls = []
-                            for rec in twilio_recording_urls:
-                                if isinstance(rec,
-                                              dict) and 'recording_url' in rec:
-                                    # Build proper media URL with file format
-                                    file_format = rec.get('file_format', 'wav')
-                                    recording_url = str(
-                                        rec.get('recording_url', ''))
-                                    media_url = f"{recording_url}.{file_format}"
-                                    media_urls.append(media_url)
-                                elif isinstance(rec, str):
-                                    media_urls.append(rec)
-
-                            logger.info(
-                                f"🔗 Extracted {len(media_urls)} media URLs for upload"
-                            )
-
-                            if media_urls:
-                                # Create Twilio auth for secure recording download
-                                twilio_auth = None
-                                if call_data and call_data.get(
-                                        "twilio_account_sid"
-                                ) and call_data.get("twilio_auth_token"):
-                                    twilio_auth = aiohttp.BasicAuth(
-                                        call_data["twilio_account_sid"],
-                                        call_data["twilio_auth_token"])
-
-                                gcp_recording_mapping = await upload_recordings_to_gcp(
-                                    media_urls, actual_call_sid, twilio_auth)
-
-                                # Rebuild recording objects with GCP URLs, preserving metadata
-                                for i, rec in enumerate(twilio_recording_urls):
-                                    if isinstance(
-                                            rec,
-                                            dict) and 'recording_url' in rec:
-                                        recording_url = str(
-                                            rec.get('recording_url', ''))
-                                        file_format = str(
-                                            rec.get('file_format', 'wav'))
-                                        original_url = f"{recording_url}.{file_format}"
-                                        gcp_url = gcp_recording_mapping.get(
-                                            original_url)
-
-                                        # Create updated recording object
-                                        updated_rec = dict(
-                                            rec)  # Explicit dict conversion
-                                        if gcp_url:
-                                            updated_rec[
-                                                'recording_url'] = gcp_url
-                                            updated_rec[
-                                                'source'] = 'gcp_storage'
-                                            webhook_recording_urls.append(
-                                                updated_rec)
-                                            logger.info(
-                                                f"✅ Updated recording {i} with GCP URL"
-                                            )
-                                        else:
-                                            # Fallback to Twilio media URL with source annotation
-                                            updated_rec[
-                                                'recording_url'] = original_url
-                                            updated_rec['source'] = 'twilio'
-                                            webhook_recording_urls.append(
-                                                updated_rec)
-                                            logger.warning(
-                                                f"⚠️ GCP upload failed for recording {i}, using Twilio media URL"
-                                            )
-                                    else:
-                                        webhook_recording_urls.append(rec)
-                            else:
-                                webhook_recording_urls = twilio_recording_urls
-                                logger.warning(
-                                    f"⚠️ No valid media URLs extracted, using original recordings"
-                                )
-                        else:
-                            logger.info(
-                                f"ℹ️ No recordings found for call {actual_call_sid}"
-                            )
-                    else:
-                        logger.warning(
-                            f"⚠️ Could not find Twilio Call SID for call from {from_phone} to {to_phone}"
-                        )
-                else:
-                    logger.warning(
-                        f"⚠️ Missing phone numbers for conversation {conversation_id}"
-                    )
-            else:
-                logger.warning(
-                    f"⚠️ Twilio credentials not found for conversation {conversation_id}"
-                )
+        if not (from_phone and to_phone):
+            logger.warning(
+                f"⚠️ Missing phone numbers for conversation {conversation_id}")
+            return None
+
+        actual_call_sid = await twilio_client.find_call_sid_by_phone_numbers(
+            from_phone, to_phone, call_start_time)
+
+        if actual_call_sid:
+            logger.info(
+                f"✅ Found actual Twilio Call SID: {actual_call_sid} for conversation {conversation_id}"
+            )
         else:
             logger.warning(
-                f"⚠️ No call data found for conversation {conversation_id}, skipping Twilio fetch"
+                f"⚠️ Could not find Twilio Call SID for call from {from_phone} to {to_phone}"
             )
+        return actual_call_sid
+
+    def _estimate_twilio_call_cost(
+            self, conversation_id: str, call_sid: str, call_data: Dict[str, Any],
+            twilio_client: TwilioCostFetcher) -> Optional[Dict[str, Any]]:
+        """Estimate the Twilio cost locally and queue the call for price reconciliation"""
+        call_duration = 0.0
+        call_start_time_str = self.call_start_times.get(conversation_id)
+        if call_start_time_str:
+            call_start_time = datetime.fromisoformat(
+                call_start_time_str.replace('Z', '+00:00'))
+            call_duration = (
+                datetime.utcnow().replace(tzinfo=call_start_time.tzinfo) -
+                call_start_time).total_seconds()
 
-        payload = {
-            "type":
-            "TRANSCRIPT_COMPLETE",
-            "call_id":
-            conversation_id,
-            "full_transcript":
-            full_transcript,
-            "user_tags_found":
-            user_tags_found,
-            "system_tags_found":
-            system_tags_found,
-            "voicemail_detected":
-            is_voicemail_transcript,
-            "usage_metrics_data":
-            usage_metrics_data.to_dict() if usage_metrics_data else None,
-            "ai_services_cost_breakdown":
-            ai_services_cost_breakdown,
-            "total_call_cost_breakdown":
-            _calculate_total_call_cost(ai_services_cost_breakdown,
-                                       twilio_call_cost_data),
-            "recording_urls":
-            webhook_recording_urls,
-            "twilio_call_cost_data":
-            twilio_call_cost_data  # Will be populated if available
-        }
+        cost_data = twilio_client.estimate_call_cost(
+            call_sid,
+            call_duration,
+            from_number=call_data.get("from_phone", ""),
+            to_number=call_data.get("to_phone", ""))
+
+        self.cost_reconciler.register(conversation_id, call_sid,
+                                      twilio_client.account_sid,
+                                      twilio_client.auth_token, cost_data)
+        return cost_data
+
+    async def _upload_call_recordings(
+            self, twilio_recording_urls: List[Any], call_sid: str,
+            call_data: Optional[Dict[str, Any]]) -> List[Any]:
+        """Upload Twilio recordings to GCP and return recording objects for the webhook"""
+        if not twilio_recording_urls:
+            logger.info(f"ℹ️ No recordings found for call {call_sid}")
+            return []
 
-        await self._send_webhook(payload)
+        logger.info(
+            f"🎙️ Processing {len(twilio_recording_urls)} recordings for GCP upload"
+        )
 
-        # Clean up stored data and usage tracking (final cleanup)
-        self.call_tags.pop(event.conversation_id, None)
-        self.call_transcripts.pop(event.conversation_id, None)
-        self.call_sids.pop(event.conversation_id,
-                           None)  # Clean up stored Call SID
-        cost_calculator.cleanup_call(event.conversation_id)
-        usage_tracker.cleanup_call(event.conversation_id)
+        # Extract media URLs from recording objects for upload
+        media_urls = []
+        for rec in twilio_recording_urls:
+            if isinstance(rec, dict) and 'recording_url' in rec:
+                # Build proper media URL with file format
+                file_format = rec.get('file_format', 'wav')
+                recording_url = str(rec.get('recording_url', ''))
+                media_urls.append(f"{recording_url}.{file_format}")
+            elif isinstance(rec, str):
+                media_urls.append(rec)
 
-        # Clean up Vocode usage hook mapping
-        from vocode_usage_hook import vocode_usage_hook
-        vocode_usage_hook.cleanup_conversation(event.conversation_id)
+        logger.info(f"🔗 Extracted {len(media_urls)} media URLs for upload")
 
-        logger.info(
-            f"🧹 Cleaned up data and usage metrics for call {event.conversation_id}"
-        )
+        if not media_urls:
+            logger.warning(
+                f"⚠️ No valid media URLs extracted, using original recordings")
+            return twilio_recording_urls
+
+        # Download through the account's pooled Twilio client
+        twilio_client = twilio_client_registry.get_client_for_call(call_data)
+
+        gcp_recording_mapping = await upload_recordings_to_gcp(
+            media_urls, call_sid, twilio_client=twilio_client)
+
+        # Rebuild recording objects with GCP URLs, preserving metadata
+        webhook_recording_urls = []
+        for i, rec in enumerate(twilio_recording_urls):
+            if isinstance(rec, dict) and 'recording_url' in rec:
+                recording_url = str(rec.get('recording_url', ''))
+                file_format = str(rec.get('file_format', 'wav'))
+                original_url = f"{recording_url}.{file_format}"
+                gcp_url = gcp_recording_mapping.get(original_url)
+
+                # Create updated recording object
+                updated_rec = dict(rec)  # Explicit dict conversion
+                if gcp_url:
+                    updated_rec['recording_url'] = gcp_url
+                    updated_rec['source'] = 'gcp_storage'
+                    # The stored object may have been transcoded
+                    updated_rec['file_format'] = stored_file_format(gcp_url)
+                    logger.info(f"✅ Updated recording {i} with GCP URL")
+                else:
+                    # Fallback to Twilio media URL with source annotation
+                    updated_rec['recording_url'] = original_url
+                    updated_rec['source'] = 'twilio'
+                    logger.warning(
+                        f"⚠️ GCP upload failed for recording {i}, using Twilio media URL"
+                    )
+                webhook_recording_urls.append(updated_rec)
+            else:
+                webhook_recording_urls.append(rec)
+
+        return webhook_recording_urls
 
     async def _handle_live_transcript(self, event: Event):
         """Handle live TRANSCRIPT events and send them immediately as webhooks"""
@@ -762,10 +1010,10 @@ class CustomEventsManager(EventsManager):
             return set()
 
         try:
-            from openai import OpenAI
+            from openai import AsyncOpenAI
 
-            # Initialize OpenAI client
-            openai_client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+            # Initialize async OpenAI client so tag evaluation doesn't block the event loop
+            openai_client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
             if not os.environ.get("OPENAI_API_KEY"):
                 logger.error(
                     "OPENAI_API_KEY environment variable not set. Cannot perform LLM evaluation."
@@ -820,7 +1068,7 @@ Be accurate in your evaluation - look for clear evidence of each concept in the
 
             # Call OpenAI API with proper error handling
             try:
-                response = openai_client.chat.completions.create(
+                response = await openai_client.chat.completions.create(
                     model="gpt-4",
                     messages=[{
                         "role":
@@ -887,10 +1135,43 @@ Be accurate in your evaluation - look for clear evidence of each concept in the
             'user_tags': user_tags or [],
             'system_tags': system_tags or []
         }
+        self.replicate_call_state(conversation_id,
+                                  call_tags=self.call_tags[conversation_id])
         logger.info(
             f"Stored tags for call {conversation_id}: user_tags={user_tags}, system_tags={system_tags}"
         )
 
+    #getting used
+    def store_call_data(self, conversation_id: str, call_data: Dict[str, Any]):
+        """Store phone numbers and Twilio credentials used for Call SID lookup"""
+        self.call_phone_numbers[conversation_id] = call_data
+        self.replicate_call_state(conversation_id, call_data=call_data)
+
+    #getting used
+    def store_call_sid(self,
+                       conversation_id: str,
+                       call_sid: Optional[str],
+                       source: str = "dial") -> bool:
+        """Store the Twilio Call SID for a call so post-call fetches can skip the Calls search"""
+        if not call_sid or not call_sid.startswith("CA"):
+            logger.warning(
+                f"⚠️ Ignoring invalid Call SID from {source} for {conversation_id}: {call_sid}"
+            )
+            return False
+
+        existing_sid = self.call_sids.get(conversation_id)
+        if existing_sid and existing_sid != call_sid:
+            logger.warning(
+                f"⚠️ Call SID mismatch for {conversation_id}: stored={existing_sid}, {source}={call_sid} - keeping stored SID"
+            )
+            return False
+
+        self.call_sids[conversation_id] = call_sid
+        self.replicate_call_state(conversation_id, call_sid=call_sid)
+        logger.info(
+            f"📇 Stored Call SID for {conversation_id} from {source}: {call_sid}")
+        return True
+
     #getting used
     def store_voicemail_config(self,
                                conversation_id: str,
@@ -906,6 +1187,9 @@ Be accurate in your evaluation - look for clear evidence of each concept in the
             "message": message,
             "recording": recording_enabled
         }
+        self.replicate_call_state(
+            conversation_id,
+            voicemail_config=self.voicemail_configs[conversation_id])
 
         logger.info(
             f"📞 Stored voicemail config for {conversation_id}: detection={detection_enabled}, recording={recording_enabled}"
@@ -925,6 +1209,9 @@ Be accurate in your evaluation - look for clear evidence of each concept in the
             'phone_number': phone_number,
             'message': message
         }
+        self.replicate_call_state(
+            conversation_id,
+            transfer_config=self.transfer_configs[conversation_id])
         logger.info(
             f"📞➡️ Stored transfer config for {conversation_id}: enabled={enabled}, phone={phone_number}"
         )
@@ -1297,6 +1584,7 @@ Be accurate in your evaluation - look for clear evidence of each concept in the
 
     async def close(self):
         """Close the HTTP client"""
+        await self.cost_reconciler.stop()
         await self.client.aclose()
 
 
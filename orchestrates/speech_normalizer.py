@@ -0,0 +1,229 @@
+"""
+PERFORMANCE OPTIMIZATION MODULE
+Single-pass speech normalizer shared by the SSML agent wrappers.
+
+Agent text is rewritten before synthesis so prices, email addresses and
+technical dots are spoken properly ("$1.50" -> "1 dollar and 50 cents",
+"john@acme.com" -> "john at acme dot com"). Each language's rule table is
+compiled once into one combined regex, so a sentence costs a single scan instead
+of a dozen re.sub calls.
+
+StreamingSpeechNormalizer applies the same rules to LLM token streams (input
+streaming synthesizers): text is released at word boundaries that no rule can
+span, so an email or price split across tokens is still normalized as a whole.
+"""
+
+import re
+from typing import AsyncGenerator, AsyncIterable, Callable, Dict, List, Literal, Optional, Sequence, Tuple, Union
+
+from sentry_sdk.tracing import Span
+from vocode.streaming.models.actions import FunctionCall, FunctionFragment
+
+Replacement = Union[str, Callable[[Tuple[str, ...]], str]]
+# (pattern, replacement, ignore case)
+Rule = Tuple[str, Replacement, bool]
+
+# Rules only span whitespace after a number or a currency symbol ("12 euros",
+# "$ 5"), so a stream can be cut after any other word
+_JOINS_NEXT_WORD = re.compile(r"[\d€$]\**\s+$")
+_LAST_WORD = re.compile(r"\S+\s*$")
+# Every rule starts with a digit, a currency sign, "@", "." or a letter followed
+# by a separator; checking that first lets the scan skip plain words without
+# trying each alternative
+_RULE_START = r"(?=[\d€$@.]|[a-zA-Z][.,])"
+
+
+def _minor_units(unit: str) -> Replacement:
+    return lambda groups: f"{int(groups[0])} {unit}"
+
+
+def _major_and_minor_units(major: str, minor: str) -> Replacement:
+    return lambda groups: (f"{groups[0]} {major} {int(groups[1])} {minor}"
+                           if int(groups[1]) > 0 else f"{groups[0]} {major}")
+
+
+def _english_dollars_and_cents(groups: Tuple[str, ...]) -> str:
+    dollars, cents = int(groups[0]), int(groups[1])
+    dollar_word = "dollar" if dollars == 1 else "dollars"
+    if cents > 0:
+        return f"{dollars} {dollar_word} and {cents} cents"
+    return f"{dollars} {dollar_word}"
+
+
+def _english_whole_dollars(groups: Tuple[str, ...]) -> str:
+    return f"{groups[0]} {'dollar' if int(groups[0]) == 1 else 'dollars'}"
+
+
+def _symbol_rules(at_word: str, dot_word: str, decimal_separators: str) -> List[Rule]:
+    """@, dots between alphanumerics (emails, URLs, versions) and ellipses"""
+    return [
+        (r"@", f" {at_word} ", False),
+        (rf"([a-zA-Z0-9])[{decimal_separators}]([a-zA-Z0-9])",
+         lambda groups: f"{groups[0]} {dot_word} {groups[1]}", False),
+        (r"\.\.\.", f" {dot_word} {dot_word} {dot_word} ", False),
+    ]
+
+
+def _euro_and_dollar_rules(cents_word: str, dollar_word: str, dollar_cents_word: str) -> List[Rule]:
+    """French/Spanish prices; comma or dot decimal separator"""
+    dollar_words = "dólares?" if dollar_word == "dólares" else "dollars?"
+    return [
+        (r"\b0[.,](\d{1,2})\s*(?:euros?|€)\b", _minor_units(cents_word), True),
+        (r"€\s*0[.,](\d{1,2})\b", _minor_units(cents_word), False),
+        (r"\b0[.,](\d{1,2})\s*€", _minor_units(cents_word), False),
+        (r"\b(\d+)[.,](\d{2})\s*(?:euros?|€)\b", _major_and_minor_units("euros", cents_word), True),
+        (r"€\s*(\d+)[.,](\d{2})\b", _major_and_minor_units("euros", cents_word), False),
+        (r"\b(\d+)\s*(?:euros?|€)\b", lambda groups: f"{groups[0]} euros", True),
+        (rf"\b0[.,](\d{{1,2}})\s*(?:{dollar_words}|\$)\b", _minor_units(dollar_cents_word), True),
+        (r"\$\s*0[.,](\d{1,2})\b", _minor_units(dollar_cents_word), False),
+        (rf"\b(\d+)[.,](\d{{2}})\s*(?:{dollar_words}|\$)\b",
+         _major_and_minor_units(dollar_word, dollar_cents_word), True),
+        (r"\$\s*(\d+)[.,](\d{2})\b", _major_and_minor_units(dollar_word, dollar_cents_word), False),
+    ]
+
+
+# Rule order matters: earlier rules win where two could match at the same place
+LANGUAGE_RULES: Dict[str, List[Rule]] = {
+    "en": [
+        (r"\b0\.(\d{1,2})\s*(?:dollars?)\b", _minor_units("cents"), True),
+        (r"\$\s*0\.(\d{1,2})\b", _minor_units("cents"), False),
+        # A "$" followed by a number prefixes that number, not this one
+        (r"\b0\.(\d{1,2})\s*\$(?!\s*\d)", _minor_units("cents"), False),
+        (r"\$\s*(\d+)\.(\d{2})\b", _english_dollars_and_cents, False),
+        (r"\b(\d+)\.(\d{2})\s*(?:dollars?)\b", _english_dollars_and_cents, True),
+        (r"\b(\d+)\.(\d{2})\s*\$(?!\s*\d)", _english_dollars_and_cents, False),
+        (r"\$\s*(\d+)\b(?!\.)", _english_whole_dollars, False),
+        (r"\b(\d+)\s*(?:dollars?)\b", _english_whole_dollars, True),
+        *_symbol_rules("at", "dot", "."),
+    ],
+    "fr": [
+        *_euro_and_dollar_rules("centimes", "dollars", "cents"),
+        *_symbol_rules("arobase", "point", ".,"),
+    ],
+    "es": [
+        *_euro_and_dollar_rules("céntimos", "dólares", "centavos"),
+        *_symbol_rules("arroba", "punto", ".,"),
+    ],
+}
+
+
+class SpeechNormalizer:
+    """One language's rule table, compiled into a single alternation"""
+
+    def __init__(self, language: str, rules: Sequence[Rule]):
+        self.language = language
+        alternatives = []
+        # Outer group index -> (slice of the rule's own groups, replacement)
+        self._replacements: Dict[int, Tuple[slice, Replacement]] = {}
+        group_index = 0
+        for pattern, replacement, ignore_case in rules:
+            rule_groups = re.compile(pattern).groups
+            group_index += 1
+            self._replacements[group_index] = (
+                slice(group_index, group_index + rule_groups), replacement)
+            group_index += rule_groups
+            alternatives.append(f"((?i:{pattern}))" if ignore_case else f"({pattern})")
+        self._pattern = re.compile(f"{_RULE_START}(?:{'|'.join(alternatives)})")
+
+    def _replace(self, match: "re.Match[str]") -> str:
+        groups, replacement = self._replacements[match.lastindex]
+        if isinstance(replacement, str):
+            return replacement
+        return replacement(match.groups()[groups])
+
+    def _apply_rules(self, text: str) -> str:
+        return self._pattern.sub(self._replace, text.replace("*", ""))
+
+    def normalize(self, text: str) -> str:
+        """Spoken form of a complete message, with whitespace collapsed"""
+        if not text:
+            return text
+        return " ".join(self._apply_rules(text).split())
+
+    def stream(self) -> "StreamingSpeechNormalizer":
+        return StreamingSpeechNormalizer(self)
+
+
+class StreamingSpeechNormalizer:
+    """Normalizes a token stream, holding back only words a rule could still extend"""
+
+    def __init__(self, normalizer: SpeechNormalizer):
+        self._normalizer = normalizer
+        self._buffer = ""
+
+    def _safe_cut(self) -> int:
+        """Longest buffer prefix, ending in whitespace, that no rule can span out of"""
+        cut = len(self._buffer)
+        if not self._buffer[-1:].isspace():
+            # The last word may still be growing
+            last_word = _LAST_WORD.search(self._buffer)
+            cut = last_word.start() if last_word else 0
+        while cut > 0 and _JOINS_NEXT_WORD.search(self._buffer, 0, cut):
+            last_word = _LAST_WORD.search(self._buffer, 0, cut)
+            cut = last_word.start() if last_word else 0
+        return cut
+
+    def feed(self, token: str) -> str:
+        """Add LLM text; returns normalized text that is safe to speak now (may be empty)"""
+        self._buffer += token
+        cut = self._safe_cut()
+        if cut == 0:
+            return ""
+        ready, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        normalized = " ".join(self._normalizer._apply_rules(ready).split())
+        return normalized + " " if normalized else ""
+
+    def flush(self) -> str:
+        """Normalized remainder at the end of the response"""
+        remainder, self._buffer = self._buffer, ""
+        return self._normalizer.normalize(remainder)
+
+
+_NORMALIZERS: Dict[str, SpeechNormalizer] = {
+    language: SpeechNormalizer(language, rules)
+    for language, rules in LANGUAGE_RULES.items()
+}
+
+
+def get_speech_normalizer(language: str) -> SpeechNormalizer:
+    """Shared normalizer for a language (English rules for anything unsupported)"""
+    return _NORMALIZERS.get(language.lower(), _NORMALIZERS["en"])
+
+
+async def stream_normalized_async(
+    conversation_id: str,
+    gen: AsyncIterable[Union[str, FunctionFragment]],
+    normalizer: SpeechNormalizer,
+    get_functions: Literal[True, False] = False,
+    sentry_span: Optional[Span] = None,
+) -> AsyncGenerator[Union[str, FunctionCall], None]:
+    """
+    Drop-in for vocode's stream_response_async that yields normalized text.
+
+    vocode's version splits after punctuation and appends a space ("acme." +
+    " com"), which breaks emails and prices before they can be normalized; this one
+    only splits where StreamingSpeechNormalizer says it is safe.
+    """
+    stream = normalizer.stream()
+    function_name_buffer = ""
+    function_args_buffer = ""
+    is_first = True
+    async for token in gen:
+        if is_first:
+            if sentry_span:
+                sentry_span.finish()
+            is_first = False
+        if not token:
+            continue
+        if isinstance(token, str):
+            ready = stream.feed(token)
+            if ready:
+                yield ready
+        elif isinstance(token, FunctionFragment):
+            function_name_buffer += token.name
+            function_args_buffer += token.arguments
+    remainder = stream.flush()
+    if remainder:
+        yield remainder + " "
+    if function_name_buffer and get_functions:
+        yield FunctionCall(name=function_name_buffer, arguments=function_args_buffer)
@@ -0,0 +1,102 @@
+"""
+Speech Normalizer Golden Check and Benchmark
+
+Checks the normalizer against speech_normalizer_golden.json (outputs of the
+original per-rule re.sub implementation), both on whole messages and on the same
+text fed as random LLM-sized token chunks, then reports throughput.
+
+Usage: python speech_normalizer_benchmark.py --repeats 200
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from speech_normalizer import get_speech_normalizer
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "speech_normalizer_golden.json")
+
+
+def _token_chunks(text: str, rng: random.Random) -> List[str]:
+    chunks = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 6)
+        chunks.append(text[position:position + size])
+        position += size
+    return chunks
+
+
+def check_golden(cases: List[Dict[str, str]], stream_trials: int) -> int:
+    failures = 0
+    rng = random.Random(0)
+    for case in cases:
+        normalizer = get_speech_normalizer(case["language"])
+        actual = normalizer.normalize(case["text"])
+        if actual != case["expected"]:
+            failures += 1
+            print(f"❌ [{case['language']}] {case['text']!r}\n   expected {case['expected']!r}\n   got      {actual!r}")
+            continue
+        for _ in range(stream_trials):
+            chunks = _token_chunks(case["text"], rng)
+            stream = normalizer.stream()
+            streamed = "".join(stream.feed(chunk) for chunk in chunks) + stream.flush()
+            if streamed.rstrip() != case["expected"]:
+                failures += 1
+                print(f"❌ [{case['language']}] streamed as {chunks!r}\n   expected {case['expected']!r}\n   got      {streamed!r}")
+                break
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--stream-trials", type=int, default=50)
+    args = parser.parse_args()
+
+    with open(GOLDEN_PATH, encoding="utf-8") as golden_file:
+        cases = json.load(golden_file)
+
+    failures = check_golden(cases, args.stream_trials)
+    if failures:
+        raise SystemExit(f"❌ {failures} golden case(s) failed")
+    print(f"✅ {len(cases)} golden cases match (whole messages and token streams)")
+
+    texts_by_language = defaultdict(list)
+    for case in cases:
+        if case["text"]:
+            texts_by_language[case["language"]].append(case["text"])
+
+    print(f"{'language':>8} {'messages/s':>12} {'chars/s':>12} {'streamed chars/s':>18}")
+    for language, texts in texts_by_language.items():
+        normalizer = get_speech_normalizer(language)
+        characters = sum(len(text) for text in texts) * args.repeats
+
+        started = time.perf_counter()
+        for _ in range(args.repeats):
+            for text in texts:
+                normalizer.normalize(text)
+        elapsed = time.perf_counter() - started
+
+        # Word-sized tokens, like an LLM stream
+        tokenized = [[word + " " for word in text.split(" ")] for text in texts]
+        started = time.perf_counter()
+        for _ in range(args.repeats):
+            for tokens in tokenized:
+                stream = normalizer.stream()
+                for token in tokens:
+                    stream.feed(token)
+                stream.flush()
+        streamed_elapsed = time.perf_counter() - started
+
+        print(f"{language:>8} {len(texts) * args.repeats / elapsed:>12.0f} "
+              f"{characters / elapsed:>12.0f} {characters / streamed_elapsed:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,15 @@
 """
 SSML Agent Wrapper for proper pronunciation of special characters
 """
-import re
 from typing import AsyncGenerator, Optional
 from vocode.streaming.agent.chat_gpt_agent import ChatGPTAgent
 from vocode.streaming.models.agent import ChatGPTAgentConfig
-from vocode.streaming.models.message import BaseMessage, SSMLMessage
+from vocode.streaming.models.message import BaseMessage, LLMToken, SSMLMessage
 from vocode.streaming.agent.base_agent import GeneratedResponse, StreamedResponse
 from loguru import logger
 
+from speech_normalizer import get_speech_normalizer
+
 
 class SSMLChatGPTAgent(ChatGPTAgent):
     """
@@ -25,6 +26,7 @@ class SSMLChatGPTAgent(ChatGPTAgent):
         """Initialize the SSML agent wrapper."""
         super().__init__(agent_config=agent_config, **kwargs)
         self.language = language.lower()
+        self.speech_normalizer = get_speech_normalizer(self.language)
         logger.info(f"🎤 SSML Agent initialized for language: {self.language}")
     
     def add_ssml_pronunciation(self, text: str) -> str:
@@ -38,116 +40,7 @@ class SSMLChatGPTAgent(ChatGPTAgent):
         Returns:
             Text with SSML tags for special characters
         """
-        if not text:
-            return text
-        
-        # Remove asterisks completely (don't speak them)
-        text = text.replace("*", "")
-        
-        # Language-specific transformations
-        if self.language == "fr":
-            # French-specific transformations
-            # Convert prices BEFORE converting dots - handle both comma and dot as decimal separator
-            # Pattern for 0.XX or 0,XX euros/dollars
-            text = re.sub(r'\b0[.,](\d{1,2})\s*(?:euros?|€)\b', 
-                          lambda m: f"{int(m.group(1))} centimes", text, flags=re.IGNORECASE)
-            text = re.sub(r'€\s*0[.,](\d{1,2})\b', 
-                          lambda m: f"{int(m.group(1))} centimes", text)
-            text = re.sub(r'\b0[.,](\d{1,2})\s*€', 
-                          lambda m: f"{int(m.group(1))} centimes", text)
-            
-            # Handle larger euro amounts (e.g., 100 euros, 50€)
-            text = re.sub(r'\b(\d+)[.,](\d{2})\s*(?:euros?|€)\b',
-                          lambda m: f"{m.group(1)} euros {int(m.group(2))} centimes" if int(m.group(2)) > 0 else f"{m.group(1)} euros", text, flags=re.IGNORECASE)
-            text = re.sub(r'€\s*(\d+)[.,](\d{2})\b',
-                          lambda m: f"{m.group(1)} euros {int(m.group(2))} centimes" if int(m.group(2)) > 0 else f"{m.group(1)} euros", text)
-            text = re.sub(r'\b(\d+)\s*(?:euros?|€)\b',
-                          lambda m: f"{m.group(1)} euros", text, flags=re.IGNORECASE)
-            
-            # Handle dollars for French
-            text = re.sub(r'\b0[.,](\d{1,2})\s*(?:dollars?|\$)\b', 
-                          lambda m: f"{int(m.group(1))} cents", text, flags=re.IGNORECASE)
-            text = re.sub(r'\$\s*0[.,](\d{1,2})\b', 
-                          lambda m: f"{int(m.group(1))} cents", text)
-            text = re.sub(r'\b(\d+)[.,](\d{2})\s*(?:dollars?|\$)\b',
-                          lambda m: f"{m.group(1)} dollars {int(m.group(2))} cents" if int(m.group(2)) > 0 else f"{m.group(1)} dollars", text, flags=re.IGNORECASE)
-            text = re.sub(r'\$\s*(\d+)[.,](\d{2})\b',
-                          lambda m: f"{m.group(1)} dollars {int(m.group(2))} cents" if int(m.group(2)) > 0 else f"{m.group(1)} dollars", text)
-            
-            # Replace @ with "arobase" (French term for @)
-            text = text.replace("@", " arobase ")
-            
-            # Replace dots in technical contexts with "point"
-            def replace_dot_fr(match):
-                return f"{match.group(1)} point {match.group(2)}"
-            
-            text = re.sub(r'([a-zA-Z0-9])[.,]([a-zA-Z0-9])', replace_dot_fr, text)
-            text = text.replace("...", " point point point ")
-            
-        elif self.language == "es":
-            # Spanish-specific transformations
-            # Convert prices BEFORE converting dots - handle both comma and dot as decimal separator
-            # Pattern for 0.XX or 0,XX euros/dollars
-            text = re.sub(r'\b0[.,](\d{1,2})\s*(?:euros?|€)\b', 
-                          lambda m: f"{int(m.group(1))} céntimos", text, flags=re.IGNORECASE)
-            text = re.sub(r'€\s*0[.,](\d{1,2})\b', 
-                          lambda m: f"{int(m.group(1))} céntimos", text)
-            text = re.sub(r'\b0[.,](\d{1,2})\s*€', 
-                          lambda m: f"{int(m.group(1))} céntimos", text)
-            
-            # Handle larger euro amounts (e.g., 100 euros, 50€)
-            text = re.sub(r'\b(\d+)[.,](\d{2})\s*(?:euros?|€)\b',
-                          lambda m: f"{m.group(1)} euros {int(m.group(2))} céntimos" if int(m.group(2)) > 0 else f"{m.group(1)} euros", text, flags=re.IGNORECASE)
-            text = re.sub(r'€\s*(\d+)[.,](\d{2})\b',
-                          lambda m: f"{m.group(1)} euros {int(m.group(2))} céntimos" if int(m.group(2)) > 0 else f"{m.group(1)} euros", text)
-            text = re.sub(r'\b(\d+)\s*(?:euros?|€)\b',
-                          lambda m: f"{m.group(1)} euros", text, flags=re.IGNORECASE)
-            
-            # Handle dollars for Spanish
-            text = re.sub(r'\b0[.,](\d{1,2})\s*(?:dólares?|\$)\b', 
-                          lambda m: f"{int(m.group(1))} centavos", text, flags=re.IGNORECASE)
-            text = re.sub(r'\$\s*0[.,](\d{1,2})\b', 
-                          lambda m: f"{int(m.group(1))} centavos", text)
-            text = re.sub(r'\b(\d+)[.,](\d{2})\s*(?:dólares?|\$)\b',
-                          lambda m: f"{m.group(1)} dólares {int(m.group(2))} centavos" if int(m.group(2)) > 0 else f"{m.group(1)} dólares", text, flags=re.IGNORECASE)
-            text = re.sub(r'\$\s*(\d+)[.,](\d{2})\b',
-                          lambda m: f"{m.group(1)} dólares {int(m.group(2))} centavos" if int(m.group(2)) > 0 else f"{m.group(1)} dólares", text)
-            
-            # Replace @ with "arroba" (Spanish term for @)
-            text = text.replace("@", " arroba ")
-            
-            # Replace dots in technical contexts with "punto"
-            def replace_dot_es(match):
-                return f"{match.group(1)} punto {match.group(2)}"
-            
-            text = re.sub(r'([a-zA-Z0-9])[.,]([a-zA-Z0-9])', replace_dot_es, text)
-            text = text.replace("...", " punto punto punto ")
-            
-        else:
-            # English (default) transformations
-            # Convert prices BEFORE converting dots
-            text = re.sub(r'\b0\.(\d{1,2})\s*(?:dollars?)\b', 
-                          lambda m: f"{int(m.group(1))} cents", text, flags=re.IGNORECASE)
-            text = re.sub(r'\$\s*0\.(\d{1,2})\b', 
-                          lambda m: f"{int(m.group(1))} cents", text)
-            text = re.sub(r'\b0\.(\d{1,2})\s*\$', 
-                          lambda m: f"{int(m.group(1))} cents", text)
-            
-            # Replace @ with "at"
-            text = text.replace("@", " at ")
-            
-            # Replace dots in technical contexts
-            def replace_dot_in_technical_context(match):
-                return f"{match.group(1)} dot {match.group(2)}"
-            
-            text = re.sub(r'([a-zA-Z0-9])\.([a-zA-Z0-9])', replace_dot_in_technical_context, text)
-            text = text.replace("...", " dot dot dot ")
-        
-        # Clean up any double spaces (common to all languages)
-        text = re.sub(r'\s+', ' ', text)
-        text = text.strip()
-        
-        return text
+        return self.speech_normalizer.normalize(text)
     
     def wrap_in_ssml(self, text: str) -> str:
         """
@@ -179,6 +72,9 @@ class SSMLChatGPTAgent(ChatGPTAgent):
         
         This method intercepts the original response and adds SSML tags.
         """
+        # Streamed tokens are normalized as a stream, so an email or price split
+        # across tokens is still recognized
+        token_stream = self.speech_normalizer.stream()
         # Call the parent's generate_response method
         async for response in super().generate_response(
             human_input=human_input,
@@ -186,8 +82,12 @@ class SSMLChatGPTAgent(ChatGPTAgent):
             is_interrupt=is_interrupt,
             bot_was_in_medias_res=bot_was_in_medias_res,
         ):
+            if isinstance(response.message, LLMToken):
+                response.message.text = token_stream.feed(response.message.text)
+                if not response.message.text:
+                    continue
             # Process BaseMessage responses to add SSML
-            if isinstance(response.message, BaseMessage):
+            elif isinstance(response.message, BaseMessage):
                 original_text = response.message.text
                 processed_text = self.wrap_in_ssml(original_text)
                 
@@ -199,3 +99,8 @@ class SSMLChatGPTAgent(ChatGPTAgent):
                 response.message.text = processed_text
             
             yield response
+
+        remainder = token_stream.flush()
+        if remainder:
+            yield StreamedResponse(message=LLMToken(text=remainder + " "),
+                                   is_interruptible=True)
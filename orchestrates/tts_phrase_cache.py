@@ -0,0 +1,272 @@
+"""
+PERFORMANCE OPTIMIZATION MODULE
+Persistent per-voice cache of synthesized audio for fixed agent phrases.
+
+Every call re-synthesizes the same strings - the initial message, cut-off
+responses, the goodbye and transfer lines, idle checks, the voicemail message.
+Phrases registered here are rendered once per voice; later calls play the
+cached mulaw audio with no TTS round trip and no per-character cost.
+
+Audio is keyed by (provider, voice, model, speed, other voice settings,
+normalized text) and kept in an in-memory LRU backed by an on-disk LRU, both
+size-limited. Free-form LLM answers are never cached.
+"""
+
+import os
+import asyncio
+import hashlib
+import logging
+import re
+import tempfile
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Dict, Iterable, Optional
+
+from vocode import conversation_id as ctx_conversation_id
+from vocode.streaming.models.audio import AudioEncoding
+from vocode.streaming.models.message import BaseMessage, LLMToken, SilenceMessage
+from vocode.streaming.models.synthesizer import SynthesizerConfig
+from vocode.streaming.synthesizer.base_synthesizer import BaseSynthesizer, CachedAudio, SynthesisResult
+from vocode.streaming.synthesizer.default_factory import DefaultSynthesizerFactory
+from vocode.streaming.synthesizer.input_streaming_synthesizer import InputStreamingSynthesizer
+
+from unified_cost_tracker import unified_cost_tracker
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+def normalize_phrase(text: str) -> str:
+    return " ".join(text.split())
+
+
+def phrase_key(synthesizer_config: SynthesizerConfig, text: str) -> str:
+    """Cache key for a phrase in one voice; any setting that changes the audio changes the key"""
+    provider = synthesizer_config.type
+    voice = next((str(getattr(synthesizer_config, field))
+                  for field in ("voice_id", "speaker", "voice", "voice_name")
+                  if getattr(synthesizer_config, field, None)), "")
+    model = str(getattr(synthesizer_config, "model_id", "") or "")
+    speed = next((str(getattr(synthesizer_config, field))
+                  for field in ("speed", "speed_alpha", "speaking_rate", "rate")
+                  if getattr(synthesizer_config, field, None) is not None), "")
+    settings = synthesizer_config.json(exclude={"api_key"}, sort_keys=True)
+    material = "\x1f".join((provider, voice, model, speed, settings, normalize_phrase(text)))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TTSPhraseCache:
+    """Registered phrases and their rendered audio (memory LRU over disk LRU)"""
+
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 memory_limit_bytes: Optional[int] = None,
+                 disk_limit_bytes: Optional[int] = None,
+                 max_registered_phrases: Optional[int] = None):
+        self.enabled = os.environ.get("TTS_PHRASE_CACHE_ENABLED", "true").lower() == "true"
+        self.cache_dir = cache_dir or os.environ.get(
+            "TTS_PHRASE_CACHE_DIR",
+            os.path.join(tempfile.gettempdir(), "orchestrates_tts_cache"))
+        self.memory_limit_bytes = memory_limit_bytes or int(
+            float(os.environ.get("TTS_PHRASE_CACHE_MEMORY_MB", "64")) * 1024 * 1024)
+        self.disk_limit_bytes = disk_limit_bytes or int(
+            float(os.environ.get("TTS_PHRASE_CACHE_DISK_MB", "512")) * 1024 * 1024)
+        self.max_registered_phrases = max_registered_phrases or int(
+            os.environ.get("TTS_PHRASE_CACHE_MAX_PHRASES", "10000"))
+
+        # Normalized phrase -> None, oldest registration first
+        self._phrases: "OrderedDict[str, None]" = OrderedDict()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        # key -> file size, least recently used first
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "characters_saved": 0
+        }
+        if self.enabled:
+            self._load_disk_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.ulaw")
+
+    def _load_disk_index(self):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".ulaw"):
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                    entries.append((stat.st_mtime, name[:-len(".ulaw")], stat.st_size))
+        except OSError as e:
+            logger.warning(f"⚠️ TTS phrase cache directory unavailable, using memory only: {e}")
+            self.cache_dir = ""
+            return
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        if entries:
+            logger.info(
+                f"🔊 TTS phrase cache: {len(entries)} phrases on disk ({self._disk_bytes / 1024 / 1024:.1f}MB)")
+
+    def register_phrases(self, texts: Iterable[Optional[str]]):
+        """Mark texts (and each of their sentences) as fixed phrases worth caching"""
+        for text in texts:
+            if not text:
+                continue
+            phrase = normalize_phrase(text)
+            for part in {phrase, *_SENTENCE_BOUNDARY.split(phrase)}:
+                if part:
+                    self._phrases[part] = None
+                    self._phrases.move_to_end(part)
+        while len(self._phrases) > self.max_registered_phrases:
+            self._phrases.popitem(last=False)
+
+    def is_fixed_phrase(self, text: str) -> bool:
+        return self.enabled and normalize_phrase(text) in self._phrases
+
+    def _remember(self, key: str, audio: bytes):
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.memory_limit_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _read_file(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as audio_file:
+                audio = audio_file.read()
+            os.utime(path)
+            return audio
+        except OSError:
+            return None
+
+    def _write_file(self, key: str, audio: bytes):
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as audio_file:
+            audio_file.write(audio)
+        os.replace(temp_path, path)
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.disk_limit_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self.stats["evictions"] += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    async def get(self, key: str) -> Optional[bytes]:
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return audio
+        if self.cache_dir and key in self._disk:
+            audio = await asyncio.to_thread(self._read_file, key)
+            if audio is not None:
+                self._disk.move_to_end(key)
+                self._remember(key, audio)
+                self.stats["disk_hits"] += 1
+                return audio
+            self._disk_bytes -= self._disk.pop(key)
+        self.stats["misses"] += 1
+        return None
+
+    async def store(self, key: str, audio: bytes):
+        if not audio:
+            return
+        self._remember(key, audio)
+        self.stats["stores"] += 1
+        if not self.cache_dir:
+            return
+        try:
+            await asyncio.to_thread(self._write_file, key, audio)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not persist TTS phrase audio: {e}")
+            return
+        self._disk_bytes += len(audio) - self._disk.pop(key, 0)
+        self._disk[key] = len(audio)
+        self._evict_disk()
+
+    async def _recording(self, key: str, chunk_generator: AsyncGenerator[SynthesisResult.ChunkResult, None]):
+        """Pass audio through and cache it once the phrase has been fully synthesized"""
+        chunks = []
+        async for chunk_result in chunk_generator:
+            chunks.append(chunk_result.chunk)
+            yield chunk_result
+        # Only reached if nobody stopped listening (an interrupted phrase is incomplete)
+        await self.store(key, b"".join(chunks))
+
+    def install(self, synthesizer: BaseSynthesizer, call_id: Optional[str]) -> BaseSynthesizer:
+        """Serve this synthesizer's fixed phrases from the cache"""
+        config = synthesizer.get_synthesizer_config()
+        if (isinstance(synthesizer, InputStreamingSynthesizer)
+                or config.audio_encoding != AudioEncoding.MULAW or config.should_encode_as_wav):
+            return synthesizer
+        create_speech = synthesizer.create_speech
+
+        async def create_speech_with_phrase_cache(message: BaseMessage,
+                                                  chunk_size: int,
+                                                  is_first_text_chunk: bool = False,
+                                                  is_sole_text_chunk: bool = False) -> SynthesisResult:
+            if (isinstance(message, (SilenceMessage, LLMToken))
+                    or not self.is_fixed_phrase(message.text)):
+                return await create_speech(message, chunk_size,
+                                           is_first_text_chunk=is_first_text_chunk,
+                                           is_sole_text_chunk=is_sole_text_chunk)
+            key = phrase_key(config, message.text)
+            audio = await self.get(key)
+            unified_cost_tracker.add_synthesis_cache_result(call_id, len(message.text),
+                                                            hit=audio is not None)
+            if audio is not None:
+                self.stats["characters_saved"] += len(message.text)
+                return CachedAudio(message, audio, config).create_synthesis_result(chunk_size)
+            result = await create_speech(message, chunk_size,
+                                         is_first_text_chunk=is_first_text_chunk,
+                                         is_sole_text_chunk=is_sole_text_chunk)
+            result.chunk_generator = self._recording(key, result.chunk_generator)
+            return result
+
+        synthesizer.create_speech = create_speech_with_phrase_cache
+        return synthesizer
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "hit_rate": round(hits / lookups * 100.0, 2) if lookups else 0.0,
+            "registered_phrases": len(self._phrases),
+            "memory_entries": len(self._memory),
+            "memory_mb": round(self._memory_bytes / 1024 / 1024, 2),
+            "disk_entries": len(self._disk),
+            "disk_mb": round(self._disk_bytes / 1024 / 1024, 2)
+        }
+
+
+class PhraseCachingSynthesizerFactory(DefaultSynthesizerFactory):
+    """vocode's synthesizer factory, with fixed phrases served from the TTS phrase cache"""
+
+    def create_synthesizer(self, synthesizer_config: SynthesizerConfig):
+        synthesizer = super().create_synthesizer(synthesizer_config)
+        if not tts_phrase_cache.enabled:
+            return synthesizer
+        # Phone conversations set the conversation id right before creating the synthesizer
+        return tts_phrase_cache.install(synthesizer, ctx_conversation_id.value)
+
+
+# Global instance
+tts_phrase_cache = TTSPhraseCache()
@@ -3,25 +3,40 @@ Twilio Cost Fetcher
 
 This module provides functionality to fetch real call costs from Twilio's REST API
 using the Call SID after a call has been completed.
+
+Clients are pooled per Twilio account in ``twilio_client_registry``. Each client keeps
+a persistent keep-alive session, bounds its concurrent requests and backs off on
+HTTP 429 responses; idle clients are evicted by the registry.
 """
 
 import os
 import asyncio
 import aiohttp
 import logging
-from typing import Optional, Dict, Any, List
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
 from datetime import datetime, timedelta
 import time
 
 logger = logging.getLogger(__name__)
 
+# Overridable to point at a local fake (fake_twilio_server.py) in tests and benchmarks
+TWILIO_API_HOST = os.environ.get("TWILIO_API_HOST", "https://api.twilio.com")
+TWILIO_API_BASE_URL = f"{TWILIO_API_HOST}/2010-04-01/Accounts"
 
-class TwilioCostFetcher:
-    """Fetches real call costs from Twilio REST API"""
 
-    def __init__(self):
-        self.account_sid = os.environ.get("TWILIO_ACCOUNT_SID")
-        self.auth_token = os.environ.get("TWILIO_AUTH_TOKEN")
+class TwilioCostFetcher:
+    """Fetches real call costs from Twilio REST API for a single Twilio account"""
+
+    def __init__(self,
+                 account_sid: Optional[str] = None,
+                 auth_token: Optional[str] = None,
+                 max_concurrency: int = 10,
+                 max_rate_limit_retries: int = 3,
+                 request_timeout: float = 15.0,
+                 stream_read_timeout: float = 30.0):
+        self.account_sid = account_sid or os.environ.get("TWILIO_ACCOUNT_SID")
+        self.auth_token = auth_token or os.environ.get("TWILIO_AUTH_TOKEN")
 
         if not self.account_sid or not self.auth_token:
             logger.warning(
@@ -30,18 +45,120 @@ class TwilioCostFetcher:
 
         # Twilio API base URL
         if self.account_sid:
-            self.base_url = f"https://api.twilio.com/2010-04-01/Accounts/{self.account_sid}"
+            self.base_url = f"{TWILIO_API_BASE_URL}/{self.account_sid}"
         else:
             self.base_url = None
 
-    def configure_credentials(self, account_sid: str, auth_token: str):
-        """Configure Twilio credentials from call payload"""
-        self.account_sid = account_sid
-        self.auth_token = auth_token
-        self.base_url = f"https://api.twilio.com/2010-04-01/Accounts/{account_sid}"
-        logger.info(
-            f"✅ Configured Twilio credentials for cost fetching: {account_sid[:8]}..."
-        )
+        self.max_concurrency = max_concurrency
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.request_timeout = request_timeout
+        # Streamed bodies (recordings) can take as long as the consumer needs to pipe
+        # them into GCS or ffmpeg - only connecting and each read are bounded
+        self.stream_timeout = aiohttp.ClientTimeout(total=None,
+                                                    sock_connect=request_timeout,
+                                                    sock_read=stream_read_timeout)
+
+        # PERFORMANCE OPTIMIZATION: One keep-alive session per account, created lazily
+        # inside the running event loop, with bounded concurrency
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        # Set whenever no request is in flight; lets a retired client close cleanly
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the persistent session for this account, creating it if needed"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency,
+                                             keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                auth=aiohttp.BasicAuth(self.account_sid, self.auth_token),
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout))
+        return self._session
+
+    def _retry_after_seconds(self, response: aiohttp.ClientResponse,
+                             attempt: int) -> float:
+        """Delay before retrying a rate-limited request"""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+        return min(8.0, 0.5 * (2**attempt))
+
+    @asynccontextmanager
+    async def stream(self, url: str, params: Optional[Dict[str, Any]] = None,
+                     timeout: Optional[aiohttp.ClientTimeout] = None):
+        """
+        Open a GET request on the pooled session and yield the response.
+
+        Concurrency is bounded per account and HTTP 429 responses are retried
+        with Retry-After aware backoff before the response is handed out. The
+        body has no total deadline unless a timeout is given (see stream_timeout).
+        """
+        session = self._get_session()
+        for attempt in range(self.max_rate_limit_retries + 1):
+            await self._semaphore.acquire()
+            self.in_flight += 1
+            self._idle.clear()
+            self.last_used = time.monotonic()
+            retry_delay = None
+            try:
+                async with session.get(url, params=params,
+                                       timeout=timeout or self.stream_timeout) as response:
+                    if (response.status == 429
+                            and attempt < self.max_rate_limit_retries):
+                        retry_delay = self._retry_after_seconds(
+                            response, attempt)
+                    else:
+                        yield response
+                        return
+            finally:
+                self.in_flight -= 1
+                if self.in_flight == 0:
+                    self._idle.set()
+                self.last_used = time.monotonic()
+                self._semaphore.release()
+
+            # Back off outside the semaphore so other requests can proceed
+            logger.warning(
+                f"⏳ Twilio rate limit hit for {self.account_sid[:8]}..., retrying in {retry_delay:.1f}s (attempt {attempt + 1}/{self.max_rate_limit_retries})"
+            )
+            await asyncio.sleep(retry_delay)
+
+    async def _get(self,
+                   url: str,
+                   params: Optional[Dict[str, Any]] = None) -> Tuple[int, Any]:
+        """GET a Twilio API resource, returning (status, parsed JSON or error text)"""
+        async with self.stream(url, params=params,
+                               timeout=aiohttp.ClientTimeout(total=self.request_timeout)) as response:
+            if response.status == 200:
+                return response.status, await response.json()
+            return response.status, await response.text()
+
+    @property
+    def is_idle(self) -> bool:
+        return self.in_flight == 0
+
+    async def close(self):
+        """Close the pooled session"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def close_when_idle(self, grace_seconds: float):
+        """Close the session once in-flight requests finish, or after grace_seconds"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), grace_seconds)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"⚠️ Closing retired Twilio client for {self.account_sid[:8]}... with {self.in_flight} requests still in flight"
+            )
+        await self.close()
 
     async def fetch_recording_urls(self, call_sid: str) -> List[str]:
         """
@@ -63,57 +180,67 @@ class TwilioCostFetcher:
             return []
 
         url = f"{self.base_url}/Calls/{call_sid}/Recordings.json"
-        auth = aiohttp.BasicAuth(self.account_sid, self.auth_token)
 
         logger.info(
             f"🎙️ Fetching recording URLs for call {call_sid} from Twilio API..."
         )
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, auth=auth) as response:
-                    if response.status == 200:
-                        recordings_data = await response.json()
-                        recordings = recordings_data.get('recordings', [])
-
-                        if recordings:
-                            recording_urls = []
-                            for recording in recordings:
-                                recording_sid = recording.get('sid', '')
-                                if recording_sid:
-                                    # Construct media URL for recording download
-                                    recording_url = f"{self.base_url}/Recordings/{recording_sid}"
-                                    recording_urls.append({
-                                        "recording_sid":
-                                        recording_sid,
-                                        "recording_url":
-                                        recording_url,
-                                        "duration":
-                                        recording.get('duration', '0'),
-                                        "channels":
-                                        recording.get('channels', 1),
-                                        "file_format":
-                                        "wav"
-                                    })
-
-                            logger.info(
-                                f"✅ Found {len(recording_urls)} recordings for call {call_sid}"
-                            )
-                            return recording_urls
-                        else:
-                            logger.info(
-                                f"📭 No recordings found for call {call_sid}")
-                            return []
-                    else:
-                        logger.error(
-                            f"❌ Failed to fetch recordings: HTTP {response.status}"
-                        )
-                        return []
+            status, recordings_data = await self._get(url)
+            if status == 200:
+                recordings = recordings_data.get('recordings', [])
+
+                if recordings:
+                    recording_urls = []
+                    for recording in recordings:
+                        recording_sid = recording.get('sid', '')
+                        if recording_sid:
+                            # Construct media URL for recording download
+                            recording_url = f"{self.base_url}/Recordings/{recording_sid}"
+                            recording_urls.append({
+                                "recording_sid":
+                                recording_sid,
+                                "recording_url":
+                                recording_url,
+                                "duration":
+                                recording.get('duration', '0'),
+                                "channels":
+                                recording.get('channels', 1),
+                                "file_format":
+                                "wav"
+                            })
+
+                    logger.info(
+                        f"✅ Found {len(recording_urls)} recordings for call {call_sid}"
+                    )
+                    return recording_urls
+                else:
+                    logger.info(
+                        f"📭 No recordings found for call {call_sid}")
+                    return []
+            else:
+                logger.error(
+                    f"❌ Failed to fetch recordings: HTTP {status}"
+                )
+                return []
 
         except Exception as e:
             logger.error(f"❌ Error fetching recording URLs: {e}")
             return []
 
+    async def fetch_call_status(self, call_sid: str) -> Optional[str]:
+        """Current Twilio status of a call (e.g. "in-progress", "completed"), or None"""
+        if not self.account_sid or not self.auth_token or not call_sid:
+            return None
+
+        status, call_data = await self._get(
+            f"{self.base_url}/Calls/{call_sid}.json")
+        if status != 200:
+            logger.warning(
+                f"⚠️ Failed to fetch status of call {call_sid}: HTTP {status}")
+            return None
+        return call_data.get("status")
+
     async def fetch_call_cost(
             self,
             call_sid: str,
@@ -140,71 +267,120 @@ class TwilioCostFetcher:
 
         url = f"{self.base_url}/Calls/{call_sid}.json"
 
-        # Basic auth credentials
-        auth = aiohttp.BasicAuth(self.account_sid, self.auth_token)
-
         logger.info(
             f"💰 Fetching real cost for call {call_sid} from Twilio API...")
 
-        async with aiohttp.ClientSession() as session:
-            for attempt in range(max_retries):
-                try:
-                    async with session.get(url, auth=auth) as response:
-                        if response.status == 200:
-                            call_data = await response.json()
-
-                            # Check if price is available
-                            price = call_data.get('price')
-                            if price is not None and price != '0' and price != 0:
-                                # Price is available - parse and return
-                                cost_data = self._parse_call_data(call_data)
-                                logger.info(
-                                    f"✅ Successfully fetched real cost: ${abs(float(price)):.6f} for call {call_sid}"
-                                )
-                                return cost_data
-                            elif attempt == max_retries - 1:
-                                # Price still not available after retries, calculate fallback cost
-                                logger.info(
-                                    f"💰 Price not directly available, calculating fallback cost based on duration and standard rates..."
-                                )
-                                fallback_cost = self._calculate_fallback_cost(
-                                    call_data)
-                                if fallback_cost:
-                                    logger.info(
-                                        f"✅ Calculated fallback cost: ${fallback_cost['cost_usd']:.6f} for call {call_sid}"
-                                    )
-                                    return fallback_cost
-                                else:
-                                    logger.warning(
-                                        f"⚠️ Could not calculate cost for call {call_sid}"
-                                    )
-                                    return None
-                            else:
-                                # Price not yet available, retry
-                                logger.info(
-                                    f"⏳ Price not yet available for call {call_sid} (attempt {attempt + 1}/{max_retries})"
-                                )
-                                if attempt < max_retries - 1:
-                                    await asyncio.sleep(retry_delay)
-                                    continue
+        for attempt in range(max_retries):
+            try:
+                status, call_data = await self._get(url)
+                if status == 200:
+                    # Check if price is available
+                    price = call_data.get('price')
+                    if price is not None and price != '0' and price != 0:
+                        # Price is available - parse and return
+                        cost_data = self.parse_call_data(call_data)
+                        logger.info(
+                            f"✅ Successfully fetched real cost: ${abs(float(price)):.6f} for call {call_sid}"
+                        )
+                        return cost_data
+                    elif attempt == max_retries - 1:
+                        # Price still not available after retries, calculate fallback cost
+                        logger.info(
+                            f"💰 Price not directly available, calculating fallback cost based on duration and standard rates..."
+                        )
+                        fallback_cost = self._calculate_fallback_cost(
+                            call_data)
+                        if fallback_cost:
+                            logger.info(
+                                f"✅ Calculated fallback cost: ${fallback_cost['cost_usd']:.6f} for call {call_sid}"
+                            )
+                            return fallback_cost
                         else:
-                            logger.error(
-                                f"❌ Twilio API error: {response.status} - {await response.text()}"
+                            logger.warning(
+                                f"⚠️ Could not calculate cost for call {call_sid}"
                             )
                             return None
-
-                except Exception as e:
+                    else:
+                        # Price not yet available, retry
+                        logger.info(
+                            f"⏳ Price not yet available for call {call_sid} (attempt {attempt + 1}/{max_retries})"
+                        )
+                        if attempt < max_retries - 1:
+                            await asyncio.sleep(retry_delay)
+                            continue
+                else:
                     logger.error(
-                        f"❌ Error fetching call cost (attempt {attempt + 1}): {e}"
+                        f"❌ Twilio API error: {status} - {call_data}"
                     )
-                    if attempt < max_retries - 1:
-                        await asyncio.sleep(retry_delay)
-                    else:
-                        return None
+                    return None
+
+            except Exception as e:
+                logger.error(
+                    f"❌ Error fetching call cost (attempt {attempt + 1}): {e}"
+                )
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(retry_delay)
+                else:
+                    return None
 
         return None
 
-    def _parse_call_data(self, call_data: Dict[str, Any]) -> Dict[str, Any]:
+    def estimate_call_cost(self,
+                           call_sid: str,
+                           duration_seconds: float,
+                           from_number: str = "",
+                           to_number: str = "",
+                           direction: str = "outbound-api"
+                           ) -> Optional[Dict[str, Any]]:
+        """
+        Estimate call cost locally from the measured call duration (no API request).
+
+        The final Twilio price is filled in later by the cost reconciler.
+        """
+        cost_data = self._calculate_fallback_cost({
+            "sid": call_sid,
+            "duration": int(duration_seconds),
+            "direction": direction,
+            "status": "completed",
+            "from": from_number,
+            "to": to_number
+        })
+        if cost_data:
+            cost_data["reconciliation_pending"] = True
+        return cost_data
+
+    async def iter_calls(self,
+                         params: Dict[str, Any],
+                         max_pages: int = 20) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Page through the account's Calls list, yielding one page of calls at a time.
+
+        Args:
+            params: Calls list filters (e.g. {'EndTime>': '2024-01-01', 'PageSize': 200})
+            max_pages: Upper bound on pages fetched per listing
+        """
+        if not self.account_sid or not self.auth_token:
+            logger.warning(
+                "Twilio credentials not configured - cannot list calls")
+            return
+
+        url = f"{self.base_url}/Calls.json"
+        for _ in range(max_pages):
+            status, data = await self._get(url, params=params)
+            if status != 200:
+                logger.error(f"❌ Twilio API error listing calls: {status}")
+                return
+
+            yield data.get('calls', [])
+
+            next_page_uri = data.get('next_page_uri')
+            if not next_page_uri:
+                return
+            # next_page_uri already carries the filters and page token
+            url = f"{TWILIO_API_HOST}{next_page_uri}"
+            params = None
+
+    def parse_call_data(self, call_data: Dict[str, Any]) -> Dict[str, Any]:
         """Parse Twilio call data into standardized format"""
         try:
             # Extract key fields
@@ -345,7 +521,11 @@ class TwilioCostFetcher:
             from_phone: str,
             to_phone: str,
             call_start_time: Optional[str] = None) -> Optional[str]:
-        """Find Twilio Call SID by matching phone numbers and optionally call start time"""
+        """Find Twilio Call SID by matching phone numbers and optionally call start time.
+
+        Fallback only - the SID is normally captured at dial time or from the
+        Twilio status callback.
+        """
         if not self.account_sid or not self.auth_token:
             logger.warning(
                 "Twilio credentials not configured - cannot search calls")
@@ -380,39 +560,33 @@ class TwilioCostFetcher:
             logger.info(
                 f"🔍 Searching for call from {from_phone} to {to_phone}")
 
-        # Build URL with query parameters
-        query_string = '&'.join([f"{k}={v}" for k, v in params.items()])
-        url = f"{self.base_url}/Calls.json?{query_string}"
-        auth = aiohttp.BasicAuth(self.account_sid, self.auth_token)
+        url = f"{self.base_url}/Calls.json"
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, auth=auth) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        calls = data.get('calls', [])
-
-                        if calls:
-                            # Return the most recent matching call
-                            most_recent_call = calls[0]
-                            call_sid = most_recent_call.get('sid')
-                            call_status = most_recent_call.get('status')
-                            call_duration = most_recent_call.get('duration')
-
-                            logger.info(
-                                f"✅ Found matching call SID: {call_sid} (status: {call_status}, duration: {call_duration}s)"
-                            )
-                            return call_sid
-                        else:
-                            logger.warning(
-                                f"❌ No calls found matching from:{from_phone} to:{to_phone}"
-                            )
-                            return None
-                    else:
-                        logger.error(
-                            f"❌ Twilio API error searching calls: {response.status}"
-                        )
-                        return None
+            status, data = await self._get(url, params=params)
+            if status == 200:
+                calls = data.get('calls', [])
+
+                if calls:
+                    # Return the most recent matching call
+                    most_recent_call = calls[0]
+                    call_sid = most_recent_call.get('sid')
+                    call_status = most_recent_call.get('status')
+                    call_duration = most_recent_call.get('duration')
+
+                    logger.info(
+                        f"✅ Found matching call SID: {call_sid} (status: {call_status}, duration: {call_duration}s)"
+                    )
+                    return call_sid
+                else:
+                    logger.warning(
+                        f"❌ No calls found matching from:{from_phone} to:{to_phone}"
+                    )
+                    return None
+            else:
+                logger.error(
+                    f"❌ Twilio API error searching calls: {status}")
+                return None
         except Exception as e:
             logger.error(f"❌ Error searching for call: {e}")
             return None
@@ -427,31 +601,117 @@ class TwilioCostFetcher:
             return []
 
         try:
-            # Use Twilio REST API with aiohttp instead of sync client
-            url = f"{self.base_url}/Calls.json?PageSize={limit}"
-            auth = aiohttp.BasicAuth(self.account_sid, self.auth_token)
-
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, auth=auth) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        calls = data.get('calls', [])
-                        return [{
-                            "sid": call.get("sid"),
-                            "status": call.get("status"),
-                            "duration": call.get("duration") or 0,
-                            "price": call.get("price"),
-                            "start_time": call.get("start_time")
-                        } for call in calls]
-                    else:
-                        logger.error(
-                            f"❌ Twilio API error fetching recent calls: {response.status}"
-                        )
-                        return []
+            url = f"{self.base_url}/Calls.json"
+            status, data = await self._get(url, params={'PageSize': limit})
+            if status == 200:
+                calls = data.get('calls', [])
+                return [{
+                    "sid": call.get("sid"),
+                    "status": call.get("status"),
+                    "duration": call.get("duration") or 0,
+                    "price": call.get("price"),
+                    "start_time": call.get("start_time")
+                } for call in calls]
+            else:
+                logger.error(
+                    f"❌ Twilio API error fetching recent calls: {status}")
+                return []
         except Exception as e:
             logger.error(f"❌ Error fetching recent calls: {e}")
             return []
 
 
+class TwilioClientRegistry:
+    """Pool of per-account Twilio clients keyed by account SID"""
+
+    def __init__(self, idle_timeout_seconds: float = 600.0,
+                 max_concurrency_per_account: int = 10,
+                 retire_grace_seconds: float = 60.0):
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.max_concurrency_per_account = max_concurrency_per_account
+        # Longest a replaced client waits for its in-flight requests before closing
+        self.retire_grace_seconds = retire_grace_seconds
+        self._clients: Dict[str, TwilioCostFetcher] = {}
+
+    def get_client(self, account_sid: Optional[str],
+                   auth_token: Optional[str]) -> Optional[TwilioCostFetcher]:
+        """
+        Return the pooled client for a Twilio account, creating it on first use.
+
+        Args:
+            account_sid: Twilio Account SID (starts with 'AC')
+            auth_token: Twilio Auth Token for the account
+
+        Returns:
+            TwilioCostFetcher bound to the account or None if credentials are missing
+        """
+        if not account_sid or not auth_token:
+            return None
+
+        self._evict_idle()
+
+        client = self._clients.get(account_sid)
+        if client is not None and client.auth_token != auth_token:
+            # Token rotated - retire the old client once its requests finish
+            logger.info(
+                f"🔄 Twilio auth token changed for {account_sid[:8]}..., replacing pooled client"
+            )
+            self._retire(client)
+            client = None
+
+        if client is None:
+            client = TwilioCostFetcher(
+                account_sid=account_sid,
+                auth_token=auth_token,
+                max_concurrency=self.max_concurrency_per_account)
+            self._clients[account_sid] = client
+            logger.info(
+                f"✅ Created pooled Twilio client for {account_sid[:8]}... ({len(self._clients)} accounts pooled)"
+            )
+
+        client.last_used = time.monotonic()
+        return client
+
+    def get_client_for_call(self,
+                            call_data: Dict[str, Any]) -> Optional[TwilioCostFetcher]:
+        """Return the pooled client for the Twilio credentials stored with a call"""
+        call_data = call_data or {}
+        return self.get_client(call_data.get("twilio_account_sid"),
+                               call_data.get("twilio_auth_token"))
+
+    def _evict_idle(self):
+        """Close clients that have not been used within the idle timeout"""
+        now = time.monotonic()
+        for account_sid, client in list(self._clients.items()):
+            if client.is_idle and now - client.last_used > self.idle_timeout_seconds:
+                del self._clients[account_sid]
+                self._retire(client)
+                logger.info(
+                    f"🧹 Evicted idle Twilio client for {account_sid[:8]}...")
+
+    def _retire(self, client: TwilioCostFetcher):
+        """Close a client that left the pool once its in-flight requests finish"""
+        try:
+            asyncio.get_running_loop().create_task(
+                client.close_when_idle(self.retire_grace_seconds))
+        except RuntimeError:
+            # No running loop - the session was never opened in one
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool statistics for health reporting"""
+        return {
+            "pooled_accounts": len(self._clients),
+            "in_flight_requests": sum(c.in_flight for c in self._clients.values())
+        }
+
+    async def close_all(self):
+        """Close every pooled client (used on shutdown)"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        await asyncio.gather(*(client.close() for client in clients),
+                             return_exceptions=True)
+
+
 # Global instance
-twilio_cost_fetcher = TwilioCostFetcher()
+twilio_client_registry = TwilioClientRegistry()
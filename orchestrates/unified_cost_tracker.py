@@ -4,26 +4,42 @@ Combines cost calculation, usage tracking, and real-time cost calculation into o
 Handles all AI service usage tracking and cost calculation with proper error handling.
 """
 
+import os
 import time
+import random
 import logging
 from typing import Dict, Any, Optional, List
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+def _is_transcript_estimate(context: str) -> bool:
+    """Usage estimated after the call from its transcript (e.g. speech_recognition_from_transcript)"""
+    return context.endswith("_from_transcript")
+
+
+# PERFORMANCE OPTIMIZATION: Per-call usage is kept as fixed-size running totals
+# (slotted records); per-event details are only captured when sampling is enabled
+
+
+@dataclass(slots=True)
 class ServiceUsage:
     """Track usage for a specific service"""
     provider: str = ""
     model: str = ""
     total_usage: float = 0.0
     usage_count: int = 0
+    # Running cost of total_usage, so an estimate can be replaced in O(1)
+    cost: float = 0.0
+    # The totals come from transcript estimation (replaced by the first live event)
+    estimated: bool = False
+    # Sampled events (USAGE_DETAIL_SAMPLE_RATE), at most USAGE_DETAIL_MAX_SAMPLES
     usage_details: List[Dict[str, Any]] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class LLMUsage:
     """Track LLM usage with detailed breakdown"""
     provider: str = ""
@@ -32,10 +48,13 @@ class LLMUsage:
     output_tokens: int = 0
     total_tokens: int = 0
     requests_count: int = 0
+    # Real-time agent responses were tracked, so transcript estimates are skipped
+    live_data: bool = False
+    # Sampled like ServiceUsage.usage_details
     usage_contexts: List[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class CostBreakdown:
     """Detailed cost breakdown for a call"""
     transcription_cost: float = 0.0
@@ -51,6 +70,10 @@ class CostBreakdown:
     llm_output_tokens: int = 0
     call_duration_seconds: float = 0.0
 
+    # Phrases played from the TTS phrase cache instead of being synthesized
+    synthesis_cached_characters: int = 0
+    synthesis_cache_savings: float = 0.0
+
     # Provider-specific details
     transcription_provider: str = ""
     synthesis_provider: str = ""
@@ -71,7 +94,9 @@ class CostBreakdown:
                 "synthesis_characters": self.synthesis_characters,
                 "llm_input_tokens": self.llm_input_tokens,
                 "llm_output_tokens": self.llm_output_tokens,
-                "call_duration_seconds": round(self.call_duration_seconds, 2)
+                "call_duration_seconds": round(self.call_duration_seconds, 2),
+                "synthesis_cached_characters": self.synthesis_cached_characters,
+                "synthesis_cache_savings": round(self.synthesis_cache_savings, 6)
             },
             "providers": {
                 "transcription_provider": self.transcription_provider,
@@ -81,7 +106,7 @@ class CostBreakdown:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class CallMetrics:
     """Comprehensive usage metrics for a single call"""
     call_id: str = ""
@@ -145,6 +170,25 @@ class UnifiedCostTracker:
         self.call_metrics: Dict[str, CallMetrics] = {}
         self.call_costs: Dict[str, CostBreakdown] = {}
         self.call_start_times: Dict[str, float] = {}
+        # call_id -> time finalized, oldest first; evicted after FINALIZED_CALL_TTL_SECONDS
+        self.finalized_calls: Dict[str, float] = {}
+
+        # Share of usage events kept as per-event details (0 keeps totals only)
+        self.detail_sample_rate = float(os.environ.get("USAGE_DETAIL_SAMPLE_RATE", "0"))
+        self.max_detail_samples = int(os.environ.get("USAGE_DETAIL_MAX_SAMPLES", "50"))
+        # Finalized calls stay readable this long (e.g. for a retried webhook)
+        self.finalized_call_ttl_seconds = float(
+            os.environ.get("FINALIZED_CALL_TTL_SECONDS", "300"))
+        # Calls that never reach post-call processing are dropped after this
+        self.max_call_age_seconds = float(os.environ.get("MAX_TRACKED_CALL_AGE_SECONDS", "14400"))
+
+        # TTS phrase cache lookups across all calls
+        self.synthesis_cache_stats = {
+            "hits": 0,
+            "misses": 0,
+            "characters_saved": 0,
+            "cost_saved": 0.0
+        }
 
         # Real provider pricing rates (2025)
         self.pricing_rates = {
@@ -237,6 +281,7 @@ class UnifiedCostTracker:
                             llm_provider: str = "openai",
                             llm_model: str = "gpt-4o-mini") -> None:
         """Initialize comprehensive tracking for a new call"""
+        self._evict_expired_calls()
 
         # Initialize usage metrics
         metrics = CallMetrics(call_id=call_id, start_time=time.time())
@@ -260,6 +305,9 @@ class UnifiedCostTracker:
             synthesis_provider=synthesis_provider,
             llm_provider=llm_provider)
 
+        # Re-tracked calls move to the back of the eviction order
+        self.call_start_times.pop(call_id, None)
+        self.finalized_calls.pop(call_id, None)
         self.call_start_times[call_id] = time.time()
         logger.info(f"💰 Unified tracking initialized for call {call_id}")
 
@@ -274,37 +322,36 @@ class UnifiedCostTracker:
             return
 
         # Session-based deduplication for transcript estimation vs real-time data
-        metrics = self.call_metrics[call_id]
+        usage = self.call_metrics[call_id].transcription
+        estimate = _is_transcript_estimate(context)
 
-        # If this is transcript estimation and we already have real-time data, skip
-        if context == "speech_recognition_from_transcript" and metrics.transcription.usage_count > 0:
+        # If this is transcript estimation and we already have data, skip
+        if estimate and usage.usage_count > 0:
             logger.debug(
-                f"🔄 Skipping transcript estimation - already have {metrics.transcription.usage_count} real-time transcription events"
+                f"🔄 Skipping transcript estimation - already have {usage.usage_count} transcription events"
             )
             return
 
         # If we're adding real-time data but already have transcript estimation, reset and start fresh
-        if context == "live_transcription" and any(
-                "transcript" in detail.get("context", "")
-                for detail in metrics.transcription.usage_details):
+        if not estimate and usage.estimated:
             logger.info(
                 f"🔄 Switching from transcript estimation to real-time data for call {call_id}"
             )
-            metrics.transcription.total_usage = 0
-            metrics.transcription.usage_count = 0
-            metrics.transcription.usage_details = []
+            if call_id in self.call_costs:
+                self.call_costs[call_id].transcription_seconds -= usage.total_usage
+                self.call_costs[call_id].transcription_cost -= usage.cost
+            self._reset_service_usage(usage)
 
         # Update usage metrics
-        metrics.transcription.total_usage += duration_seconds
-        metrics.transcription.usage_count += 1
-        metrics.transcription.usage_details.append({
-            "timestamp":
-            datetime.utcnow().isoformat() + "Z",
-            "duration_seconds":
-            round(duration_seconds, 2),
-            "context":
-            context
-        })
+        usage.total_usage += duration_seconds
+        usage.usage_count += 1
+        usage.estimated = estimate
+        if self._sample_detail(usage.usage_details):
+            usage.usage_details.append({
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "duration_seconds": round(duration_seconds, 2),
+                "context": context
+            })
 
         # Update cost breakdown
         if call_id in self.call_costs:
@@ -313,7 +360,7 @@ class UnifiedCostTracker:
 
             # Calculate cost
             provider = cost_breakdown.transcription_provider.lower()
-            actual_model = model or metrics.transcription.model or "default"
+            actual_model = model or usage.model or "default"
             if actual_model is None:
                 actual_model = "default"
             duration_minutes = duration_seconds / 60.0
@@ -325,6 +372,7 @@ class UnifiedCostTracker:
                                           provider_rates.get("default", 0))
 
             cost = duration_minutes * rate
+            usage.cost += cost
             cost_breakdown.transcription_cost += cost
             self._update_total_cost(call_id)
 
@@ -343,60 +391,45 @@ class UnifiedCostTracker:
             return
 
         # Session-based deduplication for transcript estimation vs real-time data
-        metrics = self.call_metrics[call_id]
+        usage = self.call_metrics[call_id].synthesis
+        estimate = _is_transcript_estimate(context)
 
-        # If this is transcript estimation and we already have real-time data, skip
-        if context == "agent_responses_from_transcript" and metrics.synthesis.usage_count > 0:
+        # If this is transcript estimation and we already have data, skip
+        if estimate and usage.usage_count > 0:
             logger.debug(
-                f"🔄 Skipping synthesis transcript estimation - already have {metrics.synthesis.usage_count} real-time synthesis events"
+                f"🔄 Skipping synthesis transcript estimation - already have {usage.usage_count} synthesis events"
             )
             return
 
         # If we're adding real-time data but already have transcript estimation, reset and start fresh
-        if context == "live_synthesis" and any(
-                "transcript" in detail.get("context", "")
-                for detail in metrics.synthesis.usage_details):
+        if not estimate and usage.estimated:
             logger.info(
                 f"🔄 Switching from synthesis transcript estimation to real-time data for call {call_id}"
             )
-            metrics.synthesis.total_usage = 0
-            metrics.synthesis.usage_count = 0
-            metrics.synthesis.usage_details = []
+            if call_id in self.call_costs:
+                self.call_costs[call_id].synthesis_characters -= int(usage.total_usage)
+                self.call_costs[call_id].synthesis_cost -= usage.cost
+            self._reset_service_usage(usage)
 
         # Update usage metrics
-        metrics.synthesis.total_usage += character_count
-        metrics.synthesis.usage_count += 1
-        metrics.synthesis.usage_details.append({
-            "timestamp":
-            datetime.utcnow().isoformat() + "Z",
-            "character_count":
-            character_count,
-            "context":
-            context
-        })
+        usage.total_usage += character_count
+        usage.usage_count += 1
+        usage.estimated = estimate
+        if self._sample_detail(usage.usage_details):
+            usage.usage_details.append({
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "character_count": character_count,
+                "context": context
+            })
 
         # Update cost breakdown
         if call_id in self.call_costs:
             cost_breakdown = self.call_costs[call_id]
             cost_breakdown.synthesis_characters += character_count
 
-            # Calculate cost with robust model handling
-            provider = cost_breakdown.synthesis_provider.lower()
-            actual_model = model or metrics.synthesis.model or "default"
-
-            # Handle None model gracefully
-            if actual_model is None:
-                actual_model = "default"
-            else:
-                actual_model = str(actual_model)
-
-            rate = 0
-            if provider in self.pricing_rates:
-                provider_rates = self.pricing_rates[provider]
-                rate = provider_rates.get(actual_model.lower(),
-                                          provider_rates.get("default", 0))
-
+            rate = self._synthesis_rate(call_id, model)
             cost = character_count * rate
+            usage.cost += cost
             cost_breakdown.synthesis_cost += cost
             self._update_total_cost(call_id)
 
@@ -404,6 +437,66 @@ class UnifiedCostTracker:
                 f"🗣️ Added synthesis: {character_count} chars at ${rate:.6f}/char = ${cost:.6f}"
             )
 
+    def _sample_detail(self, details: List[Any]) -> bool:
+        """Whether to keep this event's details (bounded, off by default)"""
+        return (self.detail_sample_rate > 0 and len(details) < self.max_detail_samples
+                and random.random() < self.detail_sample_rate)
+
+    @staticmethod
+    def _reset_service_usage(usage: ServiceUsage) -> None:
+        usage.total_usage = 0.0
+        usage.usage_count = 0
+        usage.cost = 0.0
+        usage.estimated = False
+        usage.usage_details = []
+
+    def _synthesis_rate(self, call_id: str, model: Optional[str] = None) -> float:
+        """Per-character TTS rate for the call's synthesis provider and model"""
+        provider = self.call_costs[call_id].synthesis_provider.lower()
+        actual_model = model or self.call_metrics[call_id].synthesis.model or "default"
+
+        # Handle None model gracefully
+        if actual_model is None:
+            actual_model = "default"
+        else:
+            actual_model = str(actual_model)
+
+        rate = 0
+        if provider in self.pricing_rates:
+            provider_rates = self.pricing_rates[provider]
+            rate = provider_rates.get(actual_model.lower(),
+                                      provider_rates.get("default", 0))
+        return rate
+
+    def add_synthesis_cache_result(self,
+                                   call_id: Optional[str],
+                                   character_count: int,
+                                   hit: bool) -> None:
+        """Track a TTS phrase cache lookup; a hit is characters the provider never billed"""
+        self.synthesis_cache_stats["hits" if hit else "misses"] += 1
+        if not hit:
+            return
+        self.synthesis_cache_stats["characters_saved"] += character_count
+
+        if call_id in self.call_costs and call_id in self.call_metrics:
+            cost_breakdown = self.call_costs[call_id]
+            saved = character_count * self._synthesis_rate(call_id)
+            cost_breakdown.synthesis_cached_characters += character_count
+            cost_breakdown.synthesis_cache_savings += saved
+            self.synthesis_cache_stats["cost_saved"] += saved
+            logger.debug(
+                f"🔊 TTS phrase cache hit: {character_count} chars (${saved:.6f}) saved for call {call_id}"
+            )
+
+    def get_synthesis_cache_stats(self) -> Dict[str, Any]:
+        """TTS phrase cache hit rate and savings across all calls"""
+        lookups = self.synthesis_cache_stats["hits"] + self.synthesis_cache_stats["misses"]
+        return {
+            **self.synthesis_cache_stats,
+            "cost_saved": round(self.synthesis_cache_stats["cost_saved"], 6),
+            "hit_rate": round(self.synthesis_cache_stats["hits"] / lookups * 100.0, 2) if lookups else 0.0
+        }
+
     def add_llm_usage(self,
                       call_id: str,
                       input_tokens: int,
@@ -419,9 +512,7 @@ class UnifiedCostTracker:
         metrics = self.call_metrics[call_id]
 
         # If this is transcript estimation and we already have real-time data, skip
-        if context == "agent_conversation" and any(
-                "live_agent_response" in ctx
-                for ctx in metrics.llm.usage_contexts):
+        if context == "agent_conversation" and metrics.llm.live_data:
             logger.debug(
                 f"🔄 Skipping LLM transcript estimation - already have real-time LLM data"
             )
@@ -432,8 +523,11 @@ class UnifiedCostTracker:
         metrics.llm.output_tokens += output_tokens
         metrics.llm.total_tokens += (input_tokens + output_tokens)
         metrics.llm.requests_count += 1
-        metrics.llm.usage_contexts.append(
-            f"{context}:{input_tokens}/{output_tokens}")
+        if "live_agent_response" in context:
+            metrics.llm.live_data = True
+        if self._sample_detail(metrics.llm.usage_contexts):
+            metrics.llm.usage_contexts.append(
+                f"{context}:{input_tokens}/{output_tokens}")
 
         # Update cost breakdown
         if call_id in self.call_costs:
@@ -559,9 +653,33 @@ class UnifiedCostTracker:
         return self.call_costs.get(call_id)
 
     def finalize_call_metrics(self, call_id: str) -> Optional[CallMetrics]:
-        """Finalize metrics and calculate call duration"""
-        if call_id not in self.call_metrics:
+        """Finalize metrics; the call's tracking data is evicted once FINALIZED_CALL_TTL_SECONDS pass"""
+        metrics = self.call_metrics.get(call_id)
+        if metrics is None:
             return None
+        self._mark_finalized(call_id)
+        return metrics
+
+    def _mark_finalized(self, call_id: str) -> None:
+        if call_id not in self.finalized_calls:
+            self.finalized_calls[call_id] = time.time()
+        self._evict_expired_calls()
+
+    def _evict_expired_calls(self) -> None:
+        """Drop finalized calls past their TTL and calls that were never finalized"""
+        # Both maps are in insertion order, so only expired entries at the front are visited
+        now = time.time()
+        while self.finalized_calls:
+            call_id, finalized_at = next(iter(self.finalized_calls.items()))
+            if now - finalized_at < self.finalized_call_ttl_seconds:
+                break
+            self.cleanup_call(call_id)
+        while self.call_start_times:
+            call_id, started_at = next(iter(self.call_start_times.items()))
+            if now - started_at < self.max_call_age_seconds:
+                break
+            logger.warning(f"⚠️ Evicting tracking data for call {call_id}, never finalized")
+            self.cleanup_call(call_id)
 
     def update_call_metadata(self, call_id: str, duration_seconds: float, transcript_text: str) -> None:
         """Update call metadata with actual duration and transcript data"""
@@ -599,6 +717,10 @@ class UnifiedCostTracker:
             bot_lines = [line for line in transcript_text.split('\n') if line.startswith('BOT:')]
             bot_text = ' '.join(line[4:].strip() for line in bot_lines)  # Remove "BOT:" prefix
             bot_character_count = len(bot_text)
+            # Cached phrases were played without being synthesized
+            if call_id in self.call_costs:
+                bot_character_count = max(
+                    0, bot_character_count - self.call_costs[call_id].synthesis_cached_characters)
             
             if bot_character_count > 0:
                 self.add_synthesis_usage(call_id, bot_character_count, context="agent_responses_from_transcript")
@@ -765,6 +887,7 @@ class UnifiedCostTracker:
 
         if call_duration_seconds is not None:
             cost_breakdown.call_duration_seconds = call_duration_seconds
+        self._mark_finalized(call_id)
 
         # Add call metadata
         result = cost_breakdown.to_dict()
@@ -1069,11 +1192,37 @@ class UnifiedCostTracker:
 
         return {}
 
+    def export_call_state(self, call_id: str) -> Optional[Dict[str, Any]]:
+        """Serialize a call's tracking data so another process can finish it"""
+        metrics = self.call_metrics.get(call_id)
+        if metrics is None:
+            return None
+        costs = self.call_costs.get(call_id)
+        return {
+            "metrics": asdict(metrics),
+            "costs": asdict(costs) if costs else None,
+            "start_time": self.call_start_times.get(call_id)
+        }
+
+    def import_call_state(self, call_id: str, state: Dict[str, Any]) -> None:
+        """Restore tracking data produced by export_call_state"""
+        metrics = dict(state["metrics"])
+        metrics["transcription"] = ServiceUsage(**metrics["transcription"])
+        metrics["synthesis"] = ServiceUsage(**metrics["synthesis"])
+        metrics["llm"] = LLMUsage(**metrics["llm"])
+        self.call_metrics[call_id] = CallMetrics(**metrics)
+        if state.get("costs"):
+            self.call_costs[call_id] = CostBreakdown(**state["costs"])
+        if state.get("start_time") is not None:
+            self.call_start_times[call_id] = state["start_time"]
+        logger.info(f"📥 Imported tracking data for call {call_id}")
+
     def cleanup_call(self, call_id: str) -> None:
         """Clean up tracking data for completed call"""
         self.call_metrics.pop(call_id, None)
         self.call_costs.pop(call_id, None)
         self.call_start_times.pop(call_id, None)
+        self.finalized_calls.pop(call_id, None)
         logger.info(f"🧹 Cleaned up tracking data for call {call_id}")
 
 